@@ -1,11 +1,13 @@
 __all__ = [
   "cli",
   "ServiceBroker",
+  "JobStatusPoller",
   "JobStatusWorker",
   "Worker"
 ]
 
 from .cli import cli
 from .broker import ServiceBroker
+from .job_status_poller import JobStatusPoller
 from .job_status_worker import JobStatusWorker
 from .worker import Worker
@@ -7,9 +7,9 @@ from time import sleep
 from operandi_utils import (
     get_log_file_path_prefix, reconfigure_all_loggers, verify_database_uri, verify_and_parse_mq_uri)
 from operandi_utils.constants import LOG_LEVEL_BROKER
-from operandi_utils.rabbitmq.constants import (
-    RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_USERS, RABBITMQ_QUEUE_JOB_STATUSES)
+from operandi_utils.rabbitmq.constants import RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_USERS
 from .worker import Worker
+from .job_status_poller import JobStatusPoller
 from .job_status_worker import JobStatusWorker
 
 
@@ -43,19 +43,19 @@ class ServiceBroker:
         # Keys: Each key is a unique queue name
         # Value: List of worker pids consuming from the key queue name
         self.queues_and_workers = {}
+        # The job status poller is not bound to a queue, its pid is tracked under this key
+        self.poller_key = "job_status_poller"
 
     def run_broker(self):
         # A list of queues for which a worker process should be created
         queues = [RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_USERS]
-        status_queue = RABBITMQ_QUEUE_JOB_STATUSES
         try:
             for queue_name in queues:
                 self.log.info(f"Creating a worker process to consume from queue: {queue_name}")
                 self.create_worker_process(
                     queue_name=queue_name, status_checker=False, tunnel_port_executor=22, tunnel_port_transfer=22)
-            self.log.info(f"Creating a status worker process to consume from queue: {status_queue}")
-            self.create_worker_process(
-                queue_name=status_queue, status_checker=True, tunnel_port_executor=22, tunnel_port_transfer=22)
+            self.log.info(f"Creating a job status poller process")
+            self.create_job_status_poller_process(tunnel_port_executor=22, tunnel_port_transfer=22)
         except Exception as error:
             self.log.error(f"Error while creating worker processes: {error}")
 
@@ -97,6 +97,30 @@ class ServiceBroker:
             # append the pid to the workers list of the queue_name
             (self.queues_and_workers[queue_name]).append(child_pid)
 
+    # Creates a separate job status poller process and append its pid if successful
+    def create_job_status_poller_process(self, tunnel_port_executor: int = 22, tunnel_port_transfer: int = 22) -> None:
+        if self.poller_key not in self.queues_and_workers:
+            self.queues_and_workers[self.poller_key] = []
+        self.log.info(f"Trying to create a new job status poller process")
+        try:
+            created_pid = fork()
+        except Exception as os_error:
+            self.log.error(f"Failed to create a child process, reason: {os_error}")
+            return
+        if created_pid != 0:
+            self.log.info(f"Assigning a new job status poller process with pid: {created_pid}")
+            (self.queues_and_workers[self.poller_key]).append(created_pid)
+            return
+        try:
+            child_poller = JobStatusPoller(
+                db_url=self.db_url, tunnel_port_executor=tunnel_port_executor,
+                tunnel_port_transfer=tunnel_port_transfer, test_sbatch=self.test_sbatch)
+            child_poller.run()
+            exit(0)
+        except Exception as e:
+            self.log.error(f"Job status poller process failed, reason: {e}")
+            exit(-1)
+
     # Forks a child process
     def __create_child_process(
         self, queue_name, tunnel_port_executor: int = 22, tunnel_port_transfer: int = 22, status_checker=False
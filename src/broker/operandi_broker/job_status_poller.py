@@ -0,0 +1,209 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import getLogger
+import signal
+from os import environ, getpid, getppid, setsid
+from sys import exit
+from threading import Event
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+from operandi_utils import reconfigure_all_loggers
+from operandi_utils.constants import (
+    JOB_STATUS_POLLER_BACKOFF_FACTOR, JOB_STATUS_POLLER_DOWNLOAD_TRIES, JOB_STATUS_POLLER_INTERVAL,
+    JOB_STATUS_POLLER_MAX_INTERVAL, LOG_LEVEL_WORKER, StateJob, StateJobSlurm, StateWorkspace)
+from operandi_utils.database import (
+    sync_db_initiate_database, sync_db_get_active_hpc_slurm_jobs, sync_db_get_active_workflow_jobs,
+    sync_db_get_hpc_slurm_job, sync_db_get_workflow_job, sync_db_get_workspace, sync_db_update_workflow_job,
+    sync_db_update_workspace)
+from operandi_utils.hpc import HPCExecutor, HPCTransfer
+from .job_status_worker import JobStatusWorker
+
+
+class JobStatusPoller(JobStatusWorker):
+    """
+    Keeps the states of the slurm jobs, workflow jobs and workspaces in the DB current without being asked to.
+    All active jobs are synced from a single slurm query per poll. The poll interval is reset to `poll_interval`
+    when a state has changed and otherwise grows by the backoff factor, up to `max_poll_interval`.
+    The results are downloaded in a separate thread, hence a large download does not delay the next polls.
+    """
+    def __init__(
+        self, db_url, tunnel_port_executor, tunnel_port_transfer, test_sbatch=False,
+        poll_interval: Optional[int] = None, max_poll_interval: Optional[int] = None,
+        unpack_mode: Optional[str] = None, use_hpc_agent: Optional[bool] = None
+    ):
+        # Read on construction, not on import, so that the environment of the forked process is used
+        if poll_interval is None:
+            poll_interval = int(environ.get("OPERANDI_POLLER_INTERVAL", JOB_STATUS_POLLER_INTERVAL))
+        if max_poll_interval is None:
+            max_poll_interval = int(environ.get("OPERANDI_POLLER_MAX_INTERVAL", JOB_STATUS_POLLER_MAX_INTERVAL))
+        if poll_interval <= 0:
+            raise ValueError(f"The poll interval must be positive, got: {poll_interval}")
+        super().__init__(
+            db_url=db_url, rabbitmq_url=None, queue_name="job_status_poller", tunnel_port_executor=tunnel_port_executor,
+            tunnel_port_transfer=tunnel_port_transfer, test_sbatch=test_sbatch, unpack_mode=unpack_mode,
+            use_hpc_agent=use_hpc_agent)
+        self.log = getLogger(f"operandi_broker.job_status_poller[{getpid()}]")
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(poll_interval, max_poll_interval)
+        self.current_poll_interval = poll_interval
+        self.stop_polling = Event()
+        # A single thread, so that the downloads do not compete for the transfer connection
+        self.download_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job_status_poller_download")
+        # Keys: workflow job ids, values: the workspace id and the future of the results download in flight
+        self.results_downloads: Dict[str, Tuple[str, Future]] = {}
+        # Keys: workflow job ids, values: the amount of failed results downloads and the earliest time of the retry
+        self.results_download_failures: Dict[str, Tuple[int, float]] = {}
+
+    def run(self):
+        try:
+            # Make the current process session leader
+            setsid()
+            # Reconfigure all loggers to the same format
+            reconfigure_all_loggers(log_level=LOG_LEVEL_WORKER, log_file_path=self.log_file_path)
+            self.log.info(f"Activating signal handler for SIGINT, SIGTERM")
+            signal.signal(signal.SIGINT, self.signal_handler)
+            signal.signal(signal.SIGTERM, self.signal_handler)
+
+            sync_db_initiate_database(self.db_url)
+            self.hpc_executor = HPCExecutor(tunnel_host='localhost', tunnel_port=self.tunnel_port_executor)
+            self.log.info("HPC executor connection successful.")
+            self.hpc_io_transfer = HPCTransfer(tunnel_host='localhost', tunnel_port=self.tunnel_port_transfer)
+            self.log.info("HPC transfer connection successful.")
+            if self.use_hpc_agent:
+                self.hpc_executor.use_deployed_batch_scripts(
+                    batch_scripts=self.hpc_io_transfer.deploy_batch_scripts(), start_agent=True)
+        except Exception as e:
+            self.log.error(f"The job status poller failed, reason: {e}")
+            raise Exception(f"The job status poller failed, reason: {e}")
+
+        self.log.info(f"Polling the slurm job states every {self.poll_interval} to {self.max_poll_interval} seconds")
+        while not self.stop_polling.is_set():
+            try:
+                states_changed = self.poll_job_states()
+            except Exception as error:
+                self.log.error(f"Polling the job states has failed: {error}")
+                states_changed = False
+            # Polled at the fastest interval while results are downloaded, to finish their jobs soon after
+            self.stop_polling.wait(
+                timeout=self.next_poll_interval(states_changed=states_changed or bool(self.results_downloads)))
+        self.log.info("Exiting gracefully.")
+
+    def next_poll_interval(self, states_changed: bool) -> float:
+        if states_changed:
+            self.current_poll_interval = self.poll_interval
+        else:
+            self.current_poll_interval = min(
+                self.current_poll_interval * JOB_STATUS_POLLER_BACKOFF_FACTOR, self.max_poll_interval)
+        self.log.debug(f"Next poll of the job states in {self.current_poll_interval} seconds")
+        return self.current_poll_interval
+
+    def _download_results_from_hpc(
+        self, job_id: str, job_dir: str, workspace_id: str, workspace_dir: str, results_mode: str
+    ) -> None:
+        """
+        Starts the results download in the download thread. The DB is updated on the poll thread by
+        `_finish_results_downloads`, since the sync DB wrappers use the event loop of that thread.
+        """
+        if job_id in self.results_downloads:
+            self.log.debug(f"The results of workflow job: {job_id} are still being downloaded")
+            return
+        failures, retry_time = self.results_download_failures.get(job_id, (0, 0.0))
+        if monotonic() < retry_time:
+            self.log.debug(f"Delaying the retried results download of workflow job: {job_id}, failures: {failures}")
+            return
+        sync_db_update_workspace(find_workspace_id=workspace_id, state=StateWorkspace.TRANSFERRING_FROM_HPC)
+        sync_db_update_workflow_job(find_job_id=job_id, job_state=StateJob.TRANSFERRING_FROM_HPC)
+        self.results_downloads[job_id] = (workspace_id, self.download_executor.submit(
+            self.hpc_io_transfer.get_and_unpack_slurm_workspace, ocrd_workspace_dir=workspace_dir,
+            workflow_job_dir=job_dir, unpack_mode=self.unpack_mode, results_mode=results_mode))
+
+    def _finish_results_downloads(self) -> bool:
+        """
+        Finishes the workflow jobs whose results download is done. A failed download is started again by a later
+        poll, since its workflow job is still transferring, with the delay growing by the backoff factor. After
+        `JOB_STATUS_POLLER_DOWNLOAD_TRIES` failed downloads the workflow job is failed. Returns whether any
+        download was done.
+        """
+        downloads_done = False
+        for job_id, (workspace_id, future) in list(self.results_downloads.items()):
+            if not future.done():
+                continue
+            del self.results_downloads[job_id]
+            downloads_done = True
+            try:
+                results_sha256 = future.result()
+            except Exception as error:
+                self.log.warning(f"Failed to download the results of workflow job: {job_id}, reason: {error}")
+                self._handle_failed_results_download(job_id=job_id, workspace_id=workspace_id)
+                continue
+            self.results_download_failures.pop(job_id, None)
+            self._finish_results_download(job_id=job_id, workspace_id=workspace_id, results_sha256=results_sha256)
+        return downloads_done
+
+    def _handle_failed_results_download(self, job_id: str, workspace_id: str) -> None:
+        failures = self.results_download_failures.get(job_id, (0, 0.0))[0] + 1
+        if failures >= JOB_STATUS_POLLER_DOWNLOAD_TRIES:
+            self.log.error(f"Giving up the results download of workflow job: {job_id} after {failures} failures")
+            self.results_download_failures.pop(job_id, None)
+            sync_db_update_workspace(find_workspace_id=workspace_id, state=StateWorkspace.READY)
+            sync_db_update_workflow_job(find_job_id=job_id, job_state=StateJob.FAILED)
+            return
+        retry_delay = min(
+            self.poll_interval * JOB_STATUS_POLLER_BACKOFF_FACTOR ** (failures - 1), self.max_poll_interval)
+        self.log.info(f"Retrying the results download of workflow job: {job_id} in {retry_delay} seconds")
+        self.results_download_failures[job_id] = (failures, monotonic() + retry_delay)
+
+    def poll_job_states(self) -> bool:
+        """
+        Syncs the non-terminal slurm jobs and workflow jobs from a single slurm query.
+        Workflow jobs whose slurm job is already terminal, e.g., due to an interrupted results download,
+        are finished based on the slurm job state stored in the DB. The missing accounting of the finished
+        slurm jobs is queried on each poll cycle. Returns whether any state has changed.
+        """
+        # Finished first, so that the jobs with downloaded results are no longer active
+        states_changed = self._finish_results_downloads()
+        db_slurm_jobs = {db_slurm_job.workflow_job_id: db_slurm_job
+                         for db_slurm_job in sync_db_get_active_hpc_slurm_jobs()}
+        for db_workflow_job in sync_db_get_active_workflow_jobs():
+            if db_workflow_job.job_id in db_slurm_jobs:
+                continue
+            try:
+                db_slurm_jobs[db_workflow_job.job_id] = sync_db_get_hpc_slurm_job(db_workflow_job.job_id)
+            except RuntimeError as error:
+                self.log.warning(f"{error}")
+        if not db_slurm_jobs:
+            self.log.debug("No active jobs to poll")
+            self._ingest_pending_slurm_jobs_accounting()
+            return states_changed
+
+        slurm_job_ids = sorted({db_slurm_job.hpc_slurm_job_id for db_slurm_job in db_slurm_jobs.values()})
+        self.log.info(f"Polling the states of {len(slurm_job_ids)} slurm jobs")
+        slurm_job_states = self.hpc_executor.check_slurm_job_states(slurm_job_ids=slurm_job_ids)
+
+        for workflow_job_id, db_slurm_job in db_slurm_jobs.items():
+            new_slurm_job_state = slurm_job_states.get(db_slurm_job.hpc_slurm_job_id, None)
+            if not new_slurm_job_state:
+                new_slurm_job_state = db_slurm_job.hpc_slurm_job_state
+            if not new_slurm_job_state or new_slurm_job_state == StateJobSlurm.UNSET:
+                self.log.debug(f"Slurm job state not available yet: {db_slurm_job.hpc_slurm_job_id}")
+                continue
+            try:
+                db_workflow_job = sync_db_get_workflow_job(workflow_job_id)
+                db_workspace = sync_db_get_workspace(db_workflow_job.workspace_id)
+                if self._handle_hpc_and_workflow_states(
+                    hpc_slurm_job_db=db_slurm_job, workflow_job_db=db_workflow_job, workspace_db=db_workspace,
+                    new_slurm_job_state=new_slurm_job_state
+                ):
+                    states_changed = True
+            except Exception as error:
+                self.log.warning(f"Failed to sync the states of workflow job: {workflow_job_id}, reason: {error}")
+        self._ingest_pending_slurm_jobs_accounting()
+        return states_changed
+
+    # The arguments to this method are passed by the caller from the OS
+    def signal_handler(self, sig, frame):
+        signal_name = signal.Signals(sig).name
+        self.log.info(f"{signal_name} received from parent process `{getppid()}`.")
+        self.stop_polling.set()
+        self.log.info("Exiting gracefully.")
+        exit(0)
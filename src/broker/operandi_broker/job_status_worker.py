@@ -1,25 +1,46 @@
 from json import loads
 from logging import getLogger
 import signal
-from os import getpid, getppid, setsid
+from os import environ, getpid, getppid, setsid
 from sys import exit
+from typing import Dict, Optional
 
 from operandi_utils import reconfigure_all_loggers, get_log_file_path_prefix
-from operandi_utils.constants import LOG_LEVEL_WORKER, StateJob, StateWorkspace
+from operandi_utils.constants import LOG_LEVEL_WORKER, StateJob, StateJobSlurm, StateWorkspace
 from operandi_utils.database import (
     DBHPCSlurmJob, DBWorkflowJob, DBWorkspace,
-    sync_db_initiate_database, sync_db_get_hpc_slurm_job, sync_db_get_workflow_job, sync_db_get_workspace,
+    sync_db_initiate_database, sync_db_get_active_hpc_slurm_jobs, sync_db_get_hpc_slurm_job,
+    sync_db_get_hpc_slurm_jobs_pending_accounting, sync_db_get_workflow_job, sync_db_get_workspace,
     sync_db_update_hpc_slurm_job, sync_db_update_workflow_job, sync_db_update_workspace)
 from operandi_utils.hpc import HPCExecutor, HPCTransfer
+from operandi_utils.hpc.constants import HPC_SLURM_ACCOUNTING_TRIES, HPC_UNPACK_MODE_DOWNLOAD, HPC_UNPACK_MODES
 from operandi_utils.rabbitmq import get_connection_consumer
 
 
 class JobStatusWorker:
-    def __init__(self, db_url, rabbitmq_url, queue_name, tunnel_port_executor, tunnel_port_transfer, test_sbatch=False):
+    """
+    Syncs the states of a single workflow job, whose id is consumed from the job statuses queue, and
+    downloads its results. Operandi itself no longer publishes to that queue, since the `JobStatusPoller`
+    based on this class syncs all active jobs. The consumer stays to re-sync a single job on demand,
+    e.g., after a failed results download, by publishing its job id without waiting for the poll backoff.
+    """
+    def __init__(
+        self, db_url, rabbitmq_url, queue_name, tunnel_port_executor, tunnel_port_transfer, test_sbatch=False,
+        unpack_mode: Optional[str] = None, use_hpc_agent: Optional[bool] = None
+    ):
+        # Read on construction, not on import, so that the environment of the forked process is used
+        if unpack_mode is None:
+            unpack_mode = environ.get("OPERANDI_HPC_UNPACK_MODE", HPC_UNPACK_MODE_DOWNLOAD)
+        if use_hpc_agent is None:
+            use_hpc_agent = environ.get("OPERANDI_HPC_USE_AGENT", "false").lower() in ["1", "true"]
+        if unpack_mode not in HPC_UNPACK_MODES:
+            raise ValueError(f"Invalid HPC unpack mode: {unpack_mode}, must be one of: {HPC_UNPACK_MODES}")
         self.log = getLogger(f"operandi_broker.worker[{getpid()}].{queue_name}")
         self.queue_name = queue_name
         self.log_file_path = f"{get_log_file_path_prefix(module_type='worker')}_{queue_name}.log"
         self.test_sbatch = test_sbatch
+        self.unpack_mode = unpack_mode
+        self.use_hpc_agent = use_hpc_agent
 
         self.db_url = db_url
         self.rmq_url = rabbitmq_url
@@ -55,6 +76,9 @@ class JobStatusWorker:
             self.log.info("HPC executor connection successful.")
             self.hpc_io_transfer = HPCTransfer(tunnel_host='localhost', tunnel_port=self.tunnel_port_transfer)
             self.log.info("HPC transfer connection successful.")
+            if self.use_hpc_agent:
+                self.hpc_executor.use_deployed_batch_scripts(
+                    batch_scripts=self.hpc_io_transfer.deploy_batch_scripts(), start_agent=True)
 
             self.rmq_consumer = get_connection_consumer(rabbitmq_url=self.rmq_url)
             self.log.info(f"RMQConsumer connected")
@@ -66,22 +90,100 @@ class JobStatusWorker:
             self.log.error(f"The worker failed, reason: {e}")
             raise Exception(f"The worker failed, reason: {e}")
 
-    def __download_results_from_hpc(self, job_id: str, job_dir: str, workspace_id: str, workspace_dir: str) -> None:
+    def _download_results_from_hpc(
+        self, job_id: str, job_dir: str, workspace_id: str, workspace_dir: str, results_mode: str
+    ) -> None:
         sync_db_update_workspace(find_workspace_id=workspace_id, state=StateWorkspace.TRANSFERRING_FROM_HPC)
         sync_db_update_workflow_job(find_job_id=job_id, job_state=StateJob.TRANSFERRING_FROM_HPC)
-        self.hpc_io_transfer.get_and_unpack_slurm_workspace(ocrd_workspace_dir=workspace_dir, workflow_job_dir=job_dir)
-        self.log.info(f"Transferred slurm workspace from hpc path")
+        results_sha256 = self.hpc_io_transfer.get_and_unpack_slurm_workspace(
+            ocrd_workspace_dir=workspace_dir, workflow_job_dir=job_dir, unpack_mode=self.unpack_mode,
+            results_mode=results_mode)
+        self._finish_results_download(job_id=job_id, workspace_id=workspace_id, results_sha256=results_sha256)
+
+    def _finish_results_download(self, job_id: str, workspace_id: str, results_sha256: Optional[str]) -> None:
+        self.log.info(f"Transferred slurm workspace from hpc path, results sha256: {results_sha256}")
+        sync_db_update_workflow_job(find_job_id=job_id, hpc_results_sha256=results_sha256)
         # Delete the result dir from the HPC home folder
         # self.hpc_executor.execute_blocking(f"bash -lc 'rm -rf {hpc_slurm_workspace_path}/{workflow_job_id}'")
         sync_db_update_workspace(find_workspace_id=workspace_id, state=StateWorkspace.READY)
-        sync_db_update_workflow_job(find_job_id=self.current_message_job_id, job_state=StateJob.SUCCESS)
+        sync_db_update_workflow_job(find_job_id=job_id, job_state=StateJob.SUCCESS)
 
-    def __handle_hpc_and_workflow_states(
-        self, hpc_slurm_job_db: DBHPCSlurmJob, workflow_job_db: DBWorkflowJob, workspace_db: DBWorkspace
-    ):
+    def __refresh_active_slurm_job_states(self, current_slurm_job_id: str) -> Dict[str, Optional[str]]:
+        """
+        Queries the states of the current and of all other active slurm jobs in one round trip and updates
+        the changed states of the other jobs in the DB. The current job is updated by the caller.
+        """
+        active_slurm_jobs = {
+            db_slurm_job.hpc_slurm_job_id: db_slurm_job for db_slurm_job in sync_db_get_active_hpc_slurm_jobs()}
+        slurm_job_states = self.hpc_executor.check_slurm_job_states(
+            slurm_job_ids=sorted(set(active_slurm_jobs) | {current_slurm_job_id}))
+        for slurm_job_id, db_slurm_job in active_slurm_jobs.items():
+            new_slurm_job_state = slurm_job_states.get(slurm_job_id, None)
+            if slurm_job_id == current_slurm_job_id or not new_slurm_job_state:
+                continue
+            if db_slurm_job.hpc_slurm_job_state != new_slurm_job_state:
+                self.log.info(f"Slurm job: {slurm_job_id}, old state: {db_slurm_job.hpc_slurm_job_state}, "
+                              f"new state: {new_slurm_job_state}")
+                self._update_slurm_job_state(
+                    workflow_job_id=db_slurm_job.workflow_job_id, slurm_job_state=new_slurm_job_state)
+        return slurm_job_states
+
+    @staticmethod
+    def _update_slurm_job_state(workflow_job_id: str, slurm_job_state: str) -> None:
+        # The accounting of a finished slurm job is ingested by `_ingest_pending_slurm_jobs_accounting`
+        accounting_kwargs = {}
+        if slurm_job_state in StateJobSlurm.success_states() + StateJobSlurm.failing_states():
+            accounting_kwargs["hpc_accounting_tries_left"] = HPC_SLURM_ACCOUNTING_TRIES
+        sync_db_update_hpc_slurm_job(
+            find_workflow_job_id=workflow_job_id, hpc_slurm_job_state=slurm_job_state, **accounting_kwargs)
+
+    def _ingest_pending_slurm_jobs_accounting(self) -> None:
+        """
+        Queries the accounting of all finished slurm jobs still missing it in one round trip. Since sacct may
+        lag behind the job states, the jobs without accounting data are queried again on the next poll cycles
+        until their tries are used up.
+        """
+        # Missing accounting data must never block the handling of the finished jobs
+        try:
+            db_slurm_jobs = sync_db_get_hpc_slurm_jobs_pending_accounting()
+            if not db_slurm_jobs:
+                return
+            slurm_jobs_accounting = self.hpc_executor.get_slurm_jobs_accounting(
+                slurm_job_ids=[db_slurm_job.hpc_slurm_job_id for db_slurm_job in db_slurm_jobs])
+            for db_slurm_job in db_slurm_jobs:
+                slurm_job_id = db_slurm_job.hpc_slurm_job_id
+                slurm_job_accounting = slurm_jobs_accounting.get(slurm_job_id, None)
+                if slurm_job_accounting:
+                    self.log.info(f"Accounting of slurm job: {slurm_job_id}, {slurm_job_accounting}")
+                    sync_db_update_hpc_slurm_job(
+                        find_workflow_job_id=db_slurm_job.workflow_job_id, hpc_accounting_tries_left=0,
+                        **slurm_job_accounting)
+                    continue
+                tries_left = db_slurm_job.hpc_accounting_tries_left - 1
+                self.log.warning(
+                    f"No accounting data available for slurm job: {slurm_job_id}, tries left: {tries_left}")
+                sync_db_update_hpc_slurm_job(
+                    find_workflow_job_id=db_slurm_job.workflow_job_id, hpc_accounting_tries_left=tries_left)
+        except Exception as error:
+            self.log.warning(f"Failed to ingest the accounting of the finished slurm jobs, reason: {error}")
+
+    def _handle_hpc_and_workflow_states(
+        self, hpc_slurm_job_db: DBHPCSlurmJob, workflow_job_db: DBWorkflowJob, workspace_db: DBWorkspace,
+        new_slurm_job_state: Optional[str] = None
+    ) -> bool:
+        """
+        Updates the slurm job, workflow job and workspace states in the DB and downloads the results of
+        succeeded jobs. The slurm job state is queried from the HPC unless `new_slurm_job_state` is passed.
+        Returns whether the slurm job or the workflow job state has changed.
+        """
         hpc_slurm_job_id = hpc_slurm_job_db.hpc_slurm_job_id
         old_slurm_job_state = hpc_slurm_job_db.hpc_slurm_job_state
-        new_slurm_job_state = self.hpc_executor.check_slurm_job_state(slurm_job_id=hpc_slurm_job_id)
+        if not new_slurm_job_state:
+            # The states of all outstanding slurm jobs are refreshed with a single query
+            new_slurm_job_state = self.__refresh_active_slurm_job_states(
+                current_slurm_job_id=hpc_slurm_job_id).get(hpc_slurm_job_id, None)
+        if not new_slurm_job_state:
+            new_slurm_job_state = self.hpc_executor.check_slurm_job_state(slurm_job_id=hpc_slurm_job_id)
 
         job_id = workflow_job_db.job_id
         job_dir = workflow_job_db.job_dir
@@ -89,12 +191,14 @@ class JobStatusWorker:
 
         workspace_id = workspace_db.workspace_id
         workspace_dir = workspace_db.workspace_dir
+        states_changed = False
 
         # If there has been a change of slurm job state, update it
         if old_slurm_job_state != new_slurm_job_state:
             self.log.info(
                 f"Slurm job: {hpc_slurm_job_id}, old state: {old_slurm_job_state}, new state: {new_slurm_job_state}")
-            sync_db_update_hpc_slurm_job(find_workflow_job_id=job_id, hpc_slurm_job_state=new_slurm_job_state)
+            self._update_slurm_job_state(workflow_job_id=job_id, slurm_job_state=new_slurm_job_state)
+            states_changed = True
 
         # Convert the slurm job state to operandi workflow job state
         new_job_state = StateJob.convert_from_slurm_job(slurm_job_state=new_slurm_job_state)
@@ -102,9 +206,13 @@ class JobStatusWorker:
         # If there has been a change of operandi workflow state, update it
         if old_job_state != new_job_state:
             self.log.info(f"Workflow job id: {job_id}, old state: {old_job_state}, new state: {new_job_state}")
+            states_changed = True
             if new_job_state == StateJob.SUCCESS:
-                self.__download_results_from_hpc(
-                    job_id=job_id, job_dir=job_dir, workspace_id=workspace_id, workspace_dir=workspace_dir)
+                self._download_results_from_hpc(
+                    job_id=job_id, job_dir=job_dir, workspace_id=workspace_id, workspace_dir=workspace_dir,
+                    results_mode=hpc_slurm_job_db.hpc_results_mode)
+            else:
+                sync_db_update_workflow_job(find_job_id=job_id, job_state=new_job_state)
             if new_job_state == StateJob.FAILED:
                 ws_state = StateWorkspace.READY
                 self.log.info(f"Setting new workspace state `{ws_state}` of workspace_id: {workspace_id}")
@@ -112,6 +220,7 @@ class JobStatusWorker:
 
         self.log.info(f"Latest slurm job state: {new_slurm_job_state}")
         self.log.info(f"Latest workflow job state: {new_job_state}")
+        return states_changed
 
     def __callback(self, ch, method, properties, body):
         self.log.debug(f"ch: {ch}, method: {method}, properties: {properties}, body: {body}")
@@ -146,12 +255,13 @@ class JobStatusWorker:
             return
 
         try:
-            self.__handle_hpc_and_workflow_states(
+            self._handle_hpc_and_workflow_states(
                 hpc_slurm_job_db=db_hpc_slurm_job, workflow_job_db=db_workflow_job, workspace_db=db_workspace)
         except ValueError as error:
             self.log.warning(f"{error}")
             self.__handle_message_failure(interruption=False)
             return
+        self._ingest_pending_slurm_jobs_accounting()
 
         self.has_consumed_message = False
         self.log.debug(f"Ack delivery tag: {self.current_message_delivery_tag}")
@@ -1,18 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from json import loads
 from logging import getLogger
 import signal
-from os import getpid, getppid, setsid
+from os import environ, getpid, getppid, setsid
 from os.path import join
+from shutil import rmtree
 from sys import exit
+from tempfile import mkdtemp
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from operandi_utils import reconfigure_all_loggers, get_log_file_path_prefix
-from operandi_utils.constants import LOG_LEVEL_WORKER, StateJob, StateWorkspace
+from operandi_utils.constants import (
+    ARCHIVE_CODEC_AUTO, ARCHIVE_CODECS, LOG_LEVEL_WORKER, StateJob, StateWorkspace, WORKER_RMQ_SERVICE_INTERVAL)
 from operandi_utils.database import (
     sync_db_initiate_database, sync_db_get_workflow, sync_db_get_workspace, sync_db_create_hpc_slurm_job,
     sync_db_update_workflow_job, sync_db_update_workspace)
-from operandi_utils.hpc import HPCExecutor, HPCTransfer
+from operandi_utils.hpc import HPCExecutor, HPCTransfer, nextflow_script_uses_mets_chunks, write_page_ranges
 from operandi_utils.hpc.constants import (
-    HPC_JOB_DEADLINE_TIME_REGULAR, HPC_JOB_DEADLINE_TIME_TEST, HPC_JOB_QOS_2H, HPC_JOB_QOS_48H
+    HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB, HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB_ARRAY, HPC_JOB_ARRAY_MAX_SIZE,
+    HPC_JOB_DEADLINE_TIME_REGULAR, HPC_JOB_DEADLINE_TIME_TEST, HPC_JOB_QOS_2H, HPC_JOB_QOS_48H, HPC_NF_EXECUTOR_LOCAL,
+    HPC_RESULTS_MODE_FULL, HPC_RESULTS_MODES, HPC_STAGING_MODE_STREAM, HPC_STAGING_MODE_SYNC, HPC_STAGING_MODES
 )
 from operandi_utils.rabbitmq import get_connection_consumer
 
@@ -20,11 +27,32 @@ from operandi_utils.rabbitmq import get_connection_consumer
 # Each worker class listens to a specific queue,
 # consume messages, and process messages.
 class Worker:
-    def __init__(self, db_url, rabbitmq_url, queue_name, tunnel_port_executor, tunnel_port_transfer, test_sbatch=False):
+    def __init__(
+        self, db_url, rabbitmq_url, queue_name, tunnel_port_executor, tunnel_port_transfer, test_sbatch=False,
+        staging_mode: str = environ.get("OPERANDI_HPC_STAGING_MODE", HPC_STAGING_MODE_STREAM),
+        results_mode: str = environ.get("OPERANDI_HPC_RESULTS_MODE", HPC_RESULTS_MODE_FULL),
+        archive_codec: str = environ.get("OPERANDI_HPC_ARCHIVE_CODEC", ARCHIVE_CODEC_AUTO),
+        job_array_size: int = int(environ.get("OPERANDI_HPC_JOB_ARRAY_SIZE", HPC_JOB_ARRAY_MAX_SIZE)),
+        use_hpc_agent: bool = environ.get("OPERANDI_HPC_USE_AGENT", "false").lower() in ["1", "true"]
+    ):
+        if staging_mode not in HPC_STAGING_MODES:
+            raise ValueError(f"Invalid HPC staging mode: {staging_mode}, must be one of: {HPC_STAGING_MODES}")
+        if results_mode not in HPC_RESULTS_MODES:
+            raise ValueError(f"Invalid HPC results mode: {results_mode}, must be one of: {HPC_RESULTS_MODES}")
+        if archive_codec not in ARCHIVE_CODECS:
+            raise ValueError(f"Invalid archive codec: {archive_codec}, must be one of: {ARCHIVE_CODECS}")
+        if not 1 <= job_array_size <= HPC_JOB_ARRAY_MAX_SIZE:
+            raise ValueError(f"Invalid HPC job array size: {job_array_size}, must be in 1-{HPC_JOB_ARRAY_MAX_SIZE}")
         self.log = getLogger(f"operandi_broker.worker[{getpid()}].{queue_name}")
         self.queue_name = queue_name
         self.log_file_path = f"{get_log_file_path_prefix(module_type='worker')}_{queue_name}.log"
         self.test_sbatch = test_sbatch
+        self.staging_mode = staging_mode
+        self.results_mode = results_mode
+        self.archive_codec = archive_codec
+        # Up to this amount of waiting workflow jobs are submitted together, 1 disables the slurm job arrays
+        self.job_array_size = job_array_size
+        self.use_hpc_agent = use_hpc_agent
 
         self.db_url = db_url
         self.rmq_url = rabbitmq_url
@@ -38,6 +66,8 @@ class Worker:
         self.current_message_wf_id = None
         self.current_message_job_id = None
         self.has_consumed_message = False
+        # Consumed but not yet acknowledged workflow jobs of a batch submitted as slurm job arrays
+        self.current_batch_workflow_jobs: List[Dict[str, Any]] = []
 
         self.tunnel_port_executor = tunnel_port_executor
         self.tunnel_port_transfer = tunnel_port_transfer
@@ -62,6 +92,9 @@ class Worker:
             self.log.info("HPC executor connection successful.")
             self.hpc_io_transfer = HPCTransfer(tunnel_host='localhost', tunnel_port=self.tunnel_port_transfer)
             self.log.info("HPC transfer connection successful.")
+            self.hpc_executor.use_deployed_batch_scripts(
+                batch_scripts=self.hpc_io_transfer.deploy_batch_scripts(), start_agent=self.use_hpc_agent)
+            self.log.info("HPC batch scripts deployed.")
 
             self.rmq_consumer = get_connection_consumer(rabbitmq_url=self.rmq_url)
             self.log.info(f"RMQConsumer connected")
@@ -73,29 +106,45 @@ class Worker:
             self.log.error(f"The worker failed, reason: {e}")
             raise Exception(f"The worker failed, reason: {e}")
 
+    def _call_servicing_rmq_connection(self, function: Callable, **kwargs) -> Any:
+        """
+        Runs the blocking HPC call in a separate thread while the consumer thread keeps servicing the RabbitMQ
+        connection. Otherwise, the heartbeats are not answered during long stagings of a consumed batch, the broker
+        drops the connection and redelivers the unacknowledged messages, which are then submitted twice.
+        The DB calls stay on the consumer thread, since the sync DB wrappers use the event loop of that thread.
+        """
+        if not self.rmq_consumer:
+            return function(**kwargs)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="worker_hpc_call") as hpc_call_executor:
+            future = hpc_call_executor.submit(function, **kwargs)
+            while True:
+                try:
+                    return future.result(timeout=WORKER_RMQ_SERVICE_INTERVAL)
+                except FutureTimeoutError:
+                    self.rmq_consumer.process_data_events(time_limit=0)
+
     def __callback(self, ch, method, properties, body):
         self.log.debug(f"ch: {ch}, method: {method}, properties: {properties}, body: {body}")
         self.log.debug(f"Consumed message: {body}")
 
+        # Compatible workflow jobs waiting in the queue are submitted together as slurm job arrays
+        if self.job_array_size > 1:
+            waiting_messages = self.__get_waiting_messages(max_amount=self.job_array_size - 1)
+            if waiting_messages:
+                self.__handle_message_batch(messages=[(method.delivery_tag, body)] + waiting_messages)
+                return
+
         self.current_message_delivery_tag = method.delivery_tag
         self.has_consumed_message = True
 
         # Since the workflow_message is constructed by the Operandi Server,
         # it should not fail here when parsing under normal circumstances.
         try:
-            consumed_message = loads(body)
-            self.log.info(f"Consumed message: {consumed_message}")
-            self.current_message_ws_id = consumed_message["workspace_id"]
-            self.current_message_wf_id = consumed_message["workflow_id"]
-            self.current_message_job_id = consumed_message["job_id"]
-            input_file_grp = consumed_message["input_file_grp"]
-            remove_file_grps = consumed_message["remove_file_grps"]
-            slurm_job_partition = consumed_message["partition"]
-            slurm_job_cpus = int(consumed_message["cpus"])
-            slurm_job_ram = int(consumed_message["ram"])
-            # How many process instances to create for each OCR-D processor
-            # By default, the amount of cpus, since that gives optimal performance
-            nf_process_forks = slurm_job_cpus
+            workflow_job = self._parse_workflow_job_message(body)
+            self.log.info(f"Consumed message: {workflow_job}")
+            self.current_message_ws_id = workflow_job["workspace_id"]
+            self.current_message_wf_id = workflow_job["workflow_id"]
+            self.current_message_job_id = workflow_job["workflow_job_id"]
         except Exception as error:
             self.log.error(f"Parsing the consumed message has failed: {error}")
             self.__handle_message_failure(interruption=False)
@@ -103,15 +152,7 @@ class Worker:
 
         # Handle database related reads and set the workflow job status to RUNNING
         try:
-            workflow_db = sync_db_get_workflow(self.current_message_wf_id)
-            workspace_db = sync_db_get_workspace(self.current_message_ws_id)
-
-            workflow_script_path = workflow_db.workflow_script_path
-            workspace_dir = workspace_db.workspace_dir
-            mets_basename = workspace_db.mets_basename
-            ws_pages_amount = workspace_db.pages_amount
-            if not mets_basename:
-                mets_basename = "mets.xml"
+            workflow_job.update(self._read_workflow_job_resources(workflow_job))
         except RuntimeError as error:
             self.log.error(f"Database run-time error has occurred: {error}")
             self.__handle_message_failure(interruption=False, set_ws_ready=True)
@@ -126,11 +167,14 @@ class Worker:
             # TODO: Fix the use_mets_server flag - the flag should be set according to the used workflow
             self.prepare_and_trigger_slurm_job(
                 workflow_job_id=self.current_message_job_id, workspace_id=self.current_message_ws_id,
-                workspace_dir=workspace_dir, workspace_base_mets=mets_basename,
-                workflow_script_path=workflow_script_path, input_file_grp=input_file_grp,
-                nf_process_forks=nf_process_forks, ws_pages_amount=ws_pages_amount, use_mets_server=False,
-                file_groups_to_remove=remove_file_grps, cpus=slurm_job_cpus, ram=slurm_job_ram,
-                partition=slurm_job_partition
+                workspace_dir=workflow_job["workspace_dir"], workspace_base_mets=workflow_job["mets_basename"],
+                workflow_script_path=workflow_job["workflow_script_path"],
+                input_file_grp=workflow_job["input_file_grp"], nf_process_forks=workflow_job["nf_process_forks"],
+                ws_pages_amount=workflow_job["ws_pages_amount"], use_mets_server=False,
+                file_groups_to_remove=workflow_job["file_groups_to_remove"], cpus=workflow_job["cpus"],
+                ram=workflow_job["ram"], partition=workflow_job["partition"],
+                model_dependencies=workflow_job["model_dependencies"], nf_executor=workflow_job["nf_executor"],
+                ws_page_ids=workflow_job["ws_page_ids"]
             )
             self.log.info(f"The HPC slurm job was successfully submitted")
         except Exception as error:
@@ -150,6 +194,127 @@ class Worker:
         self.log.debug(f"Ack delivery tag: {self.current_message_delivery_tag}")
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
+    @staticmethod
+    def _parse_workflow_job_message(body) -> Dict[str, Any]:
+        consumed_message = loads(body)
+        slurm_job_cpus = int(consumed_message["cpus"])
+        return {
+            "workflow_job_id": consumed_message["job_id"],
+            "workflow_id": consumed_message["workflow_id"],
+            "workspace_id": consumed_message["workspace_id"],
+            "input_file_grp": consumed_message["input_file_grp"],
+            "file_groups_to_remove": consumed_message["remove_file_grps"],
+            "partition": consumed_message["partition"],
+            "cpus": slurm_job_cpus,
+            "ram": int(consumed_message["ram"]),
+            # Messages queued before the nextflow executor was selectable run with the local executor
+            "nf_executor": consumed_message.get("nf_executor", HPC_NF_EXECUTOR_LOCAL),
+            # How many process instances to create for each OCR-D processor
+            # By default, the amount of cpus, since that gives optimal performance
+            "nf_process_forks": slurm_job_cpus
+        }
+
+    @staticmethod
+    def _read_workflow_job_resources(workflow_job: Dict[str, Any]) -> Dict[str, Any]:
+        workflow_db = sync_db_get_workflow(workflow_job["workflow_id"])
+        workspace_db = sync_db_get_workspace(workflow_job["workspace_id"])
+        return {
+            "workflow_script_path": workflow_db.workflow_script_path,
+            "model_dependencies": workflow_db.model_dependencies,
+            "workspace_dir": workspace_db.workspace_dir,
+            "mets_basename": workspace_db.mets_basename or "mets.xml",
+            "ws_pages_amount": workspace_db.pages_amount,
+            "ws_page_ids": workspace_db.page_ids
+        }
+
+    def __get_waiting_messages(self, max_amount: int) -> List[Tuple[int, bytes]]:
+        waiting_messages = []
+        while len(waiting_messages) < max_amount:
+            message = self.rmq_consumer.get_one_message(queue_name=self.queue_name)
+            if not message or not message[0]:
+                break
+            method, _, body = message
+            waiting_messages.append((method.delivery_tag, body))
+        return waiting_messages
+
+    def __handle_message_batch(self, messages: List[Tuple[int, bytes]]) -> None:
+        self.log.info(f"Consumed a batch of {len(messages)} messages")
+        # Workflow jobs of the same workflow and with the same slurm resources are submitted together
+        job_groups: Dict[Tuple[str, str, int, int, str], List[Dict[str, Any]]] = {}
+        for delivery_tag, body in messages:
+            try:
+                workflow_job = self._parse_workflow_job_message(body)
+            except Exception as error:
+                self.log.error(f"Parsing the consumed message has failed: {error}")
+                self.log.debug(f"Ack delivery tag: {delivery_tag}")
+                self.rmq_consumer.ack_message(delivery_tag=delivery_tag)
+                continue
+            workflow_job["delivery_tag"] = delivery_tag
+            self.current_batch_workflow_jobs.append(workflow_job)
+            try:
+                workflow_job.update(self._read_workflow_job_resources(workflow_job))
+            except Exception as error:
+                self.log.error(f"Database related error has occurred: {error}")
+                self.__handle_batched_workflow_job_failure(workflow_job, set_ws_ready=True)
+                continue
+            group_key = (workflow_job["workflow_id"], workflow_job["partition"], workflow_job["cpus"],
+                         workflow_job["ram"], workflow_job["nf_executor"])
+            job_groups.setdefault(group_key, []).append(workflow_job)
+
+        for workflow_jobs in job_groups.values():
+            self.__submit_workflow_job_group(workflow_jobs=workflow_jobs)
+
+    def __submit_workflow_job_group(self, workflow_jobs: List[Dict[str, Any]]) -> None:
+        if len(workflow_jobs) == 1:
+            workflow_job = workflow_jobs[0]
+            try:
+                slurm_job_ids = [self.prepare_and_trigger_slurm_job(
+                    workflow_job_id=workflow_job["workflow_job_id"], workspace_id=workflow_job["workspace_id"],
+                    workspace_dir=workflow_job["workspace_dir"], workspace_base_mets=workflow_job["mets_basename"],
+                    workflow_script_path=workflow_job["workflow_script_path"],
+                    input_file_grp=workflow_job["input_file_grp"], nf_process_forks=workflow_job["nf_process_forks"],
+                    ws_pages_amount=workflow_job["ws_pages_amount"], use_mets_server=False,
+                    file_groups_to_remove=workflow_job["file_groups_to_remove"], cpus=workflow_job["cpus"],
+                    ram=workflow_job["ram"], partition=workflow_job["partition"],
+                    model_dependencies=workflow_job["model_dependencies"], nf_executor=workflow_job["nf_executor"],
+                    ws_page_ids=workflow_job["ws_page_ids"])]
+            except Exception as error:
+                self.log.error(f"Triggering a slurm job in the HPC has failed: {error}")
+                self.__handle_batched_workflow_job_failure(workflow_job, set_ws_ready=True)
+                return
+        else:
+            try:
+                slurm_job_ids = self.prepare_and_trigger_slurm_job_array(workflow_jobs=workflow_jobs)
+            except Exception as error:
+                self.log.error(f"Triggering a slurm job array in the HPC has failed: {error}")
+                for workflow_job in workflow_jobs:
+                    self.__handle_batched_workflow_job_failure(workflow_job, set_ws_ready=True)
+                return
+
+        for workflow_job, slurm_job_id in zip(workflow_jobs, slurm_job_ids):
+            if not slurm_job_id:
+                # The staging of this workflow job has failed
+                self.__handle_batched_workflow_job_failure(workflow_job, set_ws_ready=True)
+                continue
+            self.log.info(f"Setting new job state `{StateJob.RUNNING}` of job_id: {workflow_job['workflow_job_id']}")
+            sync_db_update_workflow_job(find_job_id=workflow_job["workflow_job_id"], job_state=StateJob.RUNNING)
+            sync_db_update_workspace(find_workspace_id=workflow_job["workspace_id"], state=StateWorkspace.RUNNING)
+            self.log.debug(f"Ack delivery tag: {workflow_job['delivery_tag']}")
+            self.rmq_consumer.ack_message(delivery_tag=workflow_job["delivery_tag"])
+            self.current_batch_workflow_jobs.remove(workflow_job)
+
+    def __handle_batched_workflow_job_failure(self, workflow_job: Dict[str, Any], set_ws_ready: bool = False):
+        job_state = StateJob.FAILED
+        self.log.info(f"Setting new state `{job_state}` of job_id: {workflow_job['workflow_job_id']}")
+        sync_db_update_workflow_job(find_job_id=workflow_job["workflow_job_id"], job_state=job_state)
+        if set_ws_ready:
+            ws_state = StateWorkspace.READY
+            self.log.info(f"Setting new workspace state `{ws_state}` of workspace_id: {workflow_job['workspace_id']}")
+            sync_db_update_workspace(find_workspace_id=workflow_job["workspace_id"], state=ws_state)
+        self.log.debug(f"Ack delivery tag: {workflow_job['delivery_tag']}")
+        self.rmq_consumer.ack_message(delivery_tag=workflow_job["delivery_tag"])
+        self.current_batch_workflow_jobs.remove(workflow_job)
+
     def __handle_message_failure(self, interruption: bool = False, set_ws_ready: bool = False):
         job_state = StateJob.FAILED
         self.log.info(f"Setting new state `{job_state}` of job_id: {self.current_message_job_id}")
@@ -187,6 +352,9 @@ class Worker:
         if self.has_consumed_message:
             self.log.info(f"Handling the message failure due to interruption: {signal_name}")
             self.__handle_message_failure(interruption=True)
+        for workflow_job in list(self.current_batch_workflow_jobs):
+            self.log.info(f"Handling the batched message failure due to interruption: {signal_name}")
+            self.__handle_batched_workflow_job_failure(workflow_job, set_ws_ready=False)
 
         self.rmq_consumer.disconnect()
         self.rmq_consumer = None
@@ -197,14 +365,11 @@ class Worker:
     def prepare_and_trigger_slurm_job(
         self, workflow_job_id: str, workspace_id: str, workspace_dir: str, workspace_base_mets: str,
         workflow_script_path: str, input_file_grp: str, nf_process_forks: int, ws_pages_amount: int,
-        use_mets_server: bool, file_groups_to_remove: str, cpus: int, ram: int, partition: str
+        use_mets_server: bool, file_groups_to_remove: str, cpus: int, ram: int, partition: str,
+        model_dependencies: Optional[List[str]] = None, nf_executor: str = HPC_NF_EXECUTOR_LOCAL,
+        ws_page_ids: Optional[List[str]] = None
     ) -> str:
-        if self.test_sbatch:
-            job_deadline_time = HPC_JOB_DEADLINE_TIME_TEST
-            qos = HPC_JOB_QOS_2H
-        else:
-            job_deadline_time = HPC_JOB_DEADLINE_TIME_REGULAR
-            qos = HPC_JOB_QOS_48H
+        job_deadline_time, qos = self.__slurm_job_time_limits()
 
         # Recreate the transfer connection for each workflow job submission
         # This is required due to all kind of nasty connection fails - timeouts,
@@ -214,25 +379,26 @@ class Worker:
         # self.hpc_io_transfer = HPCTransfer(tunel_host='localhost', tunel_port=4023)
         # self.log.info("HPC transfer connection renewed successfully.")
 
-        hpc_batch_script_path = self.hpc_io_transfer.put_batch_script(batch_script_id="submit_workflow_job.sh")
+        # Uploaded only if this version of the batch script is not yet deployed
+        hpc_batch_script_path = self.hpc_io_transfer.put_batch_script(
+            batch_script_id=HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB)
 
-        try:
-            sync_db_update_workspace(find_workspace_id=workspace_id, state=StateWorkspace.TRANSFERRING_TO_HPC)
-            sync_db_update_workflow_job(find_job_id=workflow_job_id, job_state=StateJob.TRANSFERRING_TO_HPC)
-            self.hpc_io_transfer.pack_and_put_slurm_workspace(
-                ocrd_workspace_dir=workspace_dir, workflow_job_id=workflow_job_id,
-                nextflow_script_path=workflow_script_path)
-        except Exception as error:
-            raise Exception(f"Failed to pack and put slurm workspace: {error}")
+        self.stage_slurm_workspace(
+            workflow_job_id=workflow_job_id, workspace_id=workspace_id, workspace_dir=workspace_dir,
+            workflow_script_path=workflow_script_path, mets_basename=workspace_base_mets,
+            nf_process_forks=nf_process_forks, ws_pages_amount=ws_pages_amount, ws_page_ids=ws_page_ids,
+            use_mets_server=use_mets_server)
 
         try:
             # NOTE: The paths below must be a valid existing path inside the HPC
-            slurm_job_id = self.hpc_executor.trigger_slurm_job(
+            slurm_job_id = self._call_servicing_rmq_connection(
+                self.hpc_executor.trigger_slurm_job,
                 batch_script_path=hpc_batch_script_path, workflow_job_id=workflow_job_id,
                 nextflow_script_path=workflow_script_path, workspace_id=workspace_id, mets_basename=workspace_base_mets,
                 input_file_grp=input_file_grp, nf_process_forks=nf_process_forks, ws_pages_amount=ws_pages_amount,
                 use_mets_server=use_mets_server, file_groups_to_remove=file_groups_to_remove, cpus=cpus, ram=ram,
-                job_deadline_time=job_deadline_time, partition=partition, qos=qos)
+                job_deadline_time=job_deadline_time, partition=partition, qos=qos, results_mode=self.results_mode,
+                model_dependencies=model_dependencies, nf_executor=nf_executor)
         except Exception as error:
             raise Exception(f"Triggering slurm job failed: {error}")
 
@@ -240,7 +406,114 @@ class Worker:
             sync_db_create_hpc_slurm_job(
                 workflow_job_id=workflow_job_id, hpc_slurm_job_id=slurm_job_id,
                 hpc_batch_script_path=hpc_batch_script_path,
-                hpc_slurm_workspace_path=join(self.hpc_io_transfer.slurm_workspaces_dir, workflow_job_id))
+                hpc_slurm_workspace_path=join(self.hpc_io_transfer.slurm_workspaces_dir, workflow_job_id),
+                hpc_results_mode=self.results_mode)
         except Exception as error:
             raise Exception(f"Failed to save the hpc slurm job in DB: {error}")
         return slurm_job_id
+
+    def prepare_and_trigger_slurm_job_array(self, workflow_jobs: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Stages the workflow jobs and submits the successfully staged ones as a single slurm job array.
+        Returns the slurm job id of each workflow job, i.e., `<array id>_<index>`, None for failed stagings.
+        """
+        job_deadline_time, qos = self.__slurm_job_time_limits()
+        # Uploaded only if these versions of the batch scripts are not yet deployed
+        hpc_batch_script_path = self.hpc_io_transfer.put_batch_script(
+            batch_script_id=HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB)
+        hpc_array_batch_script_path = self.hpc_io_transfer.put_batch_script(
+            batch_script_id=HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB_ARRAY)
+
+        staged_workflow_jobs = []
+        for workflow_job in workflow_jobs:
+            try:
+                self.stage_slurm_workspace(
+                    workflow_job_id=workflow_job["workflow_job_id"], workspace_id=workflow_job["workspace_id"],
+                    workspace_dir=workflow_job["workspace_dir"],
+                    workflow_script_path=workflow_job["workflow_script_path"],
+                    mets_basename=workflow_job["mets_basename"], nf_process_forks=workflow_job["nf_process_forks"],
+                    ws_pages_amount=workflow_job["ws_pages_amount"], ws_page_ids=workflow_job["ws_page_ids"],
+                    use_mets_server=False)
+                staged_workflow_jobs.append(workflow_job)
+            except Exception as error:
+                self.log.error(f"{error}")
+        if not staged_workflow_jobs:
+            return [None] * len(workflow_jobs)
+
+        # All workflow jobs of an array share the same slurm resources
+        first_workflow_job = staged_workflow_jobs[0]
+        try:
+            # TODO: Fix the use_mets_server flag - the flag should be set according to the used workflow
+            slurm_job_ids = self._call_servicing_rmq_connection(
+                self.hpc_executor.trigger_slurm_job_array,
+                array_batch_script_path=hpc_array_batch_script_path, batch_script_path=hpc_batch_script_path,
+                workflow_jobs=[{
+                    "workflow_job_id": workflow_job["workflow_job_id"],
+                    "nextflow_script_path": workflow_job["workflow_script_path"],
+                    "input_file_grp": workflow_job["input_file_grp"],
+                    "workspace_id": workflow_job["workspace_id"],
+                    "mets_basename": workflow_job["mets_basename"],
+                    "nf_process_forks": workflow_job["nf_process_forks"],
+                    "ws_pages_amount": workflow_job["ws_pages_amount"],
+                    "use_mets_server": False,
+                    "file_groups_to_remove": workflow_job["file_groups_to_remove"],
+                    "model_dependencies": workflow_job["model_dependencies"]
+                } for workflow_job in staged_workflow_jobs],
+                cpus=first_workflow_job["cpus"], ram=first_workflow_job["ram"], job_deadline_time=job_deadline_time,
+                partition=first_workflow_job["partition"], qos=qos, results_mode=self.results_mode,
+                nf_executor=first_workflow_job["nf_executor"])
+        except Exception as error:
+            raise Exception(f"Triggering slurm job array failed: {error}")
+
+        triggered_slurm_job_ids = {}
+        for workflow_job, slurm_job_id in zip(staged_workflow_jobs, slurm_job_ids):
+            workflow_job_id = workflow_job["workflow_job_id"]
+            try:
+                sync_db_create_hpc_slurm_job(
+                    workflow_job_id=workflow_job_id, hpc_slurm_job_id=slurm_job_id,
+                    hpc_batch_script_path=hpc_batch_script_path,
+                    hpc_slurm_workspace_path=join(self.hpc_io_transfer.slurm_workspaces_dir, workflow_job_id),
+                    hpc_results_mode=self.results_mode)
+                triggered_slurm_job_ids[workflow_job_id] = slurm_job_id
+            except Exception as error:
+                self.log.error(f"Failed to save the hpc slurm job in DB: {error}")
+        return [triggered_slurm_job_ids.get(workflow_job["workflow_job_id"], None) for workflow_job in workflow_jobs]
+
+    def stage_slurm_workspace(
+        self, workflow_job_id: str, workspace_id: str, workspace_dir: str, workflow_script_path: str,
+        mets_basename: str = "mets.xml", nf_process_forks: int = 1, ws_pages_amount: int = 1,
+        ws_page_ids: Optional[List[str]] = None, use_mets_server: bool = False
+    ) -> None:
+        # The page ranges and the METS file chunks of the forks are computed once here instead of in each fork
+        page_ranges_dir = mkdtemp(prefix="page_ranges-")
+        try:
+            sync_db_update_workspace(find_workspace_id=workspace_id, state=StateWorkspace.TRANSFERRING_TO_HPC)
+            sync_db_update_workflow_job(find_job_id=workflow_job_id, job_state=StateJob.TRANSFERRING_TO_HPC)
+            # With the METS server all forks share the single METS file of the workspace
+            mets_chunks = not use_mets_server and nextflow_script_uses_mets_chunks(workflow_script_path)
+            self._call_servicing_rmq_connection(
+                write_page_ranges, dst_dir=page_ranges_dir, mets_path=join(workspace_dir, mets_basename),
+                chunks=max(1, min(nf_process_forks, ws_pages_amount)), page_ids=ws_page_ids,
+                mets_chunks=mets_chunks)
+            if self.staging_mode == HPC_STAGING_MODE_SYNC:
+                self._call_servicing_rmq_connection(
+                    self.hpc_io_transfer.sync_slurm_workspace,
+                    ocrd_workspace_dir=workspace_dir, workflow_job_id=workflow_job_id,
+                    nextflow_script_path=workflow_script_path, page_ranges_dir=page_ranges_dir)
+            else:
+                # The archive is verified against the remote sha256sum while staging
+                _, staging_sha256 = self._call_servicing_rmq_connection(
+                    self.hpc_io_transfer.pack_and_stream_slurm_workspace,
+                    ocrd_workspace_dir=workspace_dir, workflow_job_id=workflow_job_id,
+                    nextflow_script_path=workflow_script_path, codec=self.archive_codec,
+                    page_ranges_dir=page_ranges_dir)
+                sync_db_update_workflow_job(find_job_id=workflow_job_id, hpc_staging_sha256=staging_sha256)
+        except Exception as error:
+            raise Exception(f"Failed to stage the slurm workspace with mode `{self.staging_mode}`: {error}")
+        finally:
+            rmtree(page_ranges_dir, ignore_errors=True)
+
+    def __slurm_job_time_limits(self) -> Tuple[str, str]:
+        if self.test_sbatch:
+            return HPC_JOB_DEADLINE_TIME_TEST, HPC_JOB_QOS_2H
+        return HPC_JOB_DEADLINE_TIME_REGULAR, HPC_JOB_QOS_48H
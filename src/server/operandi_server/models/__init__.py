@@ -1,6 +1,7 @@
 __all__ = [
     "Job",
     "PYDiscovery",
+    "PYSlurmJobAccounting",
     "PYUserAction",
     "Resource",
     "SbatchArguments",
@@ -13,5 +14,5 @@ __all__ = [
 from .base import Resource, Job, SbatchArguments, WorkflowArguments
 from .discovery import PYDiscovery
 from .user import PYUserAction
-from .workflow import WorkflowRsrc, WorkflowJobRsrc
+from .workflow import PYSlurmJobAccounting, WorkflowRsrc, WorkflowJobRsrc
 from .workspace import WorkspaceRsrc
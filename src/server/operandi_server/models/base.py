@@ -2,7 +2,7 @@ from pydantic import BaseModel, Field
 from typing import Optional
 
 from operandi_utils import StateJob
-from operandi_utils.hpc.constants import HPC_JOB_DEFAULT_PARTITION
+from operandi_utils.hpc.constants import HPC_JOB_DEFAULT_PARTITION, HPC_NF_EXECUTOR_LOCAL
 
 from ..constants import DEFAULT_FILE_GRP, DEFAULT_METS_BASENAME
 
@@ -38,3 +38,5 @@ class SbatchArguments(BaseModel):
     partition: str = HPC_JOB_DEFAULT_PARTITION  # partition to be used
     cpus: int = 4  # cpus per job allocated by default
     ram: int = 32  # RAM (in GB) per job allocated by default
+    # "local" runs the whole workflow on a single node, "slurm" submits each nextflow process fork as a slurm job
+    nf_executor: str = HPC_NF_EXECUTOR_LOCAL
@@ -1,5 +1,7 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
 from typing import Optional
-from operandi_utils.constants import StateJob, StateWorkspace
+from operandi_utils.constants import StateJob, StateJobSlurm, StateWorkspace
 from .base import Job, Resource
 from .workspace import WorkspaceRsrc
 
@@ -39,3 +41,47 @@ class WorkflowJobRsrc(Job):
             resource_id=job_id, resource_url=job_url, description=description, job_state=job_state,
             workflow_rsrc=workflow_rsrc, workspace_rsrc=workspace_rsrc,
         )
+
+
+class PYSlurmJobAccounting(BaseModel):
+    job_id: str = Field(..., description="ID of the workflow job")
+    slurm_job_id: str = Field(..., description="ID of the slurm job that has run the workflow job")
+    slurm_job_state: StateJobSlurm = Field(default=StateJobSlurm.UNSET, description="State of the slurm job")
+    submit_time: Optional[datetime] = Field(default=None, description="When the slurm job was submitted")
+    start_time: Optional[datetime] = Field(default=None, description="When the slurm job has started running")
+    end_time: Optional[datetime] = Field(default=None, description="When the slurm job has finished")
+    queued_seconds: Optional[float] = Field(default=None, description="Time in seconds spent waiting in the queue")
+    elapsed_seconds: Optional[int] = Field(default=None, description="Run time in seconds")
+    total_cpu_seconds: Optional[float] = Field(default=None, description="Consumed cpu time in seconds")
+    alloc_cpus: Optional[int] = Field(default=None, description="Amount of allocated cpus")
+    max_rss_bytes: Optional[int] = Field(default=None, description="Maximum resident memory in bytes")
+    req_mem_bytes: Optional[int] = Field(default=None, description="Requested memory in bytes")
+    cpu_efficiency: Optional[float] = Field(
+        default=None, description="Consumed cpu time divided by the allocated cpu time, between 0 and 1")
+    memory_efficiency: Optional[float] = Field(
+        default=None, description="Maximum resident memory divided by the requested memory, between 0 and 1")
+    node_list: Optional[str] = Field(default=None, description="The nodes the slurm job has run on")
+
+    @staticmethod
+    def create(
+        job_id: str, slurm_job_id: str, slurm_job_state: StateJobSlurm = StateJobSlurm.UNSET,
+        submit_time: datetime = None, start_time: datetime = None, end_time: datetime = None,
+        elapsed_seconds: int = None, total_cpu_seconds: float = None, alloc_cpus: int = None,
+        max_rss_bytes: int = None, req_mem_bytes: int = None, node_list: str = None
+    ):
+        queued_seconds = None
+        if submit_time and start_time:
+            queued_seconds = (start_time - submit_time).total_seconds()
+        cpu_efficiency = None
+        if total_cpu_seconds is not None and elapsed_seconds and alloc_cpus:
+            cpu_efficiency = total_cpu_seconds / (elapsed_seconds * alloc_cpus)
+        memory_efficiency = None
+        if max_rss_bytes is not None and req_mem_bytes:
+            memory_efficiency = max_rss_bytes / req_mem_bytes
+        return PYSlurmJobAccounting(
+            job_id=job_id, slurm_job_id=slurm_job_id, slurm_job_state=slurm_job_state, submit_time=submit_time,
+            start_time=start_time, end_time=end_time, queued_seconds=queued_seconds, elapsed_seconds=elapsed_seconds,
+            total_cpu_seconds=total_cpu_seconds, alloc_cpus=alloc_cpus, max_rss_bytes=max_rss_bytes,
+            req_mem_bytes=req_mem_bytes, cpu_efficiency=cpu_efficiency, memory_efficiency=memory_efficiency,
+            node_list=node_list
+        )
@@ -12,14 +12,18 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
 from operandi_utils import get_nf_workflows_dir
 from operandi_utils.constants import AccountTypes, StateJob, StateWorkspace
-from operandi_utils.database import db_create_workflow, db_create_workflow_job, db_update_workspace
+from operandi_utils.database import (
+    db_create_workflow, db_create_workflow_job, db_get_hpc_slurm_job, db_update_workspace)
+from operandi_utils.hpc import extract_model_dependencies_from_file
+from operandi_utils.hpc.constants import HPC_NF_EXECUTORS
 from operandi_utils.rabbitmq import (
-    get_connection_publisher, RABBITMQ_QUEUE_JOB_STATUSES, RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_USERS)
+    get_connection_publisher, RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_USERS)
 from operandi_server.constants import SERVER_WORKFLOWS_ROUTER, SERVER_WORKFLOW_JOBS_ROUTER, SERVER_WORKSPACES_ROUTER
 from operandi_server.files_manager import (
     create_resource_dir, delete_resource_dir, get_all_resources_url, get_resource_local, get_resource_url,
     receive_resource)
-from operandi_server.models import SbatchArguments, WorkflowArguments, WorkflowRsrc, WorkflowJobRsrc
+from operandi_server.models import (
+    PYSlurmJobAccounting, SbatchArguments, WorkflowArguments, WorkflowRsrc, WorkflowJobRsrc)
 from .constants import ServerApiTags
 from .workflow_utils import get_db_workflow_job_with_handling, get_db_workflow_with_handling
 from .workspace_utils import get_db_workspace_with_handling
@@ -88,25 +92,21 @@ class RouterWorkflow:
             summary="Download the logs zip of a job identified with `workflow_id` and `job_id`.",
             response_model=None, response_model_exclude_unset=False, response_model_exclude_none=False
         )
+        self.router.add_api_route(
+            path="/workflow/{workflow_id}/{job_id}/accounting",
+            endpoint=self.get_workflow_job_accounting, methods=["GET"], status_code=status.HTTP_200_OK,
+            summary="""
+            Get the slurm accounting of a job identified with `workflow_id` and `job_id`, i.e.,
+            the queue and run times and the cpu and memory usage compared to the allocated resources.
+            The accounting is available once the slurm job of the workflow job has finished.
+            """,
+            response_model=PYSlurmJobAccounting, response_model_exclude_unset=True, response_model_exclude_none=True
+        )
 
     def __del__(self):
         if self.rmq_publisher:
             self.rmq_publisher.disconnect()
 
-    async def _push_status_request_to_rabbitmq(self, job_id: str):
-        # Create the job status message to be sent to the RabbitMQ queue
-        try:
-            job_status_message = {"job_id": f"{job_id}"}
-            self.logger.debug(f"Encoding the job status RabbitMQ message: {job_status_message}")
-            encoded_workflow_message = dumps(job_status_message).encode(encoding="utf-8")
-            self.logger.debug(f"Pushing to the RabbitMQ queue for job statuses: {RABBITMQ_QUEUE_JOB_STATUSES}")
-            self.rmq_publisher.publish_to_queue(
-                queue_name=RABBITMQ_QUEUE_JOB_STATUSES, message=encoded_workflow_message)
-        except Exception as error:
-            message = "Failed to push status request to RabbitMQ"
-            self.logger.error(f"{message}, error: {error}")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=message)
-
     async def insert_production_workflows(self, production_workflows_dir: Path = get_nf_workflows_dir()):
         for path in production_workflows_dir.iterdir():
             if not path.is_file():
@@ -121,7 +121,7 @@ class RouterWorkflow:
             copyfile(src=path, dst=nf_script_dst)
             await db_create_workflow(
                 workflow_id=workflow_id, workflow_dir=workflow_dir, workflow_script_path=nf_script_dst,
-                workflow_script_base=path.name)
+                workflow_script_base=path.name, model_dependencies=extract_model_dependencies_from_file(nf_script_dst))
             self.production_workflows.append(workflow_id)
 
     async def list_workflows(self, auth: HTTPBasicCredentials = Depends(HTTPBasic())) -> List[WorkflowRsrc]:
@@ -167,7 +167,8 @@ class RouterWorkflow:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=message)
         await db_create_workflow(
             workflow_id=workflow_id, workflow_dir=workflow_dir, workflow_script_path=nf_script_dest,
-            workflow_script_base=nextflow_script.filename)
+            workflow_script_base=nextflow_script.filename,
+            model_dependencies=extract_model_dependencies_from_file(nf_script_dest))
         workflow_url = get_resource_url(SERVER_WORKFLOWS_ROUTER, workflow_id)
         return WorkflowRsrc.create(workflow_id=workflow_id, workflow_url=workflow_url)
 
@@ -200,7 +201,8 @@ class RouterWorkflow:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=message)
         await db_create_workflow(
             workflow_id=workflow_id, workflow_dir=workflow_dir, workflow_script_path=nf_script_dst,
-            workflow_script_base=nextflow_script.filename)
+            workflow_script_base=nextflow_script.filename,
+            model_dependencies=extract_model_dependencies_from_file(nf_script_dst))
         workflow_url = get_resource_url(SERVER_WORKFLOWS_ROUTER, workflow_id)
         return WorkflowRsrc.create(workflow_id=workflow_id, workflow_url=workflow_url)
 
@@ -212,7 +214,6 @@ class RouterWorkflow:
         `curl -X GET SERVER_ADDR/workflow/{workflow_id}/{job_id}`
         """
         await self.user_authenticator.user_login(auth)
-        await self._push_status_request_to_rabbitmq(job_id=job_id)
 
         db_wf_job = await get_db_workflow_job_with_handling(self.logger, job_id=job_id, check_local_existence=True)
         workspace_id = db_wf_job.workspace_id
@@ -244,7 +245,6 @@ class RouterWorkflow:
         `curl -X GET SERVER_ADDR/workflow/{workflow_id}/logs -H "accept: application/vnd.zip" -o foo.zip`
         """
         await self.user_authenticator.user_login(auth)
-        await self._push_status_request_to_rabbitmq(job_id=job_id)
 
         db_wf_job = await get_db_workflow_job_with_handling(self.logger, job_id=job_id, check_local_existence=True)
         job_state = db_wf_job.job_state
@@ -265,6 +265,36 @@ class RouterWorkflow:
         background_tasks.add_task(unlink, job_archive_path)
         return FileResponse(path=job_archive_path, filename=f"{job_id}.zip", media_type="application/zip")
 
+    async def get_workflow_job_accounting(
+        self, workflow_id: str, job_id: str, auth: HTTPBasicCredentials = Depends(HTTPBasic())
+    ) -> PYSlurmJobAccounting:
+        """
+        Curl equivalent:
+        `curl -X GET SERVER_ADDR/workflow/{workflow_id}/{job_id}/accounting`
+        """
+        await self.user_authenticator.user_login(auth)
+
+        db_wf_job = await get_db_workflow_job_with_handling(self.logger, job_id=job_id, check_local_existence=False)
+        try:
+            db_hpc_slurm_job = await db_get_hpc_slurm_job(workflow_job_id=db_wf_job.job_id)
+        except RuntimeError as error:
+            message = f"No slurm job has been submitted yet for workflow job id: {job_id}"
+            self.logger.error(f"{message}, error: {error}")
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=message)
+        if not db_hpc_slurm_job.hpc_end_time:
+            message = f"Cannot get the accounting of a job unless its slurm job has finished: {job_id}"
+            self.logger.error(message)
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=message)
+
+        return PYSlurmJobAccounting.create(
+            job_id=job_id, slurm_job_id=db_hpc_slurm_job.hpc_slurm_job_id,
+            slurm_job_state=db_hpc_slurm_job.hpc_slurm_job_state, submit_time=db_hpc_slurm_job.hpc_submit_time,
+            start_time=db_hpc_slurm_job.hpc_start_time, end_time=db_hpc_slurm_job.hpc_end_time,
+            elapsed_seconds=db_hpc_slurm_job.hpc_elapsed, total_cpu_seconds=db_hpc_slurm_job.hpc_total_cpu,
+            alloc_cpus=db_hpc_slurm_job.hpc_alloc_cpus, max_rss_bytes=db_hpc_slurm_job.hpc_max_rss,
+            req_mem_bytes=db_hpc_slurm_job.hpc_req_mem, node_list=db_hpc_slurm_job.hpc_node_list
+        )
+
     async def submit_to_rabbitmq_queue(
         self, workflow_id: str, workflow_args: WorkflowArguments, sbatch_args: SbatchArguments,
         auth: HTTPBasicCredentials = Depends(HTTPBasic())
@@ -276,10 +306,15 @@ class RouterWorkflow:
             partition = sbatch_args.partition
             cpus = sbatch_args.cpus
             ram = sbatch_args.ram
+            nf_executor = sbatch_args.nf_executor
         except Exception as error:
             message = "Failed to parse sbatch arguments"
             self.logger.error(f"{message}, error: {error}")
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=message)
+        if nf_executor not in HPC_NF_EXECUTORS:
+            message = f"Invalid nextflow executor: {nf_executor}, must be one of: {HPC_NF_EXECUTORS}"
+            self.logger.error(message)
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=message)
 
         try:
             workspace_id = workflow_args.workspace_id
@@ -325,7 +360,8 @@ class RouterWorkflow:
 
         self._push_job_to_rabbitmq(
             user_type=user_account_type, workflow_id=workflow_id, workspace_id=workspace_id, job_id=job_id,
-            input_file_grp=input_file_grp, remove_file_grps=remove_file_grps, partition=partition, cpus=cpus, ram=ram
+            input_file_grp=input_file_grp, remove_file_grps=remove_file_grps, partition=partition, cpus=cpus, ram=ram,
+            nf_executor=nf_executor
         )
 
         return WorkflowJobRsrc.create(
@@ -336,7 +372,7 @@ class RouterWorkflow:
 
     def _push_job_to_rabbitmq(
         self, user_type: str, workflow_id: str, workspace_id: str, job_id: str, input_file_grp: str,
-        remove_file_grps: str, partition: str, cpus: int, ram: int
+        remove_file_grps: str, partition: str, cpus: int, ram: int, nf_executor: str
     ):
         # Create the message to be sent to the RabbitMQ queue
         self.logger.info("Creating a workflow job RabbitMQ message")
@@ -348,7 +384,8 @@ class RouterWorkflow:
             "remove_file_grps": f"{remove_file_grps}",
             "partition": f"{partition}",
             "cpus": f"{cpus}",
-            "ram": f"{ram}"
+            "ram": f"{ram}",
+            "nf_executor": f"{nf_executor}"
         }
         self.logger.info(f"Encoding the workflow job RabbitMQ message: {workflow_processing_message}")
         encoded_workflow_message = dumps(workflow_processing_message).encode(encoding="utf-8")
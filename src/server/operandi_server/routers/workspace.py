@@ -18,7 +18,7 @@ from .workspace_utils import (
     create_workspace_bag,
     create_workspace_bag_from_remote_url,
     extract_bag_info_with_handling,
-    extract_pages_with_handling,
+    extract_page_ids_with_handling,
     validate_bag_with_handling,
     get_db_workspace_with_handling,
     parse_file_groups_with_handling,
@@ -135,11 +135,11 @@ class RouterWorkspace:
         validate_bag_with_handling(self.logger, bag_dst=bag_dest)
         bag_info = extract_bag_info_with_handling(self.logger, bag_dst=bag_dest, ws_dir=workspace_dir)
         Path(bag_dest).unlink()  # Remove the created zip bag
-        pages_amount = extract_pages_with_handling(self.logger, bag_info, workspace_dir)
+        page_ids = extract_page_ids_with_handling(self.logger, bag_info, workspace_dir)
         ws_state = StateWorkspace.READY
         await db_create_workspace(
-            workspace_id=workspace_id, workspace_dir=workspace_dir, pages_amount=pages_amount, bag_info=bag_info,
-            state=ws_state)
+            workspace_id=workspace_id, workspace_dir=workspace_dir, pages_amount=len(page_ids), bag_info=bag_info,
+            state=ws_state, page_ids=page_ids)
         workspace_url = get_resource_url(SERVER_WORKSPACES_ROUTER, workspace_id)
         return WorkspaceRsrc.create(
             workspace_id=workspace_id, workspace_url=workspace_url, description="Workspace from Mets URL",
@@ -166,10 +166,11 @@ class RouterWorkspace:
         validate_bag_with_handling(self.logger, bag_dst=bag_dest)
         bag_info = extract_bag_info_with_handling(self.logger, bag_dst=bag_dest, ws_dir=ws_dir)
         Path(bag_dest).unlink()  # Remove the created zip bag
-        pages_amount = extract_pages_with_handling(self.logger, bag_info, ws_dir)
+        page_ids = extract_page_ids_with_handling(self.logger, bag_info, ws_dir)
         ws_state = StateWorkspace.READY
         await db_create_workspace(
-            workspace_id=ws_id, workspace_dir=ws_dir, pages_amount=pages_amount, bag_info=bag_info, state=ws_state)
+            workspace_id=ws_id, workspace_dir=ws_dir, pages_amount=len(page_ids), bag_info=bag_info, state=ws_state,
+            page_ids=page_ids)
         ws_url = get_resource_url(SERVER_WORKSPACES_ROUTER, ws_id)
         return WorkspaceRsrc.create(
             workspace_id=ws_id, workspace_url=ws_url, description="Workspace from ocrd zip", state=ws_state)
@@ -211,10 +212,11 @@ class RouterWorkspace:
         validate_bag_with_handling(self.logger, bag_dst=bag_dest)
         bag_info = extract_bag_info_with_handling(self.logger, bag_dst=bag_dest, ws_dir=ws_dir)
         Path(bag_dest).unlink()
-        pages_amount = extract_pages_with_handling(self.logger, bag_info, ws_dir)
+        page_ids = extract_page_ids_with_handling(self.logger, bag_info, ws_dir)
         ws_state = StateWorkspace.READY
         await db_create_workspace(
-            workspace_id=ws_id, workspace_dir=ws_dir, pages_amount=pages_amount, bag_info=bag_info, state=ws_state)
+            workspace_id=ws_id, workspace_dir=ws_dir, pages_amount=len(page_ids), bag_info=bag_info, state=ws_state,
+            page_ids=page_ids)
         ws_url = get_resource_url(SERVER_WORKSPACES_ROUTER, ws_id)
         return WorkspaceRsrc.create(
             workspace_id=ws_id, workspace_url=ws_url, description="Workspace from ocrd zip", state=ws_state)
@@ -22,18 +22,17 @@ def get_ocrd_workspace_physical_pages(mets_path: str) -> List[str]:
     return Resolver().workspace_from_url(mets_url=mets_path).mets.physical_pages
 
 
-def extract_pages_with_handling(logger, bag_info: dict, ws_dir: str) -> int:
+def extract_page_ids_with_handling(logger, bag_info: dict, ws_dir: str) -> List[str]:
     mets_basename = DEFAULT_METS_BASENAME
     if "Ocrd-Mets" in bag_info:
         mets_basename = bag_info.get("Ocrd-Mets")
     try:
         physical_pages = get_ocrd_workspace_physical_pages(mets_path=join(ws_dir, mets_basename))
-        pages_amount = len(physical_pages)
     except Exception as error:
-        message = "Failed to extract pages amount"
+        message = "Failed to extract physical pages"
         logger.error(f"{message}, error: {error}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=message)
-    return pages_amount
+    return physical_pages
 
 
 def create_workspace_bag(db_workspace) -> Union[str, None]:
@@ -3,9 +3,13 @@ __all__ = [
     "download_mets_file",
     "is_url_responsive",
     "generate_id",
+    "get_archive_suffix",
     "get_log_file_path_prefix",
     "get_nf_workflows_dir",
+    "make_archive_file",
+    "make_archive_stream",
     "make_zip_archive",
+    "make_zip_archive_stream",
     "receive_file",
     "reconfigure_all_loggers",
     "safe_init_logging",
@@ -13,11 +17,18 @@ __all__ = [
     "StateJob",
     "StateJobSlurm",
     "StateWorkspace",
+    "unpack_archive_file",
     "unpack_zip_archive",
     "verify_and_parse_mq_uri",
     "verify_database_uri"
 ]
 
+from operandi_utils.archive import (
+    get_archive_suffix,
+    make_archive_file,
+    make_archive_stream,
+    unpack_archive_file
+)
 from operandi_utils.constants import StateJob, StateJobSlurm, StateWorkspace
 from operandi_utils.logging import reconfigure_all_loggers, get_log_file_path_prefix
 from operandi_utils.utils import (
@@ -28,6 +39,7 @@ from operandi_utils.utils import (
     get_nf_workflows_dir,
     receive_file,
     make_zip_archive,
+    make_zip_archive_stream,
     unpack_zip_archive,
     safe_init_logging,
     send_bag_to_ola_hd,
@@ -0,0 +1,144 @@
+from os import makedirs, sep, walk
+from os.path import basename, isdir, join, relpath, splitext
+from pathlib import Path
+import tarfile
+from typing import List, Tuple
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+
+from .constants import (
+    ARCHIVE_CODEC_AUTO, ARCHIVE_CODEC_DEFLATE, ARCHIVE_CODEC_STORE, ARCHIVE_CODEC_ZSTD, ARCHIVE_CODECS,
+    ARCHIVE_STORED_SUFFIXES, ARCHIVE_ZSTD_LEVEL
+)
+
+# The first bytes of the supported archive formats
+_MAGIC_ZIP = b"PK"
+_MAGIC_ZSTD = b"\x28\xb5\x2f\xfd"
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            f"The archive codec `{ARCHIVE_CODEC_ZSTD}` requires the optional `zstandard` package, "
+            f"install it with: pip install operandi_utils[zstd]")
+    return zstandard
+
+
+def get_archive_suffix(codec: str) -> str:
+    if codec not in ARCHIVE_CODECS:
+        raise ValueError(f"Invalid archive codec: {codec}, must be one of: {ARCHIVE_CODECS}")
+    return ".tar.zst" if codec == ARCHIVE_CODEC_ZSTD else ".zip"
+
+
+def get_zip_compression(file_name: str, codec: str) -> int:
+    """
+    Returns the zip compression type of a single file. The auto codec stores the already
+    compressed media files, e.g., page images, and deflates everything else, e.g., XML files.
+    """
+    if codec == ARCHIVE_CODEC_STORE:
+        return ZIP_STORED
+    if codec == ARCHIVE_CODEC_DEFLATE:
+        return ZIP_DEFLATED
+    if codec == ARCHIVE_CODEC_AUTO:
+        return ZIP_STORED if splitext(file_name)[1].lower() in ARCHIVE_STORED_SUFFIXES else ZIP_DEFLATED
+    raise ValueError(f"Invalid zip archive codec: {codec}")
+
+
+class _SequentialWriter:
+    """
+    Exposes only write() and flush() of the wrapped stream. ZipFile then treats the stream
+    as unseekable and writes data descriptors instead of seeking back to patch the local headers.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, data) -> int:
+        self._stream.write(data)
+        return len(data)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def _iterate_sources(sources: List[Tuple[str, str]]):
+    for source, arc_name in sources:
+        yield source, arc_name
+        if not isdir(source):
+            continue
+        for root, dirs, files in walk(source):
+            dirs.sort()
+            for name in dirs + sorted(files):
+                path = join(root, name)
+                yield path, join(arc_name, relpath(path, source))
+
+
+def make_archive_stream(stream, sources: List[Tuple[str, str]], codec: str = ARCHIVE_CODEC_AUTO) -> None:
+    """
+    Writes an archive directly into an already opened writable stream, e.g., a remote SFTP file.
+    The bytes are produced strictly sequentially, nothing is staged on the local disk.
+
+    Args:
+        stream: the writable file-like object to write the archive into
+        sources: tuples of a local path (file or directory) and the name under which it is archived
+        codec: one of `ARCHIVE_CODECS`, the zstd codec produces a zstd compressed tar instead of a zip
+
+    Symbolic links are archived as the files they point to, the same way for both formats.
+    """
+    if codec == ARCHIVE_CODEC_ZSTD:
+        compressor = _import_zstandard().ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL, threads=-1)
+        with compressor.stream_writer(stream, closefd=False) as zstd_stream:
+            # Dereferenced like the zip writer does, the unpacking rejects symbolic link members
+            with tarfile.open(fileobj=zstd_stream, mode="w|", dereference=True) as tar_file:
+                for path, arc_name in _iterate_sources(sources):
+                    tar_file.add(name=path, arcname=arc_name, recursive=False)
+        return
+    get_archive_suffix(codec)
+    with ZipFile(_SequentialWriter(stream), mode="w") as zip_file:
+        for path, arc_name in _iterate_sources(sources):
+            zip_file.write(filename=path, arcname=arc_name, compress_type=get_zip_compression(path, codec))
+
+
+def make_archive_file(source: str, destination: str, codec: str = ARCHIVE_CODEC_AUTO) -> None:
+    """
+    Archives the source file or directory under its base name into the destination file.
+    """
+    makedirs(name=Path(destination).parent.absolute(), exist_ok=True)
+    with open(destination, mode="wb") as archive_file:
+        make_archive_stream(stream=archive_file, sources=[(source, basename(source.rstrip(sep)))], codec=codec)
+
+
+def unpack_archive_file(source: str, destination: str) -> None:
+    """
+    Unpacks a zip or a zstd compressed tar archive, the format is detected from the first bytes.
+    """
+    with open(source, mode="rb") as archive_file:
+        magic = archive_file.read(len(_MAGIC_ZSTD))
+        archive_file.seek(0)
+        if magic.startswith(_MAGIC_ZIP):
+            with ZipFile(archive_file) as zip_file:
+                zip_file.extractall(path=destination)
+        elif magic == _MAGIC_ZSTD:
+            decompressor = _import_zstandard().ZstdDecompressor()
+            with decompressor.stream_reader(archive_file) as zstd_stream:
+                with tarfile.open(fileobj=zstd_stream, mode="r|") as tar_file:
+                    _extract_tar_stream(tar_file=tar_file, destination=destination)
+        else:
+            raise ValueError(
+                f"Unsupported archive format of: {source}, the first bytes match neither "
+                f"a zip nor a zstd compressed tar archive")
+
+
+def _extract_tar_stream(tar_file, destination: str) -> None:
+    destination_path = Path(destination).resolve()
+    makedirs(name=destination_path, exist_ok=True)
+    for member in tar_file:
+        member_path = Path(destination_path, member.name).resolve()
+        if destination_path != member_path and destination_path not in member_path.parents:
+            raise ValueError(f"Tar member: {member.name} is outside of the unpack destination: {destination}")
+        if not (member.isdir() or member.isfile()):
+            raise ValueError(f"Tar member: {member.name} is neither a regular file nor a directory")
+        if hasattr(tarfile, "data_filter"):
+            tar_file.extract(member=member, path=destination_path, filter="data")
+        else:
+            tar_file.extract(member=member, path=destination_path)
@@ -10,6 +10,20 @@ except ImportError:
 
 __all__ = [
     "AccountTypes",
+    "ARCHIVE_CODEC_AUTO",
+    "ARCHIVE_CODEC_DEFLATE",
+    "ARCHIVE_CODEC_STORE",
+    "ARCHIVE_CODEC_ZSTD",
+    "ARCHIVE_CODECS",
+    "ARCHIVE_STORED_SUFFIXES",
+    "ARCHIVE_ZSTD_LEVEL",
+    "HPC_RESULTS_MODE_FULL",
+    "HPC_RESULTS_MODE_NEW",
+    "HPC_RESULTS_MODES",
+    "JOB_STATUS_POLLER_BACKOFF_FACTOR",
+    "JOB_STATUS_POLLER_DOWNLOAD_TRIES",
+    "JOB_STATUS_POLLER_INTERVAL",
+    "JOB_STATUS_POLLER_MAX_INTERVAL",
     "LOG_FORMAT",
     "LOG_LEVEL_BROKER",
     "LOG_LEVEL_HARVESTER",
@@ -25,6 +39,7 @@ __all__ = [
     "StateJob",
     "StateJobSlurm",
     "StateWorkspace",
+    "WORKER_RMQ_SERVICE_INTERVAL",
 ]
 
 load_dotenv()
@@ -49,6 +64,38 @@ OLA_HD_PASSWORD = "JW24G.xR"
 
 OPERANDI_VERSION = get_distribution("operandi_utils").version
 
+# Archive codecs used for packing workspaces
+# auto - zip, already compressed media files are stored, everything else, e.g., XML files, is deflated
+# deflate - zip, all files are deflated
+# store - zip, no file is compressed
+# zstd - zstd compressed tar, requires the optional `zstandard` package
+ARCHIVE_CODEC_AUTO = "auto"
+ARCHIVE_CODEC_DEFLATE = "deflate"
+ARCHIVE_CODEC_STORE = "store"
+ARCHIVE_CODEC_ZSTD = "zstd"
+ARCHIVE_CODECS = [ARCHIVE_CODEC_AUTO, ARCHIVE_CODEC_DEFLATE, ARCHIVE_CODEC_STORE, ARCHIVE_CODEC_ZSTD]
+# Must match the suffixes passed to `zip -n` inside the batch scripts
+ARCHIVE_STORED_SUFFIXES = [".gif", ".gz", ".jp2", ".jpeg", ".jpg", ".pdf", ".png", ".tif", ".tiff", ".zip", ".zst"]
+ARCHIVE_ZSTD_LEVEL = 3
+
+# Which workspace files are transferred back from the HPC
+# full - the whole workspace is zipped and replaces the local workspace
+# new - only the mets and the new or changed files are zipped and merged into the local workspace
+HPC_RESULTS_MODE_FULL = "full"
+HPC_RESULTS_MODE_NEW = "new"
+HPC_RESULTS_MODES = [HPC_RESULTS_MODE_FULL, HPC_RESULTS_MODE_NEW]
+
+# Seconds between two polls of the slurm job states by the broker's job status poller
+# The interval is multiplied by the backoff factor after each poll without state changes, up to the max interval
+JOB_STATUS_POLLER_INTERVAL = 30
+JOB_STATUS_POLLER_MAX_INTERVAL = 300
+JOB_STATUS_POLLER_BACKOFF_FACTOR = 2
+# Failed results downloads of a workflow job after which it is failed, the retries are backed off like the polls
+JOB_STATUS_POLLER_DOWNLOAD_TRIES = 5
+
+# Seconds between two services of the RabbitMQ connection, e.g., heartbeats, while a worker waits for the HPC
+WORKER_RMQ_SERVICE_INTERVAL = 1
+
 
 # TODO: Still unused due to the need of changing all existing DB entries. Adapt it.
 class AccountTypes(str, Enum):
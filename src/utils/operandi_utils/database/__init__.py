@@ -9,7 +9,10 @@ __all__ = [
     "db_create_workflow",
     "db_create_workflow_job",
     "db_create_workspace",
+    "db_get_active_hpc_slurm_jobs",
+    "db_get_active_workflow_jobs",
     "db_get_hpc_slurm_job",
+    "db_get_hpc_slurm_jobs_pending_accounting",
     "db_get_user_account",
     "db_get_workflow",
     "db_get_workflow_job",
@@ -25,7 +28,10 @@ __all__ = [
     "sync_db_create_workflow",
     "sync_db_create_workflow_job",
     "sync_db_create_workspace",
+    "sync_db_get_active_hpc_slurm_jobs",
+    "sync_db_get_active_workflow_jobs",
     "sync_db_get_hpc_slurm_job",
+    "sync_db_get_hpc_slurm_jobs_pending_accounting",
     "sync_db_get_user_account",
     "sync_db_get_workflow",
     "sync_db_get_workflow_job",
@@ -42,10 +48,14 @@ from .base import db_initiate_database, sync_db_initiate_database
 from .models import DBHPCSlurmJob, DBUserAccount, DBWorkflow, DBWorkflowJob, DBWorkspace
 from .db_hpc_slurm_job import (
     db_create_hpc_slurm_job,
+    db_get_active_hpc_slurm_jobs,
     db_get_hpc_slurm_job,
+    db_get_hpc_slurm_jobs_pending_accounting,
     db_update_hpc_slurm_job,
     sync_db_create_hpc_slurm_job,
+    sync_db_get_active_hpc_slurm_jobs,
     sync_db_get_hpc_slurm_job,
+    sync_db_get_hpc_slurm_jobs_pending_accounting,
     sync_db_update_hpc_slurm_job
 )
 from .db_user_account import (
@@ -66,9 +76,11 @@ from .db_workflow import (
 )
 from .db_workflow_job import (
     db_create_workflow_job,
+    db_get_active_workflow_jobs,
     db_get_workflow_job,
     db_update_workflow_job,
     sync_db_create_workflow_job,
+    sync_db_get_active_workflow_jobs,
     sync_db_get_workflow_job,
     sync_db_update_workflow_job
 )
@@ -1,14 +1,18 @@
+from typing import List
+from beanie.operators import NotIn
 from operandi_utils import call_sync, StateJobSlurm
+from operandi_utils.constants import HPC_RESULTS_MODE_FULL
 from .models import DBHPCSlurmJob
 
 
 async def db_create_hpc_slurm_job(
     workflow_job_id: str, hpc_slurm_job_id: str, hpc_batch_script_path: str, hpc_slurm_workspace_path: str,
-    hpc_slurm_job_state: StateJobSlurm = StateJobSlurm.UNSET
+    hpc_slurm_job_state: StateJobSlurm = StateJobSlurm.UNSET, hpc_results_mode: str = HPC_RESULTS_MODE_FULL
 ) -> DBHPCSlurmJob:
     db_hpc_slurm_job = DBHPCSlurmJob(
         workflow_job_id=workflow_job_id, hpc_slurm_job_id=hpc_slurm_job_id, hpc_batch_script_path=hpc_batch_script_path,
-        hpc_slurm_workspace_path=hpc_slurm_workspace_path, hpc_slurm_job_state=hpc_slurm_job_state)
+        hpc_slurm_workspace_path=hpc_slurm_workspace_path, hpc_slurm_job_state=hpc_slurm_job_state,
+        hpc_results_mode=hpc_results_mode)
     await db_hpc_slurm_job.save()
     return db_hpc_slurm_job
 
@@ -16,10 +20,11 @@ async def db_create_hpc_slurm_job(
 @call_sync
 async def sync_db_create_hpc_slurm_job(
     workflow_job_id: str, hpc_slurm_job_id: str, hpc_batch_script_path: str, hpc_slurm_workspace_path: str,
-    hpc_slurm_job_state: StateJobSlurm = StateJobSlurm.UNSET
+    hpc_slurm_job_state: StateJobSlurm = StateJobSlurm.UNSET, hpc_results_mode: str = HPC_RESULTS_MODE_FULL
 ) -> DBHPCSlurmJob:
     return await db_create_hpc_slurm_job(
-        workflow_job_id, hpc_slurm_job_id, hpc_batch_script_path, hpc_slurm_workspace_path, hpc_slurm_job_state)
+        workflow_job_id, hpc_slurm_job_id, hpc_batch_script_path, hpc_slurm_workspace_path, hpc_slurm_job_state,
+        hpc_results_mode)
 
 
 async def db_get_hpc_slurm_job(workflow_job_id: str) -> DBHPCSlurmJob:
@@ -34,6 +39,33 @@ async def sync_db_get_hpc_slurm_job(workflow_job_id: str) -> DBHPCSlurmJob:
     return await db_get_hpc_slurm_job(workflow_job_id)
 
 
+async def db_get_active_hpc_slurm_jobs() -> List[DBHPCSlurmJob]:
+    """
+    Returns the not deleted hpc slurm jobs that have not reached a success or a failing state yet.
+    """
+    final_states = StateJobSlurm.success_states() + StateJobSlurm.failing_states()
+    return await DBHPCSlurmJob.find(
+        NotIn(DBHPCSlurmJob.hpc_slurm_job_state, final_states), DBHPCSlurmJob.deleted == False).to_list()
+
+
+@call_sync
+async def sync_db_get_active_hpc_slurm_jobs() -> List[DBHPCSlurmJob]:
+    return await db_get_active_hpc_slurm_jobs()
+
+
+async def db_get_hpc_slurm_jobs_pending_accounting() -> List[DBHPCSlurmJob]:
+    """
+    Returns the not deleted finished hpc slurm jobs whose accounting is still missing and to be queried again.
+    """
+    return await DBHPCSlurmJob.find(
+        DBHPCSlurmJob.hpc_accounting_tries_left > 0, DBHPCSlurmJob.deleted == False).to_list()
+
+
+@call_sync
+async def sync_db_get_hpc_slurm_jobs_pending_accounting() -> List[DBHPCSlurmJob]:
+    return await db_get_hpc_slurm_jobs_pending_accounting()
+
+
 async def db_update_hpc_slurm_job(find_workflow_job_id: str, **kwargs) -> DBHPCSlurmJob:
     db_hpc_slurm_job = await db_get_hpc_slurm_job(workflow_job_id=find_workflow_job_id)
     model_keys = list(db_hpc_slurm_job.__dict__.keys())
@@ -50,6 +82,28 @@ async def db_update_hpc_slurm_job(find_workflow_job_id: str, **kwargs) -> DBHPCS
             db_hpc_slurm_job.hpc_batch_script_path = value
         elif key == "hpc_slurm_workspace_path":
             db_hpc_slurm_job.hpc_slurm_workspace_path = value
+        elif key == "hpc_results_mode":
+            db_hpc_slurm_job.hpc_results_mode = value
+        elif key == "hpc_submit_time":
+            db_hpc_slurm_job.hpc_submit_time = value
+        elif key == "hpc_start_time":
+            db_hpc_slurm_job.hpc_start_time = value
+        elif key == "hpc_end_time":
+            db_hpc_slurm_job.hpc_end_time = value
+        elif key == "hpc_elapsed":
+            db_hpc_slurm_job.hpc_elapsed = value
+        elif key == "hpc_total_cpu":
+            db_hpc_slurm_job.hpc_total_cpu = value
+        elif key == "hpc_max_rss":
+            db_hpc_slurm_job.hpc_max_rss = value
+        elif key == "hpc_req_mem":
+            db_hpc_slurm_job.hpc_req_mem = value
+        elif key == "hpc_alloc_cpus":
+            db_hpc_slurm_job.hpc_alloc_cpus = value
+        elif key == "hpc_node_list":
+            db_hpc_slurm_job.hpc_node_list = value
+        elif key == "hpc_accounting_tries_left":
+            db_hpc_slurm_job.hpc_accounting_tries_left = value
         elif key == "deleted":
             db_hpc_slurm_job.deleted = value
         else:
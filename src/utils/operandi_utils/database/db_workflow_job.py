@@ -1,3 +1,5 @@
+from typing import List
+from beanie.operators import In
 from operandi_utils import call_sync
 from operandi_utils.constants import StateJob
 from .models import DBWorkflowJob
@@ -31,6 +33,20 @@ async def sync_db_get_workflow_job(job_id: str) -> DBWorkflowJob:
     return await db_get_workflow_job(job_id)
 
 
+async def db_get_active_workflow_jobs() -> List[DBWorkflowJob]:
+    """
+    Returns the not deleted workflow jobs that wait for their slurm job to finish or for their results.
+    """
+    active_states = [StateJob.RUNNING, StateJob.TRANSFERRING_FROM_HPC]
+    return await DBWorkflowJob.find(
+        In(DBWorkflowJob.job_state, active_states), DBWorkflowJob.deleted == False).to_list()
+
+
+@call_sync
+async def sync_db_get_active_workflow_jobs() -> List[DBWorkflowJob]:
+    return await db_get_active_workflow_jobs()
+
+
 async def db_update_workflow_job(find_job_id: str, **kwargs) -> DBWorkflowJob:
     db_workflow_job = await db_get_workflow_job(job_id=find_job_id)
     model_keys = list(db_workflow_job.__dict__.keys())
@@ -53,6 +69,10 @@ async def db_update_workflow_job(find_job_id: str, **kwargs) -> DBWorkflowJob:
             db_workflow_job.workspace_dir = value
         elif key == "hpc_slurm_job_id":
             db_workflow_job.hpc_slurm_job_id = value
+        elif key == "hpc_staging_sha256":
+            db_workflow_job.hpc_staging_sha256 = value
+        elif key == "hpc_results_sha256":
+            db_workflow_job.hpc_results_sha256 = value
         elif key == "deleted":
             db_workflow_job.deleted = value
         else:
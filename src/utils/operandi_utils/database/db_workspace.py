@@ -1,4 +1,5 @@
 from os.path import join
+from typing import List, Optional
 from operandi_utils import call_sync
 from operandi_utils.constants import StateWorkspace
 from .models import DBWorkspace
@@ -7,7 +8,8 @@ from .models import DBWorkspace
 # TODO: This also updates to satisfy the PUT method in the Workspace Manager - fix this
 async def db_create_workspace(
     workspace_id: str, workspace_dir: str, pages_amount: int, bag_info: dict,
-    state: StateWorkspace = StateWorkspace.UNSET, default_mets_basename: str = "mets.xml"
+    state: StateWorkspace = StateWorkspace.UNSET, default_mets_basename: str = "mets.xml",
+    page_ids: Optional[List[str]] = None
 ) -> DBWorkspace:
     bag_info = dict(bag_info)
     mets_basename = default_mets_basename
@@ -29,6 +31,7 @@ async def db_create_workspace(
             workspace_dir=workspace_dir,
             workspace_mets_path=workspace_mets_path,
             pages_amount=pages_amount,
+            page_ids=page_ids,
             state=state,
             mets_basename=mets_basename,
             ocrd_identifier=ocrd_identifier,
@@ -41,6 +44,7 @@ async def db_create_workspace(
         db_workspace.workspace_mets_path = workspace_mets_path
         db_workspace.mets_basename = mets_basename
         db_workspace.pages_amount = pages_amount
+        db_workspace.page_ids = page_ids
         db_workspace.ocrd_identifier = ocrd_identifier
         db_workspace.bagit_profile_identifier = bagit_profile_identifier
         db_workspace.ocrd_base_version_checksum = ocrd_base_version_checksum
@@ -52,9 +56,9 @@ async def db_create_workspace(
 @call_sync
 async def sync_db_create_workspace(
     workspace_id: str, workspace_dir: str, pages_amount: int, bag_info: dict,
-    state: StateWorkspace = StateWorkspace.UNSET
+    state: StateWorkspace = StateWorkspace.UNSET, page_ids: Optional[List[str]] = None
 ) -> DBWorkspace:
-    return await db_create_workspace(workspace_id, workspace_dir, pages_amount, bag_info, state)
+    return await db_create_workspace(workspace_id, workspace_dir, pages_amount, bag_info, state, page_ids=page_ids)
 
 
 async def db_get_workspace(workspace_id: str) -> DBWorkspace:
@@ -83,6 +87,8 @@ async def db_update_workspace(find_workspace_id: str, **kwargs) -> DBWorkspace:
             db_workspace.workspace_mets_path = value
         elif key == "pages_amount":
             db_workspace.pages_amount = value
+        elif key == "page_ids":
+            db_workspace.page_ids = value
         elif key == "state":
             db_workspace.state = value
         elif key == "ocrd_identifier":
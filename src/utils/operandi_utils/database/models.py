@@ -1,7 +1,8 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 from beanie import Document
 
-from operandi_utils.constants import AccountTypes, StateJob, StateJobSlurm, StateWorkspace
+from operandi_utils.constants import AccountTypes, HPC_RESULTS_MODE_FULL, StateJob, StateJobSlurm, StateWorkspace
 
 
 class DBHPCSlurmJob(Document):
@@ -14,6 +15,17 @@ class DBHPCSlurmJob(Document):
         hpc_slurm_job_state         the state of the slurm job inside the HPC
         hpc_batch_script_path       path of the batch script inside the HPC
         hpc_slurm_workspace_path    path of the slurm workspace inside the HPC
+        hpc_results_mode            which workspace files the slurm job zips for the transfer back
+        hpc_submit_time             when the slurm job was submitted, from the slurm accounting
+        hpc_start_time              when the slurm job has started running, from the slurm accounting
+        hpc_end_time                when the slurm job has finished, from the slurm accounting
+        hpc_elapsed                 run time of the slurm job in seconds
+        hpc_total_cpu               cpu time in seconds consumed by the slurm job
+        hpc_max_rss                 maximum resident memory in bytes of the slurm job steps
+        hpc_req_mem                 memory in bytes requested by the slurm job
+        hpc_alloc_cpus              amount of cpus allocated to the slurm job
+        hpc_node_list               the nodes the slurm job has run on
+        hpc_accounting_tries_left   remaining poll cycles to query the missing accounting of the finished slurm job
         deleted                     whether this record is deleted by the user
                                     (still available in the DB itself)
     """
@@ -22,6 +34,17 @@ class DBHPCSlurmJob(Document):
     hpc_slurm_job_state: StateJobSlurm = StateJobSlurm.UNSET
     hpc_batch_script_path: Optional[str]
     hpc_slurm_workspace_path: Optional[str]
+    hpc_results_mode: str = HPC_RESULTS_MODE_FULL
+    hpc_submit_time: Optional[datetime]
+    hpc_start_time: Optional[datetime]
+    hpc_end_time: Optional[datetime]
+    hpc_elapsed: Optional[int]
+    hpc_total_cpu: Optional[float]
+    hpc_max_rss: Optional[int]
+    hpc_req_mem: Optional[int]
+    hpc_alloc_cpus: Optional[int]
+    hpc_node_list: Optional[str]
+    hpc_accounting_tries_left: int = 0
     deleted: bool = False
 
     class Settings:
@@ -62,6 +85,8 @@ class DBWorkflow(Document):
         workflow_dir            dir of the workflow
         workflow_script_base    the name of the nextflow script file
         workflow_script_path    the full path of the workflow script
+        model_dependencies      the ocrd models required by the workflow, relative to the models dir
+                                (None when they cannot be determined, then all models are staged)
         deleted                 whether this record is deleted by the user
                                 (still available in the DB itself)
     """
@@ -69,6 +94,7 @@ class DBWorkflow(Document):
     workflow_dir: str
     workflow_script_base: str
     workflow_script_path: str
+    model_dependencies: Optional[List[str]] = None
     deleted: bool = False
 
     class Settings:
@@ -88,6 +114,8 @@ class DBWorkflowJob(Document):
         workflow_dir        dir of the workflow id
         workspace_dir       dir of the workspace id
         hpc_slurm_job_id    the id of the Slurm job that runs this workflow job
+        hpc_staging_sha256  sha256 of the slurm workspace archive transferred to the HPC
+        hpc_results_sha256  sha256 of the workspace results archive transferred from the HPC
         deleted             whether this record is deleted by the user
                             (still available in the DB itself)
     """
@@ -99,6 +127,8 @@ class DBWorkflowJob(Document):
     workflow_dir: Optional[str]
     workspace_dir: Optional[str]
     hpc_slurm_job_id: Optional[str]
+    hpc_staging_sha256: Optional[str]
+    hpc_results_sha256: Optional[str]
     deleted: bool = False
 
     class Settings:
@@ -113,6 +143,7 @@ class DBWorkspace(Document):
 
     Attributes:
         pages_amount                The amount of the physical pages, used for creating page ranges
+        page_ids                    The ids of the physical pages in order, used for creating page ranges
         ocrd_identifier             Ocrd-Identifier (mandatory)
         bagit_profile_identifier    BagIt-Profile-Identifier (mandatory)
         ocrd_base_version_checksum  Ocrd-Base-Version-Checksum (mandatory)
@@ -124,6 +155,7 @@ class DBWorkspace(Document):
     workspace_dir: str
     workspace_mets_path: str
     pages_amount: int
+    page_ids: Optional[List[str]] = None
     state: StateWorkspace = StateWorkspace.UNSET
     ocrd_identifier: Optional[str]
     bagit_profile_identifier: Optional[str]
@@ -1,9 +1,29 @@
 __all__ = [
+    "AsyncHPCTransfer",
+    "HPCAgentClient",
+    "HPCAgentError",
+    "HPCConnectionPool",
     "HPCConnector",
     "HPCExecutor",
-    "HPCTransfer"
+    "HPCHostStats",
+    "HPCTransfer",
+    "extract_model_dependencies",
+    "extract_model_dependencies_from_file",
+    "format_model_dependencies",
+    "get_hpc_connection_pool",
+    "get_hpc_host_stats",
+    "nextflow_script_uses_mets_chunks",
+    "split_page_ranges",
+    "write_page_ranges"
 ]
 
+from operandi_utils.hpc.agent import HPCAgentClient, HPCAgentError
+from operandi_utils.hpc.async_transfer import AsyncHPCTransfer
+from operandi_utils.hpc.connection_pool import HPCConnectionPool, get_hpc_connection_pool
 from operandi_utils.hpc.connector import HPCConnector
 from operandi_utils.hpc.executor import HPCExecutor
+from operandi_utils.hpc.host_stats import HPCHostStats, get_hpc_host_stats
+from operandi_utils.hpc.model_dependencies import (
+    extract_model_dependencies, extract_model_dependencies_from_file, format_model_dependencies)
+from operandi_utils.hpc.page_ranges import nextflow_script_uses_mets_chunks, split_page_ranges, write_page_ranges
 from operandi_utils.hpc.transfer import HPCTransfer
@@ -0,0 +1,97 @@
+from json import dumps, loads
+from logging import getLogger
+from paramiko import Transport
+from shlex import quote
+from socket import timeout as SocketTimeout
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict
+
+from .constants import HPC_AGENT_PROTOCOL_VERSION, HPC_AGENT_PYTHON, HPC_AGENT_REQUEST_TIMEOUT, HPC_EXECUTOR_RECV_SIZE
+
+
+class HPCAgentError(Exception):
+    """
+    Raised when the agent answers a request with an error, the agent itself stays usable.
+    """
+
+
+class HPCAgentClient:
+    """
+    Starts the Operandi agent inside a login shell over its own channel of the transport and sends it requests
+    over the JSON-lines protocol of the agent. Requests are sent one at a time, each waits for its response.
+    """
+    def __init__(
+        self, transport: Transport, agent_script_path: str, root_dir: str, timeout: float = HPC_AGENT_REQUEST_TIMEOUT,
+        python: str = HPC_AGENT_PYTHON
+    ) -> None:
+        self.log = getLogger("operandi_utils.hpc.agent")
+        self.timeout = timeout
+        self._lock = Lock()
+        self._next_request_id = 1
+        self._received = b""
+        self._channel = transport.open_session(timeout=timeout)
+        self._channel.settimeout(timeout)
+        agent_command = f"exec {python} {quote(agent_script_path)} --root {quote(root_dir)}"
+        self._channel.exec_command(f"bash -lc {quote(agent_command)}")
+        try:
+            # The agent signals its readiness with the unrequested response of id 0
+            ready_response = self._read_response()
+            version = ready_response.get("result", {}).get("version", None)
+            if version != HPC_AGENT_PROTOCOL_VERSION:
+                raise RuntimeError(f"Unsupported agent protocol version: {version}, "
+                                   f"expected: {HPC_AGENT_PROTOCOL_VERSION}")
+        except Exception:
+            self._channel.close()
+            raise
+        self.pid = ready_response["result"]["pid"]
+        self.log.info(f"Started the hpc agent with pid: {self.pid}, script: {agent_script_path}")
+
+    @property
+    def is_alive(self) -> bool:
+        return not (self._channel.closed or self._channel.eof_received or self._channel.exit_status_ready())
+
+    def request(self, op: str, **args) -> Any:
+        with self._lock:
+            request_id = self._next_request_id
+            self._next_request_id += 1
+            self._channel.sendall(f"{dumps({'id': request_id, 'op': op, 'args': args})}\n".encode("utf-8"))
+            response = self._read_response()
+            if response.get("id", None) != request_id:
+                # The responses can no longer be matched to the requests
+                self._channel.close()
+                raise RuntimeError(f"Unexpected agent response id: {response.get('id', None)}, expected: {request_id}")
+        if not response.get("ok", False):
+            raise HPCAgentError(f"The agent request `{op}` has failed: {response.get('error', None)}")
+        return response["result"]
+
+    def _read_response(self) -> Dict[str, Any]:
+        deadline = monotonic() + self.timeout
+        while True:
+            while b"\n" not in self._received:
+                if monotonic() > deadline:
+                    raise TimeoutError(f"No agent response within {self.timeout} secs")
+                while self._channel.recv_stderr_ready():
+                    self.log.warning(f"Agent stderr: {self._channel.recv_stderr(HPC_EXECUTOR_RECV_SIZE)}")
+                try:
+                    received = self._channel.recv(HPC_EXECUTOR_RECV_SIZE)
+                except SocketTimeout:
+                    raise TimeoutError(f"No agent response within {self.timeout} secs")
+                if not received:
+                    raise RuntimeError(f"The agent has exited with status: {self._channel.recv_exit_status()}")
+                self._received += received
+            line, self._received = self._received.split(b"\n", 1)
+            try:
+                return loads(line)
+            except ValueError:
+                # E.g., messages printed by the profile of the login shell before the agent has started
+                self.log.debug(f"Skipping a non-protocol line of the agent: {line}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self.is_alive:
+                try:
+                    self._channel.sendall(f"{dumps({'id': self._next_request_id, 'op': 'exit'})}\n".encode("utf-8"))
+                except Exception as error:
+                    self.log.warning(f"Failed to request the exit of the hpc agent: {error}")
+            self._channel.close()
@@ -0,0 +1,450 @@
+from asyncio import (
+    FIRST_COMPLETED, Lock, create_task, get_running_loop, run_coroutine_threadsafe, Semaphore, gather, wait)
+from hashlib import sha256
+from logging import getLogger
+from os import environ, listdir, makedirs, symlink, walk
+from os.path import dirname, getsize, join, relpath, splitext
+from pathlib import Path
+from posixpath import dirname as posix_dirname
+from shlex import quote
+from shutil import rmtree
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+from operandi_utils import get_archive_suffix, make_archive_stream, unpack_archive_file
+from operandi_utils.constants import ARCHIVE_CODEC_AUTO
+from .constants import (
+    HPC_BATCH_SCRIPT_VERSION_LENGTH, HPC_CONNECTION_RACE_STAGGER, HPC_RESULTS_MODE_FULL, HPC_RESULTS_MODE_NEW,
+    HPC_RESULTS_REMOVED_FILES_LIST, HPC_SSH_CONNECT_TIMEOUT, HPC_SSH_CONNECTION_TRY_TIMES, HPC_TRANSFER_CHUNK_SIZE,
+    HPC_TRANSFER_HOSTS, HPC_TRANSFER_PARALLEL_CHANNELS, HPC_TRANSFER_PROXY_HOSTS
+)
+from .host_stats import HPCHostStats, get_hpc_host_stats
+from .utils import (
+    check_keyfile_existence, compute_file_sha256, remove_listed_files, resolve_hpc_batch_scripts_dir,
+    resolve_hpc_project_root_dir, resolve_hpc_slurm_workspaces_dir, resolve_hpc_user_home_dir)
+
+
+def _import_asyncssh():
+    try:
+        import asyncssh
+    except ImportError:
+        raise ImportError(
+            "The async HPC transfer requires the optional `asyncssh` package, "
+            "install it with: pip install operandi_utils[async]")
+    return asyncssh
+
+
+class _ThreadToAsyncWriter:
+    """
+    Writable stream for a worker thread, which forwards the buffered bytes to an async
+    remote file on the event loop. Used to run the blocking archive writers against asyncssh files.
+    """
+    def __init__(self, remote_file, loop, buffer_size: int = HPC_TRANSFER_CHUNK_SIZE):
+        self._remote_file = remote_file
+        self._loop = loop
+        self._buffer = bytearray()
+        self._buffer_size = buffer_size
+        self.hasher = sha256()
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        self._buffer += data
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        if self._buffer:
+            run_coroutine_threadsafe(self._remote_file.write(bytes(self._buffer)), self._loop).result()
+            self._buffer.clear()
+
+
+class AsyncHPCTransfer:
+    """
+    Asyncio counterpart of `HPCTransfer`, built on the optional asyncssh package. Many transfers can be in flight
+    from a single event loop, each sftp request is awaited instead of blocking the calling thread.
+    The connection is opened with `connect()`, or by using the instance as an async context manager.
+    """
+    def __init__(
+        self,
+        transfer_hosts: List[str] = HPC_TRANSFER_HOSTS, proxy_hosts: List[str] = HPC_TRANSFER_PROXY_HOSTS,
+        username: str = environ.get("OPERANDI_HPC_USERNAME", None),
+        project_username: str = environ.get("OPERANDI_HPC_PROJECT_USERNAME", None),
+        key_path: str = environ.get("OPERANDI_HPC_SSH_KEYPATH", None),
+        project_name: str = environ.get("OPERANDI_HPC_PROJECT_NAME", None),
+        key_pass: Optional[str] = None, keep_alive_interval: int = 30,
+        max_parallel_transfers: int = HPC_TRANSFER_PARALLEL_CHANNELS, host_stats: HPCHostStats = None
+    ) -> None:
+        if not username:
+            raise ValueError("Environment variable is probably not set: OPERANDI_HPC_USERNAME")
+        if not project_username:
+            raise ValueError("Environment variable is probably not set: OPERANDI_HPC_PROJECT_USERNAME")
+        if not key_path:
+            raise ValueError("Environment variable is probably not set: OPERANDI_HPC_SSH_KEYPATH")
+        if not project_name:
+            raise ValueError("Environment variable is probably not set: OPERANDI_HPC_PROJECT_NAME")
+        # Fail on construction, not on the first connection, when the optional package is missing
+        _import_asyncssh()
+        self.log = getLogger("operandi_utils.hpc.async_transfer")
+        self.username = username
+        self.project_username = project_username
+        check_keyfile_existence(hpc_key_path=Path(key_path))
+        self.key_path = Path(key_path)
+        self.key_pass = key_pass
+        self.keep_alive_interval = keep_alive_interval
+        self.max_parallel_transfers = max_parallel_transfers
+
+        self.hpc_hosts = transfer_hosts
+        self.proxy_hosts = proxy_hosts
+        # The latency and failures of each proxy and hpc host route, shared with the connectors of this process
+        self.host_stats = host_stats if host_stats else get_hpc_host_stats()
+        self.last_used_hpc_host = None
+        self.last_used_proxy_host = None
+
+        self.project_name = project_name
+        self.user_home_dir = resolve_hpc_user_home_dir(project_username)
+        self.project_root_dir = resolve_hpc_project_root_dir(project_name)
+        self.batch_scripts_dir = resolve_hpc_batch_scripts_dir(project_name)
+        self.slurm_workspaces_dir = resolve_hpc_slurm_workspaces_dir(project_name)
+
+        self.ssh_proxy_conn = None
+        self.ssh_hpc_conn = None
+        self.sftp_client = None
+        # Serializes the reconnects of concurrent transfers, created on first use inside the running event loop
+        self._reconnect_lock: Optional[Lock] = None
+        # The sha256 and the HPC path of the batch script versions deployed by this instance
+        self._deployed_batch_scripts: Dict[str, Tuple[str, str]] = {}
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self, try_times: int = HPC_SSH_CONNECTION_TRY_TIMES) -> None:
+        for try_index in range(try_times):
+            try:
+                await self._race_routes(routes=self.host_stats.rank_routes(self.proxy_hosts, self.hpc_hosts))
+                return
+            except ConnectionError as error:
+                self.log.error(f"Failed to connect to any of the hpc hosts: {self.hpc_hosts}, over any of the proxy "
+                               f"hosts: {self.proxy_hosts}, connection race: {try_index + 1} of {try_times}, "
+                               f"error: {error}")
+        raise Exception(
+            f"Failed to establish connection to any of the HPC hosts: {self.hpc_hosts}, "
+            f"over any of the proxy hosts: {self.proxy_hosts}, performed connection iterations: {try_times}")
+
+    async def _race_routes(self, routes: List[Tuple[str, str]]) -> None:
+        """
+        Happy eyeballs style race of the connection attempts over the routes, the attempt over the next route
+        is started once the previous attempt has failed or `HPC_CONNECTION_RACE_STAGGER` seconds have passed.
+        The connections of the first successful attempt are kept, all other attempts are cancelled or closed.
+        """
+        pending, errors, started = set(), [], 0
+        try:
+            while True:
+                if started < len(routes):
+                    proxy_host, hpc_host = routes[started]
+                    pending.add(create_task(self._connect_over_route(proxy_host=proxy_host, hpc_host=hpc_host)))
+                    started += 1
+                if not pending:
+                    raise ConnectionError(f"All {len(errors)} connection attempts have failed: {errors}")
+                done, pending = await wait(
+                    pending, timeout=HPC_CONNECTION_RACE_STAGGER if started < len(routes) else None,
+                    return_when=FIRST_COMPLETED)
+                succeeded = [task.result() for task in done if not task.exception()]
+                errors.extend(task.exception() for task in done if task.exception())
+                if not succeeded:
+                    continue
+                for _, _, proxy_conn, hpc_conn, sftp_client in succeeded[1:]:
+                    await self._close_connections(proxy_conn, hpc_conn, sftp_client)
+                (self.last_used_proxy_host, self.last_used_hpc_host,
+                 self.ssh_proxy_conn, self.ssh_hpc_conn, self.sftp_client) = succeeded[0]
+                return
+        finally:
+            for task in pending:
+                task.cancel()
+            await gather(*pending, return_exceptions=True)
+
+    async def _connect_over_route(self, proxy_host: str, hpc_host: str, port: int = 22) -> Tuple:
+        proxy_conn, hpc_conn, sftp_client = None, None, None
+        start_time = monotonic()
+        try:
+            asyncssh = _import_asyncssh()
+            client_key = asyncssh.read_private_key(str(self.key_path), passphrase=self.key_pass)
+            self.log.info(f"Connecting to proxy server {proxy_host}:{port} with username: {self.username}")
+            proxy_conn = await asyncssh.connect(
+                host=proxy_host, port=port, username=self.username, client_keys=[client_key], known_hosts=None,
+                keepalive_interval=self.keep_alive_interval, connect_timeout=HPC_SSH_CONNECT_TIMEOUT)
+            self.log.info(
+                f"Connecting to hpc server {hpc_host}:{port} with project username: {self.project_username}")
+            hpc_conn = await asyncssh.connect(
+                host=hpc_host, port=port, tunnel=proxy_conn, username=self.project_username,
+                client_keys=[client_key], known_hosts=None, keepalive_interval=self.keep_alive_interval,
+                connect_timeout=HPC_SSH_CONNECT_TIMEOUT)
+            sftp_client = await hpc_conn.start_sftp_client()
+        except (OSError, _import_asyncssh().Error) as error:
+            self.host_stats.record_failure(proxy_host=proxy_host, hpc_host=hpc_host)
+            self.log.warning(f"Failed to connect to hpc host: {hpc_host}, over proxy host: {proxy_host}, "
+                             f"error: {error}")
+            await self._close_connections(proxy_conn, hpc_conn, sftp_client)
+            raise
+        except BaseException:
+            # Cancelled since another route has won the race
+            await self._close_connections(proxy_conn, hpc_conn, sftp_client)
+            raise
+        self.host_stats.record_success(proxy_host=proxy_host, hpc_host=hpc_host, latency=monotonic() - start_time)
+        return proxy_host, hpc_host, proxy_conn, hpc_conn, sftp_client
+
+    def _is_connected(self) -> bool:
+        return bool(self.ssh_hpc_conn and not self.ssh_hpc_conn.is_closed() and self.sftp_client)
+
+    async def reconnect_if_required(self) -> None:
+        if self._is_connected():
+            return
+        # Before python 3.10 a lock is bound to the event loop current on its creation
+        if not self._reconnect_lock:
+            self._reconnect_lock = Lock()
+        async with self._reconnect_lock:
+            # Another transfer may have reconnected while this one was waiting for the lock
+            if self._is_connected():
+                return
+            self.log.warning("The connection to the hpc server is closed, trying to open a new connection")
+            await self.close()
+            await self.connect()
+
+    async def close(self) -> None:
+        await self._close_connections(self.ssh_proxy_conn, self.ssh_hpc_conn, self.sftp_client)
+        self.ssh_proxy_conn, self.ssh_hpc_conn, self.sftp_client = None, None, None
+
+    @staticmethod
+    async def _close_connections(proxy_conn, hpc_conn, sftp_client) -> None:
+        if sftp_client:
+            sftp_client.exit()
+        for conn in (hpc_conn, proxy_conn):
+            if conn:
+                conn.close()
+                await conn.wait_closed()
+
+    async def mkdir_p(self, remotepath: str, mode=0o766) -> None:
+        await self.reconnect_if_required()
+        await self.sftp_client.makedirs(remotepath, attrs=_import_asyncssh().SFTPAttrs(permissions=mode), exist_ok=True)
+
+    async def compute_remote_sha256(self, remote_path: str) -> str:
+        await self.reconnect_if_required()
+        result = await self.ssh_hpc_conn.run(f"sha256sum {quote(remote_path)}", check=False)
+        if result.exit_status != 0:
+            raise Exception(f"Failed to compute the sha256 of remote file: {remote_path}, error: {result.stderr}")
+        return result.stdout.split()[0]
+
+    async def verify_remote_sha256(self, local_path: str, remote_path: str, local_sha256: str) -> str:
+        remote_sha256 = await self.compute_remote_sha256(remote_path)
+        if local_sha256 != remote_sha256:
+            raise Exception(
+                f"Checksum mismatch between local: {local_path} ({local_sha256}), "
+                f"and remote: {remote_path} ({remote_sha256})")
+        self.log.info(f"Verified sha256 {local_sha256} of local: {local_path}, remote: {remote_path}")
+        return local_sha256
+
+    async def put_file(self, local_src: str, remote_dst: str, verify: bool = False) -> str:
+        """
+        Uploads the file and returns its sha256, computed while the bytes are read for the upload.
+        The blocking local reads run in the default executor of the event loop.
+        """
+        await self.mkdir_p(remotepath=posix_dirname(remote_dst))
+        loop = get_running_loop()
+        file_hash = sha256()
+        with open(local_src, mode="rb") as local_file:
+            async with self.sftp_client.open(remote_dst, pflags_or_mode="wb") as remote_file:
+                while True:
+                    chunk = await loop.run_in_executor(None, local_file.read, HPC_TRANSFER_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    file_hash.update(chunk)
+                    await remote_file.write(chunk)
+        local_sha256 = file_hash.hexdigest()
+        if verify:
+            await self.verify_remote_sha256(local_path=local_src, remote_path=remote_dst, local_sha256=local_sha256)
+        return local_sha256
+
+    async def get_file(self, remote_src: str, local_dst: str, verify: bool = False) -> str:
+        """
+        Downloads the file and returns its sha256, computed while the bytes are written locally.
+        The blocking local writes run in the default executor of the event loop.
+        """
+        await self.reconnect_if_required()
+        makedirs(name=Path(local_dst).parent.absolute(), exist_ok=True)
+        loop = get_running_loop()
+        file_hash = sha256()
+        async with self.sftp_client.open(remote_src, pflags_or_mode="rb") as remote_file:
+            with open(local_dst, mode="wb") as local_file:
+                while True:
+                    chunk = await remote_file.read(HPC_TRANSFER_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    file_hash.update(chunk)
+                    await loop.run_in_executor(None, local_file.write, chunk)
+        local_sha256 = file_hash.hexdigest()
+        if verify:
+            await self.verify_remote_sha256(local_path=local_dst, remote_path=remote_src, local_sha256=local_sha256)
+        return local_sha256
+
+    async def put_dir(self, local_src: str, remote_dst: str, mode=0o766) -> None:
+        """
+        Uploads the contents of the local source directory to the remote destination directory.
+        Up to `max_parallel_transfers` files are in flight at the same time.
+        """
+        rel_paths = []
+        for root, dirs, files in walk(local_src):
+            rel_root = relpath(root, local_src)
+            await self.mkdir_p(remotepath=remote_dst if rel_root == "." else join(remote_dst, rel_root), mode=mode)
+            rel_paths.extend(relpath(join(root, file_name), local_src) for file_name in files)
+        semaphore = Semaphore(self.max_parallel_transfers)
+
+        async def put_dir_file(rel_path: str) -> None:
+            async with semaphore:
+                await self.sftp_client.put(join(local_src, rel_path), join(remote_dst, rel_path))
+
+        await gather(*(put_dir_file(rel_path) for rel_path in rel_paths))
+        self.log.info(f"Put dir: {local_src}, files: {len(rel_paths)}, to remote dst: {remote_dst}")
+
+    async def get_dir(self, remote_src: str, local_dst: str) -> None:
+        """
+        Downloads the contents of the remote source directory to the local destination directory.
+        """
+        await self.reconnect_if_required()
+        makedirs(name=local_dst, exist_ok=True)
+        await self.sftp_client.get(
+            [join(remote_src, name) for name in await self.sftp_client.listdir(remote_src) if name not in (".", "..")],
+            local_dst, recurse=True, max_requests=self.max_parallel_transfers * 32)
+        self.log.info(f"Got dir from src: {remote_src}, to dst: {local_dst}")
+
+    async def put_batch_script(self, batch_script_id: str) -> str:
+        """
+        Deploys the batch script under a name versioned by its content hash, see `HPCTransfer.put_batch_script`.
+        """
+        local_batch_script_path = join(dirname(__file__), "batch_scripts", batch_script_id)
+        local_sha256 = compute_file_sha256(local_batch_script_path)
+        deployed_sha256, hpc_batch_script_path = self._deployed_batch_scripts.get(batch_script_id, (None, None))
+        if deployed_sha256 == local_sha256:
+            return hpc_batch_script_path
+
+        stem, suffix = splitext(batch_script_id)
+        hpc_batch_script_path = join(
+            self.batch_scripts_dir, f"{stem}_{local_sha256[:HPC_BATCH_SCRIPT_VERSION_LENGTH]}{suffix}")
+        await self.reconnect_if_required()
+        try:
+            remote_size = (await self.sftp_client.stat(hpc_batch_script_path)).size
+        except _import_asyncssh().SFTPError:
+            remote_size = None
+        if remote_size == getsize(local_batch_script_path):
+            self.log.info(f"Batch script version already deployed: {hpc_batch_script_path}")
+        else:
+            remote_tmp = f"{hpc_batch_script_path}.part"
+            await self.put_file(local_src=local_batch_script_path, remote_dst=remote_tmp)
+            await self.sftp_client.posix_rename(remote_tmp, hpc_batch_script_path)
+            self.log.info(f"Put file from local src: {local_batch_script_path}, to dst: {hpc_batch_script_path}")
+        self._deployed_batch_scripts[batch_script_id] = (local_sha256, hpc_batch_script_path)
+        return hpc_batch_script_path
+
+    async def deploy_batch_scripts(self) -> Dict[str, str]:
+        local_batch_scripts_dir = join(dirname(__file__), "batch_scripts")
+        return {
+            batch_script_id: await self.put_batch_script(batch_script_id=batch_script_id)
+            for batch_script_id in sorted(listdir(local_batch_scripts_dir)) if batch_script_id.endswith((".py", ".sh"))
+        }
+
+    async def pack_and_stream_slurm_workspace(
+        self, ocrd_workspace_dir: str, workflow_job_id: str, nextflow_script_path: str,
+        codec: str = ARCHIVE_CODEC_AUTO, verify: bool = True, page_ranges_dir: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Same archive layout as `HPCTransfer.pack_and_stream_slurm_workspace`. The archive is produced
+        in a worker thread and its bytes are written to the remote file from the event loop.
+        Returns the path of the archive inside the HPC and its sha256.
+        """
+        nextflow_filename = nextflow_script_path.split('/')[-1]
+        ocrd_workspace_id = ocrd_workspace_dir.rstrip('/').split('/')[-1]
+        sources = [
+            (nextflow_script_path, join(workflow_job_id, nextflow_filename)),
+            (ocrd_workspace_dir, join(workflow_job_id, ocrd_workspace_id))
+        ]
+        if page_ranges_dir:
+            sources.extend(
+                (join(page_ranges_dir, entry_name), join(workflow_job_id, entry_name))
+                for entry_name in sorted(listdir(page_ranges_dir)))
+        hpc_dst_slurm_zip = join(self.slurm_workspaces_dir, f"{workflow_job_id}{get_archive_suffix(codec)}")
+        await self.mkdir_p(remotepath=self.slurm_workspaces_dir)
+        loop = get_running_loop()
+        try:
+            async with self.sftp_client.open(hpc_dst_slurm_zip, pflags_or_mode="wb") as remote_file:
+                writer = _ThreadToAsyncWriter(remote_file=remote_file, loop=loop)
+
+                def write_archive() -> None:
+                    make_archive_stream(stream=writer, sources=sources, codec=codec)
+                    writer.flush()
+
+                await loop.run_in_executor(None, write_archive)
+            local_sha256 = writer.hasher.hexdigest()
+            if verify:
+                await self.verify_remote_sha256(
+                    local_path=ocrd_workspace_dir, remote_path=hpc_dst_slurm_zip, local_sha256=local_sha256)
+        except Exception as error:
+            self.log.error(f"Failed to stream the slurm workspace zip to: {hpc_dst_slurm_zip}, error: {error}")
+            try:
+                await self.sftp_client.remove(hpc_dst_slurm_zip)
+            except _import_asyncssh().SFTPError:
+                pass
+            raise Exception(f"Error when streaming slurm workspace zip: {error}, remote dst: {hpc_dst_slurm_zip}")
+        self.log.info(f"Streamed slurm workspace zip from src: {ocrd_workspace_dir}, to dst: {hpc_dst_slurm_zip}")
+        return hpc_dst_slurm_zip, local_sha256
+
+    async def get_and_unpack_slurm_workspace(
+        self, ocrd_workspace_dir: str, workflow_job_dir: str, results_mode: str = HPC_RESULTS_MODE_FULL
+    ) -> str:
+        """
+        Same behavior as `HPCTransfer.get_and_unpack_slurm_workspace` with the download unpack mode,
+        the archives are unpacked in the default executor. Returns the sha256 of the workspace results archive.
+        """
+        ocrd_workspace_id = ocrd_workspace_dir.split('/')[-1]
+        workflow_job_id = workflow_job_dir.split('/')[-1]
+        loop = get_running_loop()
+
+        get_src = join(self.slurm_workspaces_dir, workflow_job_id, f"{workflow_job_id}.zip")
+        get_dst = join(Path(workflow_job_dir).parent.absolute(), f"{workflow_job_id}.zip")
+        await self._get_and_unpack_zip(remote_src=get_src, local_zip=get_dst, unpack_dst=workflow_job_dir)
+
+        if results_mode != HPC_RESULTS_MODE_NEW:
+            await loop.run_in_executor(None, rmtree, ocrd_workspace_dir, True)
+            self.log.info(f"Removed tree dirs: {ocrd_workspace_dir}")
+
+        get_src = join(self.slurm_workspaces_dir, workflow_job_id, ocrd_workspace_id, f"{ocrd_workspace_id}.zip")
+        get_dst = join(Path(ocrd_workspace_dir).parent.absolute(), f"{ocrd_workspace_id}.zip")
+        results_sha256 = await self._get_and_unpack_zip(
+            remote_src=get_src, local_zip=get_dst, unpack_dst=ocrd_workspace_dir)
+        if results_mode == HPC_RESULTS_MODE_NEW:
+            removed_amount = remove_listed_files(
+                dir_path=ocrd_workspace_dir,
+                files_list_path=join(ocrd_workspace_dir, HPC_RESULTS_REMOVED_FILES_LIST))
+            self.log.info(f"Removed {removed_amount} files no longer available in workspace: {ocrd_workspace_dir}")
+
+        workspace_dir_in_workflow_job = join(workflow_job_dir, ocrd_workspace_id)
+        try:
+            symlink(src=ocrd_workspace_dir, dst=workspace_dir_in_workflow_job, target_is_directory=True)
+        except Exception as error:
+            raise Exception(
+                f"Error when symlink: {error}, src: {ocrd_workspace_dir}, dst: {workspace_dir_in_workflow_job}")
+        self.log.info(f"Symlinked from src: {ocrd_workspace_dir}, to dst: {workspace_dir_in_workflow_job}")
+        return results_sha256
+
+    async def _get_and_unpack_zip(self, remote_src: str, local_zip: str, unpack_dst: str) -> str:
+        local_sha256 = await self.get_file(remote_src=remote_src, local_dst=local_zip, verify=True)
+        self.log.info(f"Got zip file from src: {remote_src}, to dst: {local_zip}")
+        try:
+            await get_running_loop().run_in_executor(None, unpack_archive_file, local_zip, unpack_dst)
+        except Exception as error:
+            raise Exception(f"Error when unpacking zip: {error}, unpack_src: {local_zip}, unpack_dst: {unpack_dst}")
+        self.log.info(f"Unpacked zip from src: {local_zip}, to dst: {unpack_dst}")
+        Path(local_zip).unlink(missing_ok=True)
+        return local_sha256
@@ -21,3 +21,5 @@ OCRD_ALL_MAXIMUM_IMAGE="docker://ocrd/all:latest"
 cd "${SINGULARITY_CACHE_DIR}" || exit
 singularity build --disable-cache "${SIF_NAME}" "${OCRD_ALL_MAXIMUM_IMAGE}"
 singularity exec "${SIF_NAME}" ocrd --version
+# The checksum versions the node local copies of the SIF made by the workflow jobs
+sha256sum "${SIF_NAME}" > "${SIF_NAME}.sha256"
@@ -17,6 +17,9 @@ set -e
 # $10 - Amount of pages in the workspace
 # $11 - Boolean flag showing whether a mets server is utilized or not
 # $12 - File groups to be removed from the workspace after the processing
+# $13 - Results mode - "full" zips the whole workspace, "new" zips only the mets and the new or changed files
+# $14 - Models required by the workflow - "*" for all, "none", or comma separated paths inside the models dir
+# $15 - Nextflow executor - "local" runs all processes in this job, "slurm" submits each process fork as a slurm job
 
 SIF_PATH="/scratch1/projects/project_pwieder_ocr/ocrd_all_maximum_image.sif"
 SIF_PATH_IN_NODE="${TMP_LOCAL}/ocrd_all_maximum_image.sif"
@@ -24,6 +27,18 @@ OCRD_MODELS_DIR="/scratch1/projects/project_pwieder_ocr/ocrd_models"
 OCRD_MODELS_DIR_IN_NODE="${TMP_LOCAL}/ocrd_models"
 OCRD_MODELS_DIR_IN_DOCKER="/usr/local/share"
 BIND_OCRD_MODELS="${OCRD_MODELS_DIR_IN_NODE}:${OCRD_MODELS_DIR_IN_DOCKER}"
+# The SIF and the models are kept on the local storage of the computing node for the next workflow jobs.
+# Each cache entry is versioned by the checksum of its source, written to "<source>.sha256" when it was created.
+# Placed on the node-local scratch, /tmp only if the node provides none.
+NODE_CACHE_DIR="${OPERANDI_NODE_CACHE_DIR:-${LOCAL_TMPDIR:-${TMP_LOCAL:-/tmp}}/operandi_node_cache_${USER}}"
+# The least recently used entries not used by any running job are evicted above this size
+NODE_CACHE_MAX_SIZE_GB="${OPERANDI_NODE_CACHE_MAX_SIZE_GB:-60}"
+# Populate the cache entry of the SIF with sbcast instead of cp, falls back to cp when sbcast fails
+NODE_CACHE_USE_SBCAST="${OPERANDI_NODE_CACHE_USE_SBCAST:-true}"
+# The file descriptors holding the shared locks of the used cache entries while the job runs
+NODE_CACHE_LOCK_FD_SIF=8
+NODE_CACHE_LOCK_FD_MODELS=9
+NODE_CACHE_USED=false
 
 SCRATCH_BASE=$1
 WORKFLOW_JOB_ID=$2
@@ -37,15 +52,36 @@ FORKS=$9
 PAGES=${10}
 USE_METS_SERVER=${11}
 FILE_GROUPS_TO_REMOVE=${12}
+RESULTS_MODE=${13:-full}
+MODEL_DEPENDENCIES=${14:-*}
+NF_EXECUTOR=${15:-local}
 
 WORKFLOW_JOB_DIR="${SCRATCH_BASE}/${WORKFLOW_JOB_ID}"
+# Filled by the incremental workspace sync of Operandi, used when no workflow job zip was uploaded
+SYNCED_WORKSPACE_DIR="${SCRATCH_BASE}/synced_workspaces/${WORKSPACE_ID}"
 NF_SCRIPT_PATH="${WORKFLOW_JOB_DIR}/${NEXTFLOW_SCRIPT_ID}"
 WORKSPACE_DIR="${WORKFLOW_JOB_DIR}/${WORKSPACE_ID}"
 WORKSPACE_DIR_IN_DOCKER="/ws_data"
 BIND_WORKSPACE_DIR="${WORKSPACE_DIR}:${WORKSPACE_DIR_IN_DOCKER}"
 BIND_METS_FILE_PATH="${WORKSPACE_DIR_IN_DOCKER}/${METS_BASENAME}"
 METS_SOCKET_BASENAME="mets_server.sock"
+# Already compressed media files are only stored in the result zips, must match the suffixes used by Operandi
+ZIP_STORED_SUFFIXES=".gif:.gz:.jp2:.jpeg:.jpg:.pdf:.png:.tif:.tiff:.zip:.zst:.GIF:.JP2:.JPEG:.JPG:.PDF:.PNG:.TIF:.TIFF"
+WORKSPACE_INPUT_FILES_LIST="${WORKFLOW_JOB_DIR}/workspace_input_files.txt"
+WORKSPACE_RESULT_FILES_LIST="${WORKFLOW_JOB_DIR}/workspace_result_files.txt"
+# Must match the name expected by Operandi when merging the results into the local workspace
+REMOVED_FILES_LIST=".operandi_removed_files"
 BIND_METS_SOCKET_PATH="${WORKSPACE_DIR_IN_DOCKER}/${METS_SOCKET_BASENAME}"
+# Page ranges of the forks and their mets file chunks, must match the names used by Operandi when staging
+PAGE_RANGES_PATH="${WORKFLOW_JOB_DIR}/page_ranges.tsv"
+METS_CHUNKS_DIR="${WORKFLOW_JOB_DIR}/mets_chunks"
+# Merges the mets file chunks into the main mets file, placed in the workspace next to the chunks
+METS_MERGE_SCRIPT="merge_mets_chunks.py"
+BIND_METS_MERGE_SCRIPT_PATH="${WORKSPACE_DIR_IN_DOCKER}/${METS_MERGE_SCRIPT}"
+# Generated for the slurm executor, the processes are then submitted by nextflow as separate slurm jobs
+NF_CONFIG_PATH="${WORKFLOW_JOB_DIR}/nextflow.config"
+# Limits the rate of the process job submissions of the slurm executor to spare the slurm controller
+NF_SLURM_SUBMIT_RATE_LIMIT="${OPERANDI_NF_SLURM_SUBMIT_RATE_LIMIT:-20/1min}"
 
 hostname
 /opt/slurm/etc/scripts/misc/slurm_resources
@@ -62,9 +98,14 @@ echo "Nextflow script path: $NF_SCRIPT_PATH"
 echo "Use mets server: $USE_METS_SERVER"
 echo "Used file group: $IN_FILE_GRP"
 echo "Pages: $PAGES"
+echo "Results mode: $RESULTS_MODE"
+echo "Nextflow executor: $NF_EXECUTOR"
 
-# To submit separate jobs for each process in the NF script
-# export NXF_EXECUTOR=slurm
+if [ "${NF_EXECUTOR}" == "slurm" ] && [ "${USE_METS_SERVER}" == "true" ] ; then
+  # The socket of the mets server is not reachable from the process jobs on other nodes
+  echo "The mets server is not supported with the slurm executor, processing without mets server"
+  USE_METS_SERVER=false
+fi
 
 
 # Define functions to be used
@@ -92,24 +133,185 @@ check_existence_of_paths () {
 }
 
 clear_data_from_computing_node () {
+  if [ "${NF_EXECUTOR}" == "slurm" ] ; then
+    # The shared SIF and models were used, nothing was copied to the computing node
+    return
+  fi
+  if [ "${NODE_CACHE_USED}" == "true" ] ; then
+    # The cached SIF and models stay on the computing node, only the locks protecting them from eviction are released
+    echo "Releasing the node cache entries: ${SIF_PATH_IN_NODE}, ${OCRD_MODELS_DIR_IN_NODE}"
+    eval "exec ${NODE_CACHE_LOCK_FD_SIF}>&- ${NODE_CACHE_LOCK_FD_MODELS}>&-"
+    return
+  fi
   echo "If existing, removing the SIF from the computing node, path: ${SIF_PATH_IN_NODE}"
   rm -f "${SIF_PATH_IN_NODE}"
   echo "If existing, removing the OCR-D models from the computing node, path: ${OCRD_MODELS_DIR_IN_NODE}"
   rm -rf "${OCRD_MODELS_DIR_IN_NODE}"
 }
 
+compute_node_cache_key () {
+  # $1 - The source file or dir
+  # The checksum written next to the source is used, unless the source file has been modified afterwards.
+  # Otherwise, the key is derived from the sizes and modification times, which costs no read of the contents.
+  if [ -f "$1.sha256" ] && [ ! "$1" -nt "$1.sha256" ]; then
+    cut -d " " -f 1 "$1.sha256" | cut -c 1-16
+  elif [ -d "$1" ]; then
+    cd "$1" && find . -type f -printf "%P\t%s\t%T@\n" | LC_ALL=C sort | sha256sum | cut -c 1-16
+  else
+    stat -c "%s %Y" "$1" | sha256sum | cut -c 1-16
+  fi
+}
+
+copy_ocrd_models_subset () {
+  # $1 - The models dir
+  # $2 - The dir the models are copied into, the relative paths inside the models dir are kept
+  # $3 - The comma separated paths of the models inside the models dir, or "none"
+  # Fails before copying anything if a required model is missing, the processors would fail later otherwise
+  local model_paths model_path target_dir missing_models=false
+  mkdir -p "$2"
+  if [ "$3" == "none" ] ; then
+    return
+  fi
+  target_dir="$(cd "$2" && pwd)"
+  IFS=',' read -r -a model_paths <<< "$3"
+  for model_path in "${model_paths[@]}" ; do
+    if [ ! -e "$1/${model_path}" ] ; then
+      echo "The model required by the workflow was not found: $1/${model_path}"
+      missing_models=true
+    fi
+  done
+  if [ "${missing_models}" == "true" ] ; then
+    return 1
+  fi
+  for model_path in "${model_paths[@]}" ; do
+    (cd "$1" && cp -R --parents "${model_path}" "${target_dir}/") || return 1
+  done
+}
+
+copy_to_node_cache_entry () {
+  # $1 - The source file or dir
+  # $2 - The dir of the cache entry
+  # $3 - Optional, the models of the source dir to copy, all if not set or "*"
+  if [ -n "$3" ] && [ "$3" != "*" ] ; then
+    copy_ocrd_models_subset "$1" "$2/$(basename "$1")" "$3"
+    return $?
+  fi
+  if [ -f "$1" ] && [ "${NODE_CACHE_USE_SBCAST}" == "true" ] && command -v sbcast > /dev/null ; then
+    # The file is read once from the scratch and broadcast to the local storage over the slurm tree
+    if sbcast --force "$1" "$2/$(basename "$1")" ; then
+      return
+    fi
+    echo "Broadcasting with sbcast has failed, copying instead: $1"
+  fi
+  cp -R "$1" "$2/"
+}
+
+acquire_node_cache_entry () {
+  # $1 - The source file or dir
+  # $2 - The file descriptor holding the shared lock of the cache entry until the job ends
+  # $3 - Optional, the models of the source dir to cache, all if not set or "*"
+  # Sets NODE_CACHE_ENTRY_PATH to the path of the cached copy of the source
+  local entry_dir
+  entry_dir="${NODE_CACHE_DIR}/$(basename "$1")_$(compute_node_cache_key "$1")"
+  # Workflows requiring the same models share an entry holding only these
+  if [ -n "$3" ] && [ "$3" != "*" ] ; then
+    entry_dir="${entry_dir}_$(echo "$3" | sha256sum | cut -c 1-16)"
+  fi
+  # The shared lock protects the entry from the eviction while it is used
+  eval "exec $2>\"${entry_dir}.lock\""
+  flock -s "$2"
+  # A single job populates the entry, the other jobs on the node wait for it instead of copying as well
+  (
+    flock -x 6
+    if [ -f "${entry_dir}/.complete" ] ; then
+      echo "Reusing the node cache entry: ${entry_dir}"
+    else
+      echo "Populating the node cache entry: ${entry_dir}"
+      rm -rf "${entry_dir}" "${entry_dir}.part"
+      mkdir -p "${entry_dir}.part"
+      copy_to_node_cache_entry "$1" "${entry_dir}.part" "$3" || exit 1
+      touch "${entry_dir}.part/.complete"
+      mv "${entry_dir}.part" "${entry_dir}"
+    fi
+  ) 6> "${entry_dir}.populate.lock" || {
+    # The incomplete "<entry>.part" dir is replaced by the next job populating the entry, or evicted
+    echo "Populating the node cache entry has failed: ${entry_dir}"
+    clear_data_from_computing_node
+    exit 1
+  }
+  # The modification time of the entry dir orders the entries by their last use
+  touch "${entry_dir}"
+  NODE_CACHE_ENTRY_PATH="${entry_dir}/$(basename "$1")"
+}
+
+evict_node_cache_entries () {
+  local max_size_kb=$((NODE_CACHE_MAX_SIZE_GB * 1024 * 1024))
+  (
+    # Skipped when another job on the node is already evicting
+    flock -n 7 || exit 0
+    while [ "$(du -sk "${NODE_CACHE_DIR}" | cut -f 1)" -gt "${max_size_kb}" ] ; do
+      evicted=false
+      for entry_dir in $(ls -dtr "${NODE_CACHE_DIR}"/*/ 2> /dev/null) ; do
+        entry_dir="${entry_dir%/}"
+        # A "<entry>.part" dir is populated under the lock of its entry, hence it is only evicted
+        # when the copy was interrupted and no job uses the entry
+        entry_dir="${entry_dir%.part}"
+        # The exclusive lock is not granted for entries used by running jobs, including this one.
+        # The empty lock files are kept, a job which has already opened a removed lock file would otherwise
+        # lock a deleted inode, while the later jobs lock a new file at the same path.
+        if flock -n -x "${entry_dir}.lock" \
+          rm -rf "${entry_dir}" "${entry_dir}.part" ; then
+          echo "Evicted the least recently used node cache entry: ${entry_dir}"
+          evicted=true
+          break
+        fi
+      done
+      if [ "${evicted}" != "true" ] ; then
+        echo "The node cache exceeds ${NODE_CACHE_MAX_SIZE_GB} GB, but all entries are in use"
+        break
+      fi
+    done
+  ) 7> "${NODE_CACHE_DIR}/.eviction.lock"
+}
+
 transfer_requirements_to_node_storage() {
-  cp "${SIF_PATH}" "${SIF_PATH_IN_NODE}"
+  if [ "${NF_EXECUTOR}" == "slurm" ] ; then
+    # The process jobs run on other computing nodes, hence the SIF and the models are used from the scratch
+    echo "Using the SIF and the ocrd models from the scratch for the slurm executor"
+    SIF_PATH_IN_NODE="${SIF_PATH}"
+    OCRD_MODELS_DIR_IN_NODE="${OCRD_MODELS_DIR}"
+  elif command -v flock > /dev/null && mkdir -p "${NODE_CACHE_DIR}" 2> /dev/null ; then
+    NODE_CACHE_USED=true
+    acquire_node_cache_entry "${SIF_PATH}" "${NODE_CACHE_LOCK_FD_SIF}"
+    SIF_PATH_IN_NODE="${NODE_CACHE_ENTRY_PATH}"
+    acquire_node_cache_entry "${OCRD_MODELS_DIR}" "${NODE_CACHE_LOCK_FD_MODELS}" "${MODEL_DEPENDENCIES}"
+    OCRD_MODELS_DIR_IN_NODE="${NODE_CACHE_ENTRY_PATH}"
+    evict_node_cache_entries
+  else
+    echo "The node cache is not available: ${NODE_CACHE_DIR}, copying the requirements for this job only"
+    cp "${SIF_PATH}" "${SIF_PATH_IN_NODE}"
+    if [ "${MODEL_DEPENDENCIES}" == "*" ] ; then
+      cp -R "${OCRD_MODELS_DIR}" "${OCRD_MODELS_DIR_IN_NODE}"
+    else
+      copy_ocrd_models_subset "${OCRD_MODELS_DIR}" "${OCRD_MODELS_DIR_IN_NODE}" "${MODEL_DEPENDENCIES}" || {
+        echo "Copying the ocrd models to node local storage has failed: ${OCRD_MODELS_DIR_IN_NODE}"
+        clear_data_from_computing_node
+        exit 1
+      }
+    fi
+  fi
+  BIND_OCRD_MODELS="${OCRD_MODELS_DIR_IN_NODE}:${OCRD_MODELS_DIR_IN_DOCKER}"
+
   # Check if transfer successful
   if [ ! -f "${SIF_PATH_IN_NODE}" ]; then
     echo "Required ocrd_all_image sif file not found at node local storage: ${SIF_PATH_IN_NODE}"
+    clear_data_from_computing_node
     exit 1
   else
     echo "Successfully transferred SIF to node local storage"
     singularity exec "$SIF_PATH_IN_NODE" ocrd --version
   fi
 
-  cp -R "${OCRD_MODELS_DIR}" "${OCRD_MODELS_DIR_IN_NODE}"
   if [ ! -d "${OCRD_MODELS_DIR_IN_NODE}" ]; then
     echo "Ocrd models directory not found at node local storage: ${OCRD_MODELS_DIR_IN_NODE}"
     clear_data_from_computing_node
@@ -120,6 +322,16 @@ transfer_requirements_to_node_storage() {
 }
 
 unzip_workflow_job_dir () {
+  if [ -f "${WORKFLOW_JOB_DIR}.tar.zst" ]; then
+    echo "Unpacking ${WORKFLOW_JOB_DIR}.tar.zst to: ${WORKFLOW_JOB_DIR}"
+    tar -I zstd -xvf "${WORKFLOW_JOB_DIR}.tar.zst" -C "${SCRATCH_BASE}" > "${SCRATCH_BASE}/${WORKSPACE_ID}_unzipping.log"
+    echo "Removing archive: ${WORKFLOW_JOB_DIR}.tar.zst"
+    mv "${SCRATCH_BASE}/${WORKSPACE_ID}_unzipping.log" "${WORKFLOW_JOB_DIR}/workflow_job_unzipping.log"
+    rm "${WORKFLOW_JOB_DIR}.tar.zst"
+    cd "${WORKFLOW_JOB_DIR}" || exit 1
+    return
+  fi
+
   if [ ! -f "${WORKFLOW_JOB_DIR}.zip" ]; then
     echo "Required scratch slurm workspace zip is not available: ${WORKFLOW_JOB_DIR}.zip"
     exit 1
@@ -139,6 +351,98 @@ unzip_workflow_job_dir () {
   cd "${WORKFLOW_JOB_DIR}" || exit 1
 }
 
+copy_synced_workspace_to_workflow_job_dir () {
+  if [ ! -d "${SYNCED_WORKSPACE_DIR}" ]; then
+    echo "Required synced workspace dir is not available: ${SYNCED_WORKSPACE_DIR}"
+    exit 1
+  fi
+
+  if [ ! -d "${WORKFLOW_JOB_DIR}" ]; then
+    echo "Required scratch slurm workflow dir not available: ${WORKFLOW_JOB_DIR}"
+    exit 1
+  fi
+
+  echo "Copying the synced workspace ${SYNCED_WORKSPACE_DIR} to: ${WORKSPACE_DIR}"
+  # Hard links avoid copying the files of the workspace, processors write their results to new files.
+  # The mets file is modified in place, hence it is replaced with a real copy.
+  # The shared lock keeps the broker from syncing the workspace of another workflow job meanwhile
+  (
+    flock -s 8
+    # A failed hard link copy leaves a partial dir behind, which is removed first, otherwise
+    # the fallback copies the synced workspace into it instead of creating the workspace dir
+    if ! cp -rl "${SYNCED_WORKSPACE_DIR}" "${WORKSPACE_DIR}"; then
+      rm -rf "${WORKSPACE_DIR}"
+      cp -r "${SYNCED_WORKSPACE_DIR}" "${WORKSPACE_DIR}"
+    fi
+    rm -f "${WORKSPACE_DIR}/${METS_BASENAME}"
+    cp "${SYNCED_WORKSPACE_DIR}/${METS_BASENAME}" "${WORKSPACE_DIR}/${METS_BASENAME}"
+  ) 8> "${SYNCED_WORKSPACE_DIR}.lock"
+
+  cd "${WORKFLOW_JOB_DIR}" || exit 1
+}
+
+prepare_workflow_job_dir () {
+  if [ -f "${WORKFLOW_JOB_DIR}.zip" ] || [ -f "${WORKFLOW_JOB_DIR}.tar.zst" ]; then
+    unzip_workflow_job_dir
+  else
+    copy_synced_workspace_to_workflow_job_dir
+  fi
+}
+
+place_mets_chunks_in_workspace () {
+  # The mets file chunks are referenced relative to the workspace dir by the nextflow workflow
+  if [ -d "${METS_CHUNKS_DIR}" ]; then
+    echo "Moving the mets file chunks from: ${METS_CHUNKS_DIR}, to: ${WORKSPACE_DIR}"
+    mv "${METS_CHUNKS_DIR}"/* "${WORKSPACE_DIR}/"
+    rmdir "${METS_CHUNKS_DIR}"
+    mv "${WORKFLOW_JOB_DIR}/${METS_MERGE_SCRIPT}" "${WORKSPACE_DIR}/${METS_MERGE_SCRIPT}"
+  fi
+}
+
+remove_mets_merge_script_from_workspace () {
+  # The mets file chunks are merged and removed by the workflow, unless it has failed before, or an outdated
+  # workflow never read them. The first column of the page ranges holds the chunk names, if any.
+  local mets_chunk
+  if [ -f "${PAGE_RANGES_PATH}" ]; then
+    cut -f 1 "${PAGE_RANGES_PATH}" | while read -r mets_chunk ; do
+      if [ -n "${mets_chunk}" ]; then
+        rm -f "${WORKSPACE_DIR}/${mets_chunk}"
+      fi
+    done
+  fi
+  rm -f "${WORKSPACE_DIR}/${METS_MERGE_SCRIPT}"
+}
+
+write_nextflow_slurm_config () {
+  # The process jobs are submitted to the partition and with the qos and the time limit of this job.
+  # The queue size keeps at most one process job per fork pending or running, as the local executor would do.
+  local cluster_options="--constraint=scratch"
+  local time_limit
+  if [ -n "${SLURM_JOB_QOS}" ] ; then
+    cluster_options="${cluster_options} --qos=${SLURM_JOB_QOS}"
+  fi
+  time_limit=$(squeue -h -j "${SLURM_JOB_ID}" -o "%l" 2> /dev/null || true)
+  if [ -n "${time_limit}" ] && [ "${time_limit}" != "UNLIMITED" ] ; then
+    cluster_options="${cluster_options} --time=${time_limit}"
+  fi
+  cat > "${NF_CONFIG_PATH}" << EOF
+process {
+    executor = 'slurm'
+    queue = '${SLURM_JOB_PARTITION}'
+    clusterOptions = '${cluster_options}'
+}
+executor {
+    name = 'slurm'
+    queueSize = ${FORKS}
+    submitRateLimit = '${NF_SLURM_SUBMIT_RATE_LIMIT}'
+    pollInterval = '30 sec'
+    queueStatInterval = '1 min'
+}
+EOF
+  echo "Generated the nextflow config for the slurm executor: ${NF_CONFIG_PATH}"
+  cat "${NF_CONFIG_PATH}"
+}
+
 start_mets_server () {
   # TODO: Would be better to start the mets server as an instance, but this is still broken
   # singularity instance start \
@@ -176,9 +480,14 @@ stop_mets_server () {
 
 execute_nextflow_workflow () {
   local SINGULARITY_CMD="singularity exec --bind ${BIND_WORKSPACE_DIR} --bind ${BIND_OCRD_MODELS} --env OCRD_METS_CACHING=false ${SIF_PATH_IN_NODE}"
+  local NF_CONFIG_ARGS=()
+  if [ "${NF_EXECUTOR}" == "slurm" ] ; then
+    write_nextflow_slurm_config
+    NF_CONFIG_ARGS=(-c "${NF_CONFIG_PATH}")
+  fi
   if [ "$1" == "true" ] ; then
     echo "Executing the nextflow workflow with mets server"
-    nextflow run "${NF_SCRIPT_PATH}" \
+    nextflow "${NF_CONFIG_ARGS[@]}" run "${NF_SCRIPT_PATH}" \
     -ansi-log false \
     -with-report \
     --input_file_group "${IN_FILE_GRP}" \
@@ -186,19 +495,22 @@ execute_nextflow_workflow () {
     --mets_socket "${BIND_METS_SOCKET_PATH}" \
     --workspace_dir "${WORKSPACE_DIR_IN_DOCKER}" \
     --pages "${PAGES}" \
+    --page_ranges "${PAGE_RANGES_PATH}" \
     --singularity_wrapper "${SINGULARITY_CMD}" \
     --cpus "${CPUS}" \
     --ram "${RAM}" \
     --forks "${FORKS}"
   else
     echo "Executing the nextflow workflow without mets server"
-    nextflow run "${NF_SCRIPT_PATH}" \
+    nextflow "${NF_CONFIG_ARGS[@]}" run "${NF_SCRIPT_PATH}" \
     -ansi-log false \
     -with-report \
     --input_file_group "${IN_FILE_GRP}" \
     --mets "${BIND_METS_FILE_PATH}" \
     --workspace_dir "${WORKSPACE_DIR_IN_DOCKER}" \
     --pages "${PAGES}" \
+    --page_ranges "${PAGE_RANGES_PATH}" \
+    --mets_merge_script "${BIND_METS_MERGE_SCRIPT_PATH}" \
     --singularity_wrapper "${SINGULARITY_CMD}" \
     --cpus "${CPUS}" \
     --ram "${RAM}" \
@@ -251,13 +563,45 @@ remove_file_groups_from_workspace () {
   fi
 }
 
+list_workspace_files () {
+  # Lists the relative path, size, and modification time of each file in the workspace
+  cd "${WORKSPACE_DIR}" && find . -type f ! -name "*.sock" -printf "%P\t%s\t%T@\n" | LC_ALL=C sort
+}
+
+record_workspace_input_files () {
+  if [ "$1" == "new" ] ; then
+    echo "Recording the workspace input files to: ${WORKSPACE_INPUT_FILES_LIST}"
+    list_workspace_files > "${WORKSPACE_INPUT_FILES_LIST}"
+  fi
+}
+
+zip_new_results () {
+  list_workspace_files > "${WORKSPACE_RESULT_FILES_LIST}"
+  cd "${WORKSPACE_DIR}" || exit 1
+  # Files no longer available in the workspace, e.g., of removed file groups
+  LC_ALL=C comm -23 \
+    <(cut -f1 "${WORKSPACE_INPUT_FILES_LIST}" | LC_ALL=C sort) \
+    <(cut -f1 "${WORKSPACE_RESULT_FILES_LIST}" | LC_ALL=C sort) > "${REMOVED_FILES_LIST}"
+  echo "Amount of removed workspace files: $(wc -l < "${REMOVED_FILES_LIST}")"
+  # Zip only the mets, the list of removed files, and the new or changed files
+  {
+    echo "${METS_BASENAME}"
+    echo "${REMOVED_FILES_LIST}"
+    LC_ALL=C comm -13 "${WORKSPACE_INPUT_FILES_LIST}" "${WORKSPACE_RESULT_FILES_LIST}" | cut -f1
+  } | LC_ALL=C sort -u | zip -n "${ZIP_STORED_SUFFIXES}" "${WORKSPACE_ID}.zip" -@ > "workspace_zipping.log"
+}
+
 zip_results () {
   # Delete symlinks created for the Nextflow workers
   find "${WORKFLOW_JOB_DIR}" -type l -delete
   # Create a zip of the ocrd workspace dir
-  cd "${WORKSPACE_DIR}" && zip -r "${WORKSPACE_ID}.zip" "." -x "*.sock" > "workspace_zipping.log"
+  if [ "$1" == "new" ] ; then
+    zip_new_results
+  else
+    cd "${WORKSPACE_DIR}" && zip -r -n "${ZIP_STORED_SUFFIXES}" "${WORKSPACE_ID}.zip" "." -x "*.sock" > "workspace_zipping.log"
+  fi
   # Create a zip of the Nextflow run results by excluding the ocrd workspace dir
-  cd "${WORKFLOW_JOB_DIR}" && zip -r "${WORKFLOW_JOB_ID}.zip" "." -x "${WORKSPACE_ID}**" > "workflow_job_zipping.log"
+  cd "${WORKFLOW_JOB_DIR}" && zip -r -n "${ZIP_STORED_SUFFIXES}" "${WORKFLOW_JOB_ID}.zip" "." -x "${WORKSPACE_ID}**" > "workflow_job_zipping.log"
 
   case $? in
     0) echo "The results have been zipped successfully" ;;
@@ -268,11 +612,14 @@ zip_results () {
 
 # Main loop for workflow job execution
 check_existence_of_paths
-unzip_workflow_job_dir
+prepare_workflow_job_dir
+record_workspace_input_files "$RESULTS_MODE"
+place_mets_chunks_in_workspace
 transfer_requirements_to_node_storage
 start_mets_server "$USE_METS_SERVER"
 execute_nextflow_workflow "$USE_METS_SERVER"
+remove_mets_merge_script_from_workspace
 stop_mets_server "$USE_METS_SERVER"
 remove_file_groups_from_workspace "$FILE_GROUPS_TO_REMOVE"
-zip_results
+zip_results "$RESULTS_MODE"
 clear_data_from_computing_node
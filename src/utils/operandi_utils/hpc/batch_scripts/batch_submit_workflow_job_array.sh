@@ -0,0 +1,30 @@
+#!/bin/bash
+#SBATCH --constraint scratch
+
+set -e
+
+# Executes the workflow job of a single task of a slurm job array
+# Parameters are as follows:
+# $0 - This batch script
+# $1 - The batch script executed for each array task, i.e., the batch script submitting a single workflow job
+# $2 - The manifest of the job array, line N holds the arguments of the batch script for the array task N-1
+# The arguments inside a manifest line are separated by "|", must match the separator used by Operandi
+
+BATCH_SCRIPT_PATH=$1
+MANIFEST_PATH=$2
+MANIFEST_LINE=$((SLURM_ARRAY_TASK_ID + 1))
+
+if [ ! -f "${MANIFEST_PATH}" ]; then
+  echo "Required job array manifest is not available: ${MANIFEST_PATH}"
+  exit 1
+fi
+
+TASK_ARGS=()
+IFS='|' read -r -a TASK_ARGS < <(sed -n "${MANIFEST_LINE}p" "${MANIFEST_PATH}")
+if [ ${#TASK_ARGS[@]} -eq 0 ]; then
+  echo "No manifest line ${MANIFEST_LINE} for array task ${SLURM_ARRAY_TASK_ID} in: ${MANIFEST_PATH}"
+  exit 1
+fi
+
+echo "Array job: ${SLURM_ARRAY_JOB_ID}, task: ${SLURM_ARRAY_TASK_ID}, workflow job id: ${TASK_ARGS[1]}"
+exec bash "${BATCH_SCRIPT_PATH}" "${TASK_ARGS[@]}"
@@ -8,18 +8,10 @@
 # $5 - Slurm parameter - mem
 # $6 - Slurm parameter - qos
 
-# $7 - The batch script path to execute
-# $8 - The scratch base for slurm workspaces
-# $9 - Workflow job id
-# $10 - Nextflow script id
-# $11 - Entry input file group
-# $12 - Workspace id
-# $13 - Mets basename - default "mets.xml"
-# $14 - CPUs for the Nextflow processes
-# $15 - RAM for the Nextflow processes
-# $16 - Amount of forks per OCR-D processor in the NF script
-# $17 - Amount of pages in the workspace
-# $18 - Boolean flag showing whether a mets server is utilized or not
-# $19 - File groups to be removed from the workspace after the processing
+# $7... - Further sbatch options, e.g., "--parsable" or "--array=0-9", followed by the batch script path
+#          and the arguments of the batch script, all passed through to sbatch unchanged.
+#          Check the batch scripts for the order of their arguments, e.g., `batch_submit_workflow_job.sh`.
 
-sbatch --partition="$1" --time="$2" --output="$3" --cpus-per-task="$4" --mem="$5" --qos="$6" "$7" "$8" "$9" "${10}" "${11}" "${12}" "${13}" "${14}" "${15}" "${16}" "${17}" "${18}" "${19}"
+# Deployed with a content version in its name together with the batch scripts, hence extending the arguments
+# of a batch script does not require a manual update of this script on the HPC.
+sbatch --partition="$1" --time="$2" --output="$3" --cpus-per-task="$4" --mem="$5" --qos="$6" "${@:7}"
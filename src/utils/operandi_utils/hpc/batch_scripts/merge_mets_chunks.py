@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Merges the METS file chunks of the nextflow forks back into the main METS file of the workspace.
+Each chunk holds only the pages of a single fork. The files of the chunk pages are added to the main METS,
+replacing files with the same id, i.e., the same as `ocrd workspace merge --force --page-id <chunk pages>`
+for each chunk, but the main METS file is parsed and written only once for all chunks.
+
+    python3 merge_mets_chunks.py --mets /ws_data/mets.xml --remove-chunks /ws_data/mets_chunk_0.xml ...
+
+Only lxml is required, the merge runs with the python3 of the ocrd_all container.
+"""
+import os
+import re
+from argparse import ArgumentParser
+from lxml import etree
+
+NS = {"mets": "http://www.loc.gov/METS/"}
+METS = "{http://www.loc.gov/METS/}"
+XPATH_PHYS_SEQUENCE = "mets:structMap[@TYPE='PHYSICAL']/mets:div[@TYPE='physSequence']"
+XPATH_PAGE_DIVS = XPATH_PHYS_SEQUENCE + "/mets:div[@TYPE='page']"
+
+
+def natural_sort_key(path):
+    return [int(token) if token.isdigit() else token for token in re.split(r"(\d+)", path)]
+
+
+class MainMets:
+    """
+    The main METS file with indices over its file groups, files, and physical pages.
+    """
+    def __init__(self, mets_path):
+        self.mets_path = mets_path
+        self.tree = etree.parse(mets_path, etree.XMLParser(remove_blank_text=True))
+        self.root = self.tree.getroot()
+        self.file_sec = self.root.find(METS + "fileSec")
+        if self.file_sec is None:
+            self.file_sec = etree.Element(METS + "fileSec")
+            self.root.find(METS + "structMap").addprevious(self.file_sec)
+        self.file_grps = {file_grp.get("USE"): file_grp for file_grp in self.file_sec.iter(METS + "fileGrp")}
+        self.files = {mets_file.get("ID"): mets_file for mets_file in self.file_sec.iter(METS + "file")}
+        self.phys_sequence = self.root.xpath(XPATH_PHYS_SEQUENCE, namespaces=NS)[0]
+        self.page_divs = {page_div.get("ID"): page_div for page_div in self.root.xpath(XPATH_PAGE_DIVS, namespaces=NS)}
+        self.page_fptrs = {
+            page_id: {fptr.get("FILEID") for fptr in page_div.iterfind(METS + "fptr")}
+            for page_id, page_div in self.page_divs.items()
+        }
+
+    def get_file_grp(self, use):
+        if use not in self.file_grps:
+            self.file_grps[use] = etree.SubElement(self.file_sec, METS + "fileGrp", USE=use)
+        return self.file_grps[use]
+
+    def get_page_div(self, chunk_page_div):
+        page_id = chunk_page_div.get("ID")
+        if page_id not in self.page_divs:
+            page_div = etree.SubElement(self.phys_sequence, METS + "div", dict(chunk_page_div.attrib))
+            self.page_divs[page_id] = page_div
+            self.page_fptrs[page_id] = set()
+        return self.page_divs[page_id]
+
+    def add_file(self, chunk_file, page_div):
+        """
+        Moves the file element of a chunk into the main METS, an existing file with the same id is replaced.
+        """
+        file_id = chunk_file.get("ID")
+        file_grp = self.get_file_grp(chunk_file.getparent().get("USE"))
+        existing_file = self.files.get(file_id, None)
+        if existing_file is not None and existing_file.getparent() is file_grp:
+            file_grp.replace(existing_file, chunk_file)
+        else:
+            if existing_file is not None:
+                existing_file.getparent().remove(existing_file)
+            file_grp.append(chunk_file)
+        self.files[file_id] = chunk_file
+        page_fptrs = self.page_fptrs[page_div.get("ID")]
+        if file_id not in page_fptrs:
+            etree.SubElement(page_div, METS + "fptr", FILEID=file_id)
+            page_fptrs.add(file_id)
+
+    def merge_chunk(self, chunk_path):
+        """
+        Adds the files of the pages of the chunk, returns the amount of merged files.
+        """
+        chunk_root = etree.parse(chunk_path, etree.XMLParser(remove_blank_text=True)).getroot()
+        file_page_divs = {}
+        for chunk_page_div in chunk_root.xpath(XPATH_PAGE_DIVS, namespaces=NS):
+            page_div = self.get_page_div(chunk_page_div)
+            for fptr in chunk_page_div.iterfind(METS + "fptr"):
+                file_page_divs[fptr.get("FILEID")] = page_div
+        # Collected in document order before moving, the files keep the order of the chunk
+        chunk_files = [
+            chunk_file for chunk_file in chunk_root.iterfind(f"{METS}fileSec//{METS}file")
+            if chunk_file.get("ID") in file_page_divs
+        ]
+        for chunk_file in chunk_files:
+            self.add_file(chunk_file, file_page_divs[chunk_file.get("ID")])
+        return len(chunk_files)
+
+    def write(self):
+        etree.cleanup_namespaces(self.root)
+        # Written next to the main METS and renamed, hence a failed merge leaves the main METS untouched
+        temp_mets_path = self.mets_path + ".merging"
+        self.tree.write(temp_mets_path, xml_declaration=True, encoding="utf-8", pretty_print=True)
+        os.replace(temp_mets_path, self.mets_path)
+
+
+def merge_mets_chunks(mets_path, chunk_paths, remove_chunks=False):
+    """
+    Merges the chunks in the natural order of their paths, returns the amount of merged files.
+    """
+    main_mets = MainMets(mets_path)
+    chunk_paths = sorted(chunk_paths, key=natural_sort_key)
+    merged_files = sum(main_mets.merge_chunk(chunk_path) for chunk_path in chunk_paths)
+    main_mets.write()
+    if remove_chunks:
+        for chunk_path in chunk_paths:
+            os.remove(chunk_path)
+    return merged_files
+
+
+def main():
+    parser = ArgumentParser(description="Merges the METS file chunks of the forks into the main METS file")
+    parser.add_argument("--mets", required=True, help="The main METS file of the workspace")
+    parser.add_argument("--remove-chunks", action="store_true", help="Remove the chunks after a successful merge")
+    parser.add_argument("chunks", nargs="+", help="The METS file chunks")
+    args = parser.parse_args()
+    merged_files = merge_mets_chunks(mets_path=args.mets, chunk_paths=args.chunks, remove_chunks=args.remove_chunks)
+    print(f"Merged {merged_files} files of {len(args.chunks)} METS file chunks into: {args.mets}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+The Operandi agent runs on the HPC front end for as long as the connection of an `HPCExecutor` lives.
+It is started once inside a login shell, hence the module environment is loaded only once and each request
+costs only the fork of the requested slurm command, instead of a new login shell per command.
+
+The agent reads one JSON request per line from stdin and writes one JSON response per line to stdout:
+    request:  {"id": 1, "op": "state", "args": {"slurm_job_ids": ["123", "124_0"]}}
+    response: {"id": 1, "ok": true, "result": {...}} or {"id": 1, "ok": false, "error": "..."}
+Right after the start, a response with id 0 holding the result of `ping` signals the readiness of the agent.
+
+Only the standard library is used, the agent must run with the python3 of the HPC front end.
+"""
+import json
+import os
+import subprocess
+import sys
+from argparse import ArgumentParser
+from getpass import getuser
+
+# Must match the protocol version expected by Operandi
+AGENT_PROTOCOL_VERSION = 2
+
+
+def run_command(argv):
+    completed = subprocess.run(
+        argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+        check=False)
+    return completed.returncode, completed.stdout, completed.stderr
+
+
+def resolve_path_under_root(root, path):
+    real_root = os.path.realpath(root)
+    real_path = os.path.realpath(path)
+    if os.path.commonpath([real_root, real_path]) != real_root or real_path == real_root:
+        raise ValueError("Path is not inside the agent root {}: {}".format(root, path))
+    return real_path
+
+
+def op_ping(root, args):
+    return {"pid": os.getpid(), "version": AGENT_PROTOCOL_VERSION, "root": root}
+
+
+def op_submit(root, args):
+    manifest = args.get("manifest", None)
+    if manifest:
+        manifest_path = resolve_path_under_root(root, manifest["path"])
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, "w") as manifest_file:
+            manifest_file.writelines("{}\n".format(line) for line in manifest["lines"])
+    # The same wrapper of sbatch as used when executing commands, the invoke arguments include `--parsable`
+    return_code, stdout, stderr = run_command(["bash", args["invoke_script"]] + args["invoke_args"])
+    output_lines = [line.strip() for line in stdout.splitlines() if line.strip()]
+    # The parsable output is `<job id>` or `<job id>;<cluster>`
+    slurm_job_id = output_lines[-1].split(";")[0] if output_lines else ""
+    if return_code != 0 or not slurm_job_id.isdigit():
+        raise RuntimeError("The submission has failed with return code {}: {}".format(return_code, stderr.strip()))
+    return {"slurm_job_id": slurm_job_id}
+
+
+def op_state(root, args):
+    slurm_job_ids = args["slurm_job_ids"]
+    sacct_output = ""
+    if slurm_job_ids:
+        _, sacct_output, _ = run_command(
+            ["sacct", "--parsable2", "--noheader", "--format=jobid,state", "-j", ",".join(slurm_job_ids)])
+    user = os.environ.get("USER", None) or getuser()
+    _, squeue_output, _ = run_command(["squeue", "--array", "--noheader", "--format=%i|%T", "--user={}".format(user)])
+    return {"sacct": sacct_output.splitlines(True), "squeue": squeue_output.splitlines(True)}
+
+
+def op_accounting(root, args):
+    slurm_job_ids = args["slurm_job_ids"]
+    if not slurm_job_ids:
+        return {"sacct": []}
+    _, sacct_output, _ = run_command(
+        ["sacct", "--parsable2", "--noheader", "--format={}".format(args["format"]), "-j", ",".join(slurm_job_ids)])
+    return {"sacct": sacct_output.splitlines(True)}
+
+
+OPERATIONS = {
+    "accounting": op_accounting,
+    "ping": op_ping,
+    "state": op_state,
+    "submit": op_submit,
+}
+
+
+def write_response(response):
+    sys.stdout.write(json.dumps(response) + "\n")
+    sys.stdout.flush()
+
+
+def handle_request(root, line):
+    """
+    Returns the response to the request line and whether the agent was requested to exit.
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get("id", None)
+        op = request["op"]
+        if op == "exit":
+            return {"id": request_id, "ok": True, "result": {}}, True
+        if op not in OPERATIONS:
+            raise ValueError("Unknown operation: {}".format(op))
+        result = OPERATIONS[op](root, request.get("args", {}))
+        return {"id": request_id, "ok": True, "result": result}, False
+    except Exception as error:
+        return {"id": request_id, "ok": False, "error": "{}: {}".format(type(error).__name__, error)}, False
+
+
+def main():
+    parser = ArgumentParser(description="Operandi agent on the HPC front end")
+    parser.add_argument("--root", required=True, help="Only paths inside this dir may be written")
+    root = parser.parse_args().root
+    write_response({"id": 0, "ok": True, "result": op_ping(root, {})})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        response, exit_requested = handle_request(root, line)
+        write_response(response)
+        if exit_requested:
+            break
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+from functools import lru_cache
+from logging import getLogger
+from os import getpid
+from paramiko import AutoAddPolicy, RSAKey, SSHClient
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from .connection_utils import is_transport_responsive
+from .constants import HPC_CONNECTION_POOL_TRANSPORTS_PER_HOST, HPC_SSH_CONNECT_TIMEOUT, HPC_SSH_KEEP_ALIVE_INTERVAL
+
+
+@lru_cache(maxsize=None)
+def load_private_key(key_path: str, key_pass: Optional[str] = None) -> RSAKey:
+    # The key file is read and parsed only once per process instead of on every (re)connect
+    return RSAKey.from_private_key_file(key_path, key_pass)
+
+
+class HPCConnectionPool:
+    """
+    Keeps authenticated ssh connections to the proxy hosts and, tunneled through them, to the hpc hosts.
+    Connectors with the same hosts and users share the connections and open their own exec channels
+    and sftp sessions on the shared transports. Up to `transports_per_host` connections per hpc host
+    are kept and handed out round-robin. Each connection sends keepalive packets and is health checked
+    before being handed out, unresponsive connections are closed and replaced. Connections to different
+    hosts are established concurrently, only requests for the same host wait for each other.
+    """
+    def __init__(
+        self, keep_alive_interval: int = HPC_SSH_KEEP_ALIVE_INTERVAL,
+        transports_per_host: int = HPC_CONNECTION_POOL_TRANSPORTS_PER_HOST,
+        connect_timeout: float = HPC_SSH_CONNECT_TIMEOUT
+    ) -> None:
+        self.log = getLogger("operandi_utils.hpc.connection_pool")
+        self.keep_alive_interval = keep_alive_interval
+        self.transports_per_host = max(1, transports_per_host)
+        self.connect_timeout = connect_timeout
+        self._lock = RLock()
+        self._key_locks: Dict[tuple, RLock] = {}
+        self._proxy_clients: Dict[Tuple[str, int, str], SSHClient] = {}
+        self._hpc_clients: Dict[tuple, List[SSHClient]] = {}
+        self._hpc_handouts: Dict[tuple, int] = {}
+        # The hpc host and port each hpc client is tunneled to
+        self._hpc_routes: WeakKeyDictionary = WeakKeyDictionary()
+        # How many times each hpc client has been handed out and not discarded
+        self._hpc_client_handouts: WeakKeyDictionary = WeakKeyDictionary()
+
+    def _get_key_lock(self, pool_key: tuple) -> RLock:
+        with self._lock:
+            return self._key_locks.setdefault(pool_key, RLock())
+
+    def _open_proxy_sock(self, host: str, port: int):
+        # The socket of the proxy connection, None lets paramiko open a tcp connection to the proxy host
+        return None
+
+    def get_proxy_client(self, host: str, port: int, username: str, key_path: str, key_pass: str = None) -> SSHClient:
+        pool_key = (host, port, username)
+        with self._get_key_lock(pool_key):
+            proxy_client = self._proxy_clients.get(pool_key, None)
+            if proxy_client and is_transport_responsive(self.log, proxy_client.get_transport()):
+                return proxy_client
+            if proxy_client:
+                self.log.warning(f"Closing the unresponsive ssh proxy client of: {host}:{port}")
+                proxy_client.close()
+            self.log.info(f"Connecting to proxy server {host}:{port} with username: {username}")
+            proxy_client = SSHClient()
+            proxy_client.set_missing_host_key_policy(AutoAddPolicy())
+            proxy_client.connect(
+                hostname=host, port=port, username=username, pkey=load_private_key(str(key_path), key_pass),
+                passphrase=key_pass, timeout=self.connect_timeout, banner_timeout=self.connect_timeout,
+                auth_timeout=self.connect_timeout, sock=self._open_proxy_sock(host=host, port=port))
+            proxy_client.get_transport().set_keepalive(self.keep_alive_interval)
+            with self._lock:
+                self._proxy_clients[pool_key] = proxy_client
+            return proxy_client
+
+    def get_hpc_client(
+        self, proxy_host: str, proxy_port: int, proxy_username: str, hpc_host: str, hpc_port: int, username: str,
+        key_path: str, key_pass: str = None, tunnel_host: str = 'localhost', tunnel_port: int = 0
+    ) -> SSHClient:
+        pool_key = (proxy_host, proxy_port, proxy_username, hpc_host, hpc_port, username)
+        with self._get_key_lock(pool_key):
+            hpc_clients = []
+            for hpc_client in self._hpc_clients.get(pool_key, []):
+                if is_transport_responsive(self.log, hpc_client.get_transport()):
+                    hpc_clients.append(hpc_client)
+                else:
+                    self.log.warning(f"Closing an unresponsive ssh hpc client of: {hpc_host}:{hpc_port}")
+                    hpc_client.close()
+            with self._lock:
+                self._hpc_clients[pool_key] = hpc_clients
+            if len(hpc_clients) < self.transports_per_host:
+                proxy_client = self.get_proxy_client(
+                    host=proxy_host, port=proxy_port, username=proxy_username, key_path=key_path, key_pass=key_pass)
+                self.log.info(f"Configuring a tunnel to destination {hpc_host}:{hpc_port} "
+                              f"from {tunnel_host}:{tunnel_port}")
+                proxy_tunnel = proxy_client.get_transport().open_channel(
+                    kind='direct-tcpip', src_addr=(tunnel_host, tunnel_port), dest_addr=(hpc_host, hpc_port),
+                    timeout=self.connect_timeout)
+                self.log.info(f"Connecting to hpc frontend server {hpc_host}:{hpc_port} with username: {username}")
+                hpc_client = SSHClient()
+                hpc_client.set_missing_host_key_policy(AutoAddPolicy())
+                hpc_client.connect(
+                    hostname=hpc_host, port=hpc_port, username=username,
+                    pkey=load_private_key(str(key_path), key_pass), passphrase=key_pass, sock=proxy_tunnel,
+                    timeout=self.connect_timeout, banner_timeout=self.connect_timeout,
+                    auth_timeout=self.connect_timeout)
+                hpc_client.get_transport().set_keepalive(self.keep_alive_interval)
+                hpc_clients.append(hpc_client)
+                with self._lock:
+                    self._hpc_routes[hpc_client] = (hpc_host, hpc_port)
+            handouts = self._hpc_handouts.get(pool_key, 0)
+            self._hpc_handouts[pool_key] = handouts + 1
+            hpc_client = hpc_clients[handouts % len(hpc_clients)]
+            with self._lock:
+                self._hpc_client_handouts[hpc_client] = self._hpc_client_handouts.get(hpc_client, 0) + 1
+            return hpc_client
+
+    def discard_hpc_client(self, hpc_client: SSHClient) -> None:
+        """
+        Gives back a handed out hpc client that is not used, e.g., the loser of a connection race.
+        Unless it has been handed out to another user as well, the client is removed from the pool and closed.
+        """
+        with self._lock:
+            handouts = self._hpc_client_handouts.get(hpc_client, 0) - 1
+            self._hpc_client_handouts[hpc_client] = max(handouts, 0)
+            if handouts > 0:
+                return
+            for pool_key, hpc_clients in self._hpc_clients.items():
+                self._hpc_clients[pool_key] = [
+                    pooled_client for pooled_client in hpc_clients if pooled_client is not hpc_client]
+        self.log.info(f"Closing the discarded ssh hpc client of: {self._hpc_routes.get(hpc_client, None)}")
+        hpc_client.close()
+
+    def get_hpc_route(self, hpc_client: SSHClient) -> Tuple[str, int]:
+        """
+        Returns the hpc host and port the hpc client handed out by this pool is tunneled to.
+        """
+        with self._lock:
+            return self._hpc_routes[hpc_client]
+
+    def close(self) -> None:
+        with self._lock:
+            for hpc_clients in self._hpc_clients.values():
+                for hpc_client in hpc_clients:
+                    hpc_client.close()
+            for proxy_client in self._proxy_clients.values():
+                proxy_client.close()
+            self._hpc_clients.clear()
+            self._proxy_clients.clear()
+            self._hpc_handouts.clear()
+
+
+_connection_pool: Optional[HPCConnectionPool] = None
+_connection_pool_pid: Optional[int] = None
+
+
+def get_hpc_connection_pool() -> HPCConnectionPool:
+    """
+    Returns the connection pool of the current process. A forked child process gets its own pool,
+    since the transports of the parent process cannot be shared across processes.
+    """
+    global _connection_pool, _connection_pool_pid
+    if not _connection_pool or _connection_pool_pid != getpid():
+        _connection_pool = HPCConnectionPool()
+        _connection_pool_pid = getpid()
+    return _connection_pool
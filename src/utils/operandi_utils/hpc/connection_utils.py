@@ -1,4 +1,7 @@
 from paramiko import SFTPClient, SSHClient, Transport
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import Any, Callable, List, Optional
 
 
 def is_sftp_conn_responsive(logger, sftp_client: SFTPClient) -> bool:
@@ -35,3 +38,61 @@ def is_transport_responsive(logger, transport: Transport) -> bool:
     except EOFError as error:
         logger.error(f"is_transport_responsive EOFError: {error}")
         return False
+
+
+def race_connection_attempts(
+    connect_functions: List[Callable[[], Any]], stagger: float, discard_result: Optional[Callable[[Any], None]] = None
+) -> Any:
+    """
+    Happy eyeballs style race of connection attempts, returns the result of the first successful attempt.
+    The attempts are started in order, each one once the previous attempt has failed or `stagger` seconds
+    have passed. Slower attempts are not interrupted, they finish in the background and the results of the
+    successful ones are passed to the optional `discard_result`, e.g., to close their connections.
+    """
+    if not connect_functions:
+        raise ValueError("No connection attempts to race")
+    results = Queue()
+    race_lock = Lock()
+    race_state = {"decided": False}
+
+    def discard(result: Any) -> None:
+        if discard_result:
+            discard_result(result)
+
+    def run_attempt(connect_function: Callable[[], Any]) -> None:
+        try:
+            result = connect_function()
+        except Exception as error:
+            results.put((False, error))
+            return
+        with race_lock:
+            if not race_state["decided"]:
+                results.put((True, result))
+                return
+        discard(result)
+
+    started, finished, errors = 0, 0, []
+    while True:
+        if started < len(connect_functions):
+            Thread(target=run_attempt, args=(connect_functions[started],), daemon=True).start()
+            started += 1
+        try:
+            succeeded, result = results.get(timeout=stagger if started < len(connect_functions) else None)
+        except Empty:
+            continue
+        finished += 1
+        if succeeded:
+            with race_lock:
+                race_state["decided"] = True
+            # The attempts that have succeeded before the race was decided are still queued
+            while True:
+                try:
+                    late_succeeded, late_result = results.get_nowait()
+                except Empty:
+                    break
+                if late_succeeded:
+                    discard(late_result)
+            return result
+        errors.append(result)
+        if finished == len(connect_functions):
+            raise ConnectionError(f"All {finished} connection attempts have failed: {errors}")
@@ -1,10 +1,13 @@
 from logging import Logger
-from paramiko import AutoAddPolicy, Channel, RSAKey, SSHClient
+from paramiko import SSHClient, Transport
 from pathlib import Path
-from typing import List, Union
+from time import monotonic
+from typing import List, Tuple, Union
 
-from .constants import HPC_SSH_CONNECTION_TRY_TIMES
-from .connection_utils import is_ssh_conn_responsive, is_sftp_conn_responsive
+from .constants import HPC_CONNECTION_RACE_STAGGER, HPC_SSH_CONNECTION_TRY_TIMES
+from .connection_pool import HPCConnectionPool, get_hpc_connection_pool, load_private_key
+from .connection_utils import is_ssh_conn_responsive, is_sftp_conn_responsive, race_connection_attempts
+from .host_stats import HPCHostStats, get_hpc_host_stats
 from .utils import (
     check_keyfile_existence, resolve_hpc_user_home_dir, resolve_hpc_project_root_dir, resolve_hpc_batch_scripts_dir,
     resolve_hpc_slurm_workspaces_dir)
@@ -15,7 +18,7 @@ class HPCConnector:
         self, hpc_hosts: List[str], proxy_hosts: List[str], username: str, project_username: str, key_path: Path,
         key_pass: Union[str, None], project_name: str, log: Logger,
         channel_keep_alive_interval: int = 30, connection_keep_alive_interval: int = 30, tunnel_host: str = 'localhost',
-        tunnel_port: int = 0
+        tunnel_port: int = 0, connection_pool: HPCConnectionPool = None, host_stats: HPCHostStats = None
     ) -> None:
         if not username:
             raise ValueError("Environment variable is probably not set: OPERANDI_HPC_USERNAME")
@@ -51,6 +54,10 @@ class HPCConnector:
         self.proxy_hosts = proxy_hosts
         self.last_used_proxy_host = None
 
+        # The proxy and hpc connections are shared with other connectors of this process through the pool
+        self.connection_pool = connection_pool if connection_pool else get_hpc_connection_pool()
+        # The latency and failures of each proxy and hpc host route, shared with other connectors of this process
+        self.host_stats = host_stats if host_stats else get_hpc_host_stats()
         self.ssh_proxy_client = None
         self.proxy_tunnel = None
         self.ssh_hpc_client = None
@@ -84,54 +91,29 @@ class HPCConnector:
         self.create_ssh_connection_to_hpc_by_iteration(tunnel_host=tunnel_host, tunnel_port=tunnel_port)
 
     def connect_to_proxy_server(self, host: str, port: int = 22) -> SSHClient:
-        if self.ssh_proxy_client:
-            self.log.warning(f"Closing the previously existing ssh proxy client")
-            self.ssh_proxy_client.close()
-            self.ssh_proxy_client = None
-        self.ssh_proxy_client = SSHClient()
-        self.log.debug(f"Setting missing host key policy for the proxy client")
-        self.ssh_proxy_client.set_missing_host_key_policy(AutoAddPolicy())
-        self.log.debug(f"Retrieving proxy server private key file from path: {self.proxy_key_path}")
-        proxy_pkey = RSAKey.from_private_key_file(str(self.proxy_key_path), self.proxy_key_pass)
-        self.log.info(f"Connecting to proxy server {host}:{port} with username: {self.username}")
-        self.ssh_proxy_client.connect(
-            hostname=host, port=port, username=self.username, pkey=proxy_pkey, passphrase=self.proxy_key_pass)
-        # self.ssh_proxy_client.get_transport().set_keepalive(self.connection_keep_alive_interval)
+        self.ssh_proxy_client = self.connection_pool.get_proxy_client(
+            host=host, port=port, username=self.username, key_path=self.proxy_key_path, key_pass=self.proxy_key_pass)
         self.last_used_proxy_host = host
         self.log.debug(f"Successfully connected to the proxy server")
         return self.ssh_proxy_client
 
-    def establish_proxy_tunnel(
-        self, dst_host: str, dst_port: int = 22, src_host: str = 'localhost', src_port: int = 0,
-        channel_kind: str = 'direct-tcpip',
-    ) -> Channel:
-        proxy_transport = self.ssh_proxy_client.get_transport()
-        if self.proxy_tunnel:
-            self.log.warning(f"Closing the previously existing ssh proxy tunel")
-            self.proxy_tunnel.close()
-            self.proxy_tunnel = None
-        self.log.info(f"Configuring a tunnel to destination {dst_host}:{dst_port} from {src_host}:{src_port}")
-        self.proxy_tunnel = proxy_transport.open_channel(
-            kind=channel_kind, src_addr=(src_host, src_port), dest_addr=(dst_host, dst_port))
-        # self.proxy_tunnel.get_transport().set_keepalive(self.channel_keep_alive_interval)
-        self.last_used_hpc_host = dst_host
-        self.log.debug(f"Successfully configured a proxy tunnel")
-        return self.proxy_tunnel
-
-    def connect_to_hpc_frontend_server(self, host: str, port: int = 22, proxy_tunnel: Channel = None) -> SSHClient:
-        if self.ssh_hpc_client:
-            self.log.warning(f"Closing the previously existing ssh hpc client")
-            self.ssh_hpc_client.close()
-            self.ssh_hpc_client = None
-        self.ssh_hpc_client = SSHClient()
-        self.log.debug(f"Setting missing host key policy for the hpc frontend client")
-        self.ssh_hpc_client.set_missing_host_key_policy(AutoAddPolicy())
-        self.log.debug(f"Retrieving hpc frontend server private key file from path: {self.hpc_key_path}")
-        hpc_pkey = RSAKey.from_private_key_file(str(self.hpc_key_path), self.hpc_key_pass)
-        self.log.info(f"Connecting to hpc frontend server {host}:{port} with project username: {self.project_username}")
-        self.ssh_hpc_client.connect(hostname=host, port=port, username=self.project_username, pkey=hpc_pkey,
-                                    passphrase=self.hpc_key_pass, sock=proxy_tunnel)
-        # self.ssh_hpc_client.get_transport().set_keepalive(self.connection_keep_alive_interval)
+    def connect_to_hpc_frontend_server(
+        self, host: str, port: int = 22, proxy_host: str = None, proxy_port: int = 22,
+        tunnel_host: str = 'localhost', tunnel_port: int = 0
+    ) -> SSHClient:
+        """
+        Gets a connection to the hpc frontend server, tunneled through the proxy server, from the connection pool.
+        The connection may be shared with other connectors, hence it is never closed by the connector itself.
+        """
+        if not proxy_host:
+            proxy_host = self.last_used_proxy_host
+        self.ssh_hpc_client = self.connection_pool.get_hpc_client(
+            proxy_host=proxy_host, proxy_port=proxy_port, proxy_username=self.username, hpc_host=host, hpc_port=port,
+            username=self.project_username, key_path=self.hpc_key_path, key_pass=self.hpc_key_pass,
+            tunnel_host=tunnel_host, tunnel_port=tunnel_port)
+        # The socket of the hpc transport is the direct-tcpip channel of the proxy connection
+        self.proxy_tunnel = self.ssh_hpc_client.get_transport().sock
+        self.last_used_proxy_host = proxy_host
         self.last_used_hpc_host = host
         self.log.debug(f"Successfully connected to the hpc frontend server")
         return self.ssh_hpc_client
@@ -144,15 +126,22 @@ class HPCConnector:
             hpc_host = self.last_used_hpc_host
         if not proxy_host:
             proxy_host = self.last_used_proxy_host
-        if not is_ssh_conn_responsive(self.log, self.ssh_proxy_client):
-            self.log.warning("The connection to proxy server is not responsive, trying to open a new connection")
-            self.ssh_proxy_client = self.connect_to_proxy_server(host=proxy_host, port=proxy_port)
-        if not is_ssh_conn_responsive(self.log, self.proxy_tunnel):
-            self.log.warning("The proxy tunnel is not responsive, trying to establish a new proxy tunnel")
-            self.proxy_tunnel = self.establish_proxy_tunnel(hpc_host, hpc_port, tunnel_host, tunnel_port)
-        if not is_ssh_conn_responsive(self.log, self.ssh_hpc_client):
-            self.log.warning("The connection to hpc frontend server is not responsive, trying to open a new connection")
-            self.ssh_hpc_client = self.connect_to_hpc_frontend_server(proxy_host, proxy_port, self.proxy_tunnel)
+        try:
+            if not is_ssh_conn_responsive(self.log, self.ssh_proxy_client):
+                self.log.warning("The connection to proxy server is not responsive, trying to open a new connection")
+                self.connect_to_proxy_server(host=proxy_host, port=proxy_port)
+            if not is_ssh_conn_responsive(self.log, self.ssh_hpc_client):
+                self.log.warning(
+                    "The connection to hpc frontend server is not responsive, trying to open a new connection")
+                self.connect_to_hpc_frontend_server(
+                    host=hpc_host, port=hpc_port, proxy_host=proxy_host, proxy_port=proxy_port,
+                    tunnel_host=tunnel_host, tunnel_port=tunnel_port)
+        except Exception as error:
+            self.host_stats.record_failure(proxy_host=proxy_host, hpc_host=hpc_host)
+            self.log.warning(f"Failed to reconnect to hpc host: {hpc_host}, over proxy host: {proxy_host}, "
+                             f"error: {error}, racing the connection attempts over all routes")
+            self.create_ssh_connection_to_hpc_by_iteration(
+                try_times=1, tunnel_host=tunnel_host, tunnel_port=tunnel_port)
 
     def recreate_sftp_if_required(
         self, hpc_host: str = None, hpc_port: int = 22, proxy_host: str = None, proxy_port: int = 22,
@@ -170,32 +159,61 @@ class HPCConnector:
                 self.sftp_client.close()
                 self.sftp_client = None
             self.sftp_client = self.ssh_hpc_client.open_sftp()
-            # self.sftp_client.get_channel().get_transport().set_keepalive(self.channel_keep_alive_interval)
+
+    def open_extra_hpc_transport(self) -> Transport:
+        """
+        Opens an additional authenticated transport to the hpc host of the primary hpc transport through a new
+        channel of the proxy connection carrying the primary transport. Each transport has its own packetizer
+        thread and channel windows. The caller is responsible for closing the returned transport.
+        """
+        self.reconnect_if_required()
+        hpc_host, hpc_port = self.connection_pool.get_hpc_route(self.ssh_hpc_client)
+        # The socket of the primary hpc transport is the direct-tcpip channel of the proxy connection
+        proxy_transport = self.ssh_hpc_client.get_transport().sock.get_transport()
+        self.log.info(f"Opening an extra transport to hpc host {hpc_host}:{hpc_port}")
+        tunnel = proxy_transport.open_channel(
+            kind='direct-tcpip', src_addr=(self.tunnel_host, self.tunnel_port), dest_addr=(hpc_host, hpc_port))
+        transport = Transport(tunnel)
+        transport.start_client()
+        transport.auth_publickey(
+            username=self.project_username, key=load_private_key(str(self.hpc_key_path), self.hpc_key_pass))
+        transport.set_keepalive(self.connection_keep_alive_interval)
+        self.log.debug(f"Successfully opened an extra transport to the hpc frontend server")
+        return transport
 
     def create_ssh_connection_to_hpc_by_iteration(
         self, try_times: int = HPC_SSH_CONNECTION_TRY_TIMES, tunnel_host: str = 'localhost', tunnel_port: int = 0
     ) -> None:
-        while try_times > 0:
-            for proxy_host in self.proxy_hosts:
-                self.ssh_proxy_client = None
-                self.last_used_proxy_host = None
-                for hpc_host in self.hpc_hosts:
-                    self.ssh_hpc_client = None
-                    self.last_used_hpc_host = None
-                    try:
-                        self.reconnect_if_required(
-                            hpc_host=hpc_host, hpc_port=22,
-                            proxy_host=proxy_host, proxy_port=22,
-                            tunnel_host=tunnel_host, tunnel_port=tunnel_port)
-                        return  # all connections were successful
-                    except Exception as error:
-                        self.log.error(f"""
-                            Failed to connect to hpc host: {hpc_host}
-                            Over proxy host: {proxy_host}
-                            Exception Error: {error}
-                        """)
-                        continue
-            try_times -= 1
+        """
+        Races the connection attempts over all routes of proxy host and hpc host, see `race_connection_attempts`,
+        and keeps the connection of the fastest route. Up to `try_times` races are performed.
+        """
+        for try_index in range(try_times):
+            try:
+                proxy_host, hpc_host, self.ssh_hpc_client = race_connection_attempts(
+                    connect_functions=[
+                        self._create_route_connect_function(
+                            proxy_host=proxy_host, hpc_host=hpc_host, tunnel_host=tunnel_host, tunnel_port=tunnel_port)
+                        for proxy_host, hpc_host in self.host_stats.rank_routes(self.proxy_hosts, self.hpc_hosts)
+                    ],
+                    stagger=HPC_CONNECTION_RACE_STAGGER,
+                    # The connections of the slower routes are closed instead of being kept in the pool
+                    discard_result=lambda route_result: self.connection_pool.discard_hpc_client(route_result[2]))
+            except ConnectionError as error:
+                self.log.error(f"""
+                    Failed to connect to any of the hpc hosts: {self.hpc_hosts}
+                    Over any of the proxy hosts: {self.proxy_hosts}
+                    Connection race: {try_index + 1} of {try_times}
+                    Exception Error: {error}
+                """)
+                continue
+            # Both connections are already pooled, hence this does not cost another connection setup
+            self.connect_to_proxy_server(host=proxy_host)
+            self.proxy_tunnel = self.ssh_hpc_client.get_transport().sock
+            self.last_used_proxy_host = proxy_host
+            self.last_used_hpc_host = hpc_host
+            self.log.info(f"Connected to hpc host: {hpc_host}, over proxy host: {proxy_host}")
+            return
 
         raise Exception(f"""
             Failed to establish connection to any of the HPC hosts: {self.hpc_hosts}
@@ -204,3 +222,22 @@ class HPCConnector:
             Using the proxy private key: {self.proxy_key_path}
             Performed connection iterations: {try_times}
         """)
+
+    def _create_route_connect_function(
+        self, proxy_host: str, hpc_host: str, tunnel_host: str, tunnel_port: int, port: int = 22
+    ):
+        def connect_over_route() -> Tuple[str, str, SSHClient]:
+            start_time = monotonic()
+            try:
+                hpc_client = self.connection_pool.get_hpc_client(
+                    proxy_host=proxy_host, proxy_port=port, proxy_username=self.username, hpc_host=hpc_host,
+                    hpc_port=port, username=self.project_username, key_path=self.hpc_key_path,
+                    key_pass=self.hpc_key_pass, tunnel_host=tunnel_host, tunnel_port=tunnel_port)
+            except Exception as error:
+                self.host_stats.record_failure(proxy_host=proxy_host, hpc_host=hpc_host)
+                self.log.warning(f"Failed to connect to hpc host: {hpc_host}, over proxy host: {proxy_host}, "
+                                 f"error: {error}")
+                raise
+            self.host_stats.record_success(proxy_host=proxy_host, hpc_host=hpc_host, latency=monotonic() - start_time)
+            return proxy_host, hpc_host, hpc_client
+        return connect_over_route
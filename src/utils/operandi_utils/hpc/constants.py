@@ -1,32 +1,124 @@
+# Defined next to the states stored in the DB, since the DB models do not depend on the HPC package
+from operandi_utils.constants import HPC_RESULTS_MODE_FULL, HPC_RESULTS_MODE_NEW, HPC_RESULTS_MODES
+
 __all__ = [
+    "HPC_AGENT_PROTOCOL_VERSION",
+    "HPC_AGENT_PYTHON",
+    "HPC_AGENT_REQUEST_TIMEOUT",
+    "HPC_AGENT_SCRIPT",
+    "HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB",
+    "HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB_ARRAY",
+    "HPC_BATCH_SCRIPT_VERSION_LENGTH",
+    "HPC_CONNECTION_POOL_TRANSPORTS_PER_HOST",
+    "HPC_CONNECTION_RACE_STAGGER",
     "HPC_DIR_BATCH_SCRIPTS",
+    "HPC_DIR_JOB_ARRAY_MANIFESTS",
+    "HPC_DIR_METS_CHUNKS",
     "HPC_DIR_SLURM_WORKSPACES",
+    "HPC_DIR_SYNCED_WORKSPACES",
+    "HPC_SYNCED_WORKSPACE_LOCK_TIMEOUT",
     "HPC_EXECUTOR_HOSTS",
+    "HPC_EXECUTOR_MAX_CONCURRENT_COMMANDS",
     "HPC_EXECUTOR_PROXY_HOSTS",
+    "HPC_EXECUTOR_RECV_SIZE",
+    "HPC_INVOKE_BATCH_SCRIPT",
+    "HPC_JOB_ARRAY_MANIFEST_SEPARATOR",
+    "HPC_JOB_ARRAY_MAX_SIZE",
     "HPC_JOB_DEADLINE_TIME_REGULAR",
     "HPC_JOB_DEADLINE_TIME_TEST",
     "HPC_JOB_DEFAULT_PARTITION",
+    "HPC_HOST_STATS_LATENCY_WEIGHT",
     "HPC_JOB_TEST_PARTITION",
     "HPC_JOB_QOS_2H",
     "HPC_JOB_QOS_48H",
+    "HPC_METS_CHUNK_NAME",
+    "HPC_METS_MERGE_SCRIPT",
+    "HPC_MODEL_DEPENDENCIES_ALL",
+    "HPC_MODEL_DEPENDENCIES_NONE",
+    "HPC_MODEL_DEPENDENCIES_SEPARATOR",
+    "HPC_NF_EXECUTOR_LOCAL",
+    "HPC_NF_EXECUTOR_SLURM",
+    "HPC_NF_EXECUTORS",
+    "HPC_NF_HEAD_JOB_CPUS",
+    "HPC_NF_HEAD_JOB_RAM",
+    "HPC_OCRD_MODELS_DIR_IN_DOCKER",
+    "HPC_OCRD_PROCESSOR_MODELS",
+    "HPC_OCRD_PROCESSORS_WITHOUT_MODELS",
+    "HPC_PAGE_RANGES_FILE",
     "HPC_PATH_HOME_USERS",
     "HPC_PATH_SCRATCH1_OCR_PROJECT",
-    "HPC_ROOT_BASH_SCRIPT",
+    "HPC_RESULTS_MODE_FULL",
+    "HPC_RESULTS_MODE_NEW",
+    "HPC_RESULTS_MODES",
+    "HPC_RESULTS_REMOVED_FILES_LIST",
+    "HPC_SLURM_ACCOUNTING_FORMAT",
+    "HPC_SLURM_ACCOUNTING_TRIES",
+    "HPC_SLURM_QUERY_TIMEOUT",
+    "HPC_SLURM_STATES_SEPARATOR",
+    "HPC_SSH_CONNECT_TIMEOUT",
     "HPC_SSH_CONNECTION_TRY_TIMES",
+    "HPC_SSH_KEEP_ALIVE_INTERVAL",
+    "HPC_STAGING_MODE_STREAM",
+    "HPC_STAGING_MODE_SYNC",
+    "HPC_STAGING_MODES",
+    "HPC_TRANSFER_CHUNK_SIZE",
     "HPC_TRANSFER_HOSTS",
-    "HPC_TRANSFER_PROXY_HOSTS"
+    "HPC_TRANSFER_MAX_RETRY_SLEEP",
+    "HPC_TRANSFER_MIN_PART_SIZE",
+    "HPC_TRANSFER_MKDIR_BATCH_SIZE",
+    "HPC_TRANSFER_PARALLEL_CHANNELS",
+    "HPC_TRANSFER_PROGRESS_LOG_STEP",
+    "HPC_TRANSFER_PROXY_HOSTS",
+    "HPC_UNPACK_MODE_DOWNLOAD",
+    "HPC_UNPACK_MODE_STREAM",
+    "HPC_UNPACK_MODES"
 ]
 
 # "gwdu103.hpc.gwdg.de" - bad host entry, has no access to /scratch1, but to /scratch2
 HPC_EXECUTOR_HOSTS = ["login-mdc.hpc.gwdg.de", "gwdu101.hpc.gwdg.de", "gwdu102.hpc.gwdg.de"]
 HPC_EXECUTOR_PROXY_HOSTS = ["login.gwdg.de"]
+# Amount of commands executed at the same time over separate channels of the executor transport
+HPC_EXECUTOR_MAX_CONCURRENT_COMMANDS = 8
+# Amount of bytes received at once from the output streams of an executed command
+HPC_EXECUTOR_RECV_SIZE = 32768
 HPC_TRANSFER_HOSTS = ["transfer-scc.gwdg.de", "transfer-mdc.hpc.gwdg.de"]
 HPC_TRANSFER_PROXY_HOSTS = ["transfer.gwdg.de", "login.gwdg.de"]
 HPC_PATH_HOME_USERS = "/home/users"
 HPC_PATH_SCRATCH1_OCR_PROJECT = "/scratch1/projects/project_pwieder_ocr"
-HPC_ROOT_BASH_SCRIPT = "/scratch1/projects/project_pwieder_ocr/invoke_batch_script.sh"
 HPC_DIR_BATCH_SCRIPTS = "batch_scripts"
+# The wrapper of sbatch through which all slurm jobs are submitted, deployed with the batch scripts
+HPC_INVOKE_BATCH_SCRIPT = "invoke_batch_script.sh"
+HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB = "batch_submit_workflow_job.sh"
+HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB_ARRAY = "batch_submit_workflow_job_array.sh"
+# The agent answering the requests of the executor over a JSON-lines protocol, deployed with the batch scripts
+HPC_AGENT_SCRIPT = "operandi_hpc_agent.py"
+# Must match the protocol version of the agent script
+HPC_AGENT_PROTOCOL_VERSION = 2
+HPC_AGENT_PYTHON = "python3"
+# Seconds to wait for the response to a single agent request
+HPC_AGENT_REQUEST_TIMEOUT = 120
+# Amount of sha256 hex digits in the names of the deployed batch script versions
+HPC_BATCH_SCRIPT_VERSION_LENGTH = 16
 HPC_DIR_SLURM_WORKSPACES = "slurm_workspaces"
+# Relative to the slurm workspaces dir, must match the dir used inside the batch script
+HPC_DIR_SYNCED_WORKSPACES = "synced_workspaces"
+# Seconds a sync waits for the batch jobs copying the synced workspace, which hold the `<synced ws dir>.lock`
+HPC_SYNCED_WORKSPACE_LOCK_TIMEOUT = 600
+# Relative to the slurm workspaces dir, holds the manifests mapping the array task indices to workflow jobs
+HPC_DIR_JOB_ARRAY_MANIFESTS = "job_array_manifests"
+# Relative to the workflow job dir, the page range of each fork as `<mets chunk>\t<page ids>` lines,
+# must match the file read by the batch script
+HPC_PAGE_RANGES_FILE = "page_ranges.tsv"
+# Relative to the workflow job dir, the mets chunks are moved from there into the workspace by the batch script
+HPC_DIR_METS_CHUNKS = "mets_chunks"
+# The METS file holding only the pages of the fork with the formatted index
+HPC_METS_CHUNK_NAME = "mets_chunk_{}.xml"
+# Merges the mets chunks back into the main METS in a single pass, shipped next to the chunks in the workflow job dir
+HPC_METS_MERGE_SCRIPT = "merge_mets_chunks.py"
+# Separates the batch script arguments inside a manifest line, must match the separator used by the batch script
+HPC_JOB_ARRAY_MANIFEST_SEPARATOR = "|"
+# Maximum amount of compatible workflow jobs submitted together as a single slurm job array
+HPC_JOB_ARRAY_MAX_SIZE = 100
 
 HPC_JOB_DEADLINE_TIME_REGULAR = "48:00:00"
 HPC_JOB_DEADLINE_TIME_TEST = "0:30:00"
@@ -35,3 +127,121 @@ HPC_JOB_TEST_PARTITION = "medium"
 HPC_JOB_QOS_48H = "48h"
 HPC_JOB_QOS_2H = "2h"
 HPC_SSH_CONNECTION_TRY_TIMES = 30
+# Separates the sacct and the squeue output of the bulk slurm job states query
+HPC_SLURM_STATES_SEPARATOR = "---operandi-squeue---"
+# The sacct fields ingested into the DB once a slurm job has finished, parsed in this order
+HPC_SLURM_ACCOUNTING_FORMAT = "jobid,submit,start,end,elapsedraw,totalcpu,maxrss,reqmem,alloccpus,nodelist"
+# Seconds after which a slurm query, e.g., sacct or squeue, is given up, so that an unresponsive
+# slurm controller does not block the job status polls forever
+HPC_SLURM_QUERY_TIMEOUT = 600
+# Poll cycles in which the accounting of a finished slurm job is queried, since sacct may lag behind the job state
+HPC_SLURM_ACCOUNTING_TRIES = 10
+# Interval in seconds of the keepalive packets sent over the pooled ssh connections
+HPC_SSH_KEEP_ALIVE_INTERVAL = 30
+# Amount of ssh connections per hpc host kept by the connection pool and shared by the connectors
+HPC_CONNECTION_POOL_TRANSPORTS_PER_HOST = 2
+# Timeout in seconds of the tcp connect, the ssh banner, the authentication and the tunnel opening of a connection
+HPC_SSH_CONNECT_TIMEOUT = 15
+# Delay in seconds after which the connection attempt over the next route is started, unless one has succeeded
+HPC_CONNECTION_RACE_STAGGER = 0.25
+# Weight of the latest connection setup time in the moving average latency of a route
+HPC_HOST_STATS_LATENCY_WEIGHT = 0.3
+
+# How the slurm workspace is staged to the HPC
+# stream - the whole slurm workspace zip is streamed to the HPC on each submission
+# sync - only new or changed files of the workspace are uploaded to a per-workspace cache on the HPC
+HPC_STAGING_MODE_STREAM = "stream"
+HPC_STAGING_MODE_SYNC = "sync"
+HPC_STAGING_MODES = [HPC_STAGING_MODE_STREAM, HPC_STAGING_MODE_SYNC]
+
+# The models staged to the computing node, passed to the batch script as the paths relative to the ocrd models dir
+# all - the workflow has unknown model dependencies, all models are staged
+# none - the workflow does not use any models
+HPC_MODEL_DEPENDENCIES_ALL = "*"
+HPC_MODEL_DEPENDENCIES_NONE = "none"
+HPC_MODEL_DEPENDENCIES_SEPARATOR = ","
+# The ocrd models dir is bound to this path inside the ocrd_all image
+HPC_OCRD_MODELS_DIR_IN_DOCKER = "/usr/local/share"
+# The ocrd processors of the workflows not loading any model
+HPC_OCRD_PROCESSORS_WITHOUT_MODELS = [
+    "ocrd-anybaseocr-crop", "ocrd-cis-ocropy-binarize", "ocrd-cis-ocropy-clip", "ocrd-cis-ocropy-denoise",
+    "ocrd-cis-ocropy-deskew", "ocrd-cis-ocropy-dewarp", "ocrd-cis-ocropy-resegment", "ocrd-cis-ocropy-segment",
+    "ocrd-dummy", "ocrd-fileformat-transform", "ocrd-olena-binarize", "ocrd-page-transform",
+    "ocrd-preprocess-image", "ocrd-segment-extract-pages", "ocrd-segment-repair", "ocrd-skimage-binarize",
+    "ocrd-skimage-denoise", "ocrd-skimage-denoise-raw", "ocrd-skimage-normalize"
+]
+# The models loaded by the ocrd processors of the workflows. The model names are read from the parameter,
+# or are the defaults if the parameter is not set or the processor has none. Each model name is placed into
+# the path template, relative to the ocrd models dir. The shared paths are staged whenever the processor is used.
+HPC_OCRD_PROCESSOR_MODELS = {
+    "ocrd-calamari-recognize": {
+        "parameter": "checkpoint_dir", "path": "ocrd-resources/ocrd-calamari-recognize/{}",
+        "defaults": ["qurator-gt4histocr-1.0"], "shared": []},
+    "ocrd-cis-ocropy-recognize": {
+        "parameter": "model", "path": "ocrd-resources/ocrd-cis-ocropy-recognize/{}",
+        "defaults": ["fraktur.pyrnn.gz"], "shared": []},
+    "ocrd-kraken-recognize": {
+        "parameter": "model", "path": "ocrd-resources/ocrd-kraken-recognize/{}",
+        "defaults": ["en_best.mlmodel"], "shared": []},
+    "ocrd-kraken-segment": {
+        "parameter": "model", "path": "ocrd-resources/ocrd-kraken-segment/{}",
+        "defaults": ["blla.mlmodel"], "shared": []},
+    "ocrd-sbb-binarize": {
+        "parameter": "model", "path": "ocrd-resources/ocrd-sbb-binarize/{}",
+        "defaults": ["default"], "shared": []},
+    "ocrd-tesserocr-crop": {
+        "parameter": None, "path": "tessdata/{}.traineddata", "defaults": ["eng", "osd"],
+        "shared": ["tessdata/configs", "tessdata/tessconfigs"]},
+    "ocrd-tesserocr-deskew": {
+        "parameter": None, "path": "tessdata/{}.traineddata", "defaults": ["eng", "osd"],
+        "shared": ["tessdata/configs", "tessdata/tessconfigs"]},
+    "ocrd-tesserocr-recognize": {
+        "parameter": "model", "path": "tessdata/{}.traineddata", "defaults": ["eng"],
+        "shared": ["tessdata/configs", "tessdata/osd.traineddata", "tessdata/tessconfigs"]},
+    "ocrd-tesserocr-segment": {
+        "parameter": None, "path": "tessdata/{}.traineddata", "defaults": ["eng", "osd"],
+        "shared": ["tessdata/configs", "tessdata/tessconfigs"]},
+    "ocrd-tesserocr-segment-line": {
+        "parameter": None, "path": "tessdata/{}.traineddata", "defaults": ["eng", "osd"],
+        "shared": ["tessdata/configs", "tessdata/tessconfigs"]},
+    "ocrd-tesserocr-segment-region": {
+        "parameter": None, "path": "tessdata/{}.traineddata", "defaults": ["eng", "osd"],
+        "shared": ["tessdata/configs", "tessdata/tessconfigs"]},
+    "ocrd-tesserocr-segment-table": {
+        "parameter": None, "path": "tessdata/{}.traineddata", "defaults": ["eng", "osd"],
+        "shared": ["tessdata/configs", "tessdata/tessconfigs"]},
+    "ocrd-tesserocr-segment-word": {
+        "parameter": None, "path": "tessdata/{}.traineddata", "defaults": ["eng", "osd"],
+        "shared": ["tessdata/configs", "tessdata/tessconfigs"]},
+}
+
+# How nextflow executes the processes of a workflow job
+# local - all processes run inside the allocation of the workflow job on a single node
+# slurm - the workflow job only runs the nextflow head, which submits each process fork as its own slurm job
+HPC_NF_EXECUTOR_LOCAL = "local"
+HPC_NF_EXECUTOR_SLURM = "slurm"
+HPC_NF_EXECUTORS = [HPC_NF_EXECUTOR_LOCAL, HPC_NF_EXECUTOR_SLURM]
+# The allocation of the nextflow head job with the slurm executor, the requested cpus and ram go to the process jobs
+HPC_NF_HEAD_JOB_CPUS = 2
+HPC_NF_HEAD_JOB_RAM = 8
+
+# Must match the name used inside the batch script
+HPC_RESULTS_REMOVED_FILES_LIST = ".operandi_removed_files"
+
+# Parallel transfers - amount of sftp sessions, the smallest byte range per session, and the local read/write chunk
+HPC_TRANSFER_PARALLEL_CHANNELS = 4
+HPC_TRANSFER_MIN_PART_SIZE = 32 * 1024 * 1024
+HPC_TRANSFER_CHUNK_SIZE = 1024 * 1024
+# Amount of remote dirs created with a single `mkdir -p` command
+HPC_TRANSFER_MKDIR_BATCH_SIZE = 256
+
+# Resumable downloads - the upper bound of the exponential backoff in secs, and the progress logging step in bytes
+HPC_TRANSFER_MAX_RETRY_SLEEP = 300
+HPC_TRANSFER_PROGRESS_LOG_STEP = 64 * 1024 * 1024
+
+# How the result archives are unpacked from the HPC
+# download - the whole archive is downloaded to the server disk first, then unpacked
+# stream - the archive members are extracted by parallel sftp sessions while being read from the HPC
+HPC_UNPACK_MODE_DOWNLOAD = "download"
+HPC_UNPACK_MODE_STREAM = "stream"
+HPC_UNPACK_MODES = [HPC_UNPACK_MODE_DOWNLOAD, HPC_UNPACK_MODE_STREAM]
@@ -1,14 +1,108 @@
+from codecs import getincrementaldecoder
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
 from logging import getLogger
 from os import environ
+from os.path import dirname, join
+from paramiko import Transport
 from pathlib import Path
-from time import sleep
-from typing import List
+from selectors import DefaultSelector, EVENT_READ
+from shlex import join as shlex_join, quote
+from threading import Lock
+from time import monotonic, sleep
+from re import fullmatch
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from operandi_utils.constants import StateJobSlurm
+from .agent import HPCAgentClient
+from .connection_pool import HPCConnectionPool
 from .connector import HPCConnector
 from .constants import (
-    HPC_EXECUTOR_HOSTS, HPC_EXECUTOR_PROXY_HOSTS, HPC_JOB_DEADLINE_TIME_TEST, HPC_JOB_QOS_48H,
-    HPC_JOB_DEFAULT_PARTITION, HPC_ROOT_BASH_SCRIPT
+    HPC_AGENT_SCRIPT, HPC_DIR_JOB_ARRAY_MANIFESTS, HPC_EXECUTOR_HOSTS,
+    HPC_EXECUTOR_MAX_CONCURRENT_COMMANDS, HPC_EXECUTOR_PROXY_HOSTS, HPC_EXECUTOR_RECV_SIZE, HPC_INVOKE_BATCH_SCRIPT,
+    HPC_JOB_ARRAY_MANIFEST_SEPARATOR, HPC_JOB_ARRAY_MAX_SIZE, HPC_JOB_DEADLINE_TIME_TEST, HPC_JOB_DEFAULT_PARTITION,
+    HPC_JOB_QOS_48H, HPC_NF_EXECUTORS, HPC_NF_EXECUTOR_LOCAL, HPC_NF_EXECUTOR_SLURM, HPC_NF_HEAD_JOB_CPUS,
+    HPC_NF_HEAD_JOB_RAM, HPC_RESULTS_MODE_FULL, HPC_SLURM_ACCOUNTING_FORMAT,
+    HPC_SLURM_QUERY_TIMEOUT, HPC_SLURM_STATES_SEPARATOR
 )
+from .model_dependencies import format_model_dependencies
+
+
+def expand_slurm_array_job_id(slurm_job_id: str) -> List[str]:
+    """
+    Expands the collapsed id of not yet started array tasks, e.g., `123_[0-2,5%4]`, to the ids of the single
+    array tasks, i.e., `123_0`, `123_1`, `123_2`, `123_5`. Any other slurm job id is returned unchanged.
+    """
+    collapsed_id = fullmatch(r"(\d+)_\[([0-9,\-]+)(%\d+)?\]", slurm_job_id)
+    if not collapsed_id:
+        return [slurm_job_id]
+    array_job_id, task_ranges = collapsed_id.group(1), collapsed_id.group(2)
+    slurm_job_ids = []
+    for task_range in task_ranges.split(','):
+        first_task, _, last_task = task_range.partition('-')
+        for task_index in range(int(first_task), int(last_task or first_task) + 1):
+            slurm_job_ids.append(f"{array_job_id}_{task_index}")
+    return slurm_job_ids
+
+
+def parse_slurm_duration(duration: str) -> Optional[float]:
+    """
+    Parses a slurm duration of the format `[DD-[HH:]]MM:SS[.mmm]`, e.g., the `TotalCPU` of sacct, to seconds.
+    """
+    matched = fullmatch(r"(?:(\d+)-)?(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)", duration.strip())
+    if not matched:
+        return None
+    days, hours, minutes, seconds = matched.groups()
+    return int(days or 0) * 86400 + int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def parse_slurm_memory(memory: str) -> Optional[int]:
+    """
+    Parses a slurm memory size, e.g., the `MaxRSS` or `ReqMem` of sacct, to bytes. Sizes without a unit are
+    in KiB for `MaxRSS` and in MiB for `ReqMem`, hence the unit must be passed along by the caller for those.
+    The per node `n` or per cpu `c` suffix of older slurm versions is ignored.
+    """
+    matched = fullmatch(r"(\d+(?:\.\d+)?)([KMGTP])[nc]?", memory.strip())
+    if not matched:
+        return None
+    exponent = "KMGTP".index(matched.group(2)) + 1
+    return int(float(matched.group(1)) * 1024 ** exponent)
+
+
+def parse_slurm_time(slurm_time: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(slurm_time.strip())
+    except ValueError:
+        # E.g., `Unknown` for the start or end time of a not yet started job
+        return None
+
+
+class _LinesCollector:
+    """
+    Decodes the received bytes incrementally and collects the complete lines, including their line ends.
+    Each complete line is passed to the callback as soon as it is received.
+    """
+    def __init__(self, callback: Optional[Callable[[str], None]] = None):
+        self._decoder = getincrementaldecoder("utf-8")(errors="replace")
+        self._callback = callback
+        self._partial_line = ""
+        self.lines: List[str] = []
+
+    def feed(self, data: bytes) -> None:
+        *lines, self._partial_line = (self._partial_line + self._decoder.decode(data)).split("\n")
+        for line in lines:
+            self._add_line(f"{line}\n")
+
+    def finish(self) -> List[str]:
+        last_line = self._partial_line + self._decoder.decode(b"", final=True)
+        if last_line:
+            self._add_line(last_line)
+        self._partial_line = ""
+        return self.lines
+
+    def _add_line(self, line: str) -> None:
+        self.lines.append(line)
+        if self._callback:
+            self._callback(line)
 
 
 class HPCExecutor(HPCConnector):
@@ -19,88 +113,302 @@ class HPCExecutor(HPCConnector):
         project_username: str = environ.get("OPERANDI_HPC_PROJECT_USERNAME", None),
         key_path: str = environ.get("OPERANDI_HPC_SSH_KEYPATH", None),
         project_name: str = environ.get("OPERANDI_HPC_PROJECT_NAME", None),
-        tunnel_host: str = 'localhost', tunnel_port: int = 0
+        tunnel_host: str = 'localhost', tunnel_port: int = 0, connection_pool: HPCConnectionPool = None
     ) -> None:
         super().__init__(
             hpc_hosts=executor_hosts, proxy_hosts=proxy_hosts, project_name=project_name,
             log=getLogger("operandi_utils.hpc.executor"), username=username, project_username=project_username,
-            key_path=Path(key_path), key_pass=None, tunnel_host=tunnel_host, tunnel_port=tunnel_port)
+            key_path=Path(key_path), key_pass=None, tunnel_host=tunnel_host, tunnel_port=tunnel_port,
+            connection_pool=connection_pool)
+        # Created on the first asynchronously executed command
+        self._commands_pool: Optional[ThreadPoolExecutor] = None
+        self._commands_pool_lock = Lock()
+        # The optional agent answering requests without starting a login shell per command
+        self._agent: Optional[HPCAgentClient] = None
+        self._agent_script_path: Optional[str] = None
+        # The deployed wrapper of sbatch, set by `use_deployed_batch_scripts`, required for submitting slurm jobs
+        self.invoke_batch_script_path: Optional[str] = None
+
+    def use_deployed_batch_scripts(self, batch_scripts: Dict[str, str], start_agent: bool = False) -> None:
+        """
+        Submits the slurm jobs through the deployed version of the invoke batch script, `batch_scripts` maps the
+        batch script ids to their HPC paths as returned by `HPCTransfer.deploy_batch_scripts`. With `start_agent`
+        the deployed agent is started as well, if that fails, commands are executed instead.
+        """
+        self.invoke_batch_script_path = batch_scripts[HPC_INVOKE_BATCH_SCRIPT]
+        if not start_agent:
+            return
+        try:
+            self.start_agent(agent_script_path=batch_scripts[HPC_AGENT_SCRIPT])
+            self.log.info("HPC agent started.")
+        except Exception as error:
+            self.log.warning(f"Failed to start the HPC agent, executing commands instead: {error}")
+
+    def start_agent(self, agent_script_path: str) -> None:
+        """
+        Starts the deployed agent script on the hpc front end. Afterwards, slurm jobs are submitted and queried
+        through the agent. The agent is restarted if the connection was recreated, without a running agent
+        the executor falls back to executing commands.
+        """
+        self.reconnect_if_required()
+        self.stop_agent()
+        self._agent = HPCAgentClient(
+            transport=self.ssh_hpc_client.get_transport(), agent_script_path=agent_script_path,
+            root_dir=self.project_root_dir)
+        self._agent_script_path = agent_script_path
+
+    def stop_agent(self) -> None:
+        if self._agent:
+            self._agent.close()
+            self._agent = None
+
+    def _get_agent(self) -> Optional[HPCAgentClient]:
+        if not self._agent_script_path:
+            return None
+        if self._agent and self._agent.is_alive:
+            return self._agent
+        self.log.warning("The hpc agent is not running, restarting it")
+        try:
+            self.start_agent(agent_script_path=self._agent_script_path)
+        except Exception as error:
+            self.log.error(f"Failed to restart the hpc agent, falling back to commands: {error}")
+            self._agent = None
+        return self._agent
 
     # Execute blocking commands and wait for an output and return code
     def execute_blocking(self, command, timeout=None, environment=None):
+        return self.execute_async(command=command, timeout=timeout, environment=environment).result()
+
+    def execute_async(
+        self, command: str, timeout: Optional[float] = None, environment: Dict[str, str] = None,
+        on_stdout: Callable[[str], None] = None, on_stderr: Callable[[str], None] = None
+    ) -> Future:
+        """
+        Executes the command over its own channel of the hpc transport and returns a future of the
+        (output lines, error lines, return code) tuple, the same as returned by `execute_blocking`.
+        Many commands can be in flight at the same time over separate channels of the same transport.
+        The output is received as soon as the channel signals new data, each completed line
+        is passed to the optional `on_stdout` and `on_stderr` callbacks while the command is still running.
+        The future raises a `TimeoutError` once the command runs longer than `timeout` secs, `None` waits forever.
+        """
         self.reconnect_if_required()
-        stdin, stdout, stderr = self.ssh_hpc_client.exec_command(
-            command=command, timeout=timeout, environment=environment)
+        transport = self.ssh_hpc_client.get_transport()
+        with self._commands_pool_lock:
+            if not self._commands_pool:
+                self._commands_pool = ThreadPoolExecutor(
+                    max_workers=HPC_EXECUTOR_MAX_CONCURRENT_COMMANDS, thread_name_prefix="hpc_executor_command")
+        return self._commands_pool.submit(
+            self._execute_on_channel, transport, command, timeout, environment, on_stdout, on_stderr)
 
-        # TODO: Not satisfied with this but fast conversion from
-        #  SSHLibrary to Paramiko is needed for testing
-        while not stdout.channel.exit_status_ready():
-            sleep(1)
-            continue
+    def execute_many(
+        self, commands: List[str], timeout: Optional[float] = None
+    ) -> List[Tuple[List[str], List[str], int]]:
+        """
+        Executes the commands concurrently and returns their results in the order of the commands.
+        """
+        futures = [self.execute_async(command=command, timeout=timeout) for command in commands]
+        return [future.result() for future in futures]
 
-        output = stdout.readlines()
-        err = stderr.readlines()
-        return_code = stdout.channel.recv_exit_status()
-        return output, err, return_code
+    def _execute_on_channel(
+        self, transport: Transport, command: str, timeout: Optional[float], environment: Optional[Dict[str, str]],
+        on_stdout: Optional[Callable[[str], None]], on_stderr: Optional[Callable[[str], None]]
+    ) -> Tuple[List[str], List[str], int]:
+        channel = transport.open_session(timeout=timeout)
+        try:
+            if environment:
+                channel.update_environment(environment)
+            channel.exec_command(command)
+            stdout_lines = _LinesCollector(callback=on_stdout)
+            stderr_lines = _LinesCollector(callback=on_stderr)
+            deadline = monotonic() + timeout if timeout else None
+            with DefaultSelector() as selector:
+                # The channel signals readability on new stdout or stderr data and when it is closed
+                selector.register(channel, EVENT_READ)
+                while True:
+                    while channel.recv_ready():
+                        stdout_lines.feed(channel.recv(HPC_EXECUTOR_RECV_SIZE))
+                    while channel.recv_stderr_ready():
+                        stderr_lines.feed(channel.recv_stderr(HPC_EXECUTOR_RECV_SIZE))
+                    if channel.eof_received or channel.closed:
+                        break
+                    wait_time = None
+                    if deadline:
+                        wait_time = deadline - monotonic()
+                        if wait_time <= 0:
+                            raise TimeoutError(f"Command timed out after {timeout} secs: {command}")
+                    selector.select(timeout=wait_time)
+            return_code = channel.recv_exit_status()
+            # Data received together with the end of file, may exceed a single receive
+            while channel.recv_ready():
+                stdout_lines.feed(channel.recv(HPC_EXECUTOR_RECV_SIZE))
+            while channel.recv_stderr_ready():
+                stderr_lines.feed(channel.recv_stderr(HPC_EXECUTOR_RECV_SIZE))
+            return stdout_lines.finish(), stderr_lines.finish(), return_code
+        finally:
+            channel.close()
 
     def trigger_slurm_job(
         self, batch_script_path: str, workflow_job_id: str, nextflow_script_path: str, input_file_grp: str,
         workspace_id: str, mets_basename: str, nf_process_forks: int, ws_pages_amount: int, use_mets_server: bool,
         file_groups_to_remove: str, cpus: int = 2, ram: int = 8, job_deadline_time: str = HPC_JOB_DEADLINE_TIME_TEST,
-        partition: str = HPC_JOB_DEFAULT_PARTITION, qos: str = HPC_JOB_QOS_48H
+        partition: str = HPC_JOB_DEFAULT_PARTITION, qos: str = HPC_JOB_QOS_48H,
+        results_mode: str = HPC_RESULTS_MODE_FULL, model_dependencies: Optional[List[str]] = None,
+        nf_executor: str = HPC_NF_EXECUTOR_LOCAL
+    ) -> str:
+        batch_script_args = self._workflow_job_batch_script_args(
+            workflow_job_id=workflow_job_id, nextflow_script_path=nextflow_script_path, input_file_grp=input_file_grp,
+            workspace_id=workspace_id, mets_basename=mets_basename, nf_process_forks=nf_process_forks,
+            ws_pages_amount=ws_pages_amount, use_mets_server=use_mets_server,
+            file_groups_to_remove=file_groups_to_remove, cpus=cpus, ram=ram, results_mode=results_mode,
+            model_dependencies=model_dependencies, nf_executor=nf_executor)
+        cpus, ram = self._workflow_job_allocation(cpus=cpus, ram=ram, nf_executor=nf_executor)
+        slurm_job_id = self._submit_through_invoke_batch_script(invoke_args=self._invoke_batch_script_args(
+            partition=partition, job_deadline_time=job_deadline_time, output_file="slurm-job-%J.txt", cpus=cpus,
+            ram=ram, qos=qos, sbatch_options=[], batch_script_path=batch_script_path,
+            batch_script_args=batch_script_args))
+        self.log.info(f"Slurm job id: {slurm_job_id}")
+        return slurm_job_id
+
+    def trigger_slurm_job_array(
+        self, array_batch_script_path: str, batch_script_path: str, workflow_jobs: List[Dict[str, Any]],
+        cpus: int = 2, ram: int = 8, job_deadline_time: str = HPC_JOB_DEADLINE_TIME_TEST,
+        partition: str = HPC_JOB_DEFAULT_PARTITION, qos: str = HPC_JOB_QOS_48H,
+        results_mode: str = HPC_RESULTS_MODE_FULL, nf_executor: str = HPC_NF_EXECUTOR_LOCAL
+    ) -> List[str]:
+        """
+        Submits workflow jobs with the same slurm resources as a single slurm job array with one `sbatch` call.
+        Each entry of `workflow_jobs` holds the workflow job specific keyword arguments of `trigger_slurm_job`.
+        The manifest, whose line N holds the batch script arguments of the workflow job of array task N-1, is
+        written in the same round trip. Returns the slurm job ids of the array tasks, i.e., `<array id>_<index>`,
+        in the order of `workflow_jobs`.
+        """
+        if not workflow_jobs:
+            raise ValueError("No workflow jobs to submit as a slurm job array")
+        if len(workflow_jobs) > HPC_JOB_ARRAY_MAX_SIZE:
+            raise ValueError(
+                f"Too many workflow jobs for a slurm job array: {len(workflow_jobs)}, max: {HPC_JOB_ARRAY_MAX_SIZE}")
+        manifest_lines = []
+        for workflow_job in workflow_jobs:
+            batch_script_args = self._workflow_job_batch_script_args(
+                cpus=cpus, ram=ram, results_mode=results_mode, nf_executor=nf_executor, **workflow_job)
+            for batch_script_arg in batch_script_args:
+                if HPC_JOB_ARRAY_MANIFEST_SEPARATOR in batch_script_arg or "\n" in batch_script_arg:
+                    raise ValueError(f"Invalid manifest value of workflow job {workflow_job['workflow_job_id']}: "
+                                     f"{batch_script_arg}")
+            manifest_lines.append(HPC_JOB_ARRAY_MANIFEST_SEPARATOR.join(batch_script_args))
+        cpus, ram = self._workflow_job_allocation(cpus=cpus, ram=ram, nf_executor=nf_executor)
+
+        manifest_path = join(
+            self.slurm_workspaces_dir, HPC_DIR_JOB_ARRAY_MANIFESTS, f"{workflow_jobs[0]['workflow_job_id']}.txt")
+        self.log.info(f"About to submit a slurm job array of {len(workflow_jobs)} workflow jobs")
+        array_job_id = self._submit_through_invoke_batch_script(
+            invoke_args=self._invoke_batch_script_args(
+                partition=partition, job_deadline_time=job_deadline_time, output_file="slurm-job-%A_%a.txt",
+                cpus=cpus, ram=ram, qos=qos, sbatch_options=[f"--array=0-{len(workflow_jobs) - 1}"],
+                batch_script_path=array_batch_script_path, batch_script_args=[batch_script_path, manifest_path]),
+            manifest_path=manifest_path, manifest_lines=manifest_lines)
+        slurm_job_ids = [f"{array_job_id}_{task_index}" for task_index in range(len(workflow_jobs))]
+        self.log.info(f"Slurm job array id: {array_job_id}, manifest: {manifest_path}")
+        return slurm_job_ids
+
+    def _invoke_batch_script_args(
+        self, partition: str, job_deadline_time: str, output_file: str, cpus: int, ram: int, qos: str,
+        sbatch_options: List[str], batch_script_path: str, batch_script_args: List[str]
+    ) -> List[str]:
+        """
+        Returns the arguments of the invoke batch script, i.e., the slurm parameters followed by further sbatch
+        options, the batch script path and the arguments of the batch script.
+        """
+        return [
+            partition, job_deadline_time, f"{self.project_root_dir}/{output_file}", str(cpus), f"{ram}G", qos,
+            "--parsable", *sbatch_options, batch_script_path, *batch_script_args
+        ]
+
+    def _submit_through_invoke_batch_script(
+        self, invoke_args: List[str], manifest_path: str = None, manifest_lines: List[str] = None
     ) -> str:
+        """
+        Submits a slurm job through the invoke batch script, over the agent if it is running, and returns its
+        slurm job id. The optional manifest is written in the same round trip, right before the submission.
+        """
+        if not self.invoke_batch_script_path:
+            raise RuntimeError(
+                "The invoke batch script is not deployed, call `use_deployed_batch_scripts` with the batch scripts "
+                "returned by `HPCTransfer.deploy_batch_scripts` before submitting slurm jobs")
+        agent = self._get_agent()
+        if agent:
+            manifest = {"path": manifest_path, "lines": manifest_lines} if manifest_path else None
+            return agent.request(
+                "submit", invoke_script=self.invoke_batch_script_path, invoke_args=invoke_args,
+                manifest=manifest)["slurm_job_id"]
+
+        # Quoted, so that an empty value, e.g., no file groups to remove, does not shift the following arguments.
+        # Executed with bash, hence the deployed version does not need the executable bit
+        command = f"bash {quote(self.invoke_batch_script_path)} {shlex_join(invoke_args)}"
+        if manifest_path:
+            write_manifest_command = (
+                f"mkdir -p {quote(dirname(manifest_path))} && "
+                f"printf '%s\\n' {' '.join(quote(manifest_line) for manifest_line in manifest_lines)} "
+                f"> {quote(manifest_path)}")
+            command = f"bash -lc {quote(f'{write_manifest_command} && {command}')}"
+        self.log.info(f"About to execute a blocking command: {command}")
+        output, err, return_code = self.execute_blocking(command)
+        self.log.info(f"Command output: {output}")
+        self.log.info(f"Command err: {err}")
+        self.log.info(f"Command return code: {return_code}")
+        # The parsable output is `<job id>` or `<job id>;<cluster>`
+        output_lines = [line.strip() for line in output if line.strip()]
+        slurm_job_id = output_lines[-1].split(';')[0] if output_lines else ""
+        if return_code != 0 or not slurm_job_id.isdigit():
+            raise RuntimeError(f"Submitting the slurm job has failed, return code: {return_code}, err: {err}")
+        return slurm_job_id
+
+    def _workflow_job_batch_script_args(
+        self, workflow_job_id: str, nextflow_script_path: str, input_file_grp: str, workspace_id: str,
+        mets_basename: str, nf_process_forks: int, ws_pages_amount: int, use_mets_server: bool,
+        file_groups_to_remove: str, cpus: int, ram: int, results_mode: str,
+        model_dependencies: Optional[List[str]] = None, nf_executor: str = HPC_NF_EXECUTOR_LOCAL
+    ) -> List[str]:
+        """
+        Returns the arguments of the batch script submitting a single workflow job, in the order of the batch script.
+        """
+        if nf_executor not in HPC_NF_EXECUTORS:
+            raise ValueError(f"Invalid nextflow executor: {nf_executor}, must be one of: {HPC_NF_EXECUTORS}")
         if ws_pages_amount < nf_process_forks:
             self.log.warning(
                     "The amount of workspace pages is less than the amount of requested Nextflow process forks. "
                     f"The pages amount: {ws_pages_amount}, forks requested: {nf_process_forks}. "
                     f"Setting the forks value to the value of amount of pages.")
             nf_process_forks = ws_pages_amount
-
         nextflow_script_id = nextflow_script_path.split('/')[-1]
         use_mets_server_bash_flag = "true" if use_mets_server else "false"
-        
-        command = f"{HPC_ROOT_BASH_SCRIPT}"
-
-        # SBATCH arguments passed to the batch script
-        command += f" {partition}"
-        command += f" {job_deadline_time}"
-        command += f" {self.project_root_dir}/slurm-job-%J.txt"
-        command += f" {cpus}"
-        command += f" {ram}G"
-        command += f" {qos}"
-
-        # Regular arguments passed to the batch script
-        command += f" {batch_script_path}"
-        command += f" {self.slurm_workspaces_dir}"
-        command += f" {workflow_job_id}"
-        command += f" {nextflow_script_id}"
-        command += f" {input_file_grp}"
-        command += f" {workspace_id}"
-        command += f" {mets_basename}"
-        command += f" {cpus}"
-        command += f" {ram}"
-        command += f" {nf_process_forks}"
-        command += f" {ws_pages_amount}"
-        command += f" {use_mets_server_bash_flag}"
-        command += f" {file_groups_to_remove}"
+        return [
+            self.slurm_workspaces_dir, workflow_job_id, nextflow_script_id, input_file_grp, workspace_id, mets_basename,
+            str(cpus), str(ram), str(nf_process_forks), str(ws_pages_amount), use_mets_server_bash_flag,
+            file_groups_to_remove, results_mode, format_model_dependencies(model_dependencies), nf_executor
+        ]
 
-        self.log.info(f"About to execute a blocking command: {command}")
-        output, err, return_code = self.execute_blocking(command)
-        self.log.info(f"Command output: {output}")
-        self.log.info(f"Command err: {err}")
-        self.log.info(f"Command return code: {return_code}")
-        slurm_job_id = output[0].strip('\n').split(' ')[-1]
-        self.log.info(f"Slurm job id: {slurm_job_id}")
-        assert int(slurm_job_id)
-        return slurm_job_id
+    @staticmethod
+    def _workflow_job_allocation(cpus: int, ram: int, nf_executor: str) -> Tuple[int, int]:
+        """
+        Returns the cpus and the ram allocated to the slurm job of a workflow job. With the slurm executor of
+        nextflow the requested resources are allocated by the process jobs, the workflow job only runs the head.
+        """
+        if nf_executor == HPC_NF_EXECUTOR_SLURM:
+            return HPC_NF_HEAD_JOB_CPUS, HPC_NF_HEAD_JOB_RAM
+        return cpus, ram
 
     def check_slurm_job_state(self, slurm_job_id: str, tries: int = 10, wait_time: int = 2) -> str:
+        if self._get_agent():
+            slurm_job_state = self.check_slurm_job_states(slurm_job_ids=[slurm_job_id])[slurm_job_id]
+            if slurm_job_state:
+                return slurm_job_state
         command = f"bash -lc 'sacct -j {slurm_job_id} --format=jobid,state,exitcode'"
         slurm_job_state = None
 
         while not slurm_job_state and tries > 0:
             self.log.info(f"About to execute a blocking command: {command}")
-            output, err, return_code = self.execute_blocking(command)
+            output, err, return_code = self.execute_blocking(command, timeout=HPC_SLURM_QUERY_TIMEOUT)
             self.log.info(f"Command output: {output}")
             self.log.info(f"Command err: {err}")
             self.log.info(f"Command return code: {return_code}")
@@ -125,6 +433,136 @@ class HPCExecutor(HPCConnector):
         self.log.info(f"Slurm job state of {slurm_job_id}: {slurm_job_state}")
         return slurm_job_state
 
+    def check_slurm_job_states(self, slurm_job_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Gets the states of any amount of slurm jobs in a single round trip. The states are taken from
+        sacct, jobs not listed by sacct yet, e.g., just submitted pending jobs, are looked up in squeue.
+        Jobs listed by neither of both are mapped to None.
+        """
+        slurm_job_states = {slurm_job_id: None for slurm_job_id in slurm_job_ids}
+        if not slurm_job_ids:
+            return slurm_job_states
+        agent = self._get_agent()
+        if agent:
+            try:
+                agent_output = agent.request("state", slurm_job_ids=slurm_job_ids)
+                self._parse_slurm_job_states(
+                    slurm_job_states=slurm_job_states, sacct_lines=agent_output["sacct"],
+                    squeue_lines=agent_output["squeue"])
+                self.log.info(f"Slurm job states: {slurm_job_states}")
+                return slurm_job_states
+            except Exception as error:
+                self.log.warning(f"Querying the slurm job states over the agent has failed: {error}")
+        job_ids = ','.join(slurm_job_ids)
+        bash_command = (
+            f"sacct --parsable2 --noheader --format=jobid,state -j {job_ids}; "
+            f"echo {HPC_SLURM_STATES_SEPARATOR}; "
+            f"squeue --array --noheader --format='%i|%T' --user=$USER")
+        command = f"bash -lc {quote(bash_command)}"
+        self.log.info(f"About to execute a blocking command: {command}")
+        output, err, return_code = self.execute_blocking(command, timeout=HPC_SLURM_QUERY_TIMEOUT)
+        if err:
+            self.log.warning(f"Command err: {err}")
+        sacct_lines, squeue_lines = output, []
+        if f"{HPC_SLURM_STATES_SEPARATOR}\n" in output:
+            separator_index = output.index(f"{HPC_SLURM_STATES_SEPARATOR}\n")
+            sacct_lines, squeue_lines = output[:separator_index], output[separator_index + 1:]
+        self._parse_slurm_job_states(
+            slurm_job_states=slurm_job_states, sacct_lines=sacct_lines, squeue_lines=squeue_lines)
+        self.log.info(f"Slurm job states: {slurm_job_states}")
+        return slurm_job_states
+
+    @staticmethod
+    def _parse_slurm_job_states(
+        slurm_job_states: Dict[str, Optional[str]], sacct_lines: List[str], squeue_lines: List[str]
+    ) -> None:
+        for squeue_listed, lines in ((False, sacct_lines), (True, squeue_lines)):
+            for line in lines:
+                fields = line.strip().split('|')
+                if len(fields) < 2:
+                    continue
+                # Job steps, e.g., `<id>.batch`, are listed as separate lines and skipped
+                slurm_job_state = fields[1].split(' ')[0]
+                # Not yet started array tasks are listed by sacct under a single collapsed id
+                for slurm_job_id in expand_slurm_array_job_id(fields[0]):
+                    if slurm_job_id not in slurm_job_states:
+                        continue
+                    if squeue_listed and slurm_job_states[slurm_job_id]:
+                        continue
+                    slurm_job_states[slurm_job_id] = slurm_job_state
+
+    def get_slurm_jobs_accounting(self, slurm_job_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Gets the accounting data of any amount of slurm jobs in a single round trip. The returned dicts are keyed
+        by the accounting fields of `DBHPCSlurmJob`, jobs not listed by sacct are mapped to None.
+        """
+        if not slurm_job_ids:
+            return {}
+        agent = self._get_agent()
+        if agent:
+            try:
+                agent_output = agent.request(
+                    "accounting", slurm_job_ids=slurm_job_ids, format=HPC_SLURM_ACCOUNTING_FORMAT)
+                return self._parse_slurm_jobs_accounting(
+                    slurm_job_ids=slurm_job_ids, sacct_lines=agent_output["sacct"])
+            except Exception as error:
+                self.log.warning(f"Querying the slurm jobs accounting over the agent has failed: {error}")
+        bash_command = (
+            f"sacct --parsable2 --noheader --format={HPC_SLURM_ACCOUNTING_FORMAT} -j {','.join(slurm_job_ids)}")
+        command = f"bash -lc {quote(bash_command)}"
+        self.log.info(f"About to execute a blocking command: {command}")
+        output, err, return_code = self.execute_blocking(command, timeout=HPC_SLURM_QUERY_TIMEOUT)
+        if err:
+            self.log.warning(f"Command err: {err}")
+        return self._parse_slurm_jobs_accounting(slurm_job_ids=slurm_job_ids, sacct_lines=output)
+
+    @staticmethod
+    def _parse_slurm_jobs_accounting(
+        slurm_job_ids: List[str], sacct_lines: List[str]
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        slurm_jobs_accounting = {slurm_job_id: None for slurm_job_id in slurm_job_ids}
+        steps_accounting = {slurm_job_id: {"max_rss": None, "total_cpu": 0.0} for slurm_job_id in slurm_job_ids}
+        for line in sacct_lines:
+            fields = line.rstrip("\n").split('|')
+            if len(fields) != len(HPC_SLURM_ACCOUNTING_FORMAT.split(',')):
+                continue
+            job_id, submit, start, end, elapsed, total_cpu, max_rss, req_mem, alloc_cpus, node_list = fields
+            slurm_job_id, _, step = job_id.partition('.')
+            if slurm_job_id not in slurm_jobs_accounting:
+                continue
+            if step:
+                # The memory usage is only listed for the steps, e.g., `<id>.batch` and `<id>.extern`
+                step_max_rss = parse_slurm_memory(max_rss if max_rss[-1:].isalpha() else f"{max_rss}K")
+                step_accounting = steps_accounting[slurm_job_id]
+                if step_max_rss is not None:
+                    step_accounting["max_rss"] = max(step_accounting["max_rss"] or 0, step_max_rss)
+                step_accounting["total_cpu"] += parse_slurm_duration(total_cpu) or 0.0
+                continue
+            alloc_cpus = int(alloc_cpus) if alloc_cpus.isdigit() else None
+            hpc_req_mem = parse_slurm_memory(req_mem if req_mem[-1:].isalpha() else f"{req_mem}M")
+            if hpc_req_mem is not None and req_mem.endswith('c') and alloc_cpus:
+                hpc_req_mem *= alloc_cpus
+            slurm_jobs_accounting[slurm_job_id] = {
+                "hpc_submit_time": parse_slurm_time(submit),
+                "hpc_start_time": parse_slurm_time(start),
+                "hpc_end_time": parse_slurm_time(end),
+                "hpc_elapsed": int(elapsed) if elapsed.isdigit() else None,
+                "hpc_total_cpu": parse_slurm_duration(total_cpu),
+                "hpc_max_rss": None,
+                "hpc_req_mem": hpc_req_mem,
+                "hpc_alloc_cpus": alloc_cpus,
+                "hpc_node_list": node_list if node_list and node_list != "None assigned" else None
+            }
+        for slurm_job_id, slurm_job_accounting in slurm_jobs_accounting.items():
+            if not slurm_job_accounting:
+                continue
+            step_accounting = steps_accounting[slurm_job_id]
+            slurm_job_accounting["hpc_max_rss"] = step_accounting["max_rss"]
+            # Older slurm versions do not sum up the cpu time of the steps for the job itself
+            if not slurm_job_accounting["hpc_total_cpu"]:
+                slurm_job_accounting["hpc_total_cpu"] = step_accounting["total_cpu"]
+        return slurm_jobs_accounting
+
     def poll_till_end_slurm_job_state(self, slurm_job_id: str, interval: int = 5, timeout: int = 300) -> bool:
         self.log.info(f"Polling slurm job status till end")
         tries_left = timeout/interval
@@ -0,0 +1,76 @@
+from logging import getLogger
+from os import getpid
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from .constants import HPC_HOST_STATS_LATENCY_WEIGHT
+
+
+class HPCHostStats:
+    """
+    Remembers the connection latency and the failures of each route, i.e., a pair of proxy host and hpc host.
+    The routes are ranked by these statistics before racing the connection attempts, so reconnects
+    try the fastest known route first and routes over dead hosts last.
+    """
+    def __init__(self, latency_weight: float = HPC_HOST_STATS_LATENCY_WEIGHT) -> None:
+        self.log = getLogger("operandi_utils.hpc.host_stats")
+        self.latency_weight = latency_weight
+        self._lock = Lock()
+        self._routes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def _get_route(self, proxy_host: str, hpc_host: str) -> Dict[str, Any]:
+        return self._routes.setdefault((proxy_host, hpc_host), {
+            "attempts": 0, "failures": 0, "consecutive_failures": 0, "latency": None})
+
+    def record_success(self, proxy_host: str, hpc_host: str, latency: float) -> None:
+        with self._lock:
+            route = self._get_route(proxy_host, hpc_host)
+            route["attempts"] += 1
+            route["consecutive_failures"] = 0
+            # Exponentially weighted moving average of the connection setup time in seconds
+            if route["latency"] is None:
+                route["latency"] = latency
+            else:
+                route["latency"] += self.latency_weight * (latency - route["latency"])
+        self.log.debug(f"Connected to hpc host: {hpc_host}, over proxy host: {proxy_host}, in {latency:.3f} secs")
+
+    def record_failure(self, proxy_host: str, hpc_host: str) -> None:
+        with self._lock:
+            route = self._get_route(proxy_host, hpc_host)
+            route["attempts"] += 1
+            route["failures"] += 1
+            route["consecutive_failures"] += 1
+
+    def rank_routes(self, proxy_hosts: List[str], hpc_hosts: List[str]) -> List[Tuple[str, str]]:
+        """
+        Returns all routes ordered by their consecutive failures and then by their latency.
+        Routes without a known latency keep the configured order and are ranked after the routes with one.
+        """
+        routes = [(proxy_host, hpc_host) for proxy_host in proxy_hosts for hpc_host in hpc_hosts]
+        with self._lock:
+            route_stats = {route: dict(self._routes.get(route, {})) for route in routes}
+
+        def rank_key(route: Tuple[str, str]):
+            stats = route_stats[route]
+            latency = stats.get("latency", None)
+            return stats.get("consecutive_failures", 0), latency is None, latency or 0.0
+        return sorted(routes, key=rank_key)
+
+    def get_stats(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        with self._lock:
+            return {route: dict(stats) for route, stats in self._routes.items()}
+
+
+_host_stats: Optional[HPCHostStats] = None
+_host_stats_pid: Optional[int] = None
+
+
+def get_hpc_host_stats() -> HPCHostStats:
+    """
+    Returns the host statistics of the current process, shared by all connectors of the process.
+    """
+    global _host_stats, _host_stats_pid
+    if not _host_stats or _host_stats_pid != getpid():
+        _host_stats = HPCHostStats()
+        _host_stats_pid = getpid()
+    return _host_stats
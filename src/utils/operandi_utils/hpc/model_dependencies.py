@@ -0,0 +1,97 @@
+from json import loads
+from re import compile as re_compile
+from shlex import split
+from typing import Dict, List, Optional
+
+from .constants import (
+    HPC_MODEL_DEPENDENCIES_ALL, HPC_MODEL_DEPENDENCIES_NONE, HPC_MODEL_DEPENDENCIES_SEPARATOR,
+    HPC_OCRD_MODELS_DIR_IN_DOCKER, HPC_OCRD_PROCESSOR_MODELS, HPC_OCRD_PROCESSORS_WITHOUT_MODELS)
+
+# An ocrd processor call and the rest of its command line, the `ocrd` cli itself does not load models
+_OCRD_PROCESSOR_CALL = re_compile(r"(?<![\w-])(ocrd-[a-z0-9-]+)(.*)$")
+
+
+def _parse_processor_parameters(arguments: str) -> Optional[Dict[str, str]]:
+    """
+    Returns the parameters passed with `-P <name> <value>` and `-p '<json>'`, None if they cannot be determined.
+    """
+    try:
+        tokens = split(arguments)
+    except ValueError:
+        return None
+    parameters = {}
+    for index, token in enumerate(tokens[:-1]):
+        if token == "-P" and index + 2 < len(tokens):
+            parameters[tokens[index + 1]] = tokens[index + 2]
+        elif token == "-p":
+            # A parameter file is not available when analysing the workflow
+            if not tokens[index + 1].startswith("{"):
+                return None
+            try:
+                parameters.update(loads(tokens[index + 1]))
+            except ValueError:
+                return None
+    return parameters
+
+
+def _resolve_processor_models(processor: str, arguments: str) -> Optional[List[str]]:
+    if processor in HPC_OCRD_PROCESSORS_WITHOUT_MODELS:
+        return []
+    if processor not in HPC_OCRD_PROCESSOR_MODELS:
+        return None
+    processor_models = HPC_OCRD_PROCESSOR_MODELS[processor]
+    model_names = processor_models["defaults"]
+    if processor_models["parameter"]:
+        parameters = _parse_processor_parameters(arguments)
+        if parameters is None:
+            return None
+        if processor_models["parameter"] in parameters:
+            model_names = str(parameters[processor_models["parameter"]]).split("+")
+    model_paths = list(processor_models["shared"])
+    for model_name in model_names:
+        # Values resolved at run time, e.g., nextflow params, cannot be analysed
+        if "$" in model_name:
+            return None
+        if model_name.startswith(f"{HPC_OCRD_MODELS_DIR_IN_DOCKER}/"):
+            model_paths.append(model_name[len(HPC_OCRD_MODELS_DIR_IN_DOCKER) + 1:])
+        elif "/" in model_name:
+            return None
+        else:
+            model_paths.append(processor_models["path"].format(model_name))
+    return model_paths
+
+
+def extract_model_dependencies(nf_script: str) -> Optional[List[str]]:
+    """
+    Returns the paths of the models used by the ocrd processors called in the nextflow script, relative to the
+    ocrd models dir. Returns None if the models of any processor cannot be determined, then all models are required.
+    """
+    model_dependencies = set()
+    # Joins the command lines continued with a backslash
+    for line in nf_script.replace("\\\n", " ").splitlines():
+        if line.strip().startswith("//"):
+            continue
+        match = _OCRD_PROCESSOR_CALL.search(line)
+        if not match:
+            continue
+        processor_models = _resolve_processor_models(processor=match.group(1), arguments=match.group(2))
+        if processor_models is None:
+            return None
+        model_dependencies.update(processor_models)
+    return sorted(model_dependencies)
+
+
+def extract_model_dependencies_from_file(nf_script_path: str) -> Optional[List[str]]:
+    with open(nf_script_path, mode="r") as nf_script_file:
+        return extract_model_dependencies(nf_script_file.read())
+
+
+def format_model_dependencies(model_dependencies: Optional[List[str]]) -> str:
+    """
+    Formats the model dependencies as the argument of the batch script.
+    """
+    if model_dependencies is None:
+        return HPC_MODEL_DEPENDENCIES_ALL
+    if not model_dependencies:
+        return HPC_MODEL_DEPENDENCIES_NONE
+    return HPC_MODEL_DEPENDENCIES_SEPARATOR.join(model_dependencies)
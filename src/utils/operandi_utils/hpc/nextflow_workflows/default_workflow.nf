@@ -7,6 +7,10 @@ params.mets = "null"
 params.workspace_dir = "null"
 // amount of pages of the workspace
 params.pages = "null"
+// page ranges of the forks and their mets file chunks, precomputed by Operandi
+params.page_ranges = "null"
+// merges all mets file chunks into the main mets file at once, inside the container
+params.mets_merge_script = "null"
 params.singularity_wrapper = "null"
 params.cpus = "null"
 params.ram = "null"
@@ -22,6 +26,8 @@ log.info """\
     mets                : ${params.mets}
     workspace_dir       : ${params.workspace_dir}
     pages               : ${params.pages}
+    page_ranges         : ${params.page_ranges}
+    mets_merge_script   : ${params.mets_merge_script}
     singularity_wrapper : ${params.singularity_wrapper}
     cpus                : ${params.cpus}
     ram                 : ${params.ram}
@@ -31,27 +37,6 @@ log.info """\
     """
     .stripIndent()
 
-process split_page_ranges {
-    maxForks params.forks
-    cpus params.cpus_per_fork
-    memory params.ram_per_fork
-    debug true
-
-    input:
-        val range_multiplier
-    output:
-        env mets_file_chunk
-        env current_range_pages
-    script:
-    """
-    current_range_pages=\$(${params.singularity_wrapper} ocrd workspace -d ${params.workspace_dir} list-page -f comma-separated -D ${params.forks} -C ${range_multiplier})
-    echo "Current range is: \$current_range_pages"
-    mets_file_chunk=\$(echo ${params.workspace_dir}/mets_${range_multiplier}.xml)
-    echo "Mets file chunk path: \$mets_file_chunk"
-    \$(${params.singularity_wrapper} cp -p ${params.mets} \$mets_file_chunk)
-    """
-}
-
 process ocrd_cis_ocropy_binarize {
     maxForks params.forks
     cpus params.cpus_per_fork
@@ -246,20 +231,20 @@ process merging_mets {
     maxForks 1
 
     input:
-        val mets_file_chunk
-        val page_range
+        val mets_file_chunks
     script:
     """
-    ${params.singularity_wrapper} ocrd workspace -d ${params.workspace_dir} merge --force --no-copy-files ${mets_file_chunk} --page-id ${page_range}
-    ${params.singularity_wrapper} rm ${mets_file_chunk}
+    ${params.singularity_wrapper} python3 ${params.mets_merge_script} --mets ${params.mets} --remove-chunks ${mets_file_chunks.join(' ')}
     """
 }
 
 workflow {
     main:
-        ch_range_multipliers = Channel.of(0..params.forks.intValue()-1)
-        split_page_ranges(ch_range_multipliers)
-        ocrd_cis_ocropy_binarize(split_page_ranges.out[0], split_page_ranges.out[1], params.input_file_group, "OCR-D-BIN")
+        ch_page_ranges = Channel.fromPath(params.page_ranges).splitCsv(sep: "\t").multiMap { row ->
+            mets_file_chunk: "${params.workspace_dir}/${row[0]}"
+            page_range: row[1]
+        }
+        ocrd_cis_ocropy_binarize(ch_page_ranges.mets_file_chunk, ch_page_ranges.page_range, params.input_file_group, "OCR-D-BIN")
         ocrd_anybaseocr_crop(ocrd_cis_ocropy_binarize.out[0], ocrd_cis_ocropy_binarize.out[1], "OCR-D-BIN", "OCR-D-CROP")
         ocrd_skimage_binarize(ocrd_anybaseocr_crop.out[0], ocrd_anybaseocr_crop.out[1], "OCR-D-CROP", "OCR-D-BIN2")
         ocrd_skimage_denoise(ocrd_skimage_binarize.out[0], ocrd_skimage_binarize.out[1], "OCR-D-BIN2", "OCR-D-BIN-DENOISE")
@@ -268,5 +253,5 @@ workflow {
         ocrd_cis_ocropy_dewarp(ocrd_cis_ocropy_segment.out[0], ocrd_cis_ocropy_segment.out[1], "OCR-D-SEG", "OCR-D-SEG-LINE-RESEG-DEWARP")
         ocrd_calamari_recognize(ocrd_cis_ocropy_dewarp.out[0], ocrd_cis_ocropy_dewarp.out[1], "OCR-D-SEG-LINE-RESEG-DEWARP", "OCR-D-OCR")
         ocrd_fileformat_transform(ocrd_calamari_recognize.out[0], ocrd_calamari_recognize.out[1], "OCR-D-OCR", "OCR-D-ALTO")
-        merging_mets(ocrd_fileformat_transform.out[0], ocrd_fileformat_transform.out[1])
+        merging_mets(ocrd_fileformat_transform.out[0].collect())
 }
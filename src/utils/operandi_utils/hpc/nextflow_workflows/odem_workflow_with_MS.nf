@@ -8,6 +8,8 @@ params.mets_socket = "null"
 params.workspace_dir = "null"
 // amount of pages of the workspace
 params.pages = "null"
+// page ranges of the forks and their mets file chunks, precomputed by Operandi
+params.page_ranges = "null"
 params.singularity_wrapper = "null"
 params.cpus = "null"
 params.ram = "null"
@@ -24,6 +26,7 @@ log.info """\
     mets_socket         : ${params.mets_socket}
     workspace_dir       : ${params.workspace_dir}
     pages               : ${params.pages}
+    page_ranges         : ${params.page_ranges}
     singularity_wrapper : ${params.singularity_wrapper}
     cpus                : ${params.cpus}
     ram                 : ${params.ram}
@@ -33,23 +36,6 @@ log.info """\
     """
     .stripIndent()
 
-process split_page_ranges {
-    maxForks params.forks
-    cpus params.cpus_per_fork
-    memory params.ram_per_fork
-    debug true
-
-    input:
-        val range_multiplier
-    output:
-        env current_range_pages
-    shell:
-    '''
-    current_range_pages=$(!{params.singularity_wrapper} ocrd workspace -d !{params.workspace_dir} list-page -f comma-separated -D !{params.forks} -C !{range_multiplier})
-    echo "Current range is: $current_range_pages"
-    '''
-}
-
 process ocrd_cis_ocropy_binarize_0 {
     maxForks params.forks
     cpus params.cpus_per_fork
@@ -261,9 +247,8 @@ process ocrd_fileformat_transform_10 {
 
 workflow {
     main:
-        ch_range_multipliers = Channel.of(0..params.forks.intValue()-1)
-        split_page_ranges(ch_range_multipliers)
-        ocrd_cis_ocropy_binarize_0(split_page_ranges.out, params.input_file_group, "OCR-D-BINPAGE")
+        ch_page_ranges = Channel.fromPath(params.page_ranges).splitCsv(sep: "\t").map { row -> row[1] }
+        ocrd_cis_ocropy_binarize_0(ch_page_ranges, params.input_file_group, "OCR-D-BINPAGE")
         ocrd_anybaseocr_crop_1(ocrd_cis_ocropy_binarize_0.out, "OCR-D-BINPAGE", "OCR-D-SEG-PAGE-ANYOCR")
         ocrd_cis_ocropy_denoise_2(ocrd_anybaseocr_crop_1.out, "OCR-D-SEG-PAGE-ANYOCR", "OCR-D-DENOISE-OCROPY")
         ocrd_cis_ocropy_deskew_3(ocrd_cis_ocropy_denoise_2.out, "OCR-D-DENOISE-OCROPY", "OCR-D-DESKEW-OCROPY")
@@ -8,6 +8,8 @@ params.mets_socket = "null"
 params.workspace_dir = "null"
 // amount of pages of the workspace
 params.pages = "null"
+// page ranges of the forks and their mets file chunks, precomputed by Operandi
+params.page_ranges = "null"
 params.singularity_wrapper = "null"
 params.cpus = "null"
 params.ram = "null"
@@ -24,6 +26,7 @@ log.info """\
     mets_socket         : ${params.mets_socket}
     workspace_dir       : ${params.workspace_dir}
     pages               : ${params.pages}
+    page_ranges         : ${params.page_ranges}
     singularity_wrapper : ${params.singularity_wrapper}
     cpus                : ${params.cpus}
     ram                 : ${params.ram}
@@ -33,23 +36,6 @@ log.info """\
     """
     .stripIndent()
 
-process split_page_ranges {
-    maxForks params.forks
-    cpus params.cpus_per_fork
-    memory params.ram_per_fork
-    debug true
-
-    input:
-        val range_multiplier
-    output:
-        env current_range_pages
-    shell:
-    '''
-    current_range_pages=$(!{params.singularity_wrapper} ocrd workspace -d !{params.workspace_dir} list-page -f comma-separated -D !{params.forks} -C !{range_multiplier})
-    echo "Current range is: $current_range_pages"
-    '''
-}
-
 process ocrd_cis_ocropy_binarize {
     maxForks params.forks
     cpus params.cpus_per_fork
@@ -68,7 +54,6 @@ process ocrd_cis_ocropy_binarize {
 
 workflow {
     main:
-        ch_range_multipliers = Channel.of(0..params.forks.intValue()-1)
-        split_page_ranges(ch_range_multipliers)
-        ocrd_cis_ocropy_binarize(split_page_ranges.out[0], params.input_file_group, "OCR-D-BIN")
+        ch_page_ranges = Channel.fromPath(params.page_ranges).splitCsv(sep: "\t").map { row -> row[1] }
+        ocrd_cis_ocropy_binarize(ch_page_ranges, params.input_file_group, "OCR-D-BIN")
 }
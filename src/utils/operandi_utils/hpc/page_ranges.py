@@ -0,0 +1,146 @@
+from copy import deepcopy
+from os import makedirs
+from os.path import dirname, join
+from re import compile as re_compile, MULTILINE
+from shutil import copyfile
+from typing import Dict, List, Optional, Set
+from lxml import etree
+
+from .constants import (
+    HPC_DIR_BATCH_SCRIPTS, HPC_DIR_METS_CHUNKS, HPC_METS_CHUNK_NAME, HPC_METS_MERGE_SCRIPT, HPC_PAGE_RANGES_FILE)
+
+_NS = {"mets": "http://www.loc.gov/METS/", "xlink": "http://www.w3.org/1999/xlink"}
+_TAG_DIV = f"{{{_NS['mets']}}}div"
+_TAG_FILE = f"{{{_NS['mets']}}}file"
+_TAG_FILE_GRP = f"{{{_NS['mets']}}}fileGrp"
+_TAG_FILE_SEC = f"{{{_NS['mets']}}}fileSec"
+_TAG_METS = f"{{{_NS['mets']}}}mets"
+_TAG_SM_LINK = f"{{{_NS['mets']}}}smLink"
+_TAG_STRUCT_LINK = f"{{{_NS['mets']}}}structLink"
+_TAG_STRUCT_MAP = f"{{{_NS['mets']}}}structMap"
+_XPATH_PAGE_DIVS = "mets:structMap[@TYPE='PHYSICAL']/mets:div[@TYPE='physSequence']/mets:div[@TYPE='page']"
+_NF_PARAM_PAGE_RANGES = re_compile(r"^\s*params\.page_ranges\s*=", MULTILINE)
+_NF_METS_FILE_CHUNK = re_compile(r"\bmets_file_chunk\b")
+
+
+def nextflow_script_uses_mets_chunks(nextflow_script_path: str) -> bool:
+    """
+    Whether the nextflow script runs its forks on the METS file chunks, i.e., declares `params.page_ranges`
+    and reads the `mets_file_chunk` column of the page ranges. Other workflows, e.g., uploaded by users,
+    get no chunks, which would otherwise be left behind in the workspace.
+    """
+    with open(nextflow_script_path, mode="r", encoding="utf-8") as nextflow_script:
+        nextflow_script_content = nextflow_script.read()
+    return bool(
+        _NF_PARAM_PAGE_RANGES.search(nextflow_script_content) and _NF_METS_FILE_CHUNK.search(nextflow_script_content))
+
+
+def split_page_ranges(page_ids: List[str], chunks: int) -> List[List[str]]:
+    """
+    Partitions the page ids into chunks of roughly equal size, the same way as `ocrd workspace list-page -D`,
+    i.e., the first `len(page_ids) % chunks` chunks hold one page more.
+    """
+    if not page_ids:
+        return []
+    if chunks > len(page_ids):
+        raise ValueError(f"Amount of chunks bigger than the amount of pages: {chunks} > {len(page_ids)}")
+    chunk_size, remainder = divmod(len(page_ids), chunks)
+    page_ranges = []
+    start = 0
+    for index in range(chunks):
+        end = start + chunk_size + (1 if index < remainder else 0)
+        page_ranges.append(page_ids[start:end])
+        start = end
+    return page_ranges
+
+
+def _page_file_ids(page_div) -> Set[str]:
+    return {element.get("FILEID") for element in page_div.iter() if element.get("FILEID")}
+
+
+def _copy_mets_chunk(mets_root, page_ids: Set[str], page_files: Dict[str, Set[str]]):
+    """
+    Builds the METS chunk holding only the physical pages in `page_ids`, their files, and their links to the logical
+    structure in a single pass. Only the containers of pages, files and links are descended into, anything else,
+    e.g., the header or the logical structure, is copied as is. Files not referenced by any page are kept.
+    """
+    kept_file_ids = set().union(*(page_files[page_id] for page_id in page_ids if page_id in page_files))
+    page_file_ids = set().union(*page_files.values())
+    xlink_to = f"{{{_NS['xlink']}}}to"
+
+    def descend(element) -> bool:
+        if element.tag in (_TAG_METS, _TAG_FILE_SEC, _TAG_FILE_GRP, _TAG_STRUCT_LINK):
+            return True
+        if element.tag == _TAG_STRUCT_MAP:
+            return element.get("TYPE") == "PHYSICAL"
+        return element.tag == _TAG_DIV and element.get("TYPE") == "physSequence"
+
+    def keep(element) -> bool:
+        if element.tag == _TAG_FILE:
+            return element.get("ID") not in page_file_ids or element.get("ID") in kept_file_ids
+        if element.tag == _TAG_DIV and element.get("TYPE") == "page":
+            return element.get("ID") in page_ids
+        if element.tag == _TAG_SM_LINK:
+            return element.get(xlink_to) not in page_files or element.get(xlink_to) in page_ids
+        return True
+
+    def copy_element(element, parent):
+        if parent is None:
+            copied = etree.Element(element.tag, attrib=element.attrib, nsmap=element.nsmap)
+        elif not descend(element):
+            parent.append(deepcopy(element))
+            return
+        else:
+            copied = etree.SubElement(parent, element.tag, attrib=element.attrib)
+        copied.text, copied.tail = element.text, element.tail
+        for child in element:
+            if keep(child):
+                copy_element(child, copied)
+        return copied
+
+    return copy_element(mets_root, None)
+
+
+def write_page_ranges(
+    dst_dir: str, mets_path: str, chunks: int, page_ids: Optional[List[str]] = None, mets_chunks: bool = True
+) -> str:
+    """
+    Writes the page ranges of the workflow job forks to `dst_dir`, one line `<mets chunk>\t<page range>` per fork.
+    With `mets_chunks` a METS file holding only the pages of each range is written to the mets chunks dir,
+    together with the script merging the chunks back, otherwise the mets chunk column is empty.
+    The page ids are read from the METS file if not provided, raises a ValueError if there are none.
+    Returns the path of the page ranges file.
+    """
+    mets_tree = etree.parse(mets_path)
+    mets_root = mets_tree.getroot()
+    page_files = {
+        page_div.get("ID"): _page_file_ids(page_div)
+        for page_div in mets_root.xpath(_XPATH_PAGE_DIVS, namespaces=_NS)
+    }
+    if page_ids is None:
+        page_ids = list(page_files.keys())
+    if not page_ids:
+        # An empty page ranges file would run no fork at all and the workflow job would succeed without results
+        raise ValueError(
+            f"No page ids to split into page ranges, neither given nor found in the METS file: {mets_path}")
+    page_ranges = split_page_ranges(page_ids=page_ids, chunks=min(chunks, len(page_ids)))
+
+    if mets_chunks:
+        makedirs(join(dst_dir, HPC_DIR_METS_CHUNKS), exist_ok=True)
+        copyfile(
+            src=join(dirname(__file__), HPC_DIR_BATCH_SCRIPTS, HPC_METS_MERGE_SCRIPT),
+            dst=join(dst_dir, HPC_METS_MERGE_SCRIPT))
+    lines = []
+    for index, page_range in enumerate(page_ranges):
+        mets_chunk_name = ""
+        if mets_chunks:
+            mets_chunk_name = HPC_METS_CHUNK_NAME.format(index)
+            mets_chunk_root = _copy_mets_chunk(mets_root=mets_root, page_ids=set(page_range), page_files=page_files)
+            etree.ElementTree(mets_chunk_root).write(
+                join(dst_dir, HPC_DIR_METS_CHUNKS, mets_chunk_name), xml_declaration=True, encoding="utf-8")
+        lines.append(f"{mets_chunk_name}\t{','.join(page_range)}\n")
+
+    page_ranges_path = join(dst_dir, HPC_PAGE_RANGES_FILE)
+    with open(page_ranges_path, mode="w", encoding="utf-8") as page_ranges_file:
+        page_ranges_file.writelines(lines)
+    return page_ranges_path
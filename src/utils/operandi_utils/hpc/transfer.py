@@ -1,16 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from hashlib import sha256
+from json import dumps, loads
 from logging import getLogger
-from os import environ, listdir, makedirs, remove, symlink
-from os.path import dirname, join, isdir, split
-from pathlib import Path
+from os import environ, listdir, makedirs, remove, replace, stat, symlink, walk
+from os.path import dirname, getsize, join, relpath, splitext
+from paramiko import SFTPClient
+from pathlib import Path, PurePosixPath
+from posixpath import dirname as posix_dirname, normpath
+from shlex import quote
 from shutil import rmtree, copytree
 from stat import S_ISDIR
 from tempfile import mkdtemp
 from time import sleep
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+from zipfile import ZipFile, ZipInfo
 
-from operandi_utils import make_zip_archive, unpack_zip_archive
+from operandi_utils import get_archive_suffix, make_archive_file, make_archive_stream, unpack_archive_file
+from operandi_utils.constants import ARCHIVE_CODEC_AUTO
+from .connection_pool import HPCConnectionPool
 from .connector import HPCConnector
-from .constants import HPC_TRANSFER_HOSTS, HPC_TRANSFER_PROXY_HOSTS
+from .constants import (
+    HPC_BATCH_SCRIPT_VERSION_LENGTH, HPC_DIR_SYNCED_WORKSPACES, HPC_RESULTS_MODE_FULL, HPC_RESULTS_MODE_NEW,
+    HPC_RESULTS_REMOVED_FILES_LIST, HPC_SYNCED_WORKSPACE_LOCK_TIMEOUT, HPC_TRANSFER_CHUNK_SIZE, HPC_TRANSFER_HOSTS,
+    HPC_TRANSFER_MAX_RETRY_SLEEP, HPC_TRANSFER_MIN_PART_SIZE, HPC_TRANSFER_MKDIR_BATCH_SIZE,
+    HPC_TRANSFER_PARALLEL_CHANNELS, HPC_TRANSFER_PROGRESS_LOG_STEP, HPC_TRANSFER_PROXY_HOSTS,
+    HPC_UNPACK_MODE_DOWNLOAD, HPC_UNPACK_MODE_STREAM
+)
+from .utils import compute_file_sha256, remove_listed_files, split_byte_ranges, split_into_balanced_sets
+
+
+class _HashingWriter:
+    """
+    Updates the sha256 with every block written into the wrapped stream,
+    the digest of streamed data is then known without reading the data again.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self.hasher = sha256()
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        self._stream.write(data)
+        return len(data)
+
+    def flush(self) -> None:
+        self._stream.flush()
 
 
 class HPCTransfer(HPCConnector):
@@ -22,23 +57,63 @@ class HPCTransfer(HPCConnector):
         key_path: str = environ.get("OPERANDI_HPC_SSH_KEYPATH", None),
         project_name: str = environ.get("OPERANDI_HPC_PROJECT_NAME", None),
         tunnel_host: str = 'localhost',
-        tunnel_port: int = 0
+        tunnel_port: int = 0,
+        connection_pool: HPCConnectionPool = None
     ) -> None:
         super().__init__(
             hpc_hosts=transfer_hosts, proxy_hosts=proxy_hosts, project_name=project_name,
             log=getLogger("operandi_utils.hpc.transfer"), username=username, project_username=project_username,
-            key_path=Path(key_path), key_pass=None, tunnel_host=tunnel_host, tunnel_port=tunnel_port)
+            key_path=Path(key_path), key_pass=None, tunnel_host=tunnel_host, tunnel_port=tunnel_port,
+            connection_pool=connection_pool)
+        # Remote dirs known to exist, valid only for the sftp client they were cached with
+        self._remote_dirs_cache = set()
+        self._remote_dirs_cache_client = None
+        # The sha256 and the HPC path of the batch script versions deployed by this instance
+        self._deployed_batch_scripts: Dict[str, Tuple[str, str]] = {}
 
     def put_batch_script(self, batch_script_id: str) -> str:
+        """
+        Deploys the batch script under a name versioned by its content hash and returns its path inside the HPC.
+        Each version is uploaded only once, the deployed versions are recorded in memory, hence further
+        calls with an unchanged script do not cost any round trip. Deployed versions are never overwritten,
+        so already submitted slurm jobs keep running their exact script.
+        """
         local_batch_script_path = join(dirname(__file__), "batch_scripts", batch_script_id)
-        hpc_batch_script_path = join(self.batch_scripts_dir, batch_script_id)
-        self.put_file(local_src=local_batch_script_path, remote_dst=hpc_batch_script_path)
-        self.log.info(f"Put file from local src: {local_batch_script_path}, to dst: {hpc_batch_script_path}")
+        local_sha256 = compute_file_sha256(local_batch_script_path)
+        deployed_sha256, hpc_batch_script_path = self._deployed_batch_scripts.get(batch_script_id, (None, None))
+        if deployed_sha256 == local_sha256:
+            return hpc_batch_script_path
+
+        stem, suffix = splitext(batch_script_id)
+        hpc_batch_script_path = join(
+            self.batch_scripts_dir, f"{stem}_{local_sha256[:HPC_BATCH_SCRIPT_VERSION_LENGTH]}{suffix}")
+        self.recreate_sftp_if_required()
+        try:
+            remote_size = self.sftp_client.stat(hpc_batch_script_path).st_size
+        except IOError:
+            remote_size = None
+        if remote_size == getsize(local_batch_script_path):
+            self.log.info(f"Batch script version already deployed: {hpc_batch_script_path}")
+        else:
+            self.mkdir_p(remotepath=self.batch_scripts_dir)
+            self._put_file_atomic(local_src=local_batch_script_path, remote_dst=hpc_batch_script_path)
+            self.log.info(f"Put file from local src: {local_batch_script_path}, to dst: {hpc_batch_script_path}")
+        self._deployed_batch_scripts[batch_script_id] = (local_sha256, hpc_batch_script_path)
         return hpc_batch_script_path
 
+    def deploy_batch_scripts(self) -> Dict[str, str]:
+        """
+        Deploys the current versions of all batch scripts, returns the HPC path of each batch script.
+        """
+        local_batch_scripts_dir = join(dirname(__file__), "batch_scripts")
+        return {
+            batch_script_id: self.put_batch_script(batch_script_id=batch_script_id)
+            for batch_script_id in sorted(listdir(local_batch_scripts_dir)) if batch_script_id.endswith((".py", ".sh"))
+        }
+
     def create_slurm_workspace_zip(
         self, ocrd_workspace_dir: str, workflow_job_id: str, nextflow_script_path: str,
-        tempdir_prefix: str = "slurm_workspace-"
+        tempdir_prefix: str = "slurm_workspace-", page_ranges_dir: Optional[str] = None
     ) -> str:
         self.log.info(f"Entering pack_slurm_workspace")
         self.log.info(f"ocrd_workspace_dir: {ocrd_workspace_dir}")
@@ -67,15 +142,19 @@ class HPCTransfer(HPCConnector):
         copytree(src=ocrd_workspace_dir, dst=dst_workspace_path)
         self.log.info(f"Copied tree from src: {ocrd_workspace_dir}, to dst: {dst_workspace_path}")
 
+        if page_ranges_dir:
+            copytree(src=page_ranges_dir, dst=temp_workflow_job_dir, dirs_exist_ok=True)
+            self.log.info(f"Copied page ranges from src: {page_ranges_dir}, to dst: {temp_workflow_job_dir}")
+
         dst_zip_path = f"{temp_workflow_job_dir}.zip"
-        make_zip_archive(source=temp_workflow_job_dir, destination=dst_zip_path)
+        make_archive_file(source=temp_workflow_job_dir, destination=dst_zip_path)
         self.log.info(f"Zip archive created from src: {temp_workflow_job_dir}, to dst: {dst_zip_path}")
         return dst_zip_path
 
     def put_slurm_workspace(self, local_src_slurm_zip: str, workflow_job_id: str) -> str:
         self.log.info(f"Workflow job id to be used: {workflow_job_id}")
         hpc_dst_slurm_zip = join(self.slurm_workspaces_dir, f"{workflow_job_id}.zip")
-        self.put_file(local_src=local_src_slurm_zip, remote_dst=hpc_dst_slurm_zip)
+        self.put_file(local_src=local_src_slurm_zip, remote_dst=hpc_dst_slurm_zip, verify=True)
         self.log.info(f"Put file from local src: {local_src_slurm_zip}, to remote dst: {hpc_dst_slurm_zip}")
         self.log.info(f"Leaving put_slurm_workspace, returning: {hpc_dst_slurm_zip}")
         # Zip path inside the HPC environment
@@ -83,7 +162,7 @@ class HPCTransfer(HPCConnector):
 
     def pack_and_put_slurm_workspace(
         self, ocrd_workspace_dir: str, workflow_job_id: str, nextflow_script_path: str,
-        tempdir_prefix: str = "slurm_workspace-"
+        tempdir_prefix: str = "slurm_workspace-", page_ranges_dir: Optional[str] = None
     ) -> Tuple[str, str]:
         self.log.info(f"Entering put_slurm_workspace")
         self.log.info(f"ocrd_workspace_dir: {ocrd_workspace_dir}")
@@ -93,7 +172,7 @@ class HPCTransfer(HPCConnector):
 
         local_src_slurm_zip = self.create_slurm_workspace_zip(
             ocrd_workspace_dir=ocrd_workspace_dir, workflow_job_id=workflow_job_id,
-            nextflow_script_path=nextflow_script_path, tempdir_prefix=tempdir_prefix)
+            nextflow_script_path=nextflow_script_path, tempdir_prefix=tempdir_prefix, page_ranges_dir=page_ranges_dir)
         self.log.info(f"Created slurm workspace zip: {local_src_slurm_zip}")
 
         hpc_dst = self.put_slurm_workspace(local_src_slurm_zip=local_src_slurm_zip, workflow_job_id=workflow_job_id)
@@ -101,7 +180,217 @@ class HPCTransfer(HPCConnector):
         Path(local_src_slurm_zip).unlink(missing_ok=True)
         return local_src_slurm_zip, hpc_dst
 
-    def get_and_unpack_slurm_workspace(self, ocrd_workspace_dir: str, workflow_job_dir: str):
+    def pack_and_stream_slurm_workspace(
+        self, ocrd_workspace_dir: str, workflow_job_id: str, nextflow_script_path: str,
+        codec: str = ARCHIVE_CODEC_AUTO, verify: bool = True, page_ranges_dir: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Streaming alternative to `pack_and_put_slurm_workspace`. The slurm workspace zip is built on the fly
+        from the original ocrd workspace dir and the nextflow script and written directly into the remote file.
+        The archive layout is identical to the one produced by `create_slurm_workspace_zip`. With the zstd
+        codec a `.tar.zst` archive is written instead, the batch script unpacks whichever of both exists.
+        The sha256 of the archive is computed while streaming, with `verify` it is compared with the remote
+        sha256sum. The contents of `page_ranges_dir`, see `write_page_ranges`, are placed into the workflow job dir.
+        Returns the path of the archive inside the HPC and its sha256.
+        """
+        self.log.info(f"Entering pack_and_stream_slurm_workspace")
+        self.log.info(f"ocrd_workspace_dir: {ocrd_workspace_dir}")
+        self.log.info(f"workflow_job_id: {workflow_job_id}")
+        self.log.info(f"nextflow_script_path: {nextflow_script_path}")
+
+        nextflow_filename = nextflow_script_path.split('/')[-1]
+        self.log.info(f"Nextflow file name to be used: {nextflow_filename}")
+        ocrd_workspace_id = ocrd_workspace_dir.rstrip('/').split('/')[-1]
+        self.log.info(f"OCR-D workspace id to be used: {ocrd_workspace_id}")
+
+        sources = [
+            (nextflow_script_path, join(workflow_job_id, nextflow_filename)),
+            (ocrd_workspace_dir, join(workflow_job_id, ocrd_workspace_id))
+        ]
+        if page_ranges_dir:
+            sources.extend(
+                (join(page_ranges_dir, entry_name), join(workflow_job_id, entry_name))
+                for entry_name in sorted(listdir(page_ranges_dir)))
+        hpc_dst_slurm_zip = join(self.slurm_workspaces_dir, f"{workflow_job_id}{get_archive_suffix(codec)}")
+        self.mkdir_p(remotepath=self.slurm_workspaces_dir)
+        try:
+            with self.sftp_client.open(filename=hpc_dst_slurm_zip, mode="wb") as remote_file:
+                # Do not wait for the server acknowledgement of each written block
+                remote_file.set_pipelined(True)
+                hashing_writer = _HashingWriter(stream=remote_file)
+                make_archive_stream(stream=hashing_writer, sources=sources, codec=codec)
+            local_sha256 = hashing_writer.hasher.hexdigest()
+            if verify:
+                self.verify_remote_sha256(
+                    local_path=ocrd_workspace_dir, remote_path=hpc_dst_slurm_zip, local_sha256=local_sha256)
+        except Exception as error:
+            self.log.error(f"Failed to stream the slurm workspace zip to: {hpc_dst_slurm_zip}, error: {error}")
+            try:
+                self.sftp_client.remove(hpc_dst_slurm_zip)
+            except IOError:
+                pass
+            raise Exception(f"Error when streaming slurm workspace zip: {error}, remote dst: {hpc_dst_slurm_zip}")
+        self.log.info(f"Streamed slurm workspace zip from src: {ocrd_workspace_dir}, to dst: {hpc_dst_slurm_zip}")
+        self.log.info(f"Leaving pack_and_stream_slurm_workspace, returning: {hpc_dst_slurm_zip}, {local_sha256}")
+        return hpc_dst_slurm_zip, local_sha256
+
+    def sync_slurm_workspace(
+        self, ocrd_workspace_dir: str, workflow_job_id: str, nextflow_script_path: str,
+        page_ranges_dir: Optional[str] = None
+    ) -> str:
+        """
+        Incremental alternative to `pack_and_stream_slurm_workspace`. The ocrd workspace is mirrored into
+        a per-workspace cache dir under the slurm workspaces dir and only new or changed files are uploaded.
+        The cache is described by a manifest (size, mtime, sha256 per file) stored next to the cache dir.
+        Only the nextflow script and the page ranges are put inside the workflow job dir, the batch script then
+        builds the workspace of the workflow job from the cache, since no slurm workspace zip is available.
+        The cache is updated under the exclusive lock of the workspace, the batch jobs copy it under a shared lock.
+        """
+        self.log.info(f"Entering sync_slurm_workspace")
+        self.log.info(f"ocrd_workspace_dir: {ocrd_workspace_dir}")
+        self.log.info(f"workflow_job_id: {workflow_job_id}")
+        self.log.info(f"nextflow_script_path: {nextflow_script_path}")
+
+        ocrd_workspace_id = ocrd_workspace_dir.rstrip('/').split('/')[-1]
+        self.log.info(f"OCR-D workspace id to be used: {ocrd_workspace_id}")
+        hpc_synced_ws_dir = join(self.slurm_workspaces_dir, HPC_DIR_SYNCED_WORKSPACES, ocrd_workspace_id)
+        hpc_manifest_path = f"{hpc_synced_ws_dir}.json"
+
+        self.recreate_sftp_if_required()
+        # The batch jobs copying the synced workspace meanwhile would see a half updated workspace
+        with self._lock_synced_workspace(hpc_synced_ws_dir=hpc_synced_ws_dir):
+            old_manifest = self._read_remote_manifest(remote_src=hpc_manifest_path)
+            # The remote files may have been purged from the scratch, the listing protects against a stale manifest
+            remote_sizes = self._list_remote_file_sizes(remote_dir=hpc_synced_ws_dir)
+            new_manifest = {}
+            uploaded_amount, reused_amount = 0, 0
+            for root, dirs, files in walk(ocrd_workspace_dir):
+                for file_name in files:
+                    local_path = join(root, file_name)
+                    rel_path = relpath(local_path, ocrd_workspace_dir)
+                    file_stat = stat(local_path)
+                    entry = {"size": file_stat.st_size, "mtime": file_stat.st_mtime, "sha256": None}
+                    old_entry = old_manifest.get(rel_path, None)
+                    remote_size = remote_sizes.pop(rel_path, None)
+                    if old_entry and old_entry["size"] == entry["size"] and remote_size == entry["size"]:
+                        if old_entry["mtime"] == entry["mtime"]:
+                            new_manifest[rel_path] = old_entry
+                            reused_amount += 1
+                            continue
+                        entry["sha256"] = compute_file_sha256(local_path)
+                        if old_entry["sha256"] == entry["sha256"]:
+                            new_manifest[rel_path] = entry
+                            reused_amount += 1
+                            continue
+                    if not entry["sha256"]:
+                        entry["sha256"] = compute_file_sha256(local_path)
+                    remote_path = join(hpc_synced_ws_dir, rel_path)
+                    self.mkdir_p(remotepath=posix_dirname(remote_path))
+                    self._put_file_atomic(local_src=local_path, remote_dst=remote_path)
+                    new_manifest[rel_path] = entry
+                    uploaded_amount += 1
+
+            # Files that are no longer part of the local workspace
+            for rel_path in remote_sizes:
+                self.sftp_client.remove(join(hpc_synced_ws_dir, rel_path))
+            self._remove_empty_remote_dirs(remote_dir=hpc_synced_ws_dir, rel_paths=list(remote_sizes.keys()))
+            self.log.info(
+                f"Synced workspace to: {hpc_synced_ws_dir}, uploaded files: {uploaded_amount}, "
+                f"reused files: {reused_amount}, removed files: {len(remote_sizes)}")
+            self._write_remote_manifest(remote_dst=hpc_manifest_path, manifest=new_manifest)
+
+        nextflow_filename = nextflow_script_path.split('/')[-1]
+        hpc_dst_script_path = join(self.slurm_workspaces_dir, workflow_job_id, nextflow_filename)
+        self.put_file(local_src=nextflow_script_path, remote_dst=hpc_dst_script_path)
+        self.log.info(f"Put file from local src: {nextflow_script_path}, to remote dst: {hpc_dst_script_path}")
+        if page_ranges_dir:
+            hpc_dst_workflow_job_dir = join(self.slurm_workspaces_dir, workflow_job_id)
+            self.put_dir(local_src=page_ranges_dir, remote_dst=hpc_dst_workflow_job_dir)
+            self.log.info(f"Put dir from local src: {page_ranges_dir}, to remote dst: {hpc_dst_workflow_job_dir}")
+        self.log.info(f"Leaving sync_slurm_workspace, returning: {hpc_synced_ws_dir}")
+        return hpc_synced_ws_dir
+
+    @contextmanager
+    def _lock_synced_workspace(self, hpc_synced_ws_dir: str):
+        """
+        Holds the exclusive flock of the synced workspace on the HPC while the context is active. The lock is held
+        by a remote command, which waits for the end of its stdin, i.e., it is released when the channel is closed.
+        """
+        lock_path = f"{hpc_synced_ws_dir}.lock"
+        command = (
+            f"mkdir -p {quote(posix_dirname(lock_path))} && "
+            f"flock -x -w {HPC_SYNCED_WORKSPACE_LOCK_TIMEOUT} {quote(lock_path)} -c 'echo locked && cat > /dev/null'")
+        stdin, stdout, stderr = self.ssh_hpc_client.exec_command(command=command)
+        try:
+            if stdout.readline().strip() != "locked":
+                raise RuntimeError(
+                    f"Failed to lock the synced workspace: {hpc_synced_ws_dir}, "
+                    f"return code: {stdout.channel.recv_exit_status()}, error: {stderr.read()}")
+            self.log.info(f"Locked the synced workspace: {hpc_synced_ws_dir}")
+            yield
+        finally:
+            stdin.channel.shutdown_write()
+            stdout.channel.recv_exit_status()
+            stdin.channel.close()
+
+    def _read_remote_manifest(self, remote_src: str) -> Dict[str, dict]:
+        try:
+            with self.sftp_client.open(filename=remote_src, mode="r") as remote_file:
+                return loads(remote_file.read())["files"]
+        except (IOError, KeyError, ValueError) as error:
+            self.log.info(f"No usable remote manifest found at: {remote_src}, reason: {error}")
+            return {}
+
+    def _write_remote_manifest(self, remote_dst: str, manifest: Dict[str, dict]) -> None:
+        remote_tmp = f"{remote_dst}.tmp"
+        with self.sftp_client.open(filename=remote_tmp, mode="w") as remote_file:
+            remote_file.write(dumps({"files": manifest}))
+        self.sftp_client.posix_rename(remote_tmp, remote_dst)
+
+    def _list_remote_file_sizes(self, remote_dir: str, rel_dir: str = "") -> Dict[str, int]:
+        file_sizes = {}
+        try:
+            attributes = self.sftp_client.listdir_attr(join(remote_dir, rel_dir))
+        except IOError:
+            return file_sizes
+        for attribute in attributes:
+            rel_path = join(rel_dir, attribute.filename)
+            if S_ISDIR(attribute.st_mode):
+                file_sizes.update(self._list_remote_file_sizes(remote_dir=remote_dir, rel_dir=rel_path))
+            else:
+                file_sizes[rel_path] = attribute.st_size
+        return file_sizes
+
+    def _remove_empty_remote_dirs(self, remote_dir: str, rel_paths: List[str]) -> None:
+        # Removes the dirs left empty by the removed files, the deepest dirs first, up to the `remote_dir`
+        rel_dirs = set()
+        for rel_path in rel_paths:
+            rel_dir = posix_dirname(rel_path)
+            while rel_dir:
+                rel_dirs.add(rel_dir)
+                rel_dir = posix_dirname(rel_dir)
+        for rel_dir in sorted(rel_dirs, key=lambda path: path.count('/'), reverse=True):
+            remote_rel_dir = join(remote_dir, rel_dir)
+            if not self.sftp_client.listdir(remote_rel_dir):
+                self.sftp_client.rmdir(remote_rel_dir)
+
+    def _put_file_atomic(self, local_src: str, remote_dst: str) -> None:
+        # Upload under a temporary name and rename, so a file that is hard linked
+        # into the dir of a previous workflow job is replaced instead of overwritten
+        remote_tmp = f"{remote_dst}.part"
+        self.sftp_client.put(localpath=local_src, remotepath=remote_tmp)
+        self.sftp_client.posix_rename(remote_tmp, remote_dst)
+
+    def get_and_unpack_slurm_workspace(
+        self, ocrd_workspace_dir: str, workflow_job_dir: str, unpack_mode: str = HPC_UNPACK_MODE_DOWNLOAD,
+        results_mode: str = HPC_RESULTS_MODE_FULL
+    ) -> Optional[str]:
+        """
+        Gets and unpacks the workflow job results and the workspace results, returns the sha256 of the
+        workspace results archive. In the download unpack mode the digest is verified against the remote
+        sha256sum. In the stream unpack mode the members are checked against their crc instead and the
+        remote sha256sum is only recorded.
+        """
         self.log.info(f"Entering get_and_unpack_slurm_workspace")
         self.log.info(f"ocrd_workspace_dir: {ocrd_workspace_dir}")
         self.log.info(f"workflow_job_dir: {workflow_job_dir}")
@@ -114,46 +403,25 @@ class HPCTransfer(HPCConnector):
 
         get_src = join(self.slurm_workspaces_dir, workflow_job_id, f"{workflow_job_id}.zip")
         get_dst = join(Path(workflow_job_dir).parent.absolute(), f"{workflow_job_id}.zip")
+        self._get_and_unpack_zip(
+            remote_src=get_src, local_zip=get_dst, unpack_dst=workflow_job_dir, unpack_mode=unpack_mode)
+        self.log.info(f"Got and unpacked workflow job zip from src: {get_src}, to dst: {workflow_job_dir}")
 
-        self._get_file_with_retries(remote_src=get_src, local_dst=get_dst)
-        self.log.info(f"Got workflow job zip file from src: {get_src}, to dst: {get_dst}")
-
-        unpack_src = get_dst
-        unpack_dst = workflow_job_dir
-        try:
-            unpack_zip_archive(source=unpack_src, destination=unpack_dst)
-        except Exception as error:
-            raise Exception(
-                f"Error when unpacking workflow job zip: {error}, unpack_src: {unpack_src}, unpack_dst: {unpack_dst}")
-        self.log.info(f"Unpacked workflow job zip from src: {unpack_src}, to dst: {unpack_dst}")
-
-        # Remove the temporary workflow job zip
-        Path(unpack_src).unlink(missing_ok=True)
-        self.log.info(f"Removed the temp workflow job zip: {unpack_src}")
-
-        # Remove the workspace dir from the local storage,
-        # before transferring the results to avoid potential
-        # overwrite errors or duplications
-        rmtree(ocrd_workspace_dir, ignore_errors=True)
-        self.log.info(f"Removed tree dirs: {ocrd_workspace_dir}")
+        if results_mode != HPC_RESULTS_MODE_NEW:
+            # Remove the workspace dir from the local storage,
+            # before transferring the results to avoid potential
+            # overwrite errors or duplications
+            rmtree(ocrd_workspace_dir, ignore_errors=True)
+            self.log.info(f"Removed tree dirs: {ocrd_workspace_dir}")
 
         get_src = join(self.slurm_workspaces_dir, workflow_job_id, ocrd_workspace_id, f"{ocrd_workspace_id}.zip")
         get_dst = join(Path(ocrd_workspace_dir).parent.absolute(), f"{ocrd_workspace_id}.zip")
-        self._get_file_with_retries(remote_src=get_src, local_dst=get_dst)
-        self.log.info(f"Got workspace zip file from src: {get_src}, to dst: {get_dst}")
-
-        unpack_src = join(Path(ocrd_workspace_dir).parent.absolute(), f"{ocrd_workspace_id}.zip")
-        unpack_dst = ocrd_workspace_dir
-        try:
-            unpack_zip_archive(source=unpack_src, destination=unpack_dst)
-        except Exception as error:
-            raise Exception(
-                f"Error when unpacking workspace zip: {error}, unpack_src: {unpack_src}, unpack_dst: {unpack_dst}")
-        self.log.info(f"Unpacked workspace zip from src: {unpack_src}, to dst: {unpack_dst}")
-
-        # Remove the temporary workspace zip
-        Path(unpack_src).unlink(missing_ok=True)
-        self.log.info(f"Removed the temp workspace zip: {unpack_src}")
+        results_sha256 = self._get_and_unpack_zip(
+            remote_src=get_src, local_zip=get_dst, unpack_dst=ocrd_workspace_dir, unpack_mode=unpack_mode)
+        self.log.info(f"Got and unpacked workspace zip from src: {get_src}, to dst: {ocrd_workspace_dir}")
+        if results_mode == HPC_RESULTS_MODE_NEW:
+            # Only the mets and the new files were transferred, merged into the existing workspace
+            self.remove_listed_workspace_files(ocrd_workspace_dir=ocrd_workspace_dir)
 
         # Remove the workspace dir from the local workflow job dir,
         # and. Then create a symlink of the workspace dir inside the
@@ -165,44 +433,269 @@ class HPCTransfer(HPCConnector):
             raise Exception(
                 f"Error when symlink: {error}, src: {ocrd_workspace_dir}, dst: {workspace_dir_in_workflow_job}")
         self.log.info(f"Symlinked from src: {ocrd_workspace_dir}, to dst: {workspace_dir_in_workflow_job}")
-        self.log.info(f"Leaving get_and_unpack_slurm_workspace")
+        self.log.info(f"Leaving get_and_unpack_slurm_workspace, returning: {results_sha256}")
+        return results_sha256
 
-    def _get_file_with_retries(self, remote_src, local_dst, try_times: int = 100, sleep_time: int = 3):
+    def remove_listed_workspace_files(self, ocrd_workspace_dir: str) -> None:
+        """
+        Removes the workspace files listed by the batch script as no longer available after the
+        workflow job, e.g., files of removed file groups. Directories left empty are removed as well.
+        """
+        removed_amount = remove_listed_files(
+            dir_path=ocrd_workspace_dir, files_list_path=join(ocrd_workspace_dir, HPC_RESULTS_REMOVED_FILES_LIST))
+        self.log.info(f"Removed {removed_amount} files no longer available in workspace: {ocrd_workspace_dir}")
+
+    def _get_and_unpack_zip(self, remote_src: str, local_zip: str, unpack_dst: str, unpack_mode: str) -> str:
+        if unpack_mode == HPC_UNPACK_MODE_STREAM:
+            try:
+                self.stream_and_unpack_zip(remote_src=remote_src, local_dst=unpack_dst)
+                # The members were already checked against their crc, the remote digest is only recorded
+                return self.compute_remote_sha256(remote_path=remote_src)
+            except Exception as error:
+                self.log.warning(f"Streaming unpack of: {remote_src} failed: {error}, falling back to download")
+
+        local_sha256 = self._get_file_with_retries(remote_src=remote_src, local_dst=local_zip)
+        self.log.info(f"Got zip file from src: {remote_src}, to dst: {local_zip}")
+        try:
+            unpack_archive_file(source=local_zip, destination=unpack_dst)
+        except Exception as error:
+            raise Exception(f"Error when unpacking zip: {error}, unpack_src: {local_zip}, unpack_dst: {unpack_dst}")
+        self.log.info(f"Unpacked zip from src: {local_zip}, to dst: {unpack_dst}")
+
+        # Remove the temporary zip
+        Path(local_zip).unlink(missing_ok=True)
+        self.log.info(f"Removed the temp zip: {local_zip}")
+        return local_sha256
+
+    def stream_and_unpack_zip(
+        self, remote_src: str, local_dst: str, workers: int = HPC_TRANSFER_PARALLEL_CHANNELS,
+        extra_transports: bool = False, min_part_size: int = HPC_TRANSFER_MIN_PART_SIZE
+    ) -> None:
+        """
+        Extracts the members of a remote zip archive directly into the local destination, without
+        storing the archive on the local disk. The members are split into contiguous byte ranges of the
+        archive, each range is prefetched and extracted by its own sftp session while the bytes arrive.
+        The crc of each member is checked by the zip module during the extraction.
+        """
+        self.recreate_sftp_if_required()
+        archive_size = self.sftp_client.stat(remote_src).st_size
+        with self.sftp_client.open(filename=remote_src, mode="rb") as remote_file:
+            with ZipFile(remote_file) as zip_file:
+                members = sorted(zip_file.infolist(), key=lambda member: member.header_offset)
+        if not members:
+            makedirs(name=local_dst, exist_ok=True)
+            return
+
+        # Create all dirs before the parallel extraction, so the workers never race on creating them
+        local_dst_path = Path(local_dst).resolve()
+        for member in members:
+            member_path = Path(local_dst_path, member.filename).resolve()
+            if local_dst_path != member_path and local_dst_path not in member_path.parents:
+                raise Exception(f"Zip member: {member.filename} is outside of the unpack destination: {local_dst}")
+            makedirs(name=member_path if member.is_dir() else member_path.parent, exist_ok=True)
+
+        # Assign each member to the byte range containing its local header
+        byte_ranges = split_byte_ranges(total_size=archive_size, parts=workers, min_part_size=min_part_size)
+        member_sets = [[] for _ in byte_ranges]
+        range_index = 0
+        for member in members:
+            while member.header_offset >= sum(byte_ranges[range_index]):
+                range_index += 1
+            member_sets[range_index].append(member)
+        member_sets = [member_set for member_set in member_sets if member_set]
+        # Each set is read from the local header of its first member up to the local header of the next set
+        range_ends = [member_set[0].header_offset for member_set in member_sets[1:]] + [archive_size]
+        self.log.info(f"Streaming and unpacking: {remote_src}, members: {len(members)}, "
+                      f"in {len(member_sets)} parallel sets, to: {local_dst}")
+
+        def extract_member_set(session: SFTPClient, member_set: List[ZipInfo], range_end: int) -> None:
+            with session.open(filename=remote_src, mode="rb") as set_remote_file:
+                with ZipFile(set_remote_file) as set_zip_file:
+                    set_remote_file.seek(member_set[0].header_offset)
+                    set_remote_file.prefetch(file_size=range_end)
+                    for set_member in member_set:
+                        set_zip_file.extract(member=set_member, path=local_dst)
+
+        self._run_in_sessions(
+            extract_member_set, list(zip(member_sets, range_ends)), extra_transports=extra_transports)
+
+    def _get_file_with_retries(
+        self, remote_src, local_dst, try_times: int = 100, sleep_time: int = 3,
+        max_sleep_time: int = HPC_TRANSFER_MAX_RETRY_SLEEP, verify: bool = True
+    ) -> str:
+        """
+        Downloads the remote source into a `.part` file next to the local destination. A failed attempt
+        resumes from the last byte written to the `.part` file instead of starting from zero. The sleep
+        between attempts doubles with each attempt that made no progress, up to `max_sleep_time`.
+        The completed file is verified against the remote sha256sum before being moved to the destination.
+        The local sha256 is computed while the bytes are written, returns it.
+        """
         if try_times < 0 or sleep_time < 0:
             raise ValueError("Negative values passed for the times")
+        local_part = f"{local_dst}.part"
+        makedirs(name=Path(local_dst).parent.absolute(), exist_ok=True)
         tries = try_times
+        failures_without_progress = 0
         while tries > 0:
+            part_size_before = self._get_local_size(local_part)
             try:
-                self.get_file(remote_src=remote_src, local_dst=local_dst)
-                break
+                local_sha256 = self._resume_get_file(remote_src=remote_src, local_part=local_part)
+                if verify:
+                    try:
+                        self.verify_remote_sha256(
+                            local_path=local_part, remote_path=remote_src, local_sha256=local_sha256)
+                    except Exception:
+                        # The resumed content is corrupted, the next attempt starts from zero
+                        Path(local_part).unlink(missing_ok=True)
+                        raise
+                replace(local_part, local_dst)
+                return local_sha256
             except Exception as error:
                 tries -= 1
                 if tries <= 0:
                     raise Exception(f"Error when getting zip file: {error}, "
                                     f"remote_src: {remote_src}, local_dst: {local_dst}")
-                sleep(sleep_time)
+                if part_size_before < self._get_local_size(local_part):
+                    failures_without_progress = 0
+                delay = min(sleep_time * 2 ** failures_without_progress, max_sleep_time)
+                failures_without_progress += 1
+                self.log.warning(
+                    f"Getting file: {remote_src} failed: {error}, retrying in {delay} secs, tries left: {tries}")
+                sleep(delay)
                 continue
 
-    def mkdir_p(self, remotepath, mode=0o766):
+    def _resume_get_file(self, remote_src: str, local_part: str) -> str:
         self.recreate_sftp_if_required()
-        if remotepath == '/':
-            self.sftp_client.chdir('/')  # absolute path so change directory to root
+        remote_size = self.sftp_client.stat(remote_src).st_size
+        offset = self._get_local_size(local_part)
+        if offset > remote_size:
+            # The remote file was replaced in the meantime
+            offset = 0
+        if offset:
+            self.log.info(f"Resuming download of: {remote_src} from byte: {offset}/{remote_size}")
+        with open(local_part, mode="r+b" if offset else "wb") as local_file:
+            local_file.truncate(offset)
+            # Only the already downloaded prefix is read again, the rest is hashed while being written
+            file_hash = sha256()
+            while offset and local_file.tell() < offset:
+                file_hash.update(local_file.read(HPC_TRANSFER_CHUNK_SIZE))
+            local_file.seek(offset)
+            if offset == remote_size:
+                return file_hash.hexdigest()
+            with self.sftp_client.open(filename=remote_src, mode="rb") as remote_file:
+                remote_file.seek(offset)
+                remote_file.prefetch(file_size=remote_size)
+                next_progress_log = offset + HPC_TRANSFER_PROGRESS_LOG_STEP
+                while offset < remote_size:
+                    chunk = remote_file.read(min(HPC_TRANSFER_CHUNK_SIZE, remote_size - offset))
+                    if not chunk:
+                        raise EOFError(f"Unexpected end of remote file: {remote_src}")
+                    file_hash.update(chunk)
+                    local_file.write(chunk)
+                    # Flush so that the size of the part file is the resume offset of the next attempt
+                    local_file.flush()
+                    offset += len(chunk)
+                    if offset >= next_progress_log or offset == remote_size:
+                        self.log.info(
+                            f"Downloaded {offset}/{remote_size} bytes ({offset * 100 // remote_size}%) "
+                            f"of: {remote_src}")
+                        next_progress_log = offset + HPC_TRANSFER_PROGRESS_LOG_STEP
+        return file_hash.hexdigest()
+
+    @staticmethod
+    def _get_local_size(local_path: str) -> int:
+        try:
+            return getsize(local_path)
+        except OSError:
+            return 0
+
+    def mkdir_p(self, remotepath, mode=0o766) -> bool:
+        """
+        Creates the remote dir and all of its missing parents, returns whether a dir was created.
+        Known remote dirs are cached per sftp client, hence repeated calls for the same,
+        or for a parent dir, do not cost any round trip to the HPC.
+        """
+        remotepath = normpath(remotepath) if remotepath else remotepath
+        if remotepath in ('', '.', '/') or remotepath in self._get_remote_dirs_cache():
             return False
-        if remotepath == '':
-            return False  # top-level relative directory must exist
+        self.recreate_sftp_if_required()
+        try:
+            is_dir = S_ISDIR(self.sftp_client.stat(remotepath).st_mode)
+        except IOError:
+            is_dir = None
+        if is_dir is False:
+            raise Exception(f"The remote path exists, but is not a dir: {remotepath}")
+        if is_dir:
+            self._cache_remote_dir(remotepath)
+            return False
+        self.mkdir_p(remotepath=posix_dirname(remotepath), mode=mode)
+        try:
+            self.sftp_client.mkdir(path=remotepath, mode=mode)
+        except IOError:
+            # Created by a concurrent session in the meantime
+            if not S_ISDIR(self.sftp_client.stat(remotepath).st_mode):
+                raise
+        self._cache_remote_dir(remotepath)
+        return True
+
+    def mkdirs_p(self, remotepaths: List[str], mode=0o766) -> None:
+        """
+        Creates many remote dirs with a single `mkdir -p` command per batch, instead of a round trip
+        per path component. Falls back to `mkdir_p` per dir if commands cannot be executed on the host.
+        """
+        remote_dirs_cache = self._get_remote_dirs_cache()
+        missing_dirs = sorted({normpath(path) for path in remotepaths} - remote_dirs_cache)
+        if not missing_dirs:
+            return
         try:
-            self.sftp_client.chdir(remotepath)  # subdirectory exists
-        except IOError as error:
-            dir_name, base_name = split(remotepath.rstrip('/'))
-            self.mkdir_p(dir_name)  # make parent directories
-            self.sftp_client.mkdir(path=base_name, mode=mode)  # subdirectory missing, so created it
-            self.sftp_client.chdir(base_name)
-            return True
-
-    def get_file(self, remote_src, local_dst):
+            self.reconnect_if_required()
+            for index in range(0, len(missing_dirs), HPC_TRANSFER_MKDIR_BATCH_SIZE):
+                batch = missing_dirs[index:index + HPC_TRANSFER_MKDIR_BATCH_SIZE]
+                command = f"mkdir -p -m {mode:o} -- {' '.join(quote(path) for path in batch)}"
+                stdin, stdout, stderr = self.ssh_hpc_client.exec_command(command=command)
+                return_code = stdout.channel.recv_exit_status()
+                if return_code != 0:
+                    raise Exception(f"return code: {return_code}, error: {stderr.read()}")
+                for path in batch:
+                    self._cache_remote_dir(path)
+        except Exception as error:
+            self.log.warning(f"Batched creation of remote dirs failed: {error}, creating them one by one")
+            for path in missing_dirs:
+                self.mkdir_p(remotepath=path, mode=mode)
+        self.log.info(f"Created {len(missing_dirs)} remote dirs")
+
+    def _get_remote_dirs_cache(self) -> Set[str]:
+        # The cache is bound to the sftp client, a recreated client starts with an empty cache
+        if self._remote_dirs_cache_client is not self.sftp_client:
+            self._remote_dirs_cache = set()
+            self._remote_dirs_cache_client = self.sftp_client
+        return self._remote_dirs_cache
+
+    def _cache_remote_dir(self, remotepath: str) -> None:
+        remote_dir = PurePosixPath(remotepath)
+        remote_dirs_cache = self._get_remote_dirs_cache()
+        remote_dirs_cache.add(str(remote_dir))
+        remote_dirs_cache.update(str(parent) for parent in remote_dir.parents)
+
+    def get_file(self, remote_src, local_dst, verify: bool = False) -> str:
+        """
+        Downloads the file and returns its sha256, computed while the bytes are written locally.
+        With `verify` the digest is compared with the remote sha256sum, a mismatch raises an exception.
+        Not verified by default, since a remote sha256sum per file costs a round trip and a full read,
+        the archives are verified by their callers instead.
+        """
         self.recreate_sftp_if_required()
         makedirs(name=Path(local_dst).parent.absolute(), exist_ok=True)
-        self.sftp_client.get(remotepath=remote_src, localpath=local_dst)
+        with self.sftp_client.open(filename=remote_src, mode="rb") as remote_file:
+            remote_file.prefetch()
+            with open(local_dst, mode="wb") as local_file:
+                hashing_writer = _HashingWriter(stream=local_file)
+                for chunk in iter(lambda: remote_file.read(HPC_TRANSFER_CHUNK_SIZE), b""):
+                    hashing_writer.write(chunk)
+        local_sha256 = hashing_writer.hasher.hexdigest()
+        if verify:
+            self.verify_remote_sha256(local_path=local_dst, remote_path=remote_src, local_sha256=local_sha256)
+        return local_sha256
 
     def get_dir(self, remote_src, local_dst, mode=0o766):
         """
@@ -220,24 +713,205 @@ class HPCTransfer(HPCConnector):
             else:
                 self.get_file(remote_src=item_src, local_dst=item_dst)
 
-    def put_file(self, local_src, remote_dst):
+    def put_file(self, local_src, remote_dst, verify: bool = False) -> str:
+        """
+        Uploads the file and returns its sha256, computed while the bytes are read for the upload.
+        With `verify` the digest is compared with the remote sha256sum, a mismatch raises an exception.
+        Otherwise, only the remote size is checked, the archives are verified by their callers.
+        """
         self.recreate_sftp_if_required()
         self.mkdir_p(remotepath=str(Path(remote_dst).parent.absolute()))
-        self.sftp_client.put(localpath=local_src, remotepath=remote_dst)
+        with open(local_src, mode="rb") as local_file:
+            with self.sftp_client.open(filename=remote_dst, mode="wb") as remote_file:
+                remote_file.set_pipelined(True)
+                hashing_writer = _HashingWriter(stream=remote_file)
+                for chunk in iter(lambda: local_file.read(HPC_TRANSFER_CHUNK_SIZE), b""):
+                    hashing_writer.write(chunk)
+        local_sha256 = hashing_writer.hasher.hexdigest()
+        if verify:
+            self.verify_remote_sha256(local_path=local_src, remote_path=remote_dst, local_sha256=local_sha256)
+        else:
+            # The same size check as done by the paramiko put
+            remote_size = self.sftp_client.stat(remote_dst).st_size
+            if remote_size != getsize(local_src):
+                raise IOError(f"Size mismatch in put: {remote_size} != {getsize(local_src)}, remote: {remote_dst}")
+        return local_sha256
 
-    def put_dir(self, local_src, remote_dst, mode=0o766):
+    def put_dir(
+        self, local_src, remote_dst, mode=0o766, channels: int = HPC_TRANSFER_PARALLEL_CHANNELS,
+        extra_transports: bool = False
+    ):
         """
         Uploads the contents of the local source directory to the remote destination directory.
-        The remote destination directory needs to exist.
-        All subdirectories in source are created under destination.
+        All subdirectories in source are created under destination in batches, then the files are split
+        into sets of approximately equal total size, each uploaded over its own sftp session.
+        Every single put is confirmed with a size check.
+        """
+        remote_dirs, sized_files = [], []
+        for root, dirs, files in walk(local_src):
+            rel_root = relpath(root, local_src)
+            remote_dirs.append(remote_dst if rel_root == "." else join(remote_dst, rel_root))
+            for file_name in files:
+                rel_path = relpath(join(root, file_name), local_src)
+                sized_files.append((rel_path, getsize(join(local_src, rel_path))))
+        self.mkdirs_p(remotepaths=remote_dirs, mode=mode)
+        file_sets = split_into_balanced_sets(sized_items=sized_files, sets=channels)
+        self.log.info(f"Putting dir: {local_src}, files: {len(sized_files)}, in {len(file_sets)} parallel sets")
+
+        def put_file_set(session: SFTPClient, rel_paths: List[str]) -> None:
+            for rel_path in rel_paths:
+                session.put(localpath=join(local_src, rel_path), remotepath=join(remote_dst, rel_path))
+
+        self._run_in_sessions(put_file_set, [(file_set,) for file_set in file_sets], extra_transports)
+
+    @contextmanager
+    def sftp_sessions(self, amount: int, extra_transports: bool = False):
+        """
+        Yields `amount` additional sftp sessions. By default, the sessions are multiplexed as separate channels
+        on the existing transport. With `extra_transports` each session gets its own transport, i.e.,
+        its own packetizer thread and encryption state, opened through the existing proxy connection.
         """
         self.recreate_sftp_if_required()
-        self.mkdir_p(remotepath=remote_dst, mode=mode)
-        for item in listdir(local_src):
-            item_src = join(local_src, item)
-            item_dst = join(remote_dst, item)
-            if isdir(item_src):
-                self.put_dir(local_src=item_src, remote_dst=item_dst, mode=mode)
-            else:
-                self.sftp_client.chdir(remote_dst)
-                self.put_file(local_src=item_src, remote_dst=item_dst)
+        sessions, transports = [], []
+        try:
+            for _ in range(amount):
+                if extra_transports:
+                    transport = self.open_extra_hpc_transport()
+                    transports.append(transport)
+                else:
+                    transport = self.ssh_hpc_client.get_transport()
+                sessions.append(SFTPClient.from_transport(transport))
+            yield sessions
+        finally:
+            for session in sessions:
+                session.close()
+            for transport in transports:
+                transport.close()
+
+    def compute_remote_sha256(self, remote_path: str) -> str:
+        self.reconnect_if_required()
+        stdin, stdout, stderr = self.ssh_hpc_client.exec_command(command=f"sha256sum {quote(remote_path)}")
+        output = stdout.read().decode()
+        return_code = stdout.channel.recv_exit_status()
+        if return_code != 0:
+            raise Exception(f"Failed to compute the sha256 of remote file: {remote_path}, error: {stderr.read()}")
+        return output.split()[0]
+
+    def verify_remote_sha256(self, local_path: str, remote_path: str, local_sha256: str = None) -> str:
+        if not local_sha256:
+            local_sha256 = compute_file_sha256(local_path)
+        remote_sha256 = self.compute_remote_sha256(remote_path)
+        if local_sha256 != remote_sha256:
+            raise Exception(
+                f"Checksum mismatch between local: {local_path} ({local_sha256}), "
+                f"and remote: {remote_path} ({remote_sha256})")
+        self.log.info(f"Verified sha256 {local_sha256} of local: {local_path}, remote: {remote_path}")
+        return local_sha256
+
+    def put_file_parallel(
+        self, local_src: str, remote_dst: str, channels: int = HPC_TRANSFER_PARALLEL_CHANNELS,
+        extra_transports: bool = False, min_part_size: int = HPC_TRANSFER_MIN_PART_SIZE, verify: bool = True
+    ) -> None:
+        """
+        Uploads a single large file by splitting it into byte ranges, each written in place
+        into the remote file over its own sftp session. The reassembled remote file is verified
+        against the local file with a remote sha256sum.
+        """
+        file_size = getsize(local_src)
+        byte_ranges = split_byte_ranges(total_size=file_size, parts=channels, min_part_size=min_part_size)
+        if len(byte_ranges) == 1:
+            self.put_file(local_src=local_src, remote_dst=remote_dst, verify=verify)
+            return
+        self.log.info(f"Putting file: {local_src}, size: {file_size}, in {len(byte_ranges)} parallel parts")
+        self.mkdir_p(remotepath=str(Path(remote_dst).parent.absolute()))
+        # Create the remote file with its final size, each byte range is then written in place
+        with self.sftp_client.open(filename=remote_dst, mode="wb") as remote_file:
+            remote_file.truncate(file_size)
+
+        def put_byte_range(session: SFTPClient, offset: int, length: int) -> None:
+            with open(local_src, mode="rb") as local_file:
+                with session.open(filename=remote_dst, mode="r+b") as remote_file:
+                    remote_file.set_pipelined(True)
+                    local_file.seek(offset)
+                    remote_file.seek(offset)
+                    while length > 0:
+                        chunk = local_file.read(min(HPC_TRANSFER_CHUNK_SIZE, length))
+                        if not chunk:
+                            raise EOFError(f"Unexpected end of local file: {local_src}")
+                        remote_file.write(chunk)
+                        length -= len(chunk)
+
+        self._run_in_sessions(put_byte_range, byte_ranges, extra_transports)
+        if verify:
+            self.verify_remote_sha256(local_path=local_src, remote_path=remote_dst)
+
+    def get_file_parallel(
+        self, remote_src: str, local_dst: str, channels: int = HPC_TRANSFER_PARALLEL_CHANNELS,
+        extra_transports: bool = False, min_part_size: int = HPC_TRANSFER_MIN_PART_SIZE, verify: bool = True
+    ) -> None:
+        """
+        Downloads a single large file by splitting it into byte ranges, each fetched over its own
+        sftp session and written in place into the local file. The reassembled local file is verified
+        against the remote file with a remote sha256sum.
+        """
+        self.recreate_sftp_if_required()
+        file_size = self.sftp_client.stat(remote_src).st_size
+        byte_ranges = split_byte_ranges(total_size=file_size, parts=channels, min_part_size=min_part_size)
+        if len(byte_ranges) == 1:
+            self.get_file(remote_src=remote_src, local_dst=local_dst, verify=verify)
+            return
+        self.log.info(f"Getting file: {remote_src}, size: {file_size}, in {len(byte_ranges)} parallel parts")
+        makedirs(name=Path(local_dst).parent.absolute(), exist_ok=True)
+        with open(local_dst, mode="wb") as local_file:
+            local_file.truncate(file_size)
+
+        def get_byte_range(session: SFTPClient, offset: int, length: int) -> None:
+            with session.open(filename=remote_src, mode="rb") as remote_file:
+                with open(local_dst, mode="r+b") as local_file:
+                    remote_file.seek(offset)
+                    # Keep the read requests of the whole byte range in flight
+                    remote_file.prefetch(file_size=offset + length)
+                    local_file.seek(offset)
+                    while length > 0:
+                        chunk = remote_file.read(min(HPC_TRANSFER_CHUNK_SIZE, length))
+                        if not chunk:
+                            raise EOFError(f"Unexpected end of remote file: {remote_src}")
+                        local_file.write(chunk)
+                        length -= len(chunk)
+
+        self._run_in_sessions(get_byte_range, byte_ranges, extra_transports)
+        if verify:
+            self.verify_remote_sha256(local_path=local_dst, remote_path=remote_src)
+
+    def get_dir_parallel(
+        self, remote_src: str, local_dst: str, channels: int = HPC_TRANSFER_PARALLEL_CHANNELS,
+        extra_transports: bool = False, mode=0o766
+    ) -> None:
+        """
+        Downloads a directory tree by splitting its files into sets of approximately equal total size,
+        each downloaded over its own sftp session. Every single get is confirmed with a size check.
+        """
+        self.recreate_sftp_if_required()
+        sized_files = list(self._list_remote_file_sizes(remote_dir=remote_src).items())
+        makedirs(name=local_dst, mode=mode, exist_ok=True)
+        for rel_path, _ in sized_files:
+            makedirs(name=Path(local_dst, rel_path).parent, mode=mode, exist_ok=True)
+        file_sets = split_into_balanced_sets(sized_items=sized_files, sets=channels)
+        self.log.info(f"Getting dir: {remote_src}, files: {len(sized_files)}, in {len(file_sets)} parallel sets")
+
+        def get_file_set(session: SFTPClient, rel_paths: List[str]) -> None:
+            for rel_path in rel_paths:
+                session.get(remotepath=join(remote_src, rel_path), localpath=join(local_dst, rel_path))
+
+        self._run_in_sessions(get_file_set, [(file_set,) for file_set in file_sets], extra_transports)
+
+    def _run_in_sessions(self, task, tasks_args: List[tuple], extra_transports: bool) -> None:
+        if not tasks_args:
+            return
+        with self.sftp_sessions(amount=len(tasks_args), extra_transports=extra_transports) as sessions:
+            with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+                futures = [
+                    executor.submit(task, session, *task_args) for session, task_args in zip(sessions, tasks_args)]
+                # Raises the first error, if any, after all parts have finished
+                for future in futures:
+                    future.result()
@@ -1,4 +1,7 @@
+from hashlib import sha256
+from io import DEFAULT_BUFFER_SIZE
 from pathlib import Path
+from typing import List, Tuple
 
 from .constants import (
     HPC_DIR_BATCH_SCRIPTS, HPC_DIR_SLURM_WORKSPACES, HPC_PATH_HOME_USERS, HPC_PATH_SCRATCH1_OCR_PROJECT)
@@ -29,3 +32,67 @@ def resolve_hpc_slurm_workspaces_dir(
     project_root_dir: str, slurm_workspaces_dir: str = HPC_DIR_SLURM_WORKSPACES
 ) -> str:
     return f"{resolve_hpc_project_root_dir(project_root_dir)}/{slurm_workspaces_dir}"
+
+
+def compute_file_sha256(file_path: str, chunk_size: int = DEFAULT_BUFFER_SIZE * 128) -> str:
+    file_hash = sha256()
+    with open(file_path, mode="rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def remove_listed_files(dir_path: str, files_list_path: str) -> int:
+    """
+    Removes the files listed, one relative path per line, in the files list and then the list itself.
+    Directories left empty are removed as well. Returns the amount of listed files.
+    """
+    files_list = Path(files_list_path)
+    if not files_list.exists():
+        raise Exception(f"The list of removed files is missing: {files_list}")
+    base_path = Path(dir_path).resolve()
+    removed_files = [line for line in files_list.read_text().splitlines() if line]
+    for removed_file in removed_files:
+        file_path = Path(base_path, removed_file).resolve()
+        if base_path not in file_path.parents:
+            raise Exception(f"Listed removed file: {removed_file} is outside of the dir: {base_path}")
+        file_path.unlink(missing_ok=True)
+        for parent_dir in file_path.parents:
+            if parent_dir == base_path or any(parent_dir.iterdir()):
+                break
+            parent_dir.rmdir()
+    files_list.unlink()
+    return len(removed_files)
+
+
+def split_byte_ranges(total_size: int, parts: int, min_part_size: int) -> List[Tuple[int, int]]:
+    """
+    Splits `total_size` bytes into at most `parts` contiguous (offset, length) ranges.
+    No range is smaller than `min_part_size`, except when the total size itself is smaller.
+    """
+    if total_size <= 0:
+        return [(0, 0)]
+    parts = max(1, min(parts, total_size // max(min_part_size, 1)))
+    part_size, remainder = divmod(total_size, parts)
+    ranges = []
+    offset = 0
+    for index in range(parts):
+        length = part_size + (1 if index < remainder else 0)
+        ranges.append((offset, length))
+        offset += length
+    return ranges
+
+
+def split_into_balanced_sets(sized_items: List[Tuple[str, int]], sets: int) -> List[List[str]]:
+    """
+    Distributes items (name, size) into `sets` lists with approximately equal total sizes.
+    The largest items are assigned first, each to the currently smallest set.
+    """
+    sets = max(1, min(sets, len(sized_items)))
+    buckets = [[] for _ in range(sets)]
+    bucket_sizes = [0] * sets
+    for name, size in sorted(sized_items, key=lambda item: item[1], reverse=True):
+        index = bucket_sizes.index(min(bucket_sizes))
+        buckets[index].append(name)
+        bucket_sizes[index] += size
+    return buckets
@@ -77,6 +77,11 @@ class RMQConsumer(RMQConnector):
         if self._channel:
             self._channel.close()
 
+    def process_data_events(self, time_limit: float = 0) -> None:
+        # Services the connection, e.g., answers the heartbeats, while a callback is still waiting for its work
+        if self._connection and self._connection.is_open:
+            self._connection.process_data_events(time_limit=time_limit)
+
     def ack_message(self, delivery_tag: int) -> None:
         self.logger.debug(f"Acknowledging message {delivery_tag}")
         self._channel.basic_ack(delivery_tag)
@@ -1,19 +1,20 @@
 from functools import wraps
 from io import DEFAULT_BUFFER_SIZE
-from os import makedirs, sep
-from os.path import basename, dirname, exists
+from os import makedirs
+from os.path import dirname, exists
 from pathlib import Path
 from pika import URLParameters
 from pymongo import uri_parser as mongo_uri_parser
 from re import match as re_match
 from requests import get, post
 from requests.exceptions import RequestException
-from shutil import make_archive, move, unpack_archive
+from typing import List, Tuple
 from uuid import uuid4
 
 from ocrd_utils import initLogging
 
-from .constants import OLA_HD_BAG_ENDPOINT, OLA_HD_USER, OLA_HD_PASSWORD
+from .archive import make_archive_file, make_archive_stream, unpack_archive_file
+from .constants import ARCHIVE_CODEC_AUTO, OLA_HD_BAG_ENDPOINT, OLA_HD_USER, OLA_HD_PASSWORD
 
 
 logging_initialized = False
@@ -101,18 +102,18 @@ def receive_file(response, download_path, chunk_size: int = DEFAULT_BUFFER_SIZE,
                 filePtr.flush()
 
 
-def make_zip_archive(source, destination) -> None:
-    base = basename(destination)
-    name = base.split('.')[0]
-    zip_format = base.split('.')[1]
-    archive_from = dirname(source)
-    archive_to = basename(source.strip(sep))
-    make_archive(base_name=name, format=zip_format, root_dir=archive_from, base_dir=archive_to)
-    move(src=f"{name}.{zip_format}", dst=destination)
+# The zip named helpers are kept for the existing callers, they handle all archive codecs.
+# Prefer the functions of `operandi_utils.archive` named after the archive instead.
+def make_zip_archive(source, destination, codec: str = ARCHIVE_CODEC_AUTO) -> None:
+    make_archive_file(source=source, destination=destination, codec=codec)
 
 
 def unpack_zip_archive(source, destination) -> None:
-    unpack_archive(filename=source, extract_dir=destination)
+    unpack_archive_file(source=source, destination=destination)
+
+
+def make_zip_archive_stream(stream, sources: List[Tuple[str, str]], codec: str = ARCHIVE_CODEC_AUTO) -> None:
+    make_archive_stream(stream=stream, sources=sources, codec=codec)
 
 
 # TODO: Conceptual implementation, not tested in any way yet
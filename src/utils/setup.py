@@ -19,6 +19,7 @@ setup(
         'operandi_utils.hpc',
         'operandi_utils.rabbitmq'
     ],
-    package_data={'': ['batch_scripts/*.sh', 'nextflow_workflows/*.nf']},
-    install_requires=install_requires
+    package_data={'': ['batch_scripts/*.py', 'batch_scripts/*.sh', 'nextflow_workflows/*.nf']},
+    install_requires=install_requires,
+    extras_require={'async': ['asyncssh>=2.14.0'], 'zstd': ['zstandard>=0.21.0']}
 )
@@ -0,0 +1,57 @@
+"""
+Compares the archive codecs on the test workspaces - archive size, packing time, and unpacking time.
+
+    python tests/benchmarks/benchmark_archive_codecs.py --repeat 5
+"""
+import click
+from os.path import dirname, getsize, join
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+from operandi_utils import get_archive_suffix, make_archive_file, unpack_archive_file
+from operandi_utils.constants import ARCHIVE_CODEC_ZSTD, ARCHIVE_CODECS
+
+WORKSPACES_DIR = join(dirname(dirname(__file__)), "assets", "workspaces")
+
+
+def dir_size(path: str) -> int:
+    return sum(file.stat().st_size for file in Path(path).rglob("*") if file.is_file())
+
+
+@click.command()
+@click.option("--workspaces-dir", default=WORKSPACES_DIR, help="Dir containing the extracted test workspaces.")
+@click.option("--repeat", default=3, type=int, help="Amount of repetitions, the fastest one is reported.")
+def benchmark(workspaces_dir: str, repeat: int):
+    codecs = list(ARCHIVE_CODECS)
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        click.echo(f"Skipping the `{ARCHIVE_CODEC_ZSTD}` codec, the `zstandard` package is not installed")
+        codecs.remove(ARCHIVE_CODEC_ZSTD)
+
+    temp_dir = mkdtemp(prefix="operandi_benchmark_")
+    click.echo(f"{'workspace':<12} {'codec':<8} {'ratio':>6} {'pack ms':>9} {'unpack ms':>10}")
+    for workspace_dir in sorted(path for path in Path(workspaces_dir).iterdir() if path.is_dir()):
+        source = str(workspace_dir)
+        source_size = dir_size(source)
+        for codec in codecs:
+            archive_path = join(temp_dir, f"{workspace_dir.name}{get_archive_suffix(codec)}")
+            unpack_dir = join(temp_dir, f"{workspace_dir.name}_{codec}")
+            pack_times, unpack_times = [], []
+            for _ in range(repeat):
+                start = perf_counter()
+                make_archive_file(source=source, destination=archive_path, codec=codec)
+                pack_times.append(perf_counter() - start)
+                rmtree(unpack_dir, ignore_errors=True)
+                start = perf_counter()
+                unpack_archive_file(source=archive_path, destination=unpack_dir)
+                unpack_times.append(perf_counter() - start)
+            ratio = getsize(archive_path) / source_size
+            click.echo(f"{workspace_dir.name:<12} {codec:<8} {ratio:>6.3f} "
+                       f"{min(pack_times) * 1000:>9.1f} {min(unpack_times) * 1000:>10.1f}")
+    rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark()
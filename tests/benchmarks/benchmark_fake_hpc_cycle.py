@@ -0,0 +1,95 @@
+"""
+Measures the throughput of the submit, poll and download cycle of workflow jobs against the in-process fake HPC.
+Neither the HPC nor the network is required, the cost of nextflow is emulated with the run time of the fake jobs.
+
+Runs from the repository root, e.g.:
+    python -m tests.benchmarks.benchmark_fake_hpc_cycle --jobs 20 --queue-delay 0.5 --run-time 1 --agent
+"""
+import click
+from os.path import abspath, join
+from shutil import copytree, rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+from operandi_utils.hpc.constants import (
+    HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB, HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB_ARRAY)
+from tests.helpers_fake_hpc import FakeHPC
+
+
+@click.command()
+@click.option("--workspace-dir", default="tests/assets/workspaces/small_ws/data", help="The ocrd workspace dir.")
+@click.option("--nextflow-script", default="tests/assets/workflows/test_template_workflow.nf",
+              help="The nextflow script of the workflow jobs.")
+@click.option("--jobs", default=10, type=int, help="Amount of workflow jobs.")
+@click.option("--queue-delay", default=0.0, type=float, help="Seconds each slurm job is pending.")
+@click.option("--run-time", default=0.0, type=float, help="Minimal seconds each slurm job is running.")
+@click.option("--failure-rate", default=0.0, type=float, help="Probability of a slurm job to fail.")
+@click.option("--agent/--no-agent", default=False, help="Send the slurm requests over the hpc agent.")
+@click.option("--array", is_flag=True, default=False, help="Submit all workflow jobs as a single slurm job array.")
+def benchmark(
+    workspace_dir: str, nextflow_script: str, jobs: int, queue_delay: float, run_time: float, failure_rate: float,
+    agent: bool, array: bool
+):
+    # The nextflow script is symlinked into the slurm workspace, hence relative paths would break
+    nextflow_script = abspath(nextflow_script)
+    fake_hpc = FakeHPC(queue_delay=queue_delay, run_time=run_time, failure_rate=failure_rate, seed=0)
+    local_dir = mkdtemp(prefix="operandi_benchmark_")
+    try:
+        start = perf_counter()
+        hpc_transfer = fake_hpc.create_transfer()
+        hpc_executor = fake_hpc.create_executor()
+        batch_scripts = hpc_transfer.deploy_batch_scripts()
+        hpc_executor.use_deployed_batch_scripts(batch_scripts=batch_scripts, start_agent=agent)
+        setup_time = perf_counter() - start
+
+        start = perf_counter()
+        workflow_jobs = []
+        for index in range(jobs):
+            job_workspace_dir = join(local_dir, f"ws_{index}")
+            copytree(src=workspace_dir, dst=job_workspace_dir)
+            workflow_job_id = f"wf_job_{index}"
+            hpc_transfer.pack_and_put_slurm_workspace(
+                ocrd_workspace_dir=job_workspace_dir, workflow_job_id=workflow_job_id,
+                nextflow_script_path=nextflow_script)
+            workflow_jobs.append(dict(
+                workflow_job_id=workflow_job_id, nextflow_script_path=nextflow_script, input_file_grp="DEFAULT",
+                workspace_id=f"ws_{index}", mets_basename="mets.xml", nf_process_forks=1, ws_pages_amount=1,
+                use_mets_server=False, file_groups_to_remove=""))
+        if array:
+            slurm_job_ids = hpc_executor.trigger_slurm_job_array(
+                array_batch_script_path=batch_scripts[HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB_ARRAY],
+                batch_script_path=batch_scripts[HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB], workflow_jobs=workflow_jobs)
+        else:
+            slurm_job_ids = [
+                hpc_executor.trigger_slurm_job(
+                    batch_script_path=batch_scripts[HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB], **workflow_job)
+                for workflow_job in workflow_jobs]
+        submit_time = perf_counter() - start
+
+        start = perf_counter()
+        slurm_job_states = fake_hpc.wait_slurm_job_states(
+            executor=hpc_executor, slurm_job_ids=slurm_job_ids, timeout=max(60.0, 10 * (queue_delay + run_time)))
+        poll_time = perf_counter() - start
+
+        start = perf_counter()
+        completed = 0
+        for workflow_job, slurm_job_id in zip(workflow_jobs, slurm_job_ids):
+            if slurm_job_states[slurm_job_id] != "COMPLETED":
+                continue
+            hpc_transfer.get_and_unpack_slurm_workspace(
+                ocrd_workspace_dir=join(local_dir, workflow_job["workspace_id"]),
+                workflow_job_dir=join(local_dir, workflow_job["workflow_job_id"]))
+            completed += 1
+        download_time = perf_counter() - start
+        hpc_executor.stop_agent()
+    finally:
+        fake_hpc.stop()
+        rmtree(local_dir, ignore_errors=True)
+
+    total_time = setup_time + submit_time + poll_time + download_time
+    click.echo(f"{'setup s':>8} {'submit s':>9} {'poll s':>8} {'download s':>11} {'completed':>10} {'jobs/s':>8}")
+    click.echo(f"{setup_time:>8.2f} {submit_time:>9.2f} {poll_time:>8.2f} {download_time:>11.2f} "
+               f"{completed:>6}/{jobs:<3} {jobs / total_time:>8.2f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,109 @@
+"""
+Compares merging the METS file chunks of the forks with a serial `ocrd workspace merge` per chunk against
+the single pass of the merge script, on generated METS files with thousands of pages.
+
+    python tests/benchmarks/benchmark_mets_merge.py --pages 1000 --pages 3000 --forks 16 --repeat 1
+"""
+import click
+from importlib.util import module_from_spec, spec_from_file_location
+from os import listdir, makedirs
+from os.path import dirname, join
+from shutil import copytree, rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+from ocrd_models import OcrdMets
+from operandi_utils.hpc import write_page_ranges
+from operandi_utils.hpc.constants import HPC_DIR_BATCH_SCRIPTS, HPC_DIR_METS_CHUNKS, HPC_METS_MERGE_SCRIPT
+import operandi_utils.hpc
+
+MERGE_SCRIPT_PATH = join(dirname(operandi_utils.hpc.__file__), HPC_DIR_BATCH_SCRIPTS, HPC_METS_MERGE_SCRIPT)
+
+
+def load_merge_mets_chunks():
+    spec = spec_from_file_location("merge_mets_chunks", MERGE_SCRIPT_PATH)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.merge_mets_chunks
+
+
+def write_mets(mets: OcrdMets, path: str) -> None:
+    with open(path, "wb") as mets_file:
+        mets_file.write(mets.to_xml(xmllint=True))
+
+
+def generate_workflow_job_dir(dst_dir: str, pages: int, forks: int) -> None:
+    """
+    Writes a METS file with an image per page and its chunks, each chunk extended by the files
+    that two processors of a fork would add.
+    """
+    mets = OcrdMets.empty_mets()
+    for index in range(1, pages + 1):
+        mets.add_file("OCR-D-IMG", ID=f"OCR-D-IMG_{index:05}", mimetype="image/tiff", pageId=f"PHYS_{index:05}",
+                      local_filename=f"OCR-D-IMG/OCR-D-IMG_{index:05}.tif")
+    write_mets(mets, join(dst_dir, "mets.xml"))
+    write_page_ranges(dst_dir=dst_dir, mets_path=join(dst_dir, "mets.xml"), chunks=forks)
+    for mets_chunk_name in listdir(join(dst_dir, HPC_DIR_METS_CHUNKS)):
+        mets_chunk_path = join(dst_dir, HPC_DIR_METS_CHUNKS, mets_chunk_name)
+        mets_chunk = OcrdMets(filename=mets_chunk_path)
+        for page_id in mets_chunk.physical_pages:
+            for file_grp in ["OCR-D-BIN", "OCR-D-OCR"]:
+                mets_chunk.add_file(file_grp, ID=f"{file_grp}_{page_id}", mimetype="application/vnd.prima.page+xml",
+                                    pageId=page_id, local_filename=f"{file_grp}/{file_grp}_{page_id}.xml")
+        write_mets(mets_chunk, mets_chunk_path)
+
+
+def merge_serial(workflow_job_dir: str) -> None:
+    # Same as `ocrd workspace merge --force --no-copy-files <chunk> --page-id <range>` for each chunk,
+    # without the start up of the ocrd CLI inside the container
+    mets_path = join(workflow_job_dir, "mets.xml")
+    with open(join(workflow_job_dir, "page_ranges.tsv")) as page_ranges_file:
+        page_ranges = [line.rstrip("\n").split("\t") for line in page_ranges_file]
+    for mets_chunk_name, page_range in page_ranges:
+        mets = OcrdMets(filename=mets_path)
+        mets.merge(OcrdMets(filename=join(workflow_job_dir, HPC_DIR_METS_CHUNKS, mets_chunk_name)), force=True,
+                   pageId=page_range)
+        write_mets(mets, mets_path)
+
+
+def merge_single_pass(workflow_job_dir: str) -> None:
+    mets_chunks_dir = join(workflow_job_dir, HPC_DIR_METS_CHUNKS)
+    load_merge_mets_chunks()(
+        mets_path=join(workflow_job_dir, "mets.xml"),
+        chunk_paths=[join(mets_chunks_dir, mets_chunk_name) for mets_chunk_name in listdir(mets_chunks_dir)])
+
+
+@click.command()
+@click.option("--pages", multiple=True, default=[1000, 3000], type=int, help="Amounts of pages of the METS files.")
+@click.option("--forks", default=16, type=int, help="Amount of forks, i.e., of METS file chunks.")
+@click.option("--repeat", default=3, type=int, help="Amount of repetitions, the fastest one is reported.")
+def benchmark(pages: list, forks: int, repeat: int):
+    temp_dir = mkdtemp(prefix="operandi_benchmark_")
+    click.echo(f"{'pages':>6} {'forks':>6} {'serial ms':>10} {'single ms':>10} {'speedup':>8}")
+    for pages_amount in pages:
+        generated_dir = join(temp_dir, f"generated_{pages_amount}")
+        makedirs(generated_dir)
+        generate_workflow_job_dir(generated_dir, pages=pages_amount, forks=forks)
+        merged_files = {}
+        times = {}
+        for name, merge in [("serial", merge_serial), ("single", merge_single_pass)]:
+            times[name] = []
+            for _ in range(repeat):
+                workflow_job_dir = join(temp_dir, name)
+                rmtree(workflow_job_dir, ignore_errors=True)
+                copytree(generated_dir, workflow_job_dir)
+                start = perf_counter()
+                merge(workflow_job_dir)
+                times[name].append(perf_counter() - start)
+            merged_files[name] = sorted(
+                (mets_file.fileGrp, mets_file.ID, mets_file.pageId)
+                for mets_file in OcrdMets(filename=join(workflow_job_dir, "mets.xml")).find_files())
+        if merged_files["serial"] != merged_files["single"]:
+            raise click.ClickException(f"The merged METS files differ for {pages_amount} pages")
+        serial, single = min(times["serial"]), min(times["single"])
+        click.echo(f"{pages_amount:>6} {forks:>6} {serial * 1000:>10.1f} {single * 1000:>10.1f} "
+                   f"{serial / single:>7.1f}x")
+    rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark()
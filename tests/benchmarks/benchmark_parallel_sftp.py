@@ -0,0 +1,101 @@
+"""
+Measures the throughput of the multi-channel parallel sftp transfers against the single channel transfers.
+
+Runs against the HPC configured with the same environment variables as the HPC tests, e.g.:
+    python tests/benchmarks/benchmark_parallel_sftp.py --size-mb 512 --channels 1,2,4,8
+Against a local sshd, used as both the proxy and the hpc host, e.g.:
+    python tests/benchmarks/benchmark_parallel_sftp.py --proxy-host localhost --hpc-host localhost --port 2222
+Against the in-process fake HPC, without any configuration, from the repository root, e.g.:
+    python -m tests.benchmarks.benchmark_parallel_sftp --fake-hpc --size-mb 64
+"""
+import click
+from os import remove, urandom
+from os.path import join
+from socket import create_connection
+from tempfile import mkdtemp
+from time import perf_counter
+from operandi_utils.hpc import HPCConnectionPool, HPCTransfer
+from operandi_utils.hpc.constants import HPC_TRANSFER_HOSTS, HPC_TRANSFER_PROXY_HOSTS
+
+
+class PortConnectionPool(HPCConnectionPool):
+    """
+    Connects to the proxy and hpc hosts on `port` instead of the default ssh port.
+    """
+    def __init__(self, port: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.port = port
+
+    def _open_proxy_sock(self, host: str, port: int):
+        return create_connection((host, self.port), timeout=self.connect_timeout)
+
+    def get_hpc_client(self, **kwargs):
+        return super().get_hpc_client(**dict(kwargs, hpc_port=self.port))
+
+
+def write_random_file(file_path: str, size_mb: int) -> None:
+    with open(file_path, mode="wb") as random_file:
+        for _ in range(size_mb):
+            random_file.write(urandom(1024 * 1024))
+
+
+def timed(method, **kwargs) -> float:
+    start = perf_counter()
+    method(**kwargs)
+    return perf_counter() - start
+
+
+@click.command()
+@click.option("--size-mb", default=256, type=int, help="Size of the transferred test file in MiB.")
+@click.option("--channels", default="1,2,4,8", help="Comma separated list of channel counts to measure.")
+@click.option("--extra-transports", is_flag=True, default=False, help="Open a separate transport per channel.")
+@click.option("--tunnel-host", default="localhost", help="Local host of the tunnel to the HPC.")
+@click.option("--tunnel-port", default=22, type=int, help="Local port of the tunnel to the HPC.")
+@click.option("--proxy-host", "proxy_hosts", multiple=True, help="Proxy host, repeatable, default: the HPC proxies.")
+@click.option("--hpc-host", "hpc_hosts", multiple=True, help="Hpc host, repeatable, default: the HPC transfer hosts.")
+@click.option("--port", default=22, type=int, help="Ssh port of the proxy and hpc hosts.")
+@click.option("--fake-hpc", is_flag=True, default=False, help="Transfer to the in-process fake HPC instead.")
+def benchmark(
+    size_mb: int, channels: str, extra_transports: bool, tunnel_host: str, tunnel_port: int, proxy_hosts: tuple,
+    hpc_hosts: tuple, port: int, fake_hpc: bool
+):
+    fake = None
+    if fake_hpc:
+        # Imported only here, since the fake HPC is a test helper importable from the repository root only
+        from tests.helpers_fake_hpc import FakeHPC
+        fake = FakeHPC()
+        hpc_transfer = fake.create_transfer()
+    else:
+        hpc_transfer = HPCTransfer(
+            transfer_hosts=list(hpc_hosts) or HPC_TRANSFER_HOSTS,
+            proxy_hosts=list(proxy_hosts) or HPC_TRANSFER_PROXY_HOSTS, tunnel_host=tunnel_host, tunnel_port=tunnel_port,
+            connection_pool=PortConnectionPool(port=port) if port != 22 else None)
+    local_dir = mkdtemp(prefix="operandi_benchmark_")
+    local_src = join(local_dir, "benchmark.bin")
+    local_dst = join(local_dir, "benchmark_received.bin")
+    remote_path = join(hpc_transfer.project_root_dir, "benchmark_parallel_sftp.bin")
+    write_random_file(local_src, size_mb)
+
+    click.echo(f"{'channels':>8} {'put MB/s':>10} {'get MB/s':>10}")
+    for amount in [int(value) for value in channels.split(",")]:
+        if amount == 1:
+            put_time = timed(hpc_transfer.put_file, local_src=local_src, remote_dst=remote_path)
+            get_time = timed(hpc_transfer.get_file, remote_src=remote_path, local_dst=local_dst)
+        else:
+            put_time = timed(
+                hpc_transfer.put_file_parallel, local_src=local_src, remote_dst=remote_path, channels=amount,
+                extra_transports=extra_transports, verify=False)
+            get_time = timed(
+                hpc_transfer.get_file_parallel, remote_src=remote_path, local_dst=local_dst, channels=amount,
+                extra_transports=extra_transports, verify=False)
+        click.echo(f"{amount:>8} {size_mb / put_time:>10.1f} {size_mb / get_time:>10.1f}")
+
+    hpc_transfer.sftp_client.remove(remote_path)
+    remove(local_src)
+    remove(local_dst)
+    if fake:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,22 @@
+from pytest import fixture
+from tests.helpers_fake_hpc import FakeHPC
+
+
+@fixture(scope="package", name="fake_hpc")
+def fixture_fake_hpc():
+    fake_hpc = FakeHPC()
+    yield fake_hpc
+    fake_hpc.stop()
+
+
+@fixture(scope="package", name="fake_hpc_transfer")
+def fixture_fake_hpc_transfer(fake_hpc):
+    yield fake_hpc.create_transfer()
+
+
+@fixture(scope="package", name="fake_hpc_executor")
+def fixture_fake_hpc_executor(fake_hpc, fake_hpc_transfer):
+    fake_hpc_executor = fake_hpc.create_executor()
+    fake_hpc_executor.use_deployed_batch_scripts(batch_scripts=fake_hpc_transfer.deploy_batch_scripts())
+    yield fake_hpc_executor
+    fake_hpc_executor.stop_agent()
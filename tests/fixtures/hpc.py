@@ -11,8 +11,9 @@ def fixture_hpc_transfer_connector():
 
 
 @fixture(scope="package", name="hpc_command_executor")
-def fixture_hpc_execution_connector():
+def fixture_hpc_execution_connector(hpc_data_transfer):
     hpc_paramiko_connector = HPCExecutor(tunnel_host="localhost", tunnel_port=22)
+    hpc_paramiko_connector.use_deployed_batch_scripts(batch_scripts=hpc_data_transfer.deploy_batch_scripts())
     # print(hpc_paramiko_connector.proxy_hosts)
     # print(hpc_paramiko_connector.hpc_hosts)
     yield hpc_paramiko_connector
@@ -0,0 +1,602 @@
+"""
+An in-process stand-in for the HPC, runs the submit, transfer and poll cycle of Operandi offline.
+
+`FakeHPC` serves the ssh connections of `HPCExecutor` and `HPCTransfer` with paramiko in server mode over socket
+pairs, hence neither an sshd nor the network is required. The proxy tunnels end in the same fake server. The sftp
+requests and the executed commands operate on the local file system, the hpc dirs of the connectors are rebased
+into the root dir of the fake. The slurm commands `sbatch`, `sacct`, `squeue` and `scancel` are shims of the
+in-process `FakeSlurm`, which runs the workflow jobs with a stub of the batch script instead of nextflow.
+The queue delay, the run time, the failure rate of the jobs, connection delays and unreachable hosts are configurable.
+"""
+import json
+import os
+import socket
+import sys
+from datetime import datetime
+from logging import getLogger
+from os.path import basename, exists, isdir, join
+from paramiko import (
+    AUTH_SUCCESSFUL, OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED, OPEN_FAILED_CONNECT_FAILED, OPEN_SUCCEEDED, RSAKey,
+    ServerInterface, SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface, Transport)
+from paramiko.sftp import SFTP_OK
+from random import Random
+from shutil import copytree, rmtree
+from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+from subprocess import PIPE, Popen
+from tempfile import mkdtemp
+from threading import Event, Lock, Thread
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zipfile import ZIP_DEFLATED, ZipFile
+
+from operandi_utils.archive import unpack_archive_file
+from operandi_utils.hpc import HPCConnectionPool, HPCExecutor, HPCTransfer
+from operandi_utils.hpc.constants import (
+    HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB, HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB_ARRAY, HPC_DIR_SYNCED_WORKSPACES,
+    HPC_JOB_ARRAY_MANIFEST_SEPARATOR, HPC_RESULTS_MODE_FULL, HPC_RESULTS_MODE_NEW, HPC_RESULTS_REMOVED_FILES_LIST)
+
+FAKE_HPC_USERNAME = "fake_user"
+FAKE_HPC_PROJECT_NAME = "fake_project"
+FAKE_SLURM_NODE = "fake-node-001"
+FAKE_SLURM_SOCKET_ENV = "OPERANDI_FAKE_SLURM_SOCKET"
+FAKE_SLURM_COMMANDS = ["sacct", "sbatch", "scancel", "squeue"]
+FAKE_SLURM_FINAL_STATES = ["CANCELLED", "COMPLETED", "FAILED"]
+
+# Each slurm command of the fake is a python script passing its argv to `FakeSlurm` over a unix socket
+FAKE_SLURM_SHIM = """#!{python}
+import json, os, socket, sys
+connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+connection.connect(os.environ["{socket_env}"])
+connection.sendall(json.dumps(sys.argv).encode("utf-8") + b"\\n")
+response = b""
+while True:
+    received = connection.recv(65536)
+    if not received:
+        break
+    response += received
+return_code, stdout, stderr = json.loads(response)
+sys.stdout.write(stdout)
+sys.stderr.write(stderr)
+sys.exit(return_code)
+"""
+
+
+def _decode(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _format_slurm_time(timestamp: Optional[float]) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds") if timestamp else "Unknown"
+
+
+def _format_slurm_duration(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:06.3f}"
+
+
+def _zip_dir(source_dir: str, destination: str, skip: Callable[[str], bool]) -> None:
+    # Written under a temporary name, so the zip is not part of itself when placed inside the source dir
+    with ZipFile(f"{destination}.part", mode="w", compression=ZIP_DEFLATED) as zip_file:
+        for dir_path, dir_names, file_names in os.walk(source_dir):
+            for file_name in sorted(file_names):
+                file_path = join(dir_path, file_name)
+                arc_name = os.path.relpath(file_path, source_dir)
+                if not skip(arc_name) and file_path != f"{destination}.part":
+                    zip_file.write(filename=file_path, arcname=arc_name)
+    os.replace(f"{destination}.part", destination)
+
+
+def run_workflow_job_stub(script_args: List[str]) -> int:
+    """
+    Emulates `batch_submit_workflow_job.sh` with identity processing: the workflow job dir is unpacked, a stub
+    report of nextflow is written and the result zips are created with the layout expected by Operandi.
+    """
+    scratch_base, workflow_job_id, nextflow_script_id, input_file_grp, workspace_id, mets_basename = script_args[:6]
+    results_mode = script_args[12] if len(script_args) > 12 and script_args[12] else HPC_RESULTS_MODE_FULL
+    workflow_job_dir = join(scratch_base, workflow_job_id)
+    workspace_dir = join(workflow_job_dir, workspace_id)
+    for archive_path in [f"{workflow_job_dir}.zip", f"{workflow_job_dir}.tar.zst"]:
+        if exists(archive_path):
+            unpack_archive_file(source=archive_path, destination=scratch_base)
+            os.remove(archive_path)
+            break
+    else:
+        synced_workspace_dir = join(scratch_base, HPC_DIR_SYNCED_WORKSPACES, workspace_id)
+        if not isdir(synced_workspace_dir):
+            return 1
+        copytree(src=synced_workspace_dir, dst=workspace_dir)
+    if not exists(join(workspace_dir, mets_basename)):
+        return 1
+
+    with open(join(workflow_job_dir, "report.html"), mode="w") as report_file:
+        report_file.write(f"Fake nextflow report of: {nextflow_script_id}, input file group: {input_file_grp}\n")
+    if results_mode == HPC_RESULTS_MODE_NEW:
+        # Nothing is produced by the stub, hence only the mets has changed
+        open(join(workspace_dir, HPC_RESULTS_REMOVED_FILES_LIST), mode="w").close()
+        _zip_dir(
+            source_dir=workspace_dir, destination=join(workspace_dir, f"{workspace_id}.zip"),
+            skip=lambda arc_name: arc_name not in [mets_basename, HPC_RESULTS_REMOVED_FILES_LIST])
+    else:
+        _zip_dir(
+            source_dir=workspace_dir, destination=join(workspace_dir, f"{workspace_id}.zip"),
+            skip=lambda arc_name: arc_name.endswith(".sock"))
+    _zip_dir(
+        source_dir=workflow_job_dir, destination=join(workflow_job_dir, f"{workflow_job_id}.zip"),
+        skip=lambda arc_name: arc_name.startswith(f"{workspace_id}{os.sep}"))
+    return 0
+
+
+class FakeSlurm:
+    """
+    An in-process slurm scheduler. Each job is pending for `queue_delay` seconds, then runs its batch script
+    with `stage` and ends after at least `run_time` seconds. Jobs fail with the probability `failure_rate`.
+    """
+    def __init__(
+        self, queue_delay: float = 0.0, run_time: float = 0.0, failure_rate: float = 0.0, seed: int = None,
+        stage: Callable[[List[str]], int] = run_workflow_job_stub
+    ) -> None:
+        self.log = getLogger("tests.helpers_fake_hpc.fake_slurm")
+        self.queue_delay = queue_delay
+        self.run_time = run_time
+        self.failure_rate = failure_rate
+        self.stage = stage
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._random = Random(seed)
+        self._lock = Lock()
+        self._next_job_id = 1000
+
+    def run_command(self, argv: List[str]) -> Tuple[int, str, str]:
+        command, args = basename(argv[0]), argv[1:]
+        try:
+            return getattr(self, f"_{command}")(args)
+        except Exception as error:
+            self.log.exception(f"The fake slurm command has failed: {argv}")
+            return 1, "", f"{command}: error: {error}\n"
+
+    def _sbatch(self, args: List[str]) -> Tuple[int, str, str]:
+        options, parsable = {}, False
+        while args and args[0].startswith("-"):
+            option, args = args[0], args[1:]
+            if option == "--parsable":
+                parsable = True
+                continue
+            key, _, value = option.lstrip("-").partition("=")
+            options[key] = value
+        batch_script_path, script_args = args[0], args[1:]
+        if not exists(batch_script_path):
+            return 1, "", f"sbatch: error: Unable to open file {batch_script_path}\n"
+        with self._lock:
+            job_id = str(self._next_job_id)
+            self._next_job_id += 1
+        if "array" in options:
+            first_task, _, last_task = options["array"].partition("-")
+            for task_index in range(int(first_task), int(last_task or first_task) + 1):
+                self._start_job(
+                    slurm_job_id=f"{job_id}_{task_index}", batch_script_path=batch_script_path,
+                    script_args=script_args, options=options, task_index=task_index)
+        else:
+            self._start_job(
+                slurm_job_id=job_id, batch_script_path=batch_script_path, script_args=script_args, options=options)
+        return 0, f"{job_id}\n" if parsable else f"Submitted batch job {job_id}\n", ""
+
+    def _start_job(
+        self, slurm_job_id: str, batch_script_path: str, script_args: List[str], options: Dict[str, str],
+        task_index: int = None
+    ) -> None:
+        job = {
+            "state": "PENDING", "submit": datetime.now().timestamp(), "start": None, "end": None,
+            "cpus": int(options.get("cpus-per-task", 1)), "mem": options.get("mem", "1G"), "exit_code": 0,
+            "cancelled": Event()}
+        with self._lock:
+            self.jobs[slurm_job_id] = job
+        Thread(
+            target=self._run_job, args=(slurm_job_id, job, batch_script_path, script_args, task_index),
+            daemon=True).start()
+
+    def _run_job(
+        self, slurm_job_id: str, job: Dict[str, Any], batch_script_path: str, script_args: List[str],
+        task_index: Optional[int]
+    ) -> None:
+        if job["cancelled"].wait(timeout=self.queue_delay):
+            return
+        with self._lock:
+            job.update(state="RUNNING", start=datetime.now().timestamp())
+        start_time = monotonic()
+        failed = self._random.random() < self.failure_rate
+        if not failed:
+            try:
+                failed = self._run_batch_script(batch_script_path, script_args, task_index) != 0
+            except Exception:
+                self.log.exception(f"The batch script of fake slurm job {slurm_job_id} has failed")
+                failed = True
+        if job["cancelled"].wait(timeout=max(0.0, self.run_time - (monotonic() - start_time))):
+            return
+        with self._lock:
+            if job["state"] == "RUNNING":
+                job.update(state="FAILED" if failed else "COMPLETED", end=datetime.now().timestamp(),
+                           exit_code=1 if failed else 0)
+
+    def _run_batch_script(self, batch_script_path: str, script_args: List[str], task_index: Optional[int]) -> int:
+        # The deployed batch scripts are versioned, e.g., `batch_submit_workflow_job_<sha256 prefix>.sh`
+        batch_script_id = basename(batch_script_path)
+        if batch_script_id.startswith(HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB_ARRAY[:-len(".sh")]):
+            with open(script_args[1]) as manifest_file:
+                manifest_line = manifest_file.read().splitlines()[task_index]
+            return self.stage(manifest_line.split(HPC_JOB_ARRAY_MANIFEST_SEPARATOR))
+        if batch_script_id.startswith(HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB[:-len(".sh")]):
+            return self.stage(script_args)
+        # Other batch scripts, e.g., downloading the ocrd models, have no effect
+        return 0
+
+    def _scancel(self, args: List[str]) -> Tuple[int, str, str]:
+        with self._lock:
+            for slurm_job_id in args:
+                for job_id, job in self.jobs.items():
+                    if job_id != slurm_job_id and not job_id.startswith(f"{slurm_job_id}_"):
+                        continue
+                    if job["state"] not in FAKE_SLURM_FINAL_STATES:
+                        job.update(state="CANCELLED", end=datetime.now().timestamp())
+                        job["cancelled"].set()
+        return 0, "", ""
+
+    def _squeue(self, args: List[str]) -> Tuple[int, str, str]:
+        with self._lock:
+            lines = [f"{job_id}|{job['state']}\n" for job_id, job in self.jobs.items()
+                     if job["state"] not in FAKE_SLURM_FINAL_STATES]
+        return 0, "".join(lines), ""
+
+    def _sacct(self, args: List[str]) -> Tuple[int, str, str]:
+        fields, slurm_job_ids, parsable = ["jobid", "jobname", "state", "exitcode"], [], False
+        while args:
+            arg, args = args[0], args[1:]
+            if arg.startswith("--format="):
+                fields = arg[len("--format="):].lower().split(",")
+            elif arg == "-j" and args:
+                slurm_job_ids, args = args[0].split(","), args[1:]
+            elif arg == "--parsable2":
+                parsable = True
+        lines = []
+        with self._lock:
+            for job_id, job in self.jobs.items():
+                if slurm_job_ids and job_id not in slurm_job_ids and job_id.split("_")[0] not in slurm_job_ids:
+                    continue
+                lines.append([self._sacct_field(job_id, job, field, step=False) for field in fields])
+                if job["start"]:
+                    lines.append([self._sacct_field(job_id, job, field, step=True) for field in fields])
+        if parsable:
+            return 0, "".join(f"{'|'.join(line)}\n" for line in lines), ""
+        # The human readable format of sacct with a header
+        lines = [[field.capitalize() for field in fields], ["-" * 16] * len(fields)] + lines
+        return 0, "".join(f"{' '.join(value.ljust(16) for value in line).rstrip()}\n" for line in lines), ""
+
+    @staticmethod
+    def _sacct_field(job_id: str, job: Dict[str, Any], field: str, step: bool) -> str:
+        end_time = job["end"] or datetime.now().timestamp()
+        elapsed = int(end_time - job["start"]) if job["start"] else 0
+        if field == "jobid":
+            return f"{job_id}.batch" if step else job_id
+        if field == "state":
+            return job["state"]
+        if field in ["submit", "start", "end"]:
+            return _format_slurm_time(job[field])
+        if field == "elapsedraw":
+            return str(elapsed)
+        if field == "totalcpu":
+            return _format_slurm_duration(elapsed * job["cpus"] * 0.5)
+        if field == "maxrss":
+            return "102400K" if step else ""
+        if field == "reqmem":
+            return job["mem"]
+        if field == "alloccpus":
+            return str(job["cpus"])
+        if field == "nodelist":
+            return FAKE_SLURM_NODE if job["start"] else "None assigned"
+        if field == "exitcode":
+            return f"{job['exit_code']}:0"
+        return ""
+
+
+class _FakeSlurmRequestHandler(StreamRequestHandler):
+    def handle(self) -> None:
+        argv = json.loads(self.rfile.readline())
+        self.wfile.write(json.dumps(list(self.server.fake_slurm.run_command(argv))).encode("utf-8"))
+
+
+class _LocalSFTPHandle(SFTPHandle):
+    def stat(self):
+        try:
+            return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as error:
+            return SFTPServer.convert_errno(error.errno)
+
+    def chattr(self, attr):
+        return SFTP_OK
+
+
+class _LocalSFTPServerInterface(SFTPServerInterface):
+    """
+    Serves the sftp requests from the local file system, the paths are used unchanged.
+    """
+    def list_folder(self, path):
+        try:
+            attributes = []
+            for file_name in os.listdir(path):
+                attribute = SFTPAttributes.from_stat(os.lstat(join(path, file_name)))
+                attribute.filename = file_name
+                attributes.append(attribute)
+            return attributes
+        except OSError as error:
+            return SFTPServer.convert_errno(error.errno)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(path))
+        except OSError as error:
+            return SFTPServer.convert_errno(error.errno)
+
+    def lstat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.lstat(path))
+        except OSError as error:
+            return SFTPServer.convert_errno(error.errno)
+
+    def open(self, path, flags, attr):
+        try:
+            file_descriptor = os.open(path, flags, getattr(attr, "st_mode", None) or 0o666)
+        except OSError as error:
+            return SFTPServer.convert_errno(error.errno)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        handle = _LocalSFTPHandle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(file_descriptor, mode)
+        return handle
+
+    def remove(self, path):
+        return self._call(os.remove, path)
+
+    def rename(self, oldpath, newpath):
+        return self._call(os.rename, oldpath, newpath)
+
+    def posix_rename(self, oldpath, newpath):
+        return self._call(os.replace, oldpath, newpath)
+
+    def mkdir(self, path, attr):
+        return self._call(os.mkdir, path)
+
+    def rmdir(self, path):
+        return self._call(os.rmdir, path)
+
+    def chattr(self, path, attr):
+        return self._call(SFTPServer.set_file_attr, path, attr)
+
+    def symlink(self, target_path, path):
+        return self._call(os.symlink, target_path, path)
+
+    def readlink(self, path):
+        try:
+            return os.readlink(path)
+        except OSError as error:
+            return SFTPServer.convert_errno(error.errno)
+
+    @staticmethod
+    def _call(function, *args):
+        try:
+            function(*args)
+        except OSError as error:
+            return SFTPServer.convert_errno(error.errno)
+        return SFTP_OK
+
+
+class _FakeSSHServerInterface(ServerInterface):
+    def __init__(self, fake_hpc: "FakeHPC") -> None:
+        self.fake_hpc = fake_hpc
+        self.tunnel_channel_ids = set()
+        self.environments: Dict[int, Dict[str, str]] = {}
+
+    def get_allowed_auths(self, username):
+        return "publickey"
+
+    def check_auth_publickey(self, username, key):
+        return AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        return OPEN_SUCCEEDED if kind == "session" else OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        if destination[0] in self.fake_hpc.unreachable_hosts:
+            return OPEN_FAILED_CONNECT_FAILED
+        self.tunnel_channel_ids.add(chanid)
+        return OPEN_SUCCEEDED
+
+    def check_channel_env_request(self, channel, name, value):
+        self.environments.setdefault(channel.get_id(), {})[_decode(name)] = _decode(value)
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        Thread(
+            target=self.fake_hpc.execute,
+            args=(channel, _decode(command), self.environments.pop(channel.get_id(), {})), daemon=True).start()
+        return True
+
+
+class FakeHPCConnectionPool(HPCConnectionPool):
+    """
+    Connects the proxy clients to the fake instead of opening tcp connections.
+    """
+    def __init__(self, fake_hpc: "FakeHPC", **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.fake_hpc = fake_hpc
+
+    def _open_proxy_sock(self, host: str, port: int):
+        return self.fake_hpc.open_proxy_sock(host=host)
+
+
+class FakeHPC:
+    """
+    Serves any amount of executors and transfers created with `create_executor` and `create_transfer`.
+    Hosts listed in `unreachable_hosts` refuse the connections, `connect_delays` delays the connections to hosts.
+    """
+    def __init__(
+        self, queue_delay: float = 0.0, run_time: float = 0.0, failure_rate: float = 0.0, seed: int = None,
+        connect_delays: Dict[str, float] = None, unreachable_hosts: List[str] = None
+    ) -> None:
+        self.log = getLogger("tests.helpers_fake_hpc.fake_hpc")
+        self.root_dir = mkdtemp(prefix="operandi_fake_hpc_")
+        self.connect_delays = connect_delays or {}
+        self.unreachable_hosts = unreachable_hosts or []
+        self.slurm = FakeSlurm(queue_delay=queue_delay, run_time=run_time, failure_rate=failure_rate, seed=seed)
+        self._stopped = Event()
+        self._connection_pools: List[FakeHPCConnectionPool] = []
+
+        # The same key authenticates the clients and identifies the server
+        self.key_path = join(self.root_dir, "fake_hpc_key")
+        self._host_key = RSAKey.generate(bits=2048)
+        self._host_key.write_private_key_file(self.key_path)
+
+        bin_dir = join(self.root_dir, "bin")
+        os.makedirs(bin_dir)
+        for command in FAKE_SLURM_COMMANDS:
+            with open(join(bin_dir, command), mode="w") as shim_file:
+                shim_file.write(FAKE_SLURM_SHIM.format(python=sys.executable, socket_env=FAKE_SLURM_SOCKET_ENV))
+            os.chmod(join(bin_dir, command), 0o755)
+        # Unix socket paths are limited to about 100 chars, hence not placed in the possibly long root dir
+        self._socket_dir = mkdtemp(prefix="operandi_fake_slurm_")
+        self.slurm_socket_path = join(self._socket_dir, "slurm.sock")
+        self._slurm_server = ThreadingUnixStreamServer(self.slurm_socket_path, _FakeSlurmRequestHandler)
+        self._slurm_server.daemon_threads = True
+        self._slurm_server.fake_slurm = self.slurm
+        Thread(target=self._slurm_server.serve_forever, daemon=True).start()
+
+        self.environment = dict(
+            os.environ, PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}", USER=FAKE_HPC_USERNAME,
+            **{FAKE_SLURM_SOCKET_ENV: self.slurm_socket_path})
+
+    def rebase(self, hpc_path: str) -> str:
+        return f"{self.root_dir}{hpc_path}"
+
+    def create_connection_pool(self) -> FakeHPCConnectionPool:
+        connection_pool = FakeHPCConnectionPool(fake_hpc=self)
+        self._connection_pools.append(connection_pool)
+        return connection_pool
+
+    def create_executor(self, **kwargs) -> HPCExecutor:
+        return self._rebase_connector_dirs(HPCExecutor(**self._connector_kwargs(kwargs)))
+
+    def create_transfer(self, **kwargs) -> HPCTransfer:
+        return self._rebase_connector_dirs(HPCTransfer(**self._connector_kwargs(kwargs)))
+
+    def _connector_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(dict(
+            username=FAKE_HPC_USERNAME, project_username=FAKE_HPC_USERNAME, key_path=self.key_path,
+            project_name=FAKE_HPC_PROJECT_NAME, connection_pool=self.create_connection_pool()), **kwargs)
+
+    def _rebase_connector_dirs(self, connector):
+        for dir_attribute in ["user_home_dir", "project_root_dir", "batch_scripts_dir", "slurm_workspaces_dir"]:
+            rebased_dir = self.rebase(getattr(connector, dir_attribute))
+            os.makedirs(rebased_dir, exist_ok=True)
+            setattr(connector, dir_attribute, rebased_dir)
+        return connector
+
+    def open_proxy_sock(self, host: str) -> socket.socket:
+        if host in self.unreachable_hosts:
+            raise ConnectionRefusedError(f"The fake proxy host is unreachable: {host}")
+        sleep(self.connect_delays.get(host, 0.0))
+        client_sock, server_sock = socket.socketpair()
+        Thread(target=self._serve_transport, args=(server_sock,), daemon=True).start()
+        return client_sock
+
+    def _serve_transport(self, sock) -> None:
+        transport = Transport(sock)
+        transport.add_server_key(self._host_key)
+        transport.set_subsystem_handler("sftp", SFTPServer, _LocalSFTPServerInterface)
+        server_interface = _FakeSSHServerInterface(fake_hpc=self)
+        try:
+            transport.start_server(server=server_interface)
+        except Exception as error:
+            self.log.warning(f"The fake ssh negotiation has failed: {error}")
+            return
+        while transport.is_active() and not self._stopped.is_set():
+            channel = transport.accept(timeout=0.5)
+            # Each proxy tunnel is served as the connection to an hpc host
+            if channel is not None and channel.get_id() in server_interface.tunnel_channel_ids:
+                Thread(target=self._serve_transport, args=(channel,), daemon=True).start()
+        transport.close()
+
+    def execute(self, channel, command: str, environment: Dict[str, str]) -> None:
+        # Login shells would source the profiles of the local machine
+        if command.startswith("bash -lc "):
+            command = f"bash -c {command[len('bash -lc '):]}"
+        process = Popen(
+            command, shell=True, stdin=PIPE, stdout=PIPE, stderr=PIPE, cwd=self.root_dir,
+            env=dict(self.environment, **environment))
+
+        def pump_stdin() -> None:
+            try:
+                while True:
+                    received = channel.recv(32768)
+                    if not received:
+                        break
+                    process.stdin.write(received)
+                    process.stdin.flush()
+            except (OSError, ValueError):
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except (OSError, ValueError):
+                    pass
+
+        def pump_output(stream, send) -> None:
+            while True:
+                data = os.read(stream.fileno(), 32768)
+                if not data:
+                    break
+                try:
+                    send(data)
+                except OSError:
+                    pass
+
+        Thread(target=pump_stdin, daemon=True).start()
+        output_pumps = [
+            Thread(target=pump_output, args=(process.stdout, channel.sendall), daemon=True),
+            Thread(target=pump_output, args=(process.stderr, channel.sendall_stderr), daemon=True)]
+        for output_pump in output_pumps:
+            output_pump.start()
+        return_code = process.wait()
+        for output_pump in output_pumps:
+            output_pump.join()
+        try:
+            channel.send_exit_status(return_code)
+            channel.shutdown_write()
+            channel.close()
+        except OSError:
+            pass
+
+    def wait_slurm_job_states(
+        self, executor: HPCExecutor, slurm_job_ids: List[str], timeout: float = 30.0, interval: float = 0.05
+    ) -> Dict[str, Optional[str]]:
+        """
+        Polls the states of the slurm jobs through the executor until all are final or the timeout has passed.
+        """
+        deadline = monotonic() + timeout
+        while True:
+            slurm_job_states = executor.check_slurm_job_states(slurm_job_ids=slurm_job_ids)
+            if all(state in FAKE_SLURM_FINAL_STATES for state in slurm_job_states.values()) or monotonic() > deadline:
+                return slurm_job_states
+            sleep(interval)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for connection_pool in self._connection_pools:
+            connection_pool.close()
+        self._slurm_server.shutdown()
+        self._slurm_server.server_close()
+        for job in list(self.slurm.jobs.values()):
+            job["cancelled"].set()
+        rmtree(self._socket_dir, ignore_errors=True)
+        rmtree(self.root_dir, ignore_errors=True)
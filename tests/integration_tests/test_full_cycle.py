@@ -4,7 +4,7 @@ from time import sleep
 
 from operandi_server.constants import DEFAULT_METS_BASENAME, DEFAULT_FILE_GRP
 from operandi_utils.constants import StateJob
-from operandi_utils.rabbitmq import RABBITMQ_QUEUE_HARVESTER, RABBITMQ_QUEUE_JOB_STATUSES
+from operandi_utils.rabbitmq import RABBITMQ_QUEUE_HARVESTER
 from operandi_utils.hpc.constants import HPC_JOB_TEST_PARTITION
 from tests.tests_server.helpers_asserts import assert_response_status_code
 
@@ -16,9 +16,8 @@ def test_full_cycle(auth_harvester, operandi, service_broker, bytes_small_worksp
     # Create a background worker for the harvester queue
     service_broker.create_worker_process(
         queue_name=RABBITMQ_QUEUE_HARVESTER, status_checker=False, tunnel_port_executor=22, tunnel_port_transfer=22)
-    # Create a background worker for the job statuses queue
-    service_broker.create_worker_process(
-        queue_name=RABBITMQ_QUEUE_JOB_STATUSES, status_checker=True, tunnel_port_executor=22, tunnel_port_transfer=22)
+    # Create a background poller of the job statuses
+    service_broker.create_job_status_poller_process(tunnel_port_executor=22, tunnel_port_transfer=22)
 
     # Post a workspace zip
     response = operandi.post(url="/workspace", files={"workspace": bytes_small_workspace}, auth=auth_harvester)
@@ -1,3 +1,4 @@
 pytest_plugins = [
-    "tests.fixtures.broker"
+    "tests.fixtures.broker",
+    "tests.fixtures.fake_hpc"
 ]
@@ -0,0 +1,113 @@
+from concurrent.futures import wait
+from threading import Event
+from time import monotonic
+from operandi_broker import JobStatusPoller
+from operandi_broker import job_status_poller, job_status_worker
+from operandi_utils.constants import JOB_STATUS_POLLER_DOWNLOAD_TRIES, StateJob, StateWorkspace
+from operandi_utils.hpc.constants import HPC_RESULTS_MODE_FULL
+
+
+def test_job_status_poller_backoff():
+    poller = JobStatusPoller(
+        db_url="mongodb://localhost:27017", tunnel_port_executor=22, tunnel_port_transfer=22,
+        poll_interval=10, max_poll_interval=60)
+    assert poller.next_poll_interval(states_changed=False) == 20
+    assert poller.next_poll_interval(states_changed=False) == 40
+    assert poller.next_poll_interval(states_changed=False) == 60
+    assert poller.next_poll_interval(states_changed=False) == 60
+    # Any state change resets the interval to the fastest polling
+    assert poller.next_poll_interval(states_changed=True) == 10
+    assert poller.next_poll_interval(states_changed=False) == 20
+
+
+def test_job_status_poller_intervals_from_environment(monkeypatch):
+    monkeypatch.setenv("OPERANDI_POLLER_INTERVAL", "5")
+    monkeypatch.setenv("OPERANDI_POLLER_MAX_INTERVAL", "15")
+    poller = JobStatusPoller(db_url="mongodb://localhost:27017", tunnel_port_executor=22, tunnel_port_transfer=22)
+    assert poller.poll_interval == 5
+    assert poller.max_poll_interval == 15
+
+
+def test_job_status_poller_results_download_in_thread(monkeypatch):
+    """
+    Testing that the results are downloaded off the poll thread and the workflow job is finished
+    by the first poll after the download is done
+    """
+    db_updates = []
+    monkeypatch.setattr(job_status_poller, "sync_db_update_workspace", lambda **kwargs: db_updates.append(kwargs))
+    monkeypatch.setattr(job_status_worker, "sync_db_update_workspace", lambda **kwargs: db_updates.append(kwargs))
+    monkeypatch.setattr(job_status_poller, "sync_db_update_workflow_job", lambda **kwargs: db_updates.append(kwargs))
+    monkeypatch.setattr(job_status_worker, "sync_db_update_workflow_job", lambda **kwargs: db_updates.append(kwargs))
+    monkeypatch.setattr(job_status_poller, "sync_db_get_active_hpc_slurm_jobs", lambda: [])
+    monkeypatch.setattr(job_status_poller, "sync_db_get_active_workflow_jobs", lambda: [])
+    monkeypatch.setattr(job_status_worker, "sync_db_get_hpc_slurm_jobs_pending_accounting", lambda: [])
+    download_started, download_allowed = Event(), Event()
+
+    class FakeTransfer:
+        @staticmethod
+        def get_and_unpack_slurm_workspace(**kwargs):
+            download_started.set()
+            download_allowed.wait(timeout=10)
+            return "fake_sha256"
+
+    poller = JobStatusPoller(
+        db_url="mongodb://localhost:27017", tunnel_port_executor=22, tunnel_port_transfer=22, poll_interval=10)
+    poller.hpc_io_transfer = FakeTransfer()
+    poller._download_results_from_hpc(
+        job_id="fake_job", job_dir="/tmp/fake_job", workspace_id="fake_ws", workspace_dir="/tmp/fake_ws",
+        results_mode=HPC_RESULTS_MODE_FULL)
+    assert download_started.wait(timeout=10)
+    # The poll is not blocked by the download in flight
+    assert not poller.poll_job_states()
+    assert {"find_job_id": "fake_job", "job_state": StateJob.SUCCESS} not in db_updates
+    download_allowed.set()
+    poller.results_downloads["fake_job"][1].result(timeout=10)
+    assert poller.poll_job_states()
+    assert {"find_job_id": "fake_job", "hpc_results_sha256": "fake_sha256"} in db_updates
+    assert {"find_job_id": "fake_job", "job_state": StateJob.SUCCESS} in db_updates
+    assert not poller.results_downloads
+
+
+def test_job_status_poller_results_download_retries(monkeypatch):
+    """
+    Testing that a failing results download is retried with a growing delay and the workflow job is failed
+    after the last try, while the workspace is ready again
+    """
+    db_updates = []
+    monkeypatch.setattr(job_status_poller, "sync_db_update_workspace", lambda **kwargs: db_updates.append(kwargs))
+    monkeypatch.setattr(job_status_poller, "sync_db_update_workflow_job", lambda **kwargs: db_updates.append(kwargs))
+    download_tries = []
+
+    class FakeTransfer:
+        @staticmethod
+        def get_and_unpack_slurm_workspace(**kwargs):
+            download_tries.append(kwargs)
+            raise FileNotFoundError("Missing results archive")
+
+    poller = JobStatusPoller(
+        db_url="mongodb://localhost:27017", tunnel_port_executor=22, tunnel_port_transfer=22,
+        poll_interval=10, max_poll_interval=30)
+    poller.hpc_io_transfer = FakeTransfer()
+    download_kwargs = dict(
+        job_id="fake_job", job_dir="/tmp/fake_job", workspace_id="fake_ws", workspace_dir="/tmp/fake_ws",
+        results_mode=HPC_RESULTS_MODE_FULL)
+    retry_delays = []
+    for tries in range(1, JOB_STATUS_POLLER_DOWNLOAD_TRIES + 1):
+        poller._download_results_from_hpc(**download_kwargs)
+        wait([poller.results_downloads["fake_job"][1]], timeout=10)
+        before_finish = monotonic()
+        assert poller._finish_results_downloads()
+        if "fake_job" not in poller.results_download_failures:
+            break
+        failures, retry_time = poller.results_download_failures["fake_job"]
+        retry_delays.append(round(retry_time - before_finish))
+        # Not started again before the retry delay has passed
+        poller._download_results_from_hpc(**download_kwargs)
+        assert "fake_job" not in poller.results_downloads
+        assert len(download_tries) == tries
+        poller.results_download_failures["fake_job"] = (failures, 0.0)
+    assert len(download_tries) == JOB_STATUS_POLLER_DOWNLOAD_TRIES
+    assert retry_delays == [10, 20, 30, 30][:JOB_STATUS_POLLER_DOWNLOAD_TRIES - 1]
+    assert {"find_job_id": "fake_job", "job_state": StateJob.FAILED} in db_updates
+    assert {"find_workspace_id": "fake_ws", "state": StateWorkspace.READY} in db_updates
+    assert not poller.results_download_failures
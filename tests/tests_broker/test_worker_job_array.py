@@ -0,0 +1,61 @@
+from os.path import join
+from shutil import copytree
+from operandi_broker import Worker
+from operandi_broker import worker as worker_module
+from operandi_utils.hpc.constants import (
+    HPC_DIR_JOB_ARRAY_MANIFESTS, HPC_JOB_ARRAY_MANIFEST_SEPARATOR, HPC_NF_EXECUTOR_LOCAL)
+
+
+def _workflow_job(workflow_job_id: str, workspace_dir: str, workflow_script_path: str):
+    return {
+        "workflow_job_id": workflow_job_id, "workflow_id": "fake_wf", "workspace_id": workspace_dir.split('/')[-1],
+        "workspace_dir": workspace_dir, "workflow_script_path": workflow_script_path, "mets_basename": "mets.xml",
+        "input_file_grp": "DEFAULT", "file_groups_to_remove": "", "nf_process_forks": 1, "ws_pages_amount": 1,
+        "ws_page_ids": None, "model_dependencies": None, "cpus": 2, "ram": 8, "partition": "medium",
+        "nf_executor": HPC_NF_EXECUTOR_LOCAL}
+
+
+def test_worker_job_array_partial_staging_failure(
+    fake_hpc, monkeypatch, path_small_workspace_data_dir, template_workflow, tmp_path
+):
+    """
+    Testing that only the staged workflow jobs of a batch are submitted as a slurm job array through the
+    deployed invoke batch script, while the workflow job whose staging has failed gets no slurm job
+    """
+    created_slurm_jobs = {}
+    # The worker is driven without the DB, only the created slurm jobs are recorded
+    monkeypatch.setattr(worker_module, "sync_db_update_workspace", lambda **kwargs: None)
+    monkeypatch.setattr(worker_module, "sync_db_update_workflow_job", lambda **kwargs: None)
+    monkeypatch.setattr(
+        worker_module, "sync_db_create_hpc_slurm_job",
+        lambda **kwargs: created_slurm_jobs.update({kwargs["workflow_job_id"]: kwargs["hpc_slurm_job_id"]}))
+    worker = Worker(
+        db_url=None, rabbitmq_url=None, queue_name="fake_queue", tunnel_port_executor=22, tunnel_port_transfer=22,
+        test_sbatch=True)
+    worker.hpc_executor = fake_hpc.create_executor()
+    worker.hpc_io_transfer = fake_hpc.create_transfer()
+    worker.hpc_executor.use_deployed_batch_scripts(batch_scripts=worker.hpc_io_transfer.deploy_batch_scripts())
+
+    workspace_dirs = [join(tmp_path, f"fake_ws_{index}") for index in range(3)]
+    for workspace_dir in [workspace_dirs[0], workspace_dirs[2]]:
+        copytree(src=path_small_workspace_data_dir, dst=workspace_dir)
+    # The second workspace does not exist, hence its staging fails
+    workflow_jobs = [
+        _workflow_job(f"fake_wf_job_array_{index}", workspace_dir, template_workflow)
+        for index, workspace_dir in enumerate(workspace_dirs)]
+    slurm_job_ids = worker.prepare_and_trigger_slurm_job_array(workflow_jobs=workflow_jobs)
+
+    array_job_id = slurm_job_ids[0].split("_")[0]
+    assert slurm_job_ids == [f"{array_job_id}_0", None, f"{array_job_id}_1"]
+    assert created_slurm_jobs == {
+        "fake_wf_job_array_0": f"{array_job_id}_0", "fake_wf_job_array_2": f"{array_job_id}_1"}
+    manifest_path = join(
+        worker.hpc_executor.slurm_workspaces_dir, HPC_DIR_JOB_ARRAY_MANIFESTS, "fake_wf_job_array_0.txt")
+    with open(manifest_path) as manifest_file:
+        manifest_lines = manifest_file.read().splitlines()
+    # The second field of each manifest line is the workflow job id of the array task
+    assert [line.split(HPC_JOB_ARRAY_MANIFEST_SEPARATOR)[1] for line in manifest_lines] == [
+        "fake_wf_job_array_0", "fake_wf_job_array_2"]
+    slurm_job_states = fake_hpc.wait_slurm_job_states(
+        executor=worker.hpc_executor, slurm_job_ids=[slurm_job_ids[0], slurm_job_ids[2]])
+    assert list(slurm_job_states.values()) == ["COMPLETED", "COMPLETED"]
@@ -1,3 +1,4 @@
+from datetime import datetime
 from tests.helpers_asserts import assert_exists_db_resource
 from .helpers_asserts import assert_local_dir_workflow, assert_response_status_code
 
@@ -93,6 +94,39 @@ def test_get_workflow_non_existing(operandi, auth):
     assert_response_status_code(response.status_code, expected_floor=4)
 
 
+def test_get_workflow_job_accounting(operandi, auth, db_workflow_jobs, db_hpc_slurm_jobs):
+    workflow_id = "template_workflow"
+    finished_job_id, running_job_id = "accounting_finished_job_id", "accounting_running_job_id"
+    for job_id in [finished_job_id, running_job_id]:
+        db_workflow_jobs.insert_one({
+            "job_id": job_id, "job_dir": f"/tmp/{job_id}", "workflow_id": workflow_id,
+            "workspace_id": "accounting_workspace_id", "job_state": "RUNNING", "deleted": False})
+    # The accounting of a finished slurm job as ingested by the job status worker
+    db_hpc_slurm_jobs.insert_one({
+        "workflow_job_id": finished_job_id, "hpc_slurm_job_id": "1001", "hpc_slurm_job_state": "COMPLETED",
+        "hpc_submit_time": datetime(2024, 1, 1, 10, 0, 0), "hpc_start_time": datetime(2024, 1, 1, 10, 5, 0),
+        "hpc_end_time": datetime(2024, 1, 1, 10, 15, 0), "hpc_elapsed": 600, "hpc_total_cpu": 1800.0,
+        "hpc_max_rss": 2 * 1024 ** 3, "hpc_req_mem": 8 * 1024 ** 3, "hpc_alloc_cpus": 4, "hpc_node_list": "gcn1",
+        "hpc_accounting_tries_left": 0, "deleted": False})
+    db_hpc_slurm_jobs.insert_one({
+        "workflow_job_id": running_job_id, "hpc_slurm_job_id": "1002", "hpc_slurm_job_state": "RUNNING",
+        "deleted": False})
+
+    response = operandi.get(url=f"/workflow/{workflow_id}/{finished_job_id}/accounting", auth=auth)
+    assert_response_status_code(response.status_code, expected_floor=2)
+    accounting = response.json()
+    assert accounting["slurm_job_id"] == "1001"
+    assert accounting["queued_seconds"] == 300
+    assert accounting["elapsed_seconds"] == 600
+    assert accounting["cpu_efficiency"] == 0.75
+    assert accounting["memory_efficiency"] == 0.25
+    assert accounting["node_list"] == "gcn1"
+
+    # The accounting is not available before the slurm job has finished
+    response = operandi.get(url=f"/workflow/{workflow_id}/{running_job_id}/accounting", auth=auth)
+    assert_response_status_code(response.status_code, expected_floor=4)
+
+
 # This is already implemented as a part of the harvester full cycle test
 def _test_run_operandi_workflow():
     pass
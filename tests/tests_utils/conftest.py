@@ -1,4 +1,5 @@
 pytest_plugins = [
+    "tests.fixtures.fake_hpc",
     "tests.fixtures.hpc",
     "tests.fixtures.rabbitmq"
 ]
@@ -0,0 +1,67 @@
+from filecmp import dircmp
+from io import BytesIO
+from os.path import join
+from pytest import importorskip, mark, raises
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
+from operandi_utils import make_archive_file, make_archive_stream, unpack_archive_file
+from operandi_utils.constants import (
+    ARCHIVE_CODEC_AUTO, ARCHIVE_CODEC_DEFLATE, ARCHIVE_CODEC_STORE, ARCHIVE_CODEC_ZSTD, ARCHIVE_CODECS)
+
+
+def assert_same_dirs(left: str, right: str):
+    comparison = dircmp(left, right)
+    assert not comparison.left_only and not comparison.right_only and not comparison.diff_files
+    for sub_dir in comparison.common_dirs:
+        assert_same_dirs(join(left, sub_dir), join(right, sub_dir))
+
+
+@mark.parametrize("codec", ARCHIVE_CODECS)
+def test_archive_codec_roundtrip(tmp_path, path_small_workspace_data_dir, codec):
+    if codec == ARCHIVE_CODEC_ZSTD:
+        importorskip("zstandard")
+    archive_path = str(tmp_path / "workspace.archive")
+    make_archive_file(source=path_small_workspace_data_dir, destination=archive_path, codec=codec)
+    unpack_archive_file(source=archive_path, destination=str(tmp_path / "unpacked"))
+    assert_same_dirs(path_small_workspace_data_dir, str(tmp_path / "unpacked" / "data"))
+
+
+def test_archive_codec_auto_stores_media(path_small_workspace_data_dir):
+    stream = BytesIO()
+    make_archive_stream(stream=stream, sources=[(path_small_workspace_data_dir, "data")], codec=ARCHIVE_CODEC_AUTO)
+    with ZipFile(stream) as zip_file:
+        compress_types = {info.filename: info.compress_type for info in zip_file.infolist() if not info.is_dir()}
+    assert compress_types["data/mets.xml"] == ZIP_DEFLATED
+    media_files = [name for name in compress_types if name.lower().endswith((".tif", ".jpg", ".png"))]
+    assert media_files
+    assert all(compress_types[name] == ZIP_STORED for name in media_files)
+
+
+@mark.parametrize("codec,compress_type", [(ARCHIVE_CODEC_DEFLATE, ZIP_DEFLATED), (ARCHIVE_CODEC_STORE, ZIP_STORED)])
+def test_archive_codec_uniform_zip(path_small_workspace_data_dir, codec, compress_type):
+    stream = BytesIO()
+    make_archive_stream(stream=stream, sources=[(path_small_workspace_data_dir, "data")], codec=codec)
+    with ZipFile(stream) as zip_file:
+        assert all(info.compress_type == compress_type for info in zip_file.infolist() if not info.is_dir())
+
+
+@mark.parametrize("codec", ARCHIVE_CODECS)
+def test_archive_codec_dereferences_symlinks(tmp_path, codec):
+    if codec == ARCHIVE_CODEC_ZSTD:
+        importorskip("zstandard")
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    (source_dir / "image.png").write_bytes(b"image")
+    (source_dir / "image_link.png").symlink_to(source_dir / "image.png")
+    archive_path = str(tmp_path / "source.archive")
+    make_archive_file(source=str(source_dir), destination=archive_path, codec=codec)
+    unpack_archive_file(source=archive_path, destination=str(tmp_path / "unpacked"))
+    unpacked_link = tmp_path / "unpacked" / "source" / "image_link.png"
+    assert not unpacked_link.is_symlink()
+    assert unpacked_link.read_bytes() == b"image"
+
+
+def test_archive_unpack_unsupported_format(tmp_path):
+    archive_path = tmp_path / "workspace.rar"
+    archive_path.write_bytes(b"Rar!\x1a\x07\x00")
+    with raises(ValueError, match="neither a zip nor a zstd"):
+        unpack_archive_file(source=str(archive_path), destination=str(tmp_path / "unpacked"))
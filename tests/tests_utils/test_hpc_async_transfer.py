@@ -0,0 +1,73 @@
+from asyncio import gather, run, sleep
+from datetime import datetime
+from os import environ
+from os.path import join
+from pytest import importorskip
+from operandi_utils.hpc import AsyncHPCTransfer
+from operandi_utils.hpc.utils import compute_file_sha256
+from tests.helpers_asserts import assert_exists_file
+from tests.constants import BATCH_SCRIPT_EMPTY
+
+OPERANDI_SERVER_BASE_DIR = environ.get("OPERANDI_SERVER_BASE_DIR")
+current_time = datetime.now().strftime("%Y%m%d_%H%M")
+
+
+def test_hpc_async_transfer_files_concurrently(path_batch_script_empty):
+    """
+    Testing concurrent put_file and get_file calls of the async HPC transfer on a single event loop
+    """
+    importorskip("asyncssh")
+    assert_exists_file(path_batch_script_empty)
+
+    async def transfer_files():
+        async with AsyncHPCTransfer() as hpc_async_transfer:
+            remote_paths = [
+                join(hpc_async_transfer.project_root_dir, f"async_{index}_{current_time}_{BATCH_SCRIPT_EMPTY}")
+                for index in range(4)]
+            put_digests = await gather(*(
+                hpc_async_transfer.put_file(local_src=path_batch_script_empty, remote_dst=remote_path)
+                for remote_path in remote_paths))
+            get_digests = await gather(*(
+                hpc_async_transfer.get_file(
+                    remote_src=remote_path, local_dst=join(OPERANDI_SERVER_BASE_DIR, remote_path.split('/')[-1]))
+                for remote_path in remote_paths))
+            for remote_path in remote_paths:
+                await hpc_async_transfer.sftp_client.remove(remote_path)
+            return put_digests, get_digests
+
+    put_digests, get_digests = run(transfer_files())
+    assert set(put_digests) == set(get_digests) == {compute_file_sha256(path_batch_script_empty)}
+
+
+def test_hpc_async_transfer_single_reconnect(tmp_path):
+    """
+    Testing that concurrent transfers on a closed connection reconnect only once
+    """
+    importorskip("asyncssh")
+    key_path = tmp_path / "fake_key"
+    key_path.write_text("fake key")
+    hpc_async_transfer = AsyncHPCTransfer(
+        username="fake_user", project_username="fake_user", key_path=str(key_path), project_name="fake_project")
+    connects = []
+
+    class FakeConnection:
+        @staticmethod
+        def is_closed() -> bool:
+            return False
+
+    async def fake_connect():
+        connects.append(len(connects))
+        await sleep(0.05)
+        hpc_async_transfer.ssh_hpc_conn, hpc_async_transfer.sftp_client = FakeConnection(), object()
+
+    async def fake_close():
+        hpc_async_transfer.ssh_hpc_conn, hpc_async_transfer.sftp_client = None, None
+
+    hpc_async_transfer.connect = fake_connect
+    hpc_async_transfer.close = fake_close
+
+    async def reconnect_concurrently():
+        await gather(*(hpc_async_transfer.reconnect_if_required() for _ in range(5)))
+
+    run(reconnect_concurrently())
+    assert connects == [0]
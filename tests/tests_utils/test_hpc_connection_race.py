@@ -0,0 +1,85 @@
+from threading import Event
+from time import monotonic, sleep
+from pytest import raises
+from operandi_utils.hpc import HPCHostStats
+from operandi_utils.hpc.connection_utils import race_connection_attempts
+
+
+def test_hpc_connection_race_fastest_attempt_wins():
+    """
+    Testing that a later started, but faster attempt wins and the result of the slower attempt is discarded
+    """
+    discarded, slow_discarded = [], Event()
+
+    def slow_attempt():
+        sleep(0.3)
+        return "slow"
+
+    def discard_result(result):
+        discarded.append(result)
+        slow_discarded.set()
+
+    assert race_connection_attempts(
+        connect_functions=[slow_attempt, lambda: "fast"], stagger=0.05, discard_result=discard_result) == "fast"
+    assert slow_discarded.wait(timeout=5)
+    assert discarded == ["slow"]
+
+
+def test_hpc_connection_race_stagger():
+    """
+    Testing that the next attempt is started only after the stagger, unless the previous attempt has failed
+    """
+    started = []
+
+    def attempt(name: str, fail: bool):
+        def connect():
+            started.append(name)
+            if fail:
+                raise ConnectionError(f"Failed attempt: {name}")
+            return name
+        return connect
+
+    assert race_connection_attempts(
+        connect_functions=[attempt("first", fail=False), attempt("second", fail=False)], stagger=5) == "first"
+    assert started == ["first"]
+
+    started.clear()
+    start_time = monotonic()
+    assert race_connection_attempts(
+        connect_functions=[attempt("first", fail=True), attempt("second", fail=False)], stagger=5) == "second"
+    assert monotonic() - start_time < 5
+    assert started == ["first", "second"]
+
+
+def test_hpc_connection_race_all_attempts_failed():
+    def failing_attempt():
+        raise ConnectionError("Unreachable")
+
+    with raises(ConnectionError):
+        race_connection_attempts(connect_functions=[failing_attempt, failing_attempt], stagger=0.01)
+    with raises(ValueError):
+        race_connection_attempts(connect_functions=[], stagger=0.01)
+
+
+def test_hpc_host_stats_rank_routes():
+    """
+    Testing that the routes are ranked by their consecutive failures, then by their latency,
+    and that the routes without a known latency keep the configured order after the others
+    """
+    host_stats = HPCHostStats()
+    proxy_hosts, hpc_hosts = ["proxy1"], ["hpc1", "hpc2", "hpc3", "hpc4"]
+    assert host_stats.rank_routes(proxy_hosts, hpc_hosts) == [
+        ("proxy1", "hpc1"), ("proxy1", "hpc2"), ("proxy1", "hpc3"), ("proxy1", "hpc4")]
+
+    host_stats.record_success(proxy_host="proxy1", hpc_host="hpc3", latency=0.5)
+    host_stats.record_success(proxy_host="proxy1", hpc_host="hpc4", latency=0.1)
+    host_stats.record_failure(proxy_host="proxy1", hpc_host="hpc1")
+    assert host_stats.rank_routes(proxy_hosts, hpc_hosts) == [
+        ("proxy1", "hpc4"), ("proxy1", "hpc3"), ("proxy1", "hpc2"), ("proxy1", "hpc1")]
+
+    # A failure ranks the fastest route after the routes without failures until it has succeeded again
+    host_stats.record_failure(proxy_host="proxy1", hpc_host="hpc4")
+    assert host_stats.rank_routes(proxy_hosts, hpc_hosts) == [
+        ("proxy1", "hpc3"), ("proxy1", "hpc2"), ("proxy1", "hpc4"), ("proxy1", "hpc1")]
+    host_stats.record_success(proxy_host="proxy1", hpc_host="hpc4", latency=0.1)
+    assert host_stats.rank_routes(proxy_hosts, hpc_hosts)[0] == ("proxy1", "hpc4")
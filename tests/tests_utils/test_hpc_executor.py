@@ -2,6 +2,9 @@ from datetime import datetime
 from os.path import join
 from time import sleep
 
+from operandi_utils.hpc.constants import HPC_AGENT_SCRIPT
+from operandi_utils.hpc.executor import HPCExecutor, expand_slurm_array_job_id
+
 current_time = datetime.now().strftime("%Y%m%d_%H%M")
 
 
@@ -41,3 +44,52 @@ def test_hpc_connector_executor_cd_dir(hpc_command_executor):
     # The test dir name will be part of the returned error message
     assert f'{test_dir_name}' in err[0]
     assert output == []
+
+
+def test_hpc_connector_executor_execute_async(hpc_command_executor):
+    streamed_lines = []
+    futures = [
+        hpc_command_executor.execute_async(command=f"echo {index}", on_stdout=streamed_lines.append)
+        for index in range(4)]
+    results = [future.result() for future in futures]
+    assert [output for output, err, return_code in results] == [[f"{index}\n"] for index in range(4)]
+    assert sorted(streamed_lines) == [f"{index}\n" for index in range(4)]
+    assert all(return_code == 0 for output, err, return_code in results)
+
+
+def test_hpc_connector_executor_check_slurm_job_states_unknown(hpc_command_executor):
+    slurm_job_states = hpc_command_executor.check_slurm_job_states(slurm_job_ids=["1", "2"])
+    assert slurm_job_states == {"1": None, "2": None}
+
+
+def test_hpc_connector_executor_agent(hpc_command_executor, hpc_data_transfer):
+    agent_script_path = hpc_data_transfer.put_batch_script(batch_script_id=HPC_AGENT_SCRIPT)
+    hpc_command_executor.start_agent(agent_script_path=agent_script_path)
+    try:
+        slurm_job_states = hpc_command_executor.check_slurm_job_states(slurm_job_ids=["1", "2"])
+        assert slurm_job_states == {"1": None, "2": None}
+    finally:
+        hpc_command_executor.stop_agent()
+
+
+def test_hpc_connector_executor_expand_slurm_array_job_id():
+    assert expand_slurm_array_job_id("123_[0-2,5%4]") == ["123_0", "123_1", "123_2", "123_5"]
+    assert expand_slurm_array_job_id("123_4") == ["123_4"]
+    assert expand_slurm_array_job_id("123.batch") == ["123.batch"]
+
+
+def test_hpc_connector_executor_parse_slurm_jobs_accounting():
+    sacct_lines = [
+        "123|2024-05-01T10:00:00|2024-05-01T10:01:40|2024-05-01T10:11:40|600|20:00.500||32G|4|gwdc001\n",
+        "123.batch|2024-05-01T10:01:40|2024-05-01T10:01:40|2024-05-01T10:11:40|600|19:59.500|2097152K||4|gwdc001\n",
+        "123.extern|2024-05-01T10:01:40|2024-05-01T10:01:40|2024-05-01T10:11:40|600|00:01|1024||4|gwdc001\n",
+    ]
+    accounting = HPCExecutor._parse_slurm_jobs_accounting(slurm_job_ids=["123", "124"], sacct_lines=sacct_lines)
+    assert accounting["124"] is None
+    assert accounting["123"]["hpc_start_time"] == datetime(2024, 5, 1, 10, 1, 40)
+    assert accounting["123"]["hpc_elapsed"] == 600
+    assert accounting["123"]["hpc_total_cpu"] == 1200.5
+    assert accounting["123"]["hpc_max_rss"] == 2 * 1024 ** 3
+    assert accounting["123"]["hpc_req_mem"] == 32 * 1024 ** 3
+    assert accounting["123"]["hpc_alloc_cpus"] == 4
+    assert accounting["123"]["hpc_node_list"] == "gwdc001"
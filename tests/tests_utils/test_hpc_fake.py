@@ -0,0 +1,191 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from fcntl import flock, LOCK_SH, LOCK_UN
+from os import makedirs, urandom
+from os.path import join
+from shutil import copytree, rmtree
+from pytest import raises
+from operandi_utils.hpc.constants import (
+    HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB, HPC_EXECUTOR_HOSTS, HPC_NF_EXECUTOR_SLURM,
+    HPC_NF_HEAD_JOB_CPUS)
+from operandi_utils.hpc.utils import compute_file_sha256
+from tests.helpers_asserts import assert_exists_file
+from tests.helpers_fake_hpc import FakeHPC
+
+
+def _submit_workflow_job(fake_hpc_executor, fake_hpc_transfer, batch_script_path, workspace_dir, workflow_job_id,
+                         nextflow_script_path, **kwargs):
+    fake_hpc_transfer.pack_and_put_slurm_workspace(
+        ocrd_workspace_dir=workspace_dir, workflow_job_id=workflow_job_id, nextflow_script_path=nextflow_script_path)
+    return fake_hpc_executor.trigger_slurm_job(
+        batch_script_path=batch_script_path, workflow_job_id=workflow_job_id, nextflow_script_path=nextflow_script_path,
+        input_file_grp="DEFAULT", workspace_id=workspace_dir.split('/')[-1], mets_basename="mets.xml",
+        nf_process_forks=1, ws_pages_amount=1, use_mets_server=False, file_groups_to_remove="", **kwargs)
+
+
+def test_hpc_fake_workflow_job_cycle(
+    fake_hpc, fake_hpc_executor, fake_hpc_transfer, path_small_workspace_data_dir, template_workflow, tmp_path
+):
+    """
+    Testing the submit, poll and download cycle of a workflow job against the fake hpc, over the agent
+    """
+    batch_scripts = fake_hpc_transfer.deploy_batch_scripts()
+    fake_hpc_executor.use_deployed_batch_scripts(batch_scripts=batch_scripts, start_agent=True)
+    assert fake_hpc_executor._get_agent()
+    workspace_dir = join(tmp_path, "fake_ws")
+    copytree(src=path_small_workspace_data_dir, dst=workspace_dir)
+    workflow_job_id = "fake_wf_job_cycle"
+    slurm_job_id = _submit_workflow_job(
+        fake_hpc_executor, fake_hpc_transfer, batch_scripts[HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB], workspace_dir,
+        workflow_job_id, template_workflow)
+    slurm_job_states = fake_hpc.wait_slurm_job_states(executor=fake_hpc_executor, slurm_job_ids=[slurm_job_id])
+    assert slurm_job_states[slurm_job_id] == "COMPLETED"
+
+    workflow_job_dir = join(tmp_path, workflow_job_id)
+    fake_hpc_transfer.get_and_unpack_slurm_workspace(
+        ocrd_workspace_dir=workspace_dir, workflow_job_dir=workflow_job_dir)
+    assert_exists_file(join(workspace_dir, "mets.xml"))
+    assert_exists_file(join(workflow_job_dir, "report.html"))
+    accounting = fake_hpc_executor.get_slurm_jobs_accounting(slurm_job_ids=[slurm_job_id])[slurm_job_id]
+    assert accounting["hpc_alloc_cpus"] == 2
+    assert accounting["hpc_max_rss"] > 0
+
+
+def test_hpc_fake_failures_and_unreachable_hosts(path_small_workspace_data_dir, template_workflow, tmp_path):
+    """
+    Testing failed slurm jobs and the connection over the remaining route when the first hpc host is down
+    """
+    fake_hpc = FakeHPC(failure_rate=1.0, unreachable_hosts=[HPC_EXECUTOR_HOSTS[0]])
+    try:
+        fake_hpc_transfer = fake_hpc.create_transfer()
+        fake_hpc_executor = fake_hpc.create_executor()
+        assert fake_hpc_executor.last_used_hpc_host != HPC_EXECUTOR_HOSTS[0]
+        fake_hpc_executor.use_deployed_batch_scripts(batch_scripts=fake_hpc_transfer.deploy_batch_scripts())
+        batch_script_path = fake_hpc_transfer.put_batch_script(HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB)
+        workspace_dir = join(tmp_path, "fake_ws")
+        copytree(src=path_small_workspace_data_dir, dst=workspace_dir)
+        slurm_job_id = _submit_workflow_job(
+            fake_hpc_executor, fake_hpc_transfer, batch_script_path, workspace_dir, "fake_wf_job_failing",
+            template_workflow)
+        slurm_job_states = fake_hpc.wait_slurm_job_states(executor=fake_hpc_executor, slurm_job_ids=[slurm_job_id])
+        assert slurm_job_states[slurm_job_id] == "FAILED"
+    finally:
+        fake_hpc.stop()
+
+
+def test_hpc_fake_nextflow_slurm_executor(
+    fake_hpc, fake_hpc_executor, fake_hpc_transfer, path_small_workspace_data_dir, template_workflow, tmp_path
+):
+    """
+    Testing that the workflow job only allocates the nextflow head when the processes are submitted by nextflow
+    """
+    batch_script_path = fake_hpc_transfer.put_batch_script(HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB)
+    workspace_dir = join(tmp_path, "fake_ws")
+    copytree(src=path_small_workspace_data_dir, dst=workspace_dir)
+    slurm_job_id = _submit_workflow_job(
+        fake_hpc_executor, fake_hpc_transfer, batch_script_path, workspace_dir, "fake_wf_job_nf_slurm",
+        template_workflow, cpus=16, ram=64, nf_executor=HPC_NF_EXECUTOR_SLURM)
+    slurm_job_states = fake_hpc.wait_slurm_job_states(executor=fake_hpc_executor, slurm_job_ids=[slurm_job_id])
+    assert slurm_job_states[slurm_job_id] == "COMPLETED"
+    accounting = fake_hpc_executor.get_slurm_jobs_accounting(slurm_job_ids=[slurm_job_id])[slurm_job_id]
+    assert accounting["hpc_alloc_cpus"] == HPC_NF_HEAD_JOB_CPUS
+
+
+def test_hpc_fake_large_command_output(fake_hpc_executor):
+    """
+    Testing that the output of a command, many times larger than a single receive, is received in full
+    """
+    output, err, return_code = fake_hpc_executor.execute_blocking(
+        "python3 -c \"import sys; [print('x' * 999) for _ in range(500)]; sys.stderr.write('e' * 99999)\"")
+    assert return_code == 0
+    assert output == ['x' * 999 + '\n'] * 500
+    assert "".join(err) == 'e' * 99999
+
+
+def test_hpc_fake_parallel_transfer_extra_transports(fake_hpc_transfer, tmp_path):
+    """
+    Testing that the extra transports take the route of the primary transport to the hpc host
+    """
+    local_src, local_dst = join(tmp_path, "parallel_src.bin"), join(tmp_path, "parallel_dst.bin")
+    with open(local_src, mode="wb") as local_file:
+        local_file.write(urandom(4 * 1024 * 1024))
+    remote_path = join(fake_hpc_transfer.project_root_dir, "parallel_extra_transports.bin")
+    fake_hpc_transfer.put_file_parallel(
+        local_src=local_src, remote_dst=remote_path, channels=4, extra_transports=True, min_part_size=1024 * 1024)
+    fake_hpc_transfer.get_file_parallel(
+        remote_src=remote_path, local_dst=local_dst, channels=4, extra_transports=True, min_part_size=1024 * 1024)
+    assert compute_file_sha256(local_dst) == compute_file_sha256(local_src)
+
+
+def test_hpc_fake_sync_workspace_removes_empty_dirs(fake_hpc_transfer, path_small_workspace_data_dir, tmp_path):
+    """
+    Testing that the dirs left empty by files removed from the local workspace are removed from the synced cache
+    """
+    workspace_dir = join(tmp_path, "fake_ws_sync")
+    copytree(src=path_small_workspace_data_dir, dst=workspace_dir)
+    makedirs(join(workspace_dir, "OCR-D-REMOVED", "nested"))
+    with open(join(workspace_dir, "OCR-D-REMOVED", "nested", "removed.txt"), mode="w") as removed_file:
+        removed_file.write("removed")
+    nextflow_script_path = join(tmp_path, "fake_sync.nf")
+    with open(nextflow_script_path, mode="w") as nextflow_script:
+        nextflow_script.write("")
+    hpc_synced_ws_dir = fake_hpc_transfer.sync_slurm_workspace(
+        ocrd_workspace_dir=workspace_dir, workflow_job_id="fake_wf_job_sync_0",
+        nextflow_script_path=nextflow_script_path)
+    assert "OCR-D-REMOVED" in fake_hpc_transfer.sftp_client.listdir(hpc_synced_ws_dir)
+
+    rmtree(join(workspace_dir, "OCR-D-REMOVED"))
+    fake_hpc_transfer.sync_slurm_workspace(
+        ocrd_workspace_dir=workspace_dir, workflow_job_id="fake_wf_job_sync_1",
+        nextflow_script_path=nextflow_script_path)
+    synced_entries = fake_hpc_transfer.sftp_client.listdir(hpc_synced_ws_dir)
+    assert "OCR-D-REMOVED" not in synced_entries
+    assert "mets.xml" in synced_entries
+
+
+def test_hpc_fake_submit_requires_deployed_batch_scripts(fake_hpc, fake_hpc_transfer, template_workflow):
+    """
+    Testing that an executor without the deployed invoke batch script refuses to submit slurm jobs
+    """
+    hpc_executor = fake_hpc.create_executor()
+    batch_script_path = fake_hpc_transfer.put_batch_script(HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB)
+    with raises(RuntimeError, match="use_deployed_batch_scripts"):
+        hpc_executor.trigger_slurm_job(
+            batch_script_path=batch_script_path, workflow_job_id="fake_wf_job_not_deployed",
+            nextflow_script_path=template_workflow, input_file_grp="DEFAULT", workspace_id="fake_ws",
+            mets_basename="mets.xml", nf_process_forks=1, ws_pages_amount=1, use_mets_server=False,
+            file_groups_to_remove="")
+
+
+def test_hpc_fake_sync_workspace_waits_for_copying_jobs(fake_hpc, path_small_workspace_data_dir, tmp_path):
+    """
+    Testing two overlapping workflow jobs on one workspace: the sync of the second job waits for the first job
+    copying the synced workspace under the shared lock, and concurrent syncs of the workspace are serialized
+    """
+    workspace_dir = join(tmp_path, "fake_ws_sync_lock")
+    copytree(src=path_small_workspace_data_dir, dst=workspace_dir)
+    nextflow_script_path = join(tmp_path, "fake_sync_lock.nf")
+    with open(nextflow_script_path, mode="w") as nextflow_script:
+        nextflow_script.write("")
+    transfers = [fake_hpc.create_transfer(), fake_hpc.create_transfer()]
+
+    def sync(index: int) -> str:
+        return transfers[index].sync_slurm_workspace(
+            ocrd_workspace_dir=workspace_dir, workflow_job_id=f"fake_wf_job_sync_lock_{index}",
+            nextflow_script_path=nextflow_script_path)
+
+    hpc_synced_ws_dir = sync(0)
+    # The first job copies the synced workspace, like the batch script does under the shared lock
+    with open(f"{hpc_synced_ws_dir}.lock", mode="w") as lock_file:
+        flock(lock_file, LOCK_SH)
+        with ThreadPoolExecutor(max_workers=2) as sync_executor:
+            blocked_sync = sync_executor.submit(sync, 1)
+            with raises(FutureTimeoutError):
+                blocked_sync.result(timeout=1)
+            flock(lock_file, LOCK_UN)
+            assert blocked_sync.result(timeout=30) == hpc_synced_ws_dir
+
+            with open(join(workspace_dir, "added.txt"), mode="w") as added_file:
+                added_file.write("added")
+            assert [sync_future.result(timeout=30) for sync_future in [
+                sync_executor.submit(sync, 0), sync_executor.submit(sync, 1)]] == [hpc_synced_ws_dir] * 2
+    assert "added.txt" in transfers[0].sftp_client.listdir(hpc_synced_ws_dir)
@@ -0,0 +1,19 @@
+from operandi_utils.hpc import (
+    extract_model_dependencies, extract_model_dependencies_from_file, format_model_dependencies)
+
+
+def test_hpc_model_dependencies_of_workflows(default_workflow, odem_workflow, template_workflow):
+    default_models = extract_model_dependencies_from_file(default_workflow)
+    assert "ocrd-resources/ocrd-calamari-recognize/qurator-gt4histocr-1.0" in default_models
+    assert "tessdata/Fraktur.traineddata" not in default_models
+    odem_models = extract_model_dependencies_from_file(odem_workflow)
+    assert "tessdata/Fraktur.traineddata" in odem_models
+    assert "ocrd-resources/ocrd-calamari-recognize/qurator-gt4histocr-1.0" not in odem_models
+    assert format_model_dependencies(extract_model_dependencies_from_file(template_workflow)) == "none"
+
+    # Models not known before the run time require all models to be staged
+    assert extract_model_dependencies('ocrd-tesserocr-recognize -P model "${params.model}"') is None
+    assert extract_model_dependencies("ocrd-unknown-processor -I OCR-D-IMG -O OCR-D-OUT") is None
+    assert format_model_dependencies(None) == "*"
+    assert extract_model_dependencies(
+        "ocrd-calamari-recognize \\\n -p '{\"checkpoint_dir\": \"/usr/local/share/custom\"}'") == ["custom"]
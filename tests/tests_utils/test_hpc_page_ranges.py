@@ -0,0 +1,79 @@
+from os.path import join
+from pathlib import Path
+from shutil import copytree
+from subprocess import run
+from sys import executable
+from pytest import raises
+from ocrd_models import OcrdMets
+from operandi_utils.hpc import nextflow_script_uses_mets_chunks, split_page_ranges, write_page_ranges
+from operandi_utils.hpc.constants import HPC_DIR_METS_CHUNKS, HPC_METS_MERGE_SCRIPT, HPC_PAGE_RANGES_FILE
+
+
+def test_hpc_page_ranges_with_mets_chunks(path_small_workspace_data_dir, tmp_path):
+    mets_path = join(path_small_workspace_data_dir, "mets.xml")
+    page_ids = OcrdMets(filename=mets_path).physical_pages
+    assert split_page_ranges(page_ids=list("abcdefg"), chunks=3) == [list("abc"), list("de"), list("fg")]
+
+    page_ranges_path = write_page_ranges(dst_dir=str(tmp_path), mets_path=mets_path, chunks=len(page_ids) + 1)
+    with open(page_ranges_path) as page_ranges_file:
+        rows = [line.rstrip("\n").split("\t") for line in page_ranges_file]
+    # Never more chunks than pages
+    assert [page_range for _, page_range in rows] == page_ids
+    for mets_chunk_name, page_range in rows:
+        mets_chunk = OcrdMets(filename=join(tmp_path, HPC_DIR_METS_CHUNKS, mets_chunk_name))
+        assert mets_chunk.physical_pages == [page_range]
+        assert all(mets_file.pageId == page_range for mets_file in mets_chunk.find_files() if mets_file.pageId)
+
+    # Without mets chunks all forks share the mets file of the workspace
+    ms_dir = tmp_path / "ms"
+    ms_dir.mkdir()
+    page_ranges_path = write_page_ranges(
+        dst_dir=str(ms_dir), mets_path=mets_path, chunks=1, page_ids=page_ids, mets_chunks=False)
+    assert not (ms_dir / HPC_DIR_METS_CHUNKS).exists()
+    with open(page_ranges_path) as page_ranges_file:
+        assert page_ranges_file.read() == f"\t{','.join(page_ids)}\n"
+
+
+def test_hpc_page_ranges_merge_mets_chunks(path_small_workspace_data_dir, tmp_path):
+    workspace_dir = tmp_path / "workspace"
+    copytree(path_small_workspace_data_dir, workspace_dir)
+    mets_path = str(workspace_dir / "mets.xml")
+    write_page_ranges(dst_dir=str(tmp_path), mets_path=mets_path, chunks=3)
+    mets_chunk_paths = sorted(str(path) for path in (tmp_path / HPC_DIR_METS_CHUNKS).iterdir())
+    assert len(mets_chunk_paths) == 3
+    # Each fork adds the files of its pages to its own mets chunk
+    for mets_chunk_path in mets_chunk_paths:
+        mets_chunk = OcrdMets(filename=mets_chunk_path)
+        for page_id in mets_chunk.physical_pages:
+            mets_chunk.add_file(
+                "OCR-D-OCR", ID=f"OCR-D-OCR_{page_id}", mimetype="application/vnd.prima.page+xml", pageId=page_id,
+                local_filename=f"OCR-D-OCR/OCR-D-OCR_{page_id}.xml")
+        with open(mets_chunk_path, "wb") as mets_chunk_file:
+            mets_chunk_file.write(mets_chunk.to_xml(xmllint=True))
+    files_before = len(list(OcrdMets(filename=mets_path).find_files()))
+
+    run([executable, str(tmp_path / HPC_METS_MERGE_SCRIPT), "--mets", mets_path, "--remove-chunks"] + mets_chunk_paths,
+        check=True)
+    merged_mets = OcrdMets(filename=mets_path)
+    page_ids = merged_mets.physical_pages
+    ocr_files = list(merged_mets.find_files(fileGrp="OCR-D-OCR"))
+    assert [ocr_file.pageId for ocr_file in ocr_files] == page_ids
+    assert len(list(merged_mets.find_files())) == files_before + len(page_ids)
+    assert not any(Path(mets_chunk_path).exists() for mets_chunk_path in mets_chunk_paths)
+
+
+def test_hpc_page_ranges_nextflow_script_uses_mets_chunks(template_workflow, template_workflow_with_ms, tmp_path):
+    assert nextflow_script_uses_mets_chunks(template_workflow)
+    # With the METS server the forks share the mets file of the workspace
+    assert not nextflow_script_uses_mets_chunks(template_workflow_with_ms)
+    # E.g., an uploaded workflow processing all pages in a single process
+    user_workflow = tmp_path / "user_workflow.nf"
+    user_workflow.write_text('nextflow.enable.dsl = 2\nparams.mets = "null"\n')
+    assert not nextflow_script_uses_mets_chunks(str(user_workflow))
+
+
+def test_hpc_page_ranges_without_pages(path_small_workspace_data_dir, tmp_path):
+    with raises(ValueError, match="No page ids"):
+        write_page_ranges(
+            dst_dir=str(tmp_path), mets_path=join(path_small_workspace_data_dir, "mets.xml"), chunks=2, page_ids=[])
+    assert not (tmp_path / HPC_PAGE_RANGES_FILE).exists()
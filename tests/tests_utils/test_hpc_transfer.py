@@ -1,7 +1,13 @@
 from datetime import datetime
-from os import environ
+from os import environ, urandom
 from os.path import join
+from pathlib import Path
+from shutil import copytree
 from time import sleep
+from operandi_utils import make_zip_archive
+from operandi_utils.hpc import HPCTransfer
+from operandi_utils.hpc.constants import HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB, HPC_RESULTS_REMOVED_FILES_LIST
+from operandi_utils.hpc.utils import compute_file_sha256
 from tests.helpers_asserts import assert_exists_dir, assert_exists_file
 from tests.constants import BATCH_SCRIPT_EMPTY
 
@@ -37,3 +43,172 @@ def test_hpc_connector_transfer_dir(hpc_data_transfer, path_dummy_workspace_data
     hpc_data_transfer.get_dir(remote_src=test_hpc_dir_path, local_dst=test_local_received_dir_path)
     sleep(2)
     assert_exists_dir(test_local_received_dir_path)
+
+
+def test_hpc_connector_stream_slurm_workspace(hpc_data_transfer, path_small_workspace_data_dir, template_workflow):
+    """
+    Testing the pack_and_stream_slurm_workspace functionality of the HPC transfer
+    """
+    assert_exists_dir(path_small_workspace_data_dir)
+    workflow_job_id = f"test_wf_job_stream_{current_time}"
+    hpc_dst_slurm_zip, slurm_zip_sha256 = hpc_data_transfer.pack_and_stream_slurm_workspace(
+        ocrd_workspace_dir=path_small_workspace_data_dir, workflow_job_id=workflow_job_id,
+        nextflow_script_path=template_workflow)
+    assert hpc_dst_slurm_zip == join(hpc_data_transfer.slurm_workspaces_dir, f"{workflow_job_id}.zip")
+    assert hpc_data_transfer.sftp_client.stat(hpc_dst_slurm_zip).st_size > 0
+    assert slurm_zip_sha256 == hpc_data_transfer.compute_remote_sha256(remote_path=hpc_dst_slurm_zip)
+    hpc_data_transfer.sftp_client.remove(hpc_dst_slurm_zip)
+
+
+def test_hpc_connector_sync_slurm_workspace(hpc_data_transfer, path_small_workspace_data_dir, template_workflow):
+    """
+    Testing the incremental sync_slurm_workspace functionality of the HPC transfer
+    """
+    assert_exists_dir(path_small_workspace_data_dir)
+    local_workspace_dir = copytree(
+        src=path_small_workspace_data_dir, dst=join(OPERANDI_SERVER_BASE_DIR, f"test_ws_sync_{current_time}"))
+    hpc_synced_ws_dir = hpc_data_transfer.sync_slurm_workspace(
+        ocrd_workspace_dir=local_workspace_dir, workflow_job_id=f"test_wf_job_sync_{current_time}",
+        nextflow_script_path=template_workflow)
+    assert hpc_data_transfer.sftp_client.stat(join(hpc_synced_ws_dir, "mets.xml")).st_size > 0
+
+    # Only the changed mets file is uploaded again, the rest is reused
+    with open(join(local_workspace_dir, "mets.xml"), mode="a") as mets_file:
+        mets_file.write("\n")
+    hpc_data_transfer.sync_slurm_workspace(
+        ocrd_workspace_dir=local_workspace_dir, workflow_job_id=f"test_wf_job_sync_2_{current_time}",
+        nextflow_script_path=template_workflow)
+    remote_mets_size = hpc_data_transfer.sftp_client.stat(join(hpc_synced_ws_dir, "mets.xml")).st_size
+    assert remote_mets_size == Path(local_workspace_dir, "mets.xml").stat().st_size
+
+
+def test_hpc_connector_transfer_file_checksum(hpc_data_transfer, path_batch_script_empty):
+    """
+    Testing that put_file and get_file return the sha256 computed while streaming the file
+    """
+    test_hpc_file_path = join(hpc_data_transfer.project_root_dir, f"checksum_{BATCH_SCRIPT_EMPTY}")
+    put_sha256 = hpc_data_transfer.put_file(local_src=path_batch_script_empty, remote_dst=test_hpc_file_path)
+    assert put_sha256 == compute_file_sha256(path_batch_script_empty)
+    test_local_received_file_path = join(OPERANDI_SERVER_BASE_DIR, f"checksum_{BATCH_SCRIPT_EMPTY}")
+    get_sha256 = hpc_data_transfer.get_file(remote_src=test_hpc_file_path, local_dst=test_local_received_file_path)
+    assert get_sha256 == put_sha256
+    hpc_data_transfer.sftp_client.remove(test_hpc_file_path)
+
+
+def test_hpc_connector_transfer_file_parallel(hpc_data_transfer):
+    """
+    Testing the put_file_parallel and get_file_parallel functionality of the HPC transfer
+    """
+    test_local_file_path = join(OPERANDI_SERVER_BASE_DIR, f"test_parallel_{current_time}.bin")
+    Path(test_local_file_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(test_local_file_path, mode="wb") as test_file:
+        test_file.write(urandom(3 * 1024 * 1024 + 17))
+    test_hpc_file_path = join(hpc_data_transfer.project_root_dir, f"test_parallel_{current_time}.bin")
+    hpc_data_transfer.put_file_parallel(
+        local_src=test_local_file_path, remote_dst=test_hpc_file_path, channels=4, min_part_size=1024 * 1024)
+    test_local_received_file_path = join(OPERANDI_SERVER_BASE_DIR, f"test_parallel_received_{current_time}.bin")
+    hpc_data_transfer.get_file_parallel(
+        remote_src=test_hpc_file_path, local_dst=test_local_received_file_path, channels=4,
+        extra_transports=True, min_part_size=1024 * 1024)
+    assert Path(test_local_received_file_path).read_bytes() == Path(test_local_file_path).read_bytes()
+    hpc_data_transfer.sftp_client.remove(test_hpc_file_path)
+
+
+def test_hpc_connector_get_file_resumes_part(hpc_data_transfer, path_batch_script_empty):
+    """
+    Testing that a download with retries resumes from an existing `.part` file
+    """
+    test_hpc_file_path = join(hpc_data_transfer.project_root_dir, f"resume_{BATCH_SCRIPT_EMPTY}")
+    hpc_data_transfer.put_file(local_src=path_batch_script_empty, remote_dst=test_hpc_file_path)
+    test_local_received_file_path = join(OPERANDI_SERVER_BASE_DIR, f"resume_{BATCH_SCRIPT_EMPTY}")
+    expected_content = Path(path_batch_script_empty).read_bytes()
+    Path(test_local_received_file_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(f"{test_local_received_file_path}.part").write_bytes(expected_content[:len(expected_content) // 2])
+    hpc_data_transfer._get_file_with_retries(remote_src=test_hpc_file_path, local_dst=test_local_received_file_path)
+    assert Path(test_local_received_file_path).read_bytes() == expected_content
+    assert not Path(f"{test_local_received_file_path}.part").exists()
+
+
+def test_hpc_connector_stream_and_unpack_zip(hpc_data_transfer, path_small_workspace_data_dir):
+    """
+    Testing the stream_and_unpack_zip functionality of the HPC transfer
+    """
+    assert_exists_dir(path_small_workspace_data_dir)
+    test_local_zip_path = join(OPERANDI_SERVER_BASE_DIR, f"test_stream_unpack_{current_time}.zip")
+    make_zip_archive(source=path_small_workspace_data_dir, destination=test_local_zip_path)
+    test_hpc_zip_path = join(hpc_data_transfer.project_root_dir, f"test_stream_unpack_{current_time}.zip")
+    hpc_data_transfer.put_file(local_src=test_local_zip_path, remote_dst=test_hpc_zip_path)
+    test_local_unpack_dir = join(OPERANDI_SERVER_BASE_DIR, f"test_stream_unpack_{current_time}")
+    hpc_data_transfer.stream_and_unpack_zip(
+        remote_src=test_hpc_zip_path, local_dst=test_local_unpack_dir, workers=4, min_part_size=1024)
+    unpacked_ws_dir = join(test_local_unpack_dir, Path(path_small_workspace_data_dir).name)
+    assert_exists_file(join(unpacked_ws_dir, "mets.xml"))
+    for path in Path(path_small_workspace_data_dir).rglob("*"):
+        if path.is_file():
+            assert Path(unpacked_ws_dir, path.relative_to(path_small_workspace_data_dir)).read_bytes() == \
+                path.read_bytes()
+    hpc_data_transfer.sftp_client.remove(test_hpc_zip_path)
+
+
+def test_hpc_connector_remove_listed_workspace_files(hpc_data_transfer, path_small_workspace_data_dir):
+    """
+    Testing the merge of the results mode `new` - files listed as removed by the batch script are removed locally
+    """
+    local_workspace_dir = copytree(
+        src=path_small_workspace_data_dir, dst=join(OPERANDI_SERVER_BASE_DIR, f"test_ws_removed_{current_time}"))
+    removed_file = next(path for path in Path(local_workspace_dir).rglob("*") if path.is_file() and
+                        path.name != "mets.xml")
+    Path(local_workspace_dir, HPC_RESULTS_REMOVED_FILES_LIST).write_text(
+        f"{removed_file.relative_to(local_workspace_dir)}\n")
+    hpc_data_transfer.remove_listed_workspace_files(ocrd_workspace_dir=local_workspace_dir)
+    assert not removed_file.exists()
+    assert not Path(local_workspace_dir, HPC_RESULTS_REMOVED_FILES_LIST).exists()
+    assert_exists_file(join(local_workspace_dir, "mets.xml"))
+
+
+def test_hpc_connector_mkdirs_p_cached(hpc_data_transfer):
+    """
+    Testing the batched creation of remote dirs and the remote dirs cache of the HPC transfer
+    """
+    test_hpc_dir_path = join(hpc_data_transfer.project_root_dir, f"test_mkdirs_{current_time}")
+    remote_dirs = [join(test_hpc_dir_path, f"group_{index}", "sub") for index in range(10)]
+    hpc_data_transfer.mkdirs_p(remotepaths=remote_dirs)
+    for remote_dir in remote_dirs:
+        hpc_data_transfer.sftp_client.stat(remote_dir)
+    # Already known dirs are neither created again, nor checked remotely
+    assert not hpc_data_transfer.mkdir_p(remotepath=remote_dirs[0])
+    assert not hpc_data_transfer.mkdir_p(remotepath=test_hpc_dir_path)
+
+
+def test_hpc_connector_put_batch_script_versioned(hpc_data_transfer):
+    """
+    Testing that batch scripts are deployed once per content version
+    """
+    hpc_batch_script_path = hpc_data_transfer.put_batch_script(batch_script_id=HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB)
+    assert hpc_batch_script_path.startswith(join(hpc_data_transfer.batch_scripts_dir, "batch_submit_workflow_job_"))
+    assert hpc_data_transfer.sftp_client.stat(hpc_batch_script_path).st_size > 0
+    assert hpc_data_transfer.put_batch_script(batch_script_id=HPC_BATCH_SCRIPT_SUBMIT_WORKFLOW_JOB) == \
+        hpc_batch_script_path
+
+
+def test_hpc_connector_shares_pooled_connections(hpc_data_transfer):
+    """
+    Testing that transfers of the same process share the pooled ssh connections
+    """
+    another_hpc_data_transfer = HPCTransfer(tunnel_host="localhost", tunnel_port=22)
+    assert another_hpc_data_transfer.connection_pool is hpc_data_transfer.connection_pool
+    assert another_hpc_data_transfer.ssh_proxy_client is hpc_data_transfer.ssh_proxy_client
+    stdin, stdout, stderr = another_hpc_data_transfer.ssh_hpc_client.exec_command(command="true")
+    assert stdout.channel.recv_exit_status() == 0
+
+
+def test_hpc_connector_records_host_stats(hpc_data_transfer):
+    """
+    Testing that the route of the established connection is remembered and ranked before unknown routes
+    """
+    route = (hpc_data_transfer.last_used_proxy_host, hpc_data_transfer.last_used_hpc_host)
+    route_stats = hpc_data_transfer.host_stats.get_stats()[route]
+    assert route_stats["consecutive_failures"] == 0
+    assert route_stats["latency"] is not None
+    ranked_routes = hpc_data_transfer.host_stats.rank_routes(hpc_data_transfer.proxy_hosts, hpc_data_transfer.hpc_hosts)
+    assert hpc_data_transfer.host_stats.get_stats()[ranked_routes[0]]["latency"] is not None